@@ -0,0 +1,258 @@
+"""
+Incremental threshold alerts on the live aggregates.
+
+The rules run on the unit summaries the live channels already compute every
+tick (standard and report WebSockets, standard SSE topics), so alerting adds
+no query. Each rule keeps a fixed handful of numbers per unit and working
+mode - no row history:
+
+- quality_below: quality over roughly the last ALERT_QUALITY_WINDOW_MINUTES,
+  as an exponentially decayed sum of the pass/fail increments between ticks,
+  below ALERT_QUALITY_MIN.
+- zero_output: no new records for ALERT_ZERO_OUTPUT_MINUTES of working time
+  (time inside the mode's SHIFT_BREAKS doesn't count).
+- performance_below: shift performance below ALERT_PERFORMANCE_MIN for
+  ALERT_PERFORMANCE_GRACE_MINUTES.
+
+Only ranges that cover the current shift are evaluated (the totals of any
+other range don't describe what is happening now), and several sockets
+observing the same unit in one tick are harmless: a repeated observation adds
+nothing. An alert is raised when a rule starts firing and resolved when it
+stops; both go to the console, ALERT_LOG_FILE (JSONL), ALERT_WEBHOOK_URL
+(POSTed from a background thread) and the listeners - main.py forwards them
+to the WebSockets watching the unit as {"alert": {...}} frames.
+
+Rule state is per worker, so with several workers each one sees the same
+transition. The log file and webhook only get it from the worker that takes
+the shared-cache lease for (status, rule, unit, mode, shift start) first;
+the others still forward it to their own sockets.
+"""
+
+import json
+import math
+import os
+import queue
+import threading
+import urllib.request
+import uuid
+
+from database import calculate_break_time
+from live_payloads import shared_cache
+from pyramid import bucket_floor
+
+ALERTS_ENABLED = os.getenv('ALERTS_ENABLED', '1') == '1'
+
+ALERT_QUALITY_MIN = float(os.getenv('ALERT_QUALITY_MIN', '0.95'))
+ALERT_QUALITY_WINDOW_MINUTES = float(os.getenv('ALERT_QUALITY_WINDOW_MINUTES', '15'))
+# Records (decayed) the window needs before its quality means anything
+ALERT_QUALITY_MIN_RECORDS = float(os.getenv('ALERT_QUALITY_MIN_RECORDS', '20'))
+
+ALERT_ZERO_OUTPUT_MINUTES = float(os.getenv('ALERT_ZERO_OUTPUT_MINUTES', '10'))
+
+ALERT_PERFORMANCE_MIN = float(os.getenv('ALERT_PERFORMANCE_MIN', '0.85'))
+ALERT_PERFORMANCE_GRACE_MINUTES = float(os.getenv('ALERT_PERFORMANCE_GRACE_MINUTES', '15'))
+
+ALERT_LOG_FILE = os.getenv('ALERT_LOG_FILE', '')
+ALERT_WEBHOOK_URL = os.getenv('ALERT_WEBHOOK_URL', '')
+# How long one worker's claim on an alert transition blocks the others from sending it again
+ALERT_DEDUPE_SECONDS = float(os.getenv('ALERT_DEDUPE_SECONDS', '300'))
+
+
+class QualityBelowRule:
+    """
+    Rule interface: update(key, shift_start, summary, current_time, working_mode)
+    -> (firing: bool or None when undecided, value), message(unit_name, value).
+    """
+
+    name = 'quality_below'
+
+    def __init__(self, minimum=ALERT_QUALITY_MIN, window_minutes=ALERT_QUALITY_WINDOW_MINUTES, min_records=ALERT_QUALITY_MIN_RECORDS):
+        self.minimum = minimum
+        self.window_seconds = window_minutes * 60
+        self.min_records = min_records
+        # key -> [shift_start, last_success, last_fail, last_time, decayed_success, decayed_fail]
+        self.state = {}
+
+    def update(self, key, shift_start, summary, current_time, working_mode):
+        success, fail = summary['total_success'], summary['total_fail']
+        state = self.state.get(key)
+        # New shift, or totals went backwards (range changed): start over from here
+        if state is None or state[0] != shift_start or success < state[1] or fail < state[2]:
+            self.state[key] = [shift_start, success, fail, current_time, 0.0, 0.0]
+            return None, None
+
+        decay = math.exp(-max((current_time - state[3]).total_seconds(), 0) / self.window_seconds)
+        state[4] = state[4] * decay + (success - state[1])
+        state[5] = state[5] * decay + (fail - state[2])
+        state[1], state[2], state[3] = success, fail, current_time
+
+        processed = state[4] + state[5]
+        if processed < self.min_records:
+            return None, None
+        quality = state[4] / processed
+        return quality < self.minimum, quality
+
+    def message(self, unit_name, value):
+        return f"{unit_name}: son {self.window_seconds / 60:.0f} dk kalite %{value * 100:.1f} (alt sınır %{self.minimum * 100:.0f})"
+
+
+class ZeroOutputRule:
+    name = 'zero_output'
+
+    def __init__(self, minutes=ALERT_ZERO_OUTPUT_MINUTES):
+        self.limit_seconds = minutes * 60
+        # key -> [shift_start, last_total, last_change_time]
+        self.state = {}
+
+    def update(self, key, shift_start, summary, current_time, working_mode):
+        total = summary['total_success'] + summary['total_fail']
+        state = self.state.get(key)
+        if state is None or state[0] != shift_start or total != state[1]:
+            self.state[key] = [shift_start, total, current_time]
+            return False, 0.0
+
+        idle_seconds = (current_time - state[2]).total_seconds() - calculate_break_time(state[2], current_time, working_mode)
+        return idle_seconds >= self.limit_seconds, idle_seconds / 60
+
+    def message(self, unit_name, value):
+        return f"{unit_name}: {value:.0f} dakikadır üretim yok (mola dışı)"
+
+
+class PerformanceBelowRule:
+    name = 'performance_below'
+
+    def __init__(self, minimum=ALERT_PERFORMANCE_MIN, grace_minutes=ALERT_PERFORMANCE_GRACE_MINUTES):
+        self.minimum = minimum
+        self.grace_seconds = grace_minutes * 60
+        # key -> [shift_start, below_since or None]
+        self.state = {}
+
+    def update(self, key, shift_start, summary, current_time, working_mode):
+        performance = summary.get('total_performance')
+        state = self.state.get(key)
+        if state is None or state[0] != shift_start:
+            state = self.state[key] = [shift_start, None]
+        # 0 means no model with a target produced anything - nothing to judge
+        if not performance or performance >= self.minimum:
+            state[1] = None
+            return False, performance
+        if state[1] is None:
+            state[1] = current_time
+        return (current_time - state[1]).total_seconds() >= self.grace_seconds, performance
+
+    def message(self, unit_name, value):
+        return f"{unit_name}: performans %{value * 100:.0f} (hedef alt sınırı %{self.minimum * 100:.0f})"
+
+
+class WebhookSink:
+    """
+    POSTs alert events as JSON from a daemon thread, so a slow receiver never holds up a tick.
+    """
+
+    def __init__(self, url, max_queue=1000):
+        self.url = url
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.thread = None
+
+    def submit(self, event):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='alert-webhook', daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            event = self.queue.get()
+            request = urllib.request.Request(self.url, data=json.dumps(event).encode('utf-8'),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                print(f"[ALERT] Webhook delivery to {self.url} failed: {str(e)}")
+
+
+class AlertEngine:
+    def __init__(self, rules):
+        self.rules = rules
+        # (rule, unit, mode) -> the firing event
+        self.firing = {}
+        self.listeners = []
+        self.webhook = WebhookSink(ALERT_WEBHOOK_URL) if ALERT_WEBHOOK_URL else None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def observe(self, unit_name, summary, start_time, current_time, working_mode):
+        """
+        Feed one tick's unit summary (range start_time..now) through the rules.
+        Returns the alert events raised or resolved by it.
+        """
+        if not ALERTS_ENABLED or not summary:
+            return []
+        shift_start = bucket_floor(current_time, 'shift', working_mode)
+        if start_time != shift_start:
+            return []
+
+        events = []
+        key = (unit_name, working_mode)
+        for rule in self.rules:
+            firing, value = rule.update(key, shift_start, summary, current_time, working_mode)
+            # None: not enough to judge yet, whatever is firing stays firing
+            if firing is None:
+                continue
+            alert_key = (rule.name, unit_name, working_mode)
+            if firing and alert_key not in self.firing:
+                event = {
+                    'id': uuid.uuid4().hex[:12],
+                    'rule': rule.name,
+                    'status': 'firing',
+                    'unit_name': unit_name,
+                    'working_mode': working_mode,
+                    'value': value,
+                    'message': rule.message(unit_name, value),
+                    'at': current_time.isoformat()
+                }
+                self.firing[alert_key] = event
+                events.append(event)
+            elif not firing and alert_key in self.firing:
+                raised = self.firing.pop(alert_key)
+                events.append(dict(raised, status='resolved', value=value, at=current_time.isoformat(), raised_at=raised['at']))
+
+        for event in events:
+            self._dispatch(event, shift_start)
+        return events
+
+    def active(self, unit_name=None):
+        return [event for event in self.firing.values() if unit_name is None or event['unit_name'] == unit_name]
+
+    def _claim(self, event, shift_start):
+        # First worker to see this transition sends it to the shared sinks
+        key = f"alert:{event['status']}:{event['rule']}:{event['unit_name']}:{event['working_mode']}:{shift_start.isoformat()}"
+        return shared_cache.backend.acquire_lease(key, shared_cache.owner, ttl=ALERT_DEDUPE_SECONDS)
+
+    def _dispatch(self, event, shift_start):
+        print(f"[ALERT] {event['status'].upper()} {event['rule']}: {event['message']}")
+        if (ALERT_LOG_FILE or self.webhook is not None) and self._claim(event, shift_start):
+            self._send(event)
+        for listener in self.listeners:
+            try:
+                listener(event)
+            except Exception as e:
+                print(f"[ALERT] Listener failed: {e}")
+
+    def _send(self, event):
+        if ALERT_LOG_FILE:
+            try:
+                with open(ALERT_LOG_FILE, 'a') as log:
+                    log.write(json.dumps(event) + "\n")
+            except OSError as e:
+                print(f"[ALERT] Could not write {ALERT_LOG_FILE}: {e}")
+        if self.webhook is not None:
+            self.webhook.submit(event)
+
+
+alert_engine = AlertEngine([QualityBelowRule(), ZeroOutputRule(), PerformanceBelowRule()])
@@ -0,0 +1,175 @@
+"""
+Period-over-period baselines for the live dashboards.
+
+"This shift vs. the same shift last week / the average of the last 7 days"
+would otherwise mean extra full-range production queries per unit per tick.
+The baselines are built from the shift-close snapshots instead (snapshots.py,
+no production-table query once they exist) and kept in the shared cache keyed by
+(unit, working mode, shift slot). The snapshot loop refreshes them every
+BASELINE_REFRESH_SECONDS, so late rows that recompute a snapshot reach the
+baselines too. The snapshot job only freezes the last SNAPSHOT_LOOKBACK_HOURS,
+so baseline slots it never reached (the first week after a deploy, a wiped
+SNAPSHOT_PATH) are frozen on the way, one multi-unit query per slot.
+
+The live standard payload gets a 'comparison' block when the dashboard is
+showing the current shift: quality and performance are compared as they are,
+counts against the baseline scaled to the share of the shift's operation
+time (after breaks) that has elapsed.
+"""
+
+import os
+from datetime import timedelta
+
+from database import TIMEZONE, calculate_break_time
+from live_payloads import build_standard_payload, shared_cache
+from pyramid import bucket_floor, bucket_next
+from snapshots import snapshot_store, store_shift, sum_snapshots
+
+# Shifts averaged for the 'avg_7d' baseline (the same slot on each previous day)
+BASELINE_DAYS = int(os.getenv('BASELINE_DAYS', '7'))
+
+# How often the snapshot loop rebuilds the cached baselines
+BASELINE_REFRESH_SECONDS = float(os.getenv('BASELINE_REFRESH_SECONDS', '300'))
+
+# A cached baseline outlives a refresh round or two, not the shift
+BASELINE_TTL = float(os.getenv('BASELINE_TTL', str(3 * 3600)))
+
+
+def baseline_key(unit_name, working_mode, shift_start):
+    return f"baseline:{unit_name}_{working_mode}_{shift_start:%H:%M}"
+
+
+def _days_back(shift_start, days):
+    return TIMEZONE.localize(shift_start.replace(tzinfo=None) - timedelta(days=days))
+
+
+def _baseline(snapshots):
+    """
+    Per-shift averages over the snapshots (None if there are none).
+    """
+    if not snapshots:
+        return None
+    total = sum_snapshots(snapshots)
+    return {
+        'shifts': len(snapshots),
+        'success_qty': total['success_qty'] / len(snapshots),
+        'fail_qty': total['fail_qty'] / len(snapshots),
+        'total_qty': total['total_qty'] / len(snapshots),
+        'quality': total['quality'],
+        'performance': total['performance']
+    }
+
+
+def _baseline_days():
+    # Days back for 'avg_7d' plus the 'last_week' slot
+    return sorted(set(range(1, BASELINE_DAYS + 1)) | {7})
+
+
+def freeze_baseline_slots(unit_names, working_mode, shift_start):
+    """
+    Freeze the baseline slots of shift_start that have no snapshot yet for
+    some of the units. Returns the number of slots that needed a query.
+    """
+    queried = 0
+    for days in _baseline_days():
+        slot_start = _days_back(shift_start, days)
+        stored = snapshot_store.record_counts(working_mode, slot_start)
+        missing = [unit_name for unit_name in unit_names if unit_name not in stored]
+        if missing:
+            store_shift(missing, [working_mode], slot_start, bucket_next(slot_start, 'shift', working_mode))
+            queried += 1
+    return queried
+
+
+def compute_baselines(unit_name, working_mode, shift_start):
+    """
+    Baselines for the shift starting at shift_start, from the snapshot store.
+    """
+    freeze_baseline_slots([unit_name], working_mode, shift_start)
+    shift_end = bucket_next(shift_start, 'shift', working_mode)
+    recent = [snapshot_store.get(unit_name, working_mode, _days_back(shift_start, days)) for days in range(1, BASELINE_DAYS + 1)]
+    last_week = snapshot_store.get(unit_name, working_mode, _days_back(shift_start, 7))
+    return {
+        'shift_start': shift_start.isoformat(),
+        'operation_seconds': max((shift_end - shift_start).total_seconds() - calculate_break_time(shift_start, shift_end, working_mode), 0),
+        'last_week': _baseline([last_week] if last_week else []),
+        'avg_7d': _baseline([snapshot for snapshot in recent if snapshot is not None])
+    }
+
+
+def get_baselines(unit_name, working_mode, shift_start):
+    """
+    Cached baselines for the shift, rebuilt from the snapshot store on a miss.
+    """
+    cache_key = baseline_key(unit_name, working_mode, shift_start)
+    baselines = shared_cache.get(cache_key)
+    # The key is per slot - an entry left over from yesterday's shift doesn't count
+    if baselines is None or baselines['shift_start'] != shift_start.isoformat():
+        baselines = compute_baselines(unit_name, working_mode, shift_start)
+        shared_cache.set(cache_key, baselines, BASELINE_TTL)
+    return baselines
+
+
+def refresh_baselines(current_time, working_modes):
+    """
+    Rebuild the cached baselines of the current and the next shift for every
+    unit in the snapshot store. Returns the number of entries written.
+    """
+    written = 0
+    unit_names = snapshot_store.unit_names()
+    for working_mode in working_modes:
+        shift_start = bucket_floor(current_time, 'shift', working_mode)
+        for start in (shift_start, bucket_next(shift_start, 'shift', working_mode)):
+            # Missing slots for every unit in one query each, rather than one per unit below
+            freeze_baseline_slots(unit_names, working_mode, start)
+            for unit_name in unit_names:
+                shared_cache.set(baseline_key(unit_name, working_mode, start),
+                                 compute_baselines(unit_name, working_mode, start), BASELINE_TTL)
+                written += 1
+    return written
+
+
+def compare(summary, baselines, start_time, current_time, working_mode):
+    """
+    Deltas of the running shift summary against each baseline.
+    """
+    elapsed_seconds = max((current_time - start_time).total_seconds() - calculate_break_time(start_time, current_time, working_mode), 0)
+    elapsed_ratio = min(elapsed_seconds / baselines['operation_seconds'], 1.0) if baselines['operation_seconds'] > 0 else 1.0
+
+    comparison = {'shift_start': baselines['shift_start'], 'elapsed_ratio': elapsed_ratio}
+    for name in ('last_week', 'avg_7d'):
+        baseline = baselines[name]
+        if baseline is None:
+            comparison[name] = None
+            continue
+        expected_success = baseline['success_qty'] * elapsed_ratio
+        expected_fail = baseline['fail_qty'] * elapsed_ratio
+        comparison[name] = dict(
+            baseline,
+            expected_success_qty=expected_success,
+            expected_fail_qty=expected_fail,
+            delta_success_qty=summary['total_success'] - expected_success,
+            delta_fail_qty=summary['total_fail'] - expected_fail,
+            delta_quality=summary['total_quality'] - baseline['quality'],
+            delta_performance=summary['total_performance'] - baseline['performance']
+        )
+    return comparison
+
+
+def shift_comparison(unit_name, summary, start_time, current_time, working_mode):
+    """
+    The comparison block for a live summary, or None unless the range is the current shift.
+    """
+    shift_start = bucket_floor(current_time, 'shift', working_mode)
+    if start_time != shift_start:
+        return None
+    return compare(summary, get_baselines(unit_name, working_mode, shift_start), start_time, current_time, working_mode)
+
+
+def build_compared_standard_payload(unit_name, start_time, end_time, current_time, working_mode):
+    """
+    build_standard_payload plus the baseline comparison - no extra production query per tick.
+    """
+    payload = build_standard_payload(unit_name, start_time, end_time, current_time, working_mode)
+    payload['comparison'] = shift_comparison(unit_name, payload['summary'], start_time, current_time, working_mode)
+    return payload
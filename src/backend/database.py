@@ -1,9 +1,19 @@
+import asyncio
+import contextvars
 import os
-import pyodbc
+import threading
+import time
+try:
+    import pyodbc
+except ImportError:  # only needed for SQL Server - DB_BACKEND=sqlite runs without the ODBC driver
+    pyodbc = None
 from dotenv import load_dotenv
 from datetime import datetime, timedelta
 import pytz
 
+from lanes import connection_target, current_lane, lanes
+from tracing import phase, span
+
 # Define timezone constant for application (GMT+3)
 TIMEZONE = pytz.timezone('Europe/Istanbul')  # Turkey is in GMT+3
 
@@ -27,6 +37,7 @@ WORKING_MODE_BREAKS = {
     'mode3': ['a', 'b', 'c', 'd', 'f', 'g', 'h', 'i']
 }
 
+@phase('break_time')
 def calculate_break_time(start_time, end_time, working_mode='mode1'):
     """
     Calculate total break time that occurred between start_time and end_time
@@ -83,39 +94,188 @@ def calculate_break_time(start_time, end_time, working_mode='mode1'):
 
 load_dotenv()
 
+# Source of production rows. Point this at the app-owned staging table (see query_advisor.py)
+# on deployments where ProductRecordLogView cannot be indexed.
+PRODUCTION_TABLE = os.getenv("PRODUCTION_TABLE", "ProductRecordLogView")
+SOURCE_VIEW = "ProductRecordLogView"
+STAGING_TABLE = os.getenv("STAGING_TABLE", "DashboardProductionStaging")
+
+# Rows re-copied on every staging sync to pick up late-arriving records
+STAGING_SYNC_OVERLAP_MINUTES = int(os.getenv("STAGING_SYNC_OVERLAP_MINUTES", "120"))
+# Span of each INSERT ... SELECT in a staging sync, small enough to finish inside the statement timeout
+STAGING_SYNC_WINDOW_HOURS = float(os.getenv("STAGING_SYNC_WINDOW_HOURS", "24"))
+
+# 'mssql' (default) or 'sqlite' for the local ProductRecordLogView stand-in (see standin_db.py)
+DB_BACKEND = os.getenv("DB_BACKEND", "mssql")
+
+# Statement timeout enforced by the driver/database, and how long callers await a DB call before cancelling it
+QUERY_TIMEOUT_SECONDS = float(os.getenv("DB_QUERY_TIMEOUT_SECONDS", "30"))
+
+
+class QueryCancelled(Exception):
+    pass
+
+
+class QueryHandle:
+    """
+    Tracks the connections opened by one DB call running in an executor
+    thread, so the awaiting coroutine can cancel the statement in flight
+    (pyodbc cursor.cancel / sqlite interrupt) when it stops waiting.
+    """
+
+    def __init__(self, label):
+        self.label = label
+        self.cancelled = False
+        self._lock = threading.Lock()
+        self._connections = []
+
+    def run(self, fn, *args):
+        _current.handle = self
+        try:
+            return fn(*args)
+        finally:
+            _current.handle = None
+            with self._lock:
+                self._connections.clear()
+
+    def track(self, conn, cursor=None):
+        with self._lock:
+            if self.cancelled:
+                raise QueryCancelled(f"{self.label} was cancelled")
+            self._connections.append((conn, cursor))
+
+    def cancel(self):
+        with self._lock:
+            self.cancelled = True
+            in_flight = list(self._connections)
+        for conn, cursor in in_flight:
+            try:
+                if cursor is not None:
+                    cursor.cancel()
+                else:
+                    conn.interrupt()
+            except Exception as e:
+                print(f"[DB] Could not cancel {self.label}: {str(e)}")
+        if in_flight:
+            print(f"[DB] Cancelled {len(in_flight)} in-flight statement(s) for {self.label}")
+
+
+_current = threading.local()
+
+
+def open_cursor(conn):
+    """
+    conn.cursor() that registers the cursor with the current QueryHandle
+    so a timed-out call can cancel it from the event loop thread.
+    """
+    cursor = conn.cursor()
+    handle = getattr(_current, 'handle', None)
+    if handle is not None:
+        try:
+            # sqlite cancels per connection (interrupt), pyodbc per cursor
+            handle.track(conn, None if DB_BACKEND == "sqlite" else cursor)
+        except QueryCancelled:
+            # The caller never gets the cursor, so nothing else would close these
+            cursor.close()
+            conn.close()
+            raise
+    return cursor
+
+
+async def run_db_query(fn, *args, timeout=QUERY_TIMEOUT_SECONDS, label=None, lane=None):
+    """
+    Run a blocking DB function on the thread pool of its lane (lanes.py; the
+    current one unless `lane` is given). If the caller stops waiting (timeout
+    or task cancellation) the statement in flight is cancelled, so the
+    executor thread and connection are released at once instead of running
+    the orphaned query to completion.
+    Raises asyncio.TimeoutError like asyncio.wait_for.
+    """
+    handle = QueryHandle(label or getattr(fn, '__name__', 'query'))
+    query_lane = lanes[lane] if lane else current_lane()
+    with span('db.call', call=handle.label, lane=query_lane.name):
+        # Run in a copy of the current context so spans opened in the thread nest under this one
+        context = contextvars.copy_context()
+        query_lane.started()
+        future = asyncio.get_running_loop().run_in_executor(query_lane.executor, context.run, handle.run, fn, *args)
+        future.add_done_callback(lambda _: query_lane.finished())
+        try:
+            return await asyncio.wait_for(future, timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError):
+            handle.cancel()
+            raise
+
+
+def _apply_statement_timeout(conn):
+    if DB_BACKEND == "sqlite":
+        # SQLite has no statement timeout - abort from the progress handler instead
+        deadline = time.monotonic() + QUERY_TIMEOUT_SECONDS
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+    else:
+        # SQL_ATTR_QUERY_TIMEOUT, whole seconds
+        conn.timeout = max(1, int(QUERY_TIMEOUT_SECONDS))
+    return conn
+
+
 def get_db_connection():
+    handle = getattr(_current, 'handle', None)
+    if handle is not None and handle.cancelled:
+        # The caller already gave up - don't start another query for it
+        raise QueryCancelled(f"{handle.label} was cancelled")
+    with span('db.connect', backend=DB_BACKEND):
+        return _open_connection()
+
+def _open_connection():
+    if DB_BACKEND == "sqlite":
+        from standin_db import connect_standin
+        return _apply_statement_timeout(connect_standin())
+    if pyodbc is None:
+        raise RuntimeError("pyodbc is not installed - install it or set DB_BACKEND=sqlite to use the local stand-in")
+    # The lane's server: historical lanes may read from a replica
+    server, database = connection_target()
     try:
         conn = pyodbc.connect(
             f'DRIVER={{ODBC Driver 18 for SQL Server}};'
-            f'SERVER={os.getenv("DB_SERVER")};'
-            f'DATABASE={os.getenv("DB_NAME")};'
+            f'SERVER={server};'
+            f'DATABASE={database};'
             f'UID={os.getenv("DB_USER")};'
             f'PWD={os.getenv("DB_PASSWORD")};'
             'Trusted_Connection=no;'
             'TrustServerCertificate=yes;'
             'Encrypt=yes;'
         )
-        return conn
+        return _apply_statement_timeout(conn)
     except pyodbc.Error as e:
         print(f"Error connecting to database: {str(e)}")
         print(f"Using connection string parameters:")
-        print(f"Server: {os.getenv('DB_SERVER')}")
-        print(f"Database: {os.getenv('DB_NAME')}")
+        print(f"Server: {server}")
+        print(f"Database: {database}")
         print(f"User: {os.getenv('DB_USER')}")
         raise
 
+# The statements below are built by *_sql functions shared with query_advisor.py, so the
+# advisor explains exactly what the app sends
+
+def unit_catalog_sql(table_name=PRODUCTION_TABLE):
+    return f"SELECT DISTINCT UnitName FROM {table_name} ORDER BY UnitName"
+
 def get_production_units():
     conn = get_db_connection()
-    cursor = conn.cursor()
-    # Temporarily use ProductRecordLog until combined table is created
-    cursor.execute("SELECT DISTINCT UnitName FROM ProductRecordLogView ORDER BY UnitName")
-    units = [row[0] for row in cursor.fetchall()]
-    cursor.close()
-    conn.close()
-    return units
+    cursor = open_cursor(conn)
+    try:
+        # Temporarily use ProductRecordLog until combined table is created
+        cursor.execute(unit_catalog_sql())
+        return [row[0] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
 
-def get_production_data(unit_name, start_time, end_time, current_time=None, working_mode='mode1'):
-    
+def resolve_query_window(start_time, end_time, current_time=None):
+    """
+    Normalise a requested range to TIMEZONE and apply the live/historical rule.
+    Returns (start_time, query_end_time, actual_end_time): the range to query
+    and the end used for operation-time calculations.
+    """
     # If current_time is not provided, use end_time
     actual_end_time = current_time if current_time else end_time
     
@@ -159,14 +319,14 @@ def get_production_data(unit_name, start_time, end_time, current_time=None, work
             # Also update actual_end_time for performance calculations
             actual_end_time = query_end_time
     
-    conn = get_db_connection()
-    cursor = conn.cursor()
-    
-    # Now use ProductRecordLogView since it contains all historical data and targets
-    table_name = "ProductRecordLogView"
-    
-    # Single query approach - when combined table is ready, just change table_name above
-    query = f"""
+    return start_time, final_query_end_time, actual_end_time
+
+def model_counts_sql(table_name=PRODUCTION_TABLE, include_end=True):
+    """
+    Per-model counts for one unit; parameters (unit_name, start, end).
+    """
+    end_condition = "KayitTarihi <= ?" if include_end else "KayitTarihi < ?"
+    return f"""
     SELECT 
         Model,
         SUM(CASE WHEN TestSonucu = 1 THEN 1 ELSE 0 END) as SuccessQty,
@@ -176,32 +336,220 @@ def get_production_data(unit_name, start_time, end_time, current_time=None, work
         {table_name}
     WHERE 
         UnitName = ? 
-        AND KayitTarihi BETWEEN ? AND ?
+        AND KayitTarihi >= ? AND {end_condition}
     GROUP BY 
         Model, ModelSuresiSN
     """
-    
-    cursor.execute(query, (unit_name, start_time, final_query_end_time))
 
-    # print(query)
-    
-    results = []
-    all_rows = cursor.fetchall()
-    
+def get_model_counts(unit_name, start_time, end_time, include_end=True):
+    """
+    Raw per-model counts for one unit: [[model, success_qty, fail_qty, target], ...].
+    include_end=False makes the range half-open so adjacent chunks
+    (range_planner.py) never count a row twice.
+    """
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    query = model_counts_sql(include_end=include_end)
+
+    try:
+        with span('db.query', unit=unit_name, start=start_time.isoformat(), end=end_time.isoformat(),
+                  range_hours=round((end_time - start_time).total_seconds() / 3600, 2)) as query_span:
+            cursor.execute(query, (unit_name, start_time, end_time))
+            rows = [[row[0], row[1], row[2], row[3]] for row in cursor.fetchall()]
+            query_span.set(rows=len(rows), records=sum((row[1] or 0) + (row[2] or 0) for row in rows))
+    finally:
+        cursor.close()
+        conn.close()
+    return rows
+
+def multi_unit_model_counts_sql(unit_count, table_name=PRODUCTION_TABLE, include_end=True):
+    """
+    Per-unit, per-model counts; parameters (*unit_names, start, end).
+    """
+    placeholders = ", ".join("?" for _ in range(unit_count))
+    end_condition = "KayitTarihi <= ?" if include_end else "KayitTarihi < ?"
+    return f"""
+    SELECT
+        UnitName,
+        Model,
+        SUM(CASE WHEN TestSonucu = 1 THEN 1 ELSE 0 END) as SuccessQty,
+        SUM(CASE WHEN TestSonucu = 0 THEN 1 ELSE 0 END) as FailQty,
+        ModelSuresiSN as Target
+    FROM
+        {table_name}
+    WHERE
+        UnitName IN ({placeholders})
+        AND KayitTarihi >= ? AND {end_condition}
+    GROUP BY
+        UnitName, Model, ModelSuresiSN
+    """
+
+def get_multi_unit_model_counts(unit_names, start_time, end_time, include_end=True):
+    """
+    get_model_counts for several units in one statement:
+    {unit_name: [[model, success_qty, fail_qty, target], ...]} with an
+    entry (possibly empty) for every requested unit.
+    """
+    unit_names = list(unit_names)
+    counts = {unit_name: [] for unit_name in unit_names}
+    if not unit_names:
+        return counts
+
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    query = multi_unit_model_counts_sql(len(unit_names), include_end=include_end)
+
+    try:
+        with span('db.query', unit=','.join(unit_names), units=len(unit_names), start=start_time.isoformat(), end=end_time.isoformat(),
+                  range_hours=round((end_time - start_time).total_seconds() / 3600, 2)) as query_span:
+            cursor.execute(query, (*unit_names, start_time, end_time))
+            rows = cursor.fetchall()
+            query_span.set(rows=len(rows), records=sum((row[2] or 0) + (row[3] or 0) for row in rows))
+    finally:
+        cursor.close()
+        conn.close()
+
+    for row in rows:
+        counts.setdefault(row[0], []).append([row[1], row[2], row[3], row[4]])
+    return counts
+
+def multi_unit_record_counts_sql(unit_count, table_name=PRODUCTION_TABLE):
+    """
+    Tested records per unit over a half-open range; parameters (*unit_names, start, end).
+    """
+    placeholders = ", ".join("?" for _ in range(unit_count))
+    return f"""
+    SELECT
+        UnitName,
+        COUNT(*) as Records
+    FROM
+        {table_name}
+    WHERE
+        UnitName IN ({placeholders})
+        AND KayitTarihi >= ? AND KayitTarihi < ?
+        AND TestSonucu IN (0, 1)
+    GROUP BY
+        UnitName
+    """
+
+def get_multi_unit_record_counts(unit_names, start_time, end_time):
+    """
+    Tested records (pass + fail) per unit over [start_time, end_time):
+    {unit_name: count}. Cheap check for rows that arrived after a shift was
+    snapshotted (snapshots.py).
+    """
+    unit_names = list(unit_names)
+    counts = {unit_name: 0 for unit_name in unit_names}
+    if not unit_names:
+        return counts
+
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    query = multi_unit_record_counts_sql(len(unit_names))
+
+    try:
+        with span('db.query', unit=','.join(unit_names), units=len(unit_names), start=start_time.isoformat(), end=end_time.isoformat(),
+                  range_hours=round((end_time - start_time).total_seconds() / 3600, 2)) as query_span:
+            cursor.execute(query, (*unit_names, start_time, end_time))
+            rows = cursor.fetchall()
+            query_span.set(rows=len(rows))
+    finally:
+        cursor.close()
+        conn.close()
+
+    for unit_name, records in rows:
+        counts[unit_name] = records
+    return counts
+
+# Bucket start of a row for get_bucket_counts, per backend (KayitTarihi is naive local time)
+BUCKET_EXPRESSIONS = {
+    'mssql': {
+        '5min': "DATEADD(minute, DATEDIFF(minute, 0, KayitTarihi) / 5 * 5, 0)",
+        'hour': "DATEADD(hour, DATEDIFF(hour, 0, KayitTarihi), 0)"
+    },
+    'sqlite': {
+        '5min': "strftime('%Y-%m-%d %H:', KayitTarihi) || printf('%02d', CAST(strftime('%M', KayitTarihi) AS INTEGER) / 5 * 5) || ':00'",
+        'hour': "strftime('%Y-%m-%d %H:00:00', KayitTarihi)"
+    }
+}
+
+def bucket_counts_sql(bucket, table_name=PRODUCTION_TABLE, backend=None):
+    """
+    Per-bucket, per-model counts for one unit over a half-open range; parameters (unit_name, start, end).
+    """
+    bucket_expression = BUCKET_EXPRESSIONS[backend or DB_BACKEND][bucket]
+    return f"""
+    SELECT
+        {bucket_expression} as BucketStart,
+        Model,
+        SUM(CASE WHEN TestSonucu = 1 THEN 1 ELSE 0 END) as SuccessQty,
+        SUM(CASE WHEN TestSonucu = 0 THEN 1 ELSE 0 END) as FailQty,
+        ModelSuresiSN as Target
+    FROM
+        {table_name}
+    WHERE
+        UnitName = ?
+        AND KayitTarihi >= ? AND KayitTarihi < ?
+    GROUP BY
+        {bucket_expression}, Model, ModelSuresiSN
+    """
+
+def get_bucket_counts(unit_name, start_time, end_time, bucket='hour'):
+    """
+    Per-bucket, per-model counts for one unit over the half-open range
+    [start_time, end_time): [[bucket_start, model, success_qty, fail_qty, target], ...]
+    with bucket_start as a localized datetime. bucket is '5min' or 'hour'.
+    """
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    query = bucket_counts_sql(bucket)
+
+    try:
+        with span('db.query', unit=unit_name, bucket=bucket, start=start_time.isoformat(), end=end_time.isoformat(),
+                  range_hours=round((end_time - start_time).total_seconds() / 3600, 2)) as query_span:
+            cursor.execute(query, (unit_name, start_time, end_time))
+            rows = cursor.fetchall()
+            query_span.set(rows=len(rows), records=sum((row[2] or 0) + (row[3] or 0) for row in rows))
+    finally:
+        cursor.close()
+        conn.close()
+
+    buckets = []
+    for row in rows:
+        # sqlite returns the bucket as text, pyodbc as a naive datetime
+        bucket_start = datetime.fromisoformat(row[0]) if isinstance(row[0], str) else row[0]
+        buckets.append([TIMEZONE.localize(bucket_start), row[1], row[2], row[3], row[4]])
+    return buckets
+
+def get_multi_unit_production_data(unit_names, start_time, end_time, current_time=None, working_mode='mode1'):
+    """
+    get_production_data for several units from one multi-unit query.
+    """
+    start_time, final_query_end_time, actual_end_time = resolve_query_window(start_time, end_time, current_time)
+    counts = get_multi_unit_model_counts(unit_names, start_time, final_query_end_time)
+    return {unit_name: build_model_results(rows, start_time, actual_end_time, working_mode)
+            for unit_name, rows in counts.items()}
+
+def build_model_results(all_rows, start_time, actual_end_time, working_mode='mode1'):
+    """
+    Per-model quality/performance figures from raw counts over a range.
+    """
     # Calculate operation time once for all models
     operation_time_total = (actual_end_time - start_time).total_seconds()
-    
+
     # Calculate and subtract break time
     break_time = calculate_break_time(start_time, actual_end_time, working_mode)
     operation_time = operation_time_total - break_time
-    
+
     # Ensure operation time is not negative
     operation_time = max(operation_time, 0)
     operation_time_hours = operation_time / 3600
-    
+
+    results = []
+
     # First pass: create model data with individual theoretical quantities for display
     models_with_target = []
-    
+
     for row in all_rows:
         model_data = {
             'model': row[0],
@@ -224,7 +572,7 @@ def get_production_data(unit_name, start_time, end_time, current_time=None, work
             model_data['theoretical_qty'] = 0
             
         results.append(model_data)
-    
+
     # Second pass: Calculate performance using individual approach
     if models_with_target:
         # Calculate individual performance for each model
@@ -247,10 +595,61 @@ def get_production_data(unit_name, start_time, end_time, current_time=None, work
         for model_data in results:
             if model_data['target'] is not None and model_data['target'] > 0:
                 model_data['performance'] = 0
-    
-    cursor.close()
-    conn.close()
 
-    # print(results)  
-    
-    return results 
\ No newline at end of file
+    return results
+
+def get_production_data(unit_name, start_time, end_time, current_time=None, working_mode='mode1'):
+    start_time, final_query_end_time, actual_end_time = resolve_query_window(start_time, end_time, current_time)
+    all_rows = get_model_counts(unit_name, start_time, final_query_end_time)
+    return build_model_results(all_rows, start_time, actual_end_time, working_mode)
+
+def sync_staging_table(overlap_minutes=STAGING_SYNC_OVERLAP_MINUTES):
+    """
+    Incrementally copy new rows from ProductRecordLogView into the indexed
+    staging table. The last `overlap_minutes` are deleted and re-copied so
+    rows that arrive late (with an older KayitTarihi) are not missed.
+
+    Rows are copied oldest first in STAGING_SYNC_WINDOW_HOURS windows, one
+    statement and commit each, so the first fill of an empty staging table
+    never has to fit the whole view into one statement timeout. A round that
+    stops part-way keeps its committed windows and the next one resumes there.
+    Returns the number of rows copied.
+    """
+    insert_sql = f"""
+        INSERT INTO {STAGING_TABLE} (UnitName, KayitTarihi, Model, ModelSuresiSN, TestSonucu)
+        SELECT UnitName, KayitTarihi, Model, ModelSuresiSN, TestSonucu FROM {SOURCE_VIEW}
+        WHERE KayitTarihi >= ?"""
+
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    try:
+        cursor.execute(f"SELECT MAX(KayitTarihi) FROM {STAGING_TABLE}")
+        last_synced = cursor.fetchone()[0]
+
+        if last_synced is None:
+            cursor.execute(f"SELECT MIN(KayitTarihi) FROM {SOURCE_VIEW}")
+            copy_from = cursor.fetchone()[0]
+            if copy_from is None:
+                return 0
+        else:
+            copy_from = last_synced - timedelta(minutes=overlap_minutes)
+            # Committed together with the first window, so readers never see the overlap missing
+            cursor.execute(f"DELETE FROM {STAGING_TABLE} WHERE KayitTarihi >= ?", (copy_from,))
+
+        window = timedelta(hours=STAGING_SYNC_WINDOW_HOURS)
+        now = datetime.now(TIMEZONE).replace(tzinfo=None)
+        copied = 0
+        while copy_from + window <= now:
+            cursor.execute(insert_sql + " AND KayitTarihi < ?", (copy_from, copy_from + window))
+            copied += cursor.rowcount
+            conn.commit()
+            copy_from += window
+
+        # The last window is open-ended so rows stamped ahead of this clock are copied too
+        cursor.execute(insert_sql, (copy_from,))
+        copied += cursor.rowcount
+        conn.commit()
+        return copied
+    finally:
+        cursor.close()
+        conn.close()
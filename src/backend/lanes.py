@@ -0,0 +1,139 @@
+"""
+Isolated execution lanes for database work.
+
+Every DB call used to run on the event loop's default executor, so a
+14-day report holding its threads (and SQL Server connections) could keep
+the 12-second live ticks waiting until they hit the query timeout. Calls
+now run on the thread pool of their lane:
+
+- live: WebSocket/SSE ticks and the small live REST calls (the default)
+- historical: historical REST reports, rankings, trends, shift reports
+- export: streamed exports (/.../stream)
+- background: snapshot, baseline and staging jobs
+
+Each lane has its own threads (LANE_<NAME>_THREADS), and so at most that
+many connections and statements in flight; live is the largest, so the
+floor displays never queue behind a report. Historical and export lanes
+can be routed to a read replica (DB_REPLICA_SERVER / DB_REPLICA_NAME,
+REPLICA_LANES). Connections themselves are reused by the ODBC driver
+manager's pooling, per connection string, so a replica lane's connections
+stay separate too.
+
+The lane is a contextvar: LaneMiddleware sets it from the request path,
+background loops set it with use_lane(), and run_db_query copies the
+context into the executor thread so the connection opened there picks the
+lane's server.
+"""
+
+import contextlib
+import contextvars
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+LANE_THREADS = {
+    'live': int(os.getenv('LANE_LIVE_THREADS', '16')),
+    'historical': int(os.getenv('LANE_HISTORICAL_THREADS', '4')),
+    'export': int(os.getenv('LANE_EXPORT_THREADS', '2')),
+    'background': int(os.getenv('LANE_BACKGROUND_THREADS', '2'))
+}
+DEFAULT_LANE = 'live'
+
+# Lanes sent to the replica when DB_REPLICA_SERVER is set (read per connection, like
+# DB_SERVER, since the .env file is loaded after this module is imported)
+REPLICA_LANES = [lane for lane in os.getenv('REPLICA_LANES', 'historical,export').split(',') if lane]
+
+# Path prefix -> lane for HTTP requests; everything else (and every WebSocket) is live
+HISTORICAL_PATHS = ('/report-data', '/historical-data', '/historical-hourly-data', '/rankings', '/drilldown',
+                    '/trend', '/shift-report')
+EXPORT_SUFFIXES = ('/stream',)
+
+_current_lane = contextvars.ContextVar('current_lane', default=DEFAULT_LANE)
+
+
+class Lane:
+    def __init__(self, name, threads):
+        self.name = name
+        self.threads = threads
+        self.executor = ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"lane-{name}")
+        # Only touched from the event loop
+        self.pending = 0
+        self.completed = 0
+        self.peak_pending = 0
+
+    def started(self):
+        self.pending += 1
+        self.peak_pending = max(self.peak_pending, self.pending)
+
+    def finished(self):
+        self.pending -= 1
+        self.completed += 1
+
+    def stats(self):
+        return {
+            'threads': self.threads,
+            'running': min(self.pending, self.threads),
+            'queued': max(self.pending - self.threads, 0),
+            'peak_pending': self.peak_pending,
+            'completed': self.completed,
+            'replica': uses_replica(self.name)
+        }
+
+
+lanes = {name: Lane(name, threads) for name, threads in LANE_THREADS.items()}
+
+
+def current_lane():
+    return lanes.get(_current_lane.get()) or lanes[DEFAULT_LANE]
+
+
+@contextlib.contextmanager
+def use_lane(name):
+    """
+    Run the DB calls made inside the block (and tasks created in it) on lane `name`.
+    """
+    token = _current_lane.set(name)
+    try:
+        yield
+    finally:
+        _current_lane.reset(token)
+
+
+def lane_for_path(path):
+    if path.endswith(EXPORT_SUFFIXES):
+        return 'export'
+    if path.startswith(HISTORICAL_PATHS):
+        return 'historical'
+    return DEFAULT_LANE
+
+
+def uses_replica(lane_name):
+    return bool(os.getenv('DB_REPLICA_SERVER')) and lane_name in REPLICA_LANES
+
+
+def connection_target():
+    """
+    (server, database) for a connection opened on the current lane.
+    """
+    if uses_replica(_current_lane.get()):
+        return os.getenv('DB_REPLICA_SERVER'), os.getenv('DB_REPLICA_NAME') or os.getenv('DB_NAME')
+    return os.getenv('DB_SERVER'), os.getenv('DB_NAME')
+
+
+def lane_stats():
+    return {name: lane.stats() for name, lane in lanes.items()}
+
+
+class LaneMiddleware:
+    """
+    ASGI middleware: picks the lane for each request from its path.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] not in ('http', 'websocket'):
+            await self.app(scope, receive, send)
+            return
+        with use_lane(lane_for_path(scope['path'])):
+            await self.app(scope, receive, send)
@@ -0,0 +1,460 @@
+"""
+Per-tick payload builders for the live dashboard sockets.
+
+These run in an executor thread (never on the event loop) and read through
+the shared cache, so any number of sockets - in any number of workers -
+watching the same unit and shift cost one database query per tick window.
+"""
+
+import os
+from datetime import datetime, timedelta
+
+from database import get_production_data, get_multi_unit_production_data, get_production_units, calculate_break_time
+from shared_cache import get_shared_cache
+from tracing import annotate, phase, span
+
+shared_cache = get_shared_cache()
+
+# ROBUST OPTIMIZATION: Cache closed hours to reduce database load for hourly data
+cache_duration = 10  # Reduced to 10 seconds for better live data freshness
+
+# Live results are shared between sockets (and workers) watching the same unit/shift for this long
+LIVE_RESULT_TTL = float(os.getenv('LIVE_RESULT_TTL', '5'))
+
+# Hours that ended longer ago than the range planner's grace period (late rows) are kept this long
+CLOSED_HOUR_TTL = float(os.getenv('CLOSED_HOUR_TTL', str(12 * 3600)))
+CLOSED_HOUR_GRACE_MINUTES = float(os.getenv('RANGE_CLOSED_GRACE_MINUTES', '30'))
+
+# The unit list only changes when a new line is commissioned
+UNIT_CATALOG_TTL = float(os.getenv('UNIT_CATALOG_TTL', '300'))
+UNIT_CATALOG_KEY = 'units:catalog'
+
+
+def is_live_range(end_time, current_time):
+    # Same 5-minute rule get_production_data uses to tell live from historical ranges
+    return abs((current_time - end_time).total_seconds()) <= timedelta(minutes=5).total_seconds()
+
+
+@phase('live_data')
+def get_live_production_data(unit_name, start_time, end_time, current_time, working_mode):
+    """
+    get_production_data for live ranges, shared through the cache for
+    LIVE_RESULT_TTL seconds. Historical ranges go straight to the database.
+    """
+    if not is_live_range(end_time, current_time):
+        return get_production_data(unit_name, start_time, end_time, current_time, working_mode)
+
+    cache_key = f"live:{unit_name}_{start_time.isoformat()}_{working_mode}"
+    return shared_cache.get_or_compute(
+        cache_key,
+        LIVE_RESULT_TTL,
+        lambda: get_production_data(unit_name, start_time, end_time, current_time, working_mode)
+    )
+
+
+def get_unit_catalog():
+    """
+    get_production_units, shared through the cache for UNIT_CATALOG_TTL seconds.
+    """
+    return shared_cache.get_or_compute(UNIT_CATALOG_KEY, UNIT_CATALOG_TTL, get_production_units)
+
+
+def get_live_multi_unit_data(unit_names, start_time, end_time, current_time, working_mode):
+    """
+    get_multi_unit_production_data, shared through the cache for live ranges
+    like get_live_production_data.
+    """
+    if not is_live_range(end_time, current_time):
+        return get_multi_unit_production_data(unit_names, start_time, end_time, current_time, working_mode)
+
+    cache_key = f"live-report:{','.join(sorted(unit_names))}_{start_time.isoformat()}_{working_mode}"
+    return shared_cache.get_or_compute(
+        cache_key,
+        LIVE_RESULT_TTL,
+        lambda: get_multi_unit_production_data(unit_names, start_time, end_time, current_time, working_mode)
+    )
+
+
+def build_standard_payload(unit_name, start_time, end_time, current_time, working_mode):
+    """
+    Build the /ws/{unit} response: per-model rows plus the unit summary.
+    """
+    # Copy the rows - the cached list is shared with other sockets
+    production_data = [dict(model) for model in get_live_production_data(unit_name, start_time, end_time, current_time, working_mode)]
+    annotate(models=len(production_data))
+
+    summary = summarize_unit(production_data, start_time, end_time, current_time, working_mode)
+
+    # Create response with both individual model data and summary
+    response_data = {
+        'unit_name': unit_name,
+        'models': production_data,
+        'summary': summary
+    }
+
+    return response_data
+
+
+def summarize_unit(production_data, start_time, end_time, current_time, working_mode):
+    """
+    Unit summary for the standard and report payloads. Clears performance and
+    OEE of models without a target in place (the rows must be copies).
+    """
+    # For each model, if it has no target, set performance and OEE to None
+    for model in production_data:
+        if not model['target']:
+            model['performance'] = None
+            model['oee'] = None
+
+    # Calculate overall summary metrics (backend-calculated)
+    total_success = sum(model['success_qty'] for model in production_data)
+    total_fail = sum(model['fail_qty'] for model in production_data)
+    total_qty = sum(model['total_qty'] for model in production_data)
+
+    # Calculate weighted quality
+    total_processed = total_success + total_fail
+    total_quality = total_success / total_processed if total_processed > 0 else 0
+
+    # Calculate overall performance as total actual / total theoretical (same logic as hourly view)
+    models_with_target = [model for model in production_data if model['target'] is not None and model['target'] > 0]
+    total_performance = 0
+    if models_with_target:
+        # Calculate total actual quantity
+        total_actual_qty = sum(model['total_qty'] for model in models_with_target)
+
+        # Calculate total theoretical quantity using weighted average target rate
+        # Use weighted average since models compete for the same production capacity
+        total_theoretical_qty = 0
+
+        if total_actual_qty > 0:
+            # Calculate weighted average target rate based on actual production mix
+            weighted_target_rate = 0
+            for model in models_with_target:
+                weight = model['total_qty'] / total_actual_qty
+                weighted_target_rate += weight * model['target']
+
+            # Get operation time for theoretical calculation (same logic as database.py)
+            # Need to determine actual end time for calculation
+            actual_end_time_for_calculation = end_time
+            if current_time:
+                time_difference = current_time - end_time
+                five_minutes = timedelta(minutes=5)
+
+                # Only use current_time for live data (end_time is within 5 minutes of current_time)
+                if time_difference <= five_minutes:
+                    actual_end_time_for_calculation = current_time
+                else:
+                    actual_end_time_for_calculation = end_time
+
+            operation_time_total = (actual_end_time_for_calculation - start_time).total_seconds() if actual_end_time_for_calculation > start_time else 0
+            break_time = calculate_break_time(start_time, actual_end_time_for_calculation, working_mode)
+            operation_time = max(operation_time_total - break_time, 0)
+
+            # Calculate theoretical quantity using weighted average rate
+            total_theoretical_qty = (operation_time / 3600) * weighted_target_rate
+        else:
+            total_theoretical_qty = 0
+
+        # Calculate overall performance as actual/theoretical ratio
+        total_performance = total_actual_qty / total_theoretical_qty if total_theoretical_qty > 0 else 0
+
+    # Calculate unit performance as sum of all model performances
+    unit_performance_sum = 0
+    for model in production_data:
+        if model.get('performance') is not None:
+            unit_performance_sum += model['performance']
+
+    return {
+        'total_success': total_success,
+        'total_fail': total_fail,
+        'total_qty': total_qty,
+        'total_quality': total_quality,
+        'total_performance': total_performance,
+        'unit_performance_sum': unit_performance_sum  # New: sum of model performances
+    }
+
+
+def plant_summary(unit_totals):
+    """
+    All-units rollup from (success, fail, performance_sum) per unit: quality
+    weighted by production, performance sum weighted by good parts.
+    """
+    total_success_all = 0
+    total_fail_all = 0
+    total_production_all = 0
+    weighted_quality_sum = 0
+    weighted_performance_sum = 0
+    total_success_weight = 0
+
+    for unit_success, unit_fail, unit_performance_sum in unit_totals:
+        unit_total = unit_success + unit_fail
+        total_success_all += unit_success
+        total_fail_all += unit_fail
+        total_production_all += unit_total
+
+        if unit_total > 0:
+            weighted_quality_sum += (unit_success / unit_total) * unit_total
+
+        if unit_success > 0:
+            weighted_performance_sum += unit_performance_sum * unit_success
+            total_success_weight += unit_success
+
+    return {
+        'total_success': total_success_all,
+        'total_fail': total_fail_all,
+        'total_production': total_production_all,
+        'weighted_quality': weighted_quality_sum / total_production_all if total_production_all > 0 else 0,
+        'weighted_performance': weighted_performance_sum / total_success_weight if total_success_weight > 0 else 0
+    }
+
+
+def build_hourly_payload(unit_name, start_time, end_time, current_time, working_mode):
+    """
+    Build the /ws/hourly/{unit} response: unit totals plus one record per hour.
+    """
+    # Get all raw data in one query for the entire time range
+    raw_data = get_live_production_data(unit_name, start_time, end_time, current_time, working_mode)
+
+    # Calculate totals from raw data first
+    total_success = sum(model['success_qty'] for model in raw_data)
+    total_fail = sum(model['fail_qty'] for model in raw_data)
+    total_qty = sum(model['total_qty'] for model in raw_data)
+
+    # Direct calculation of quality as success/processed
+    total_processed = total_success + total_fail
+    total_quality = total_success / total_processed if total_processed > 0 else 0
+
+    # Calculate total performance and OEE using the raw model data
+    models_with_target = [model for model in raw_data if model['target'] is not None and model['target'] > 0]
+    total_performance = None
+    total_oee = None
+    total_theoretical_qty = 0
+    total_theoretical_time = 0
+
+    if models_with_target:
+        # Detect if this is historical data or live data
+        actual_end_time_for_calculation = end_time
+        if current_time:
+            time_difference = current_time - end_time
+            five_minutes = timedelta(minutes=5)
+
+            # Only use current_time for live data (end_time is within 5 minutes of current_time)
+            if time_difference <= five_minutes:
+                # This is live data - use current_time
+                actual_end_time_for_calculation = current_time
+            else:
+                # This is historical data - use the original end_time
+                actual_end_time_for_calculation = end_time
+
+        operation_time_total = (actual_end_time_for_calculation - start_time).total_seconds() if actual_end_time_for_calculation > start_time else 0
+
+        # Calculate and subtract break time
+        break_time = calculate_break_time(start_time, actual_end_time_for_calculation, working_mode)
+        operation_time = operation_time_total - break_time
+
+        # Ensure operation time is not negative
+        operation_time = max(operation_time, 0)
+
+        # Calculate theoretical quantity using weighted average target rate
+        total_theoretical_qty = 0
+        total_theoretical_time = 0
+        total_actual_qty = sum(model['total_qty'] for model in models_with_target)
+
+        if total_actual_qty > 0:
+            weighted_target_rate = 0
+            for model in models_with_target:
+                weight = model['total_qty'] / total_actual_qty
+                weighted_target_rate += weight * model['target']
+                # Calculate theoretical time for performance calculation
+                if model['target'] > 0:  # Safety check to prevent division by zero
+                    model_theoretical_time = model['total_qty'] * (3600 / model['target'])
+                    total_theoretical_time += model_theoretical_time
+
+            # Calculate theoretical quantity using weighted average rate
+            total_theoretical_qty = (operation_time / 3600) * weighted_target_rate
+        else:
+            total_theoretical_qty = 0
+
+        # Calculate overall performance as actual/theoretical ratio
+        total_performance = total_actual_qty / total_theoretical_qty if total_theoretical_qty > 0 else 0
+
+        # Calculate overall OEE (set to None as per requirement #3)
+        total_oee = None
+    else:
+        pass  # No models with target found
+
+    # Process hourly data hour by hour (same approach as historical hourly endpoint)
+    hourly_data = []
+    current_hour = start_time.replace(minute=0, second=0, microsecond=0)
+
+    # Determine if this is live data to use current_time for the last hour
+    is_live_data = False
+    actual_end_time_for_hourly = end_time
+    if current_time:
+        time_difference = current_time - end_time
+        abs_time_difference = abs(time_difference.total_seconds())
+        five_minutes = timedelta(minutes=5)
+        # Consider it live data if end_time is within 5 minutes of current_time (past or future)
+        is_live_data = abs_time_difference <= five_minutes.total_seconds()
+
+        # FIXED: For live data, extend the processing to current_time to include current hour
+        if is_live_data:
+            actual_end_time_for_hourly = current_time
+            print(f"[HOURLY] Live data detected for {unit_name}")
+        else:
+            print(f"[HOURLY] Historical data for {unit_name}")
+
+    # Timed as one span: the per-hour cache lookups and queries are the bulk of a tick
+    with span('hourly.hours', unit=unit_name, live=is_live_data) as hours_span:
+        while current_hour < actual_end_time_for_hourly:
+            hour_end = current_hour + timedelta(hours=1)
+
+            # For the current hour in live data, use current_time as hour_end
+            if is_live_data and current_time > current_hour and current_time < hour_end:
+                # This is the current hour in live data - use current_time as hour_end
+                hour_end = current_time
+            else:
+                # For historical data or completed hours, use the regular hour boundary or actual_end_time_for_hourly
+                hour_end = min(hour_end, actual_end_time_for_hourly)
+
+            # SMART CACHING: Don't cache current hour for live data to ensure freshness
+            is_current_hour = (is_live_data and current_time > current_hour and current_time < hour_end)
+
+            closed = not is_current_hour and hour_end <= current_time - timedelta(minutes=CLOSED_HOUR_GRACE_MINUTES)
+            if is_current_hour:
+                # Current hour is only shared briefly between sockets/workers watching the same unit
+                hour_data = get_live_production_data(unit_name, current_hour, hour_end, current_time, working_mode)
+            else:
+                # Cache historical hours (shared across workers) to reduce database load
+                cache_key = f"hour:{unit_name}_{current_hour.isoformat()}_{hour_end.isoformat()}_{working_mode}"
+                hour_data = shared_cache.get_or_compute(
+                    cache_key,
+                    CLOSED_HOUR_TTL if closed else cache_duration,
+                    lambda: get_production_data(unit_name, current_hour, hour_end, current_time, working_mode)
+                )
+
+            # Calculate hourly totals
+            hour_success = sum(model['success_qty'] for model in hour_data)
+            hour_fail = sum(model['fail_qty'] for model in hour_data)
+            hour_total = sum(model['total_qty'] for model in hour_data)
+
+            # Calculate hourly quality
+            hour_quality = hour_success / (hour_success + hour_fail) if (hour_success + hour_fail) > 0 else 0
+
+            # Calculate hourly performance and theoretical quantity
+            models_with_target = [model for model in hour_data if model['target'] is not None and model['target'] > 0]
+            hour_performance = 0
+            hour_theoretical_qty = 0
+
+            if models_with_target:
+                # Calculate operation time for this hour
+                hour_operation_time = (hour_end - current_hour).total_seconds()
+                hour_break_time = calculate_break_time(current_hour, hour_end, working_mode)
+                hour_operation_time = max(hour_operation_time - hour_break_time, 0)
+
+                # Calculate theoretical quantity using weighted average target rate
+                hour_actual_qty = sum(model['total_qty'] for model in models_with_target)
+
+                if hour_actual_qty > 0:
+                    weighted_target_rate = 0
+                    for model in models_with_target:
+                        weight = model['total_qty'] / hour_actual_qty
+                        weighted_target_rate += model['target'] * weight
+
+                    # Calculate theoretical quantity using weighted average rate
+                    hour_theoretical_qty = (hour_operation_time / 3600) * weighted_target_rate
+
+                    # Calculate performance
+                    hour_performance = hour_actual_qty / hour_theoretical_qty if hour_theoretical_qty > 0 else 0
+
+            hour_record = {
+                'hour_start': current_hour.isoformat(),
+                'hour_end': hour_end.isoformat(),
+                'success_qty': hour_success,
+                'fail_qty': hour_fail,
+                'total_qty': hour_total,
+                'quality': hour_quality,
+                'performance': hour_performance,
+                'oee': 0,  # OEE set to 0 as per requirements
+                'theoretical_qty': hour_theoretical_qty,
+                # Final numbers - clients may keep the hour (see drop_cached_hours)
+                'closed': closed
+            }
+
+            hourly_data.append(hour_record)
+
+            # Move to next hour - but for live data current hour, advance to the next hour boundary
+            if is_live_data and hour_end == current_time:
+                # For current hour in live data, move to next hour boundary to prevent infinite loop
+                current_hour = current_hour + timedelta(hours=1)
+            else:
+                current_hour = hour_end
+
+        hours_span.set(hours=len(hourly_data), closed=sum(1 for hour in hourly_data if hour['closed']))
+
+    annotate(hours=len(hourly_data))
+
+    # Calculate corrected total theoretical quantity (sum of hourly calculations)
+    total_theoretical_qty = sum(hour['theoretical_qty'] for hour in hourly_data)
+
+    # Finalize the response data
+    response_data = {
+        'unit_name': unit_name,
+        'total_success': total_success,
+        'total_fail': total_fail,
+        'total_qty': total_qty,
+        'total_quality': total_quality if total_quality is not None else 0,
+        'total_performance': total_performance if total_performance is not None else 0,
+        'total_oee': total_oee if total_oee is not None else 0,
+        'total_theoretical_qty': total_theoretical_qty if total_theoretical_qty is not None else 0,
+        'hourly_data': hourly_data
+    }
+
+    # Ensure all values are valid for JSON serialization
+    for hour_data in response_data['hourly_data']:
+        if hour_data['quality'] is None:
+            hour_data['quality'] = 0
+        if hour_data['performance'] is None:
+            hour_data['performance'] = 0
+        if hour_data['oee'] is None:
+            hour_data['oee'] = 0
+
+    return response_data
+
+
+def drop_cached_hours(hourly_data, have_until):
+    """
+    The hour records a client still needs when it already holds every closed
+    hour before have_until (browser hour cache, hour-cache.js).
+    """
+    return [hour for hour in hourly_data
+            if not (hour.get('closed') and datetime.fromisoformat(hour['hour_end']) <= have_until)]
+
+
+def build_report_payload(units, start_time, end_time, current_time, working_mode):
+    """
+    Build the /ws/report response for a comma-separated unit list: each
+    unit's models and summary (as in the standard payload) plus the
+    plant-wide rollup, all from one multi-unit query.
+    """
+    unit_names = [unit for unit in units.split(',') if unit]
+    production = get_live_multi_unit_data(unit_names, start_time, end_time, current_time, working_mode)
+    annotate(units=len(unit_names))
+
+    unit_payloads = {}
+    for unit_name in unit_names:
+        # Copy the rows - the cached lists are shared with other sockets
+        models = [dict(model) for model in production.get(unit_name, [])]
+        unit_payloads[unit_name] = {
+            'models': models,
+            'summary': summarize_unit(models, start_time, end_time, current_time, working_mode)
+        }
+
+    return {
+        'unit_name': units,
+        'units': unit_payloads,
+        'summary': plant_summary(
+            (unit['summary']['total_success'], unit['summary']['total_fail'], unit['summary']['unit_performance_sum'])
+            for unit in unit_payloads.values()
+        )
+    }
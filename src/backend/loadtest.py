@@ -0,0 +1,249 @@
+"""
+Load-test harness for the live dashboard sockets.
+
+Starts the FastAPI app in-process against the SQLite stand-in of
+ProductRecordLogView (standin_db.py), then drives N simulated screens over
+the real /ws/{unit} and /ws/hourly/{unit} protocols: each screen sends its
+{start_time, end_time, working_mode} request, waits for the reply and asks
+again on the next tick; standard screens also send heartbeats, and all
+screens move to a new shift window together to reproduce the cold-cache
+burst of a real shift change.
+
+Reports p50/p99 tick latency per socket type, DB queries/sec and memory.
+
+Usage (from src/backend):
+    python loadtest.py --standard 40 --hourly 20 --units 8 --duration 60 --tick 2
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import resource
+import statistics
+import sys
+import threading
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import quote
+
+import websockets
+
+
+def percentile(values, pct):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def memory_mb():
+    # Current RSS from /proc when available, peak RSS otherwise
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+class ShiftClock:
+    """
+    Shared shift window for every simulated screen. A shift change moves the
+    window start to 'now' for all screens at once.
+    """
+
+    def __init__(self, shift_hours):
+        self.start = datetime.now(timezone.utc) - timedelta(hours=shift_hours)
+        self.changes = 0
+
+    def change_shift(self):
+        self.start = datetime.now(timezone.utc).replace(second=0, microsecond=0)
+        self.changes += 1
+
+    def params(self, working_mode):
+        return {
+            'start_time': self.start.isoformat().replace('+00:00', 'Z'),
+            'end_time': datetime.now(timezone.utc).isoformat().replace('+00:00', 'Z'),
+            'working_mode': working_mode,
+        }
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = {'standard': [], 'hourly': []}
+        self.errors = {'standard': 0, 'hourly': 0}
+        self.heartbeats = 0
+        self.bytes_received = 0
+        self.disconnects = 0
+
+
+async def run_screen(kind, url, clock, stats, args, stop_at):
+    """
+    One simulated dashboard screen following the browser protocol.
+    """
+    try:
+        async with websockets.connect(url, max_size=None, compression='deflate') as socket:
+            last_heartbeat = time.monotonic()
+            while time.monotonic() < stop_at:
+                sent_at = time.perf_counter()
+                await socket.send(json.dumps(clock.params(args.working_mode)))
+
+                # Heartbeat replies can arrive while waiting for the data frame
+                while True:
+                    message = await asyncio.wait_for(socket.recv(), timeout=args.timeout)
+                    stats.bytes_received += len(message)
+                    frame = json.loads(message)
+                    if isinstance(frame, dict) and frame.get('heartbeat'):
+                        stats.heartbeats += 1
+                        continue
+                    break
+
+                if isinstance(frame, dict) and 'error' in frame:
+                    stats.errors[kind] += 1
+                else:
+                    stats.latencies[kind].append((time.perf_counter() - sent_at) * 1000)
+
+                # Sleep until the next tick, sending heartbeats on schedule like standart.js
+                next_tick = time.monotonic() + args.tick
+                while time.monotonic() < min(next_tick, stop_at):
+                    if kind == 'standard' and time.monotonic() - last_heartbeat >= args.heartbeat:
+                        heartbeat = dict(clock.params(args.working_mode), heartbeat=True)
+                        await socket.send(json.dumps(heartbeat))
+                        last_heartbeat = time.monotonic()
+                    await asyncio.sleep(min(0.25, max(0.0, next_tick - time.monotonic())))
+    except (asyncio.TimeoutError, websockets.WebSocketException, OSError) as e:
+        stats.disconnects += 1
+        print(f"[LOADTEST] {kind} screen dropped: {e!r}", file=sys.__stdout__)
+
+
+async def shift_changes(clock, every, stop_at):
+    while every > 0 and time.monotonic() + every < stop_at:
+        await asyncio.sleep(every)
+        clock.change_shift()
+        print(f"[LOADTEST] Shift change #{clock.changes}", file=sys.__stdout__)
+
+
+def start_server(port):
+    import uvicorn
+    import main
+
+    config = uvicorn.Config(main.app, host='127.0.0.1', port=port, log_level='warning',
+                            ws='websockets', ws_per_message_deflate=True)
+    server = uvicorn.Server(config)
+    thread = threading.Thread(target=server.run, name='loadtest-server', daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+async def run_load(args, units):
+    from standin_db import query_counter
+
+    clock = ShiftClock(args.shift_hours)
+    stats = Stats()
+    base = f"ws://127.0.0.1:{args.port}"
+    suffix = f"?format={args.format}" if args.format != 'json' else ''
+
+    query_counter.reset()
+    started = time.monotonic()
+    stop_at = started + args.duration
+    tasks = []
+    for i in range(args.standard):
+        url = f"{base}/ws/{quote(units[i % len(units)])}{suffix}"
+        tasks.append(run_screen('standard', url, clock, stats, args, stop_at))
+    for i in range(args.hourly):
+        url = f"{base}/ws/hourly/{quote(units[i % len(units)])}{suffix}"
+        tasks.append(run_screen('hourly', url, clock, stats, args, stop_at))
+    tasks.append(shift_changes(clock, args.shift_change_every, stop_at))
+
+    peak_memory = memory_mb()
+
+    async def sample_memory():
+        nonlocal peak_memory
+        while time.monotonic() < stop_at:
+            peak_memory = max(peak_memory, memory_mb())
+            await asyncio.sleep(1)
+
+    tasks.append(sample_memory())
+    await asyncio.gather(*tasks)
+    elapsed = time.monotonic() - started
+    return stats, clock, query_counter.count, elapsed, peak_memory
+
+
+def print_report(args, stats, clock, queries, elapsed, memory_before, peak_memory, rows_written):
+    print("\n[LOADTEST] ===== Results =====")
+    print(f"[LOADTEST] Screens: {args.standard} standard + {args.hourly} hourly over {args.units} units, "
+          f"tick {args.tick}s, {elapsed:.1f}s, format={args.format}")
+    for kind, latencies in stats.latencies.items():
+        if not latencies:
+            continue
+        print(f"[LOADTEST] {kind:8s} ticks={len(latencies):6d} errors={stats.errors[kind]:4d} "
+              f"p50={percentile(latencies, 50):8.1f} ms  p99={percentile(latencies, 99):8.1f} ms  "
+              f"mean={statistics.mean(latencies):8.1f} ms")
+    print(f"[LOADTEST] DB queries: {queries} ({queries / elapsed:.2f}/s)")
+    print(f"[LOADTEST] Heartbeats answered: {stats.heartbeats}, shift changes: {clock.changes}, "
+          f"disconnects: {stats.disconnects}")
+    print(f"[LOADTEST] Received {stats.bytes_received / 1024:.1f} KiB of frames")
+    print(f"[LOADTEST] Memory: {memory_before:.1f} MiB before, {peak_memory:.1f} MiB peak")
+    print(f"[LOADTEST] Synthetic rows written during run: {rows_written}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the dashboard WebSockets against a SQLite stand-in")
+    parser.add_argument('--standard', type=int, default=20, help="Simulated standard dashboards (/ws)")
+    parser.add_argument('--hourly', type=int, default=10, help="Simulated hourly dashboards (/ws/hourly)")
+    parser.add_argument('--units', type=int, default=8, help="Production units in the stand-in")
+    parser.add_argument('--duration', type=float, default=60, help="Test duration in seconds")
+    parser.add_argument('--tick', type=float, default=12, help="Seconds between updates (LIVE_TICK_SECONDS)")
+    parser.add_argument('--heartbeat', type=float, default=30, help="Heartbeat interval for standard screens")
+    parser.add_argument('--shift-change-every', type=float, default=0, help="Seconds between simulated shift changes (0 = none)")
+    parser.add_argument('--shift-hours', type=float, default=6, help="Elapsed part of the shift at start")
+    parser.add_argument('--rows-per-minute', type=float, default=6, help="Synthetic rows per unit per minute")
+    parser.add_argument('--history-hours', type=int, default=48, help="Hours of seeded history")
+    parser.add_argument('--working-mode', default='mode1')
+    parser.add_argument('--format', default='json', choices=['json', 'columnar'])
+    parser.add_argument('--timeout', type=float, default=60, help="Seconds to wait for a frame before dropping a screen")
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--db-path', help="Stand-in SQLite file (default: temp dir)")
+    parser.add_argument('--verbose', action='store_true', help="Keep the server's per-tick logging")
+    args = parser.parse_args()
+
+    # Configure the app before it is imported
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['LIVE_TICK_SECONDS'] = str(args.tick)
+    if args.db_path:
+        os.environ['STANDIN_DB_PATH'] = args.db_path
+
+    import standin_db
+
+    standin_db.create_standin(units=args.units, rows_per_minute=args.rows_per_minute,
+                              history_hours=args.history_hours, reset=True)
+    generator = standin_db.RowGenerator(units=args.units, rows_per_minute=args.rows_per_minute).start()
+    units = standin_db.unit_names(args.units)
+
+    if not args.verbose:
+        # The server logs every tick; that cost is real but the noise hides the report
+        sys.stdout = open(os.devnull, 'w')
+
+    memory_before = memory_mb()
+    server, thread = start_server(args.port)
+    try:
+        stats, clock, queries, elapsed, peak_memory = asyncio.run(run_load(args, units))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        generator.stop()
+        if sys.stdout is not sys.__stdout__:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+
+    print_report(args, stats, clock, queries, elapsed, memory_before, peak_memory, generator.rows_written)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,14 +1,34 @@
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
+from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse, HTMLResponse
-from datetime import datetime, timedelta
+from fastapi.responses import FileResponse, HTMLResponse, JSONResponse, PlainTextResponse, StreamingResponse
+from datetime import datetime
 import json
 import asyncio
+import hmac
 import os
+import threading
 import time
 from typing import List, Dict
-from database import get_production_units, get_production_data, get_db_connection, TIMEZONE, calculate_break_time
+from database import get_db_connection, TIMEZONE, calculate_break_time, build_model_results, QUERY_TIMEOUT_SECONDS
+from database import PRODUCTION_TABLE, STAGING_TABLE, sync_staging_table, run_db_query
+from wire_format import resolve_wire_format, serialize_payload
+from static_assets import StaticAssetCache, ASSET_URL_PREFIX
+from live_payloads import build_hourly_payload, build_report_payload, drop_cached_hours, get_unit_catalog, plant_summary, shared_cache, is_live_range
+from outbound import OutboundQueue, FRAME_DATA, FRAME_HEARTBEAT, FRAME_ERROR, FRAME_ALERT
+from resilience import live_resilience, CircuitOpen
+from sse import sse_response
+from range_planner import WORKING_MODE_SHIFT_STARTS, chunk_is_closed, get_range_production_data, gather_chunk_counts, iter_chunk_counts, plan_chunks
+from pyramid import bucket_count, bucket_floor, get_trend, LEVELS, PYRAMID_DEFAULT_POINTS, PYRAMID_MAX_POINTS
+from snapshots import run_snapshot_job, get_snapshot_report, PERIODS, SNAPSHOT_VERIFY_SECONDS
+from baselines import build_compared_standard_payload, refresh_baselines, BASELINE_REFRESH_SECONDS
+from alerts import alert_engine
+from warmup import warm_up, warmup_state, save_cache_snapshot, WARMUP_BLOCKING, WARM_CACHE_PATH, WARM_SNAPSHOT_SECONDS
+from rankings import get_units_model_results, unit_summaries, rank_units, rank_models, drilldown_models, UNIT_METRICS
+from tracing import TracingMiddleware, span, trace
+from lanes import LaneMiddleware, lanes, lane_stats, use_lane
+from recorder import RecorderMiddleware, record_rows_loop, traffic_recorder
+from profiler import sampling_profiler, loop_lag_monitor, folded_text, ProfilerBusy, PROFILER_INTERVAL_MS, PROFILER_MAX_SECONDS
 import pytz
 
 # Define timezone constant for application (GMT+3)
@@ -33,6 +53,13 @@ app.add_middleware(
     expose_headers=["*"],
 )
 
+# One trace per HTTP request (TRACE_FILE / TRACE_OTLP_ENDPOINT / TRACE_SLOW_MS)
+app.add_middleware(TracingMiddleware)
+# DB calls run on the lane of the request path (lanes.py)
+app.add_middleware(LaneMiddleware)
+# Traffic recording for replay.py (RECORD_FILE); outermost, so durations include the other middleware
+app.add_middleware(RecorderMiddleware)
+
 # Get the absolute path to the frontend directory
 FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", "frontend"))
 print(f"Frontend directory: {FRONTEND_DIR}")
@@ -40,70 +67,89 @@ print(f"Frontend directory: {FRONTEND_DIR}")
 # Mount static files for JS, CSS, etc. (not at root to avoid WebSocket conflicts)
 app.mount("/static", StaticFiles(directory=FRONTEND_DIR), name="static")
 
+# In-memory, fingerprinted and pre-compressed frontend assets
+static_assets = StaticAssetCache(FRONTEND_DIR)
+static_assets.load()
+
+def serve_frontend_asset(request: Request, name: str, not_found_detail: str = None):
+    asset = static_assets.get(name)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=not_found_detail or f"File not found: {name}")
+    return static_assets.response(request, asset)
+
+# Fingerprinted asset route (/assets/hourly.3f2a1b9c.js) - cached forever by browsers
+@app.get(ASSET_URL_PREFIX + "/{asset_path}")
+async def get_fingerprinted_asset(request: Request, asset_path: str):
+    asset, is_current = static_assets.resolve_fingerprinted(asset_path)
+    if asset is None:
+        raise HTTPException(status_code=404, detail=f"Asset not found: {asset_path}")
+    # An outdated fingerprint still gets the current content, just without the immutable promise
+    return static_assets.response(request, asset, immutable=is_current)
+
 # Main index route
 @app.get("/")
-async def read_root():
-    return FileResponse(os.path.join(FRONTEND_DIR, "index.html"))
+async def read_root(request: Request):
+    return serve_frontend_asset(request, "index.html")
 
 # JS files routes
 @app.get("/app.js")
-async def get_app_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, "app.js"))
+async def get_app_js(request: Request):
+    return serve_frontend_asset(request, "app.js")
 
 @app.get("/standart.js")
-async def get_standart_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, "standart.js"))
+async def get_standart_js(request: Request):
+    return serve_frontend_asset(request, "standart.js")
+
+@app.get("/live-runtime.js")
+async def get_live_runtime_js(request: Request):
+    return serve_frontend_asset(request, "live-runtime.js")
+
+@app.get("/hour-cache.js")
+async def get_hour_cache_js(request: Request):
+    return serve_frontend_asset(request, "hour-cache.js")
+
+@app.get("/sse-socket.js")
+async def get_sse_socket_js(request: Request):
+    return serve_frontend_asset(request, "sse-socket.js")
+
+@app.get("/wire-format.js")
+async def get_wire_format_js(request: Request):
+    return serve_frontend_asset(request, "wire-format.js")
 
 @app.get("/hourly.js")
-async def get_hourly_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, "hourly.js"))
+async def get_hourly_js(request: Request):
+    return serve_frontend_asset(request, "hourly.js")
 
 @app.get("/hourly-historical.js")
-async def get_hourly_historical_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, "hourly-historical.js"))
+async def get_hourly_historical_js(request: Request):
+    return serve_frontend_asset(request, "hourly-historical.js")
 
 @app.get("/standart-historical.js")
-async def get_standart_historical_js():
-    return FileResponse(os.path.join(FRONTEND_DIR, "standart-historical.js"))
+async def get_standart_historical_js(request: Request):
+    return serve_frontend_asset(request, "standart-historical.js")
 
 # Standard view route
 @app.get("/standart.html")
-async def get_standart_html():
-    file_path = os.path.join(FRONTEND_DIR, "standart.html")
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    else:
-        raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
+async def get_standart_html(request: Request):
+    return serve_frontend_asset(request, "standart.html")
 
 @app.get("/standart-historical.html")
-async def get_standart_historical_html():
-    file_path = os.path.join(FRONTEND_DIR, "standart-historical.html")
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    else:
-        raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
+async def get_standart_historical_html(request: Request):
+    return serve_frontend_asset(request, "standart-historical.html")
 
 # Hourly view route (original, keep for backwards compatibility)
 @app.get("/hourly")
-async def read_hourly():
-    return FileResponse(os.path.join(FRONTEND_DIR, "hourly.html"))
+async def read_hourly(request: Request):
+    return serve_frontend_asset(request, "hourly.html")
 
 # Hourly view route with .html extension
 @app.get("/hourly.html")
-async def get_hourly_html():
-    file_path = os.path.join(FRONTEND_DIR, "hourly.html")
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    else:
-        raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
+async def get_hourly_html(request: Request):
+    return serve_frontend_asset(request, "hourly.html")
 
 @app.get("/hourly-historical.html")
-async def get_hourly_historical_html():
-    file_path = os.path.join(FRONTEND_DIR, "hourly-historical.html")
-    if os.path.exists(file_path):
-        return FileResponse(file_path)
-    else:
-        raise HTTPException(status_code=404, detail=f"File not found at {file_path}")
+async def get_hourly_historical_html(request: Request):
+    return serve_frontend_asset(request, "hourly-historical.html")
 
 # Test automation route
 @app.get("/test")
@@ -144,68 +190,298 @@ async def get_debug_oee():
 
 # Report route
 @app.get("/report")
-async def get_report():
-    report_file_path = os.path.join(FRONTEND_DIR, "report.html")
-    if os.path.exists(report_file_path):
-        return FileResponse(report_file_path)
-    else:
-        raise HTTPException(status_code=404, detail="Report page not found")
+async def get_report(request: Request):
+    return serve_frontend_asset(request, "report.html", "Report page not found")
 
 @app.get("/report.js")
-async def get_report_js():
-    report_js_path = os.path.join(FRONTEND_DIR, "report.js")
-    if os.path.exists(report_js_path):
-        return FileResponse(report_js_path, media_type="application/javascript")
-    else:
-        raise HTTPException(status_code=404, detail="Report JavaScript not found")
+async def get_report_js(request: Request):
+    return serve_frontend_asset(request, "report.js", "Report JavaScript not found")
 
 # Historical Report routes
 @app.get("/report-historical")
-async def get_report_historical():
-    report_file_path = os.path.join(FRONTEND_DIR, "report-historical.html")
-    if os.path.exists(report_file_path):
-        return FileResponse(report_file_path)
-    else:
-        raise HTTPException(status_code=404, detail="Historical report page not found")
+async def get_report_historical(request: Request):
+    return serve_frontend_asset(request, "report-historical.html", "Historical report page not found")
 
 @app.get("/report-historical.js")
-async def get_report_historical_js():
-    report_js_path = os.path.join(FRONTEND_DIR, "report-historical.js")
-    if os.path.exists(report_js_path):
-        return FileResponse(report_js_path, media_type="application/javascript")
-    else:
-        raise HTTPException(status_code=404, detail="Historical report JavaScript not found")
+async def get_report_historical_js(request: Request):
+    return serve_frontend_asset(request, "report-historical.js", "Historical report JavaScript not found")
 
 # Class to manage WebSocket connections
 class ConnectionManager:
     def __init__(self):
         self.active_connections: Dict[str, List[WebSocket]] = {
             'standard': [],
-            'hourly': []
+            'hourly': [],
+            'report': []
         }
+        # Every socket is written to by its own writer task (see outbound.py)
+        self.outbound: Dict[WebSocket, OutboundQueue] = {}
+        # Units each socket shows, for routing alerts
+        self.watching: Dict[WebSocket, set] = {}
 
     async def connect(self, websocket: WebSocket, connection_type: str = 'standard'):
         await websocket.accept()
         if connection_type not in self.active_connections:
             self.active_connections[connection_type] = []
         self.active_connections[connection_type].append(websocket)
+        label = f"{connection_type} {websocket.url.path}"
+        self.outbound[websocket] = OutboundQueue(websocket, label).start()
 
     def disconnect(self, websocket: WebSocket, connection_type: str = 'standard'):
         if connection_type in self.active_connections:
             if websocket in self.active_connections[connection_type]:
                 self.active_connections[connection_type].remove(websocket)
+        self.watching.pop(websocket, None)
+        queue = self.outbound.pop(websocket, None)
+        if queue is not None:
+            queue.close()
+
+    def watch(self, websocket: WebSocket, unit_names):
+        self.watching[websocket] = set(unit_names)
+
+    def send(self, websocket: WebSocket, message: str, kind: str = FRAME_DATA) -> bool:
+        """
+        Queue a text frame for a connection without waiting for the client.
+        Returns False if the connection is closed or was dropped as a stuck consumer.
+        """
+        queue = self.outbound.get(websocket)
+        if queue is None or websocket.client_state.name != 'CONNECTED':
+            return False
+        return queue.put(message, kind)
+
+    def send_json(self, websocket: WebSocket, payload: dict, kind: str = FRAME_DATA) -> bool:
+        return self.send(websocket, json.dumps(payload), kind)
+
+    def send_alert(self, event: dict):
+        """
+        Alert listener (alerts.py): queue the event on every socket showing its unit.
+        """
+        frame = json.dumps({"alert": event})
+        for websocket, unit_names in list(self.watching.items()):
+            if event['unit_name'] in unit_names:
+                self.send(websocket, frame, f"{FRAME_ALERT}:{event['id']}")
 
     async def broadcast(self, message: str, connection_type: str = 'standard'):
+        # Queue on every connection; slow clients never hold up the others
         if connection_type in self.active_connections:
-            for connection in self.active_connections[connection_type]:
-                await connection.send_text(message)
+            for connection in list(self.active_connections[connection_type]):
+                self.send(connection, message)
 
 manager = ConnectionManager()
 
+
+def tick_trace(name, websocket, unit_name, start_time, end_time, working_mode):
+    """
+    Trace for one live tick, tagged with the exact request parameters and
+    this socket's outbound stats (the previous frame's send time, frames dropped).
+    """
+    queue = manager.outbound.get(websocket)
+    last_send = queue.last_send_seconds if queue is not None else None
+    return trace(
+        name,
+        unit=unit_name,
+        start_time=start_time.isoformat(),
+        end_time=end_time.isoformat(),
+        range_hours=round((end_time - start_time).total_seconds() / 3600, 2),
+        working_mode=working_mode,
+        prev_send_ms=round(last_send * 1000, 2) if last_send is not None else None,
+        dropped_frames=queue.dropped if queue is not None else 0
+    )
+
+# Seconds between live updates on the dashboard sockets (lowered by the load-test harness)
+LIVE_TICK_SECONDS = float(os.getenv("LIVE_TICK_SECONDS", "12"))
+
+# Seconds between pushes on the live report socket (/ws/report)
+REPORT_TICK_SECONDS = float(os.getenv("REPORT_TICK_SECONDS", "20"))
+
+# Units one report subscription may cover (one IN (...) parameter each)
+REPORT_MAX_UNITS = int(os.getenv("REPORT_MAX_UNITS", "100"))
+
+# Shared secret for the /admin endpoints (profiler, loop lag); unset disables them
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# Measure event-loop lag from startup (LOOP_LAG_THRESHOLD_MS etc. in profiler.py)
+LOOP_LAG_MONITOR = os.getenv("LOOP_LAG_MONITOR", "1") == "1"
+
+# Keep the indexed staging table fresh when the app reads from it instead of the view
+STAGING_SYNC_SECONDS = int(os.getenv("STAGING_SYNC_SECONDS", "0"))
+
+# Freeze closed shifts into snapshots (snapshots.py); 0 disables the job
+SNAPSHOT_JOB_SECONDS = int(os.getenv("SNAPSHOT_JOB_SECONDS", "60"))
+
+async def snapshot_loop():
+    last_verify = 0.0
+    last_baselines = 0.0
+    while True:
+        # Only one worker per host runs each round
+        if shared_cache.backend.acquire_lease("snapshot-job", shared_cache.owner, ttl=SNAPSHOT_JOB_SECONDS):
+            verify = time.monotonic() - last_verify >= SNAPSHOT_VERIFY_SECONDS
+            try:
+                frozen, recomputed = await run_snapshot_job(datetime.now(TIMEZONE), verify)
+                if verify:
+                    last_verify = time.monotonic()
+                if frozen or recomputed:
+                    print(f"[SNAPSHOT] Froze {frozen} and recomputed {recomputed} unit shift snapshots")
+            except Exception as e:
+                print(f"[SNAPSHOT ERROR] Snapshot job failed: {e}")
+            # Baselines for the live comparison are rebuilt from the snapshots (no production query)
+            if time.monotonic() - last_baselines >= BASELINE_REFRESH_SECONDS:
+                try:
+                    await asyncio.get_event_loop().run_in_executor(lanes['background'].executor, refresh_baselines, datetime.now(TIMEZONE), list(WORKING_MODE_SHIFT_STARTS))
+                    last_baselines = time.monotonic()
+                except Exception as e:
+                    print(f"[BASELINE ERROR] Baseline refresh failed: {e}")
+        await asyncio.sleep(SNAPSHOT_JOB_SECONDS)
+
+async def warm_cache_snapshot_loop():
+    loop = asyncio.get_event_loop()
+    while True:
+        await asyncio.sleep(WARM_SNAPSHOT_SECONDS)
+        # Only one worker per host writes the snapshot
+        if shared_cache.backend.acquire_lease("warm-snapshot", shared_cache.owner, ttl=WARM_SNAPSHOT_SECONDS):
+            try:
+                saved = await loop.run_in_executor(None, save_cache_snapshot)
+                print(f"[WARMUP] Saved {saved} cache entries to {WARM_CACHE_PATH}")
+            except Exception as e:
+                print(f"[WARMUP ERROR] Cache snapshot failed: {e}")
+
+async def staging_sync_loop():
+    loop = asyncio.get_event_loop()
+    while True:
+        # Only one worker per host runs each sync round
+        if shared_cache.backend.acquire_lease("staging-sync", shared_cache.owner, ttl=STAGING_SYNC_SECONDS):
+            try:
+                copied = await loop.run_in_executor(lanes['background'].executor, sync_staging_table)
+                print(f"[STAGING] Synced {copied} rows into {STAGING_TABLE}")
+            except Exception as e:
+                print(f"[STAGING ERROR] Sync failed: {e}")
+        await asyncio.sleep(STAGING_SYNC_SECONDS)
+
+@app.on_event("startup")
+async def start_query_diagnostics():
+    if os.getenv("QUERY_ADVISOR_ON_STARTUP", "0") == "1":
+        from query_advisor import run_advisor, print_report
+        try:
+            report = await asyncio.get_event_loop().run_in_executor(None, run_advisor)
+            print_report(report)
+        except Exception as e:
+            print(f"[QUERY ADVISOR ERROR] {e}")
+    # Tasks keep the lane they were created in, so the jobs' queries stay off the live lane
+    with use_lane('background'):
+        if STAGING_SYNC_SECONDS > 0 and PRODUCTION_TABLE == STAGING_TABLE:
+            asyncio.create_task(staging_sync_loop())
+        if SNAPSHOT_JOB_SECONDS > 0:
+            asyncio.create_task(snapshot_loop())
+        if traffic_recorder is not None:
+            asyncio.create_task(record_rows_loop())
+    alert_engine.add_listener(manager.send_alert)
+    if WARM_SNAPSHOT_SECONDS > 0:
+        asyncio.create_task(warm_cache_snapshot_loop())
+    if LOOP_LAG_MONITOR:
+        loop_lag_monitor.start()
+    # Blocking: the server only starts accepting connections once the current shift is cached
+    if WARMUP_BLOCKING:
+        await warm_up()
+    else:
+        asyncio.create_task(warm_up())
+
+@app.on_event("shutdown")
+async def save_warm_cache():
+    try:
+        saved = await asyncio.get_event_loop().run_in_executor(None, save_cache_snapshot)
+        print(f"[WARMUP] Saved {saved} cache entries to {WARM_CACHE_PATH} on shutdown")
+    except Exception as e:
+        print(f"[WARMUP ERROR] Cache snapshot on shutdown failed: {e}")
+
+def require_admin(request: Request):
+    """
+    Admin endpoints need ADMIN_TOKEN in the X-Admin-Token header (or ?token=).
+    They don't exist at all while ADMIN_TOKEN is unset.
+    """
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    supplied = request.headers.get('x-admin-token') or request.query_params.get('token') or ''
+    if not hmac.compare_digest(supplied.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        raise HTTPException(status_code=403, detail="Invalid admin token")
+
+@app.get("/admin/profile")
+async def admin_profile(request: Request, seconds: float = 10, interval_ms: float = PROFILER_INTERVAL_MS,
+                        format: str = 'folded', include_idle: bool = False):
+    """
+    Sample every thread of this worker for `seconds` and return the folded
+    stacks (format=folded, for flamegraph.pl / speedscope) or a JSON summary
+    with the hottest functions and the event-loop lag stats (format=json).
+    """
+    require_admin(request)
+    if not 0 < seconds <= PROFILER_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail=f"seconds must be between 0 and {PROFILER_MAX_SECONDS:.0f}")
+    if interval_ms < 1:
+        raise HTTPException(status_code=400, detail="interval_ms must be at least 1")
+
+    # The event loop runs this handler, so this is the thread to label as the loop
+    sampling_profiler.loop_thread_id = threading.get_ident()
+    print(f"[PROFILER] Sampling for {seconds:.0f}s every {interval_ms:.0f}ms")
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def run():
+        # A dedicated thread, so the sampler never waits behind busy executor workers
+        try:
+            result = sampling_profiler.sample(seconds, interval_ms, include_idle)
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_result(result))
+        except Exception as e:
+            loop.call_soon_threadsafe(lambda: done.done() or done.set_exception(e))
+
+    threading.Thread(target=run, name='profiler-sampler', daemon=True).start()
+    try:
+        profile = await done
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    print(f"[PROFILER] {profile['samples']} samples, overhead {profile['overhead_ratio']:.2%}")
+
+    if format == 'json':
+        return {
+            'duration_seconds': profile['duration_seconds'],
+            'interval_ms': profile['interval_ms'],
+            'samples': profile['samples'],
+            'idle_samples_skipped': profile['idle_samples_skipped'],
+            'overhead_ratio': profile['overhead_ratio'],
+            'top_self': [{'function': name, 'samples': count} for name, count in profile['top_self']],
+            'folded': folded_text(profile).splitlines(),
+            'loop_lag': loop_lag_monitor.stats()
+        }
+    return PlainTextResponse(folded_text(profile))
+
+@app.get("/admin/lanes")
+async def admin_lanes(request: Request):
+    """
+    Threads, running and queued calls per query lane (lanes.py).
+    """
+    require_admin(request)
+    return lane_stats()
+
+@app.get("/admin/loop-lag")
+async def admin_loop_lag(request: Request):
+    """
+    Event-loop lag stats and the most recent blocking events with the stack
+    that was running on the loop while it was stuck.
+    """
+    require_admin(request)
+    return loop_lag_monitor.stats()
+
 # API endpoint to get available production units
 @app.get("/units")
 async def get_units():
-    return get_production_units()
+    return await run_db_query(get_unit_catalog, label='units')
+
+@app.get("/ready")
+async def readiness():
+    """
+    Readiness probe: 503 while the startup warm-up (warmup.py) is still
+    prefetching the current shift - on this worker or, for the others on the
+    host, on the one holding the warm-up lease - 200 once it is done.
+    """
+    return JSONResponse(warmup_state.as_dict(), status_code=200 if warmup_state.ready else 503)
 
 @app.get("/report-data")
 async def get_report_data(units: str, start_time: str, end_time: str, working_mode: str = 'mode1'):
@@ -237,33 +513,24 @@ async def get_report_data(units: str, start_time: str, end_time: str, working_mo
         
         # Collect data for all units
         unit_data = {}
-        total_success_all = 0
-        total_fail_all = 0
-        weighted_quality_sum = 0
-        weighted_performance_sum = 0
-        total_production_all = 0
-        total_success_weight = 0
         
-        for unit_name in unit_list:
-            # Get production data for this unit with timeout protection
-            print(f"[REPORT] Starting database query for unit {unit_name}")
-            try:
-                production_data = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None, 
-                        lambda unit=unit_name: get_production_data(unit, start_time, end_time, current_time, working_mode)
-                    ), 
-                    timeout=30.0  # 30 second timeout per unit
-                )
-                print(f"[REPORT] Database query completed for unit {unit_name}")
-            except asyncio.TimeoutError:
+        # Query all units concurrently; long ranges are split into chunks by the range planner
+        print(f"[REPORT] Starting database queries for units {', '.join(unit_list)}")
+        unit_results = await asyncio.gather(
+            *(get_range_production_data(unit_name, start_time, end_time, current_time, working_mode) for unit_name in unit_list),
+            return_exceptions=True
+        )
+        
+        for unit_name, production_data in zip(unit_list, unit_results):
+            if isinstance(production_data, asyncio.TimeoutError):
                 print(f"[REPORT ERROR] Database query timeout for unit {unit_name} - skipping unit")
                 # Skip this unit and continue with others
                 continue
-            except Exception as db_error:
-                print(f"[REPORT ERROR] Database error for unit {unit_name}: {str(db_error)} - skipping unit")
+            if isinstance(production_data, Exception):
+                print(f"[REPORT ERROR] Database error for unit {unit_name}: {str(production_data)} - skipping unit")
                 # Skip this unit and continue with others
                 continue
+            print(f"[REPORT] Database query completed for unit {unit_name}")
             
             # Calculate unit totals
             unit_success = sum(model['success_qty'] for model in production_data)
@@ -288,33 +555,13 @@ async def get_report_data(units: str, start_time: str, end_time: str, working_mo
                 'performance_sum': unit_performance_sum,
                 'models': production_data
             }
-            
-            # Add to overall totals
-            total_success_all += unit_success
-            total_fail_all += unit_fail
-            total_production_all += unit_total
-            
-            # Add to weighted sums
-            if unit_total > 0:
-                weighted_quality_sum += unit_quality * unit_total
-            
-            if unit_success > 0:
-                weighted_performance_sum += unit_performance_sum * unit_success
-                total_success_weight += unit_success
-        
-        # Calculate overall weighted averages
-        overall_quality = weighted_quality_sum / total_production_all if total_production_all > 0 else 0
-        overall_performance = weighted_performance_sum / total_success_weight if total_success_weight > 0 else 0
         
+        # Weighted overall figures (same rollup as the live /ws/report channel)
         return {
             'units': unit_data,
-            'summary': {
-                'total_success': total_success_all,
-                'total_fail': total_fail_all,
-                'total_production': total_production_all,
-                'weighted_quality': overall_quality,
-                'weighted_performance': overall_performance
-            }
+            'summary': plant_summary(
+                (unit['total_success'], unit['total_fail'], unit['performance_sum']) for unit in unit_data.values()
+            )
         }
         
     except Exception as e:
@@ -345,13 +592,8 @@ async def get_historical_data(unit_name: str, start_time: str, end_time: str, wo
         # Get production data with timeout protection
         print(f"[HISTORICAL] Starting database query for unit {unit_name}")
         try:
-            production_data = await asyncio.wait_for(
-                asyncio.get_event_loop().run_in_executor(
-                    None, 
-                    lambda: get_production_data(unit_name, start_time, end_time, current_time, working_mode)
-                ), 
-                timeout=30.0  # 30 second timeout
-            )
+            # Long ranges are split into day chunks and counted concurrently
+            production_data = await get_range_production_data(unit_name, start_time, end_time, current_time, working_mode)
             print(f"[HISTORICAL] Database query completed for unit {unit_name}")
         except asyncio.TimeoutError:
             print(f"[HISTORICAL ERROR] Database query timeout for unit {unit_name}")
@@ -415,8 +657,86 @@ async def get_historical_data(unit_name: str, start_time: str, end_time: str, wo
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def parse_have_until(value):
+    """
+    The client's "I already have every closed hour before this" mark (hour-cache.js), or None.
+    """
+    if not value:
+        return None
+    have_until = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if have_until.tzinfo is None:
+        return TIMEZONE.localize(have_until)
+    return have_until.astimezone(TIMEZONE)
+
+def skip_cached_hours(hours, have_until, current_time):
+    """
+    The planned hours still to count when the client holds every closed hour before have_until.
+    """
+    if have_until is None:
+        return hours
+    return [hour for hour in hours if not (hour[1] <= have_until and chunk_is_closed(hour[1], current_time))]
+
+def build_historical_hour_record(hour_start, hour_end, counts, working_mode, closed=False):
+    """
+    One /historical-hourly-data record from the raw model counts of that hour.
+    """
+    hour_data = build_model_results(counts, hour_start, hour_end, working_mode)
+
+    # Calculate hourly totals
+    hour_success = sum(model['success_qty'] for model in hour_data)
+    hour_fail = sum(model['fail_qty'] for model in hour_data)
+    hour_total = sum(model['total_qty'] for model in hour_data)
+
+    # Calculate hourly quality
+    hour_quality = hour_success / (hour_success + hour_fail) if (hour_success + hour_fail) > 0 else 0
+
+    # Calculate hourly performance and theoretical quantity
+    models_with_target = [model for model in hour_data if model['target'] is not None and model['target'] > 0]
+    hour_performance = 0
+    hour_theoretical_qty = 0
+
+    if models_with_target:
+        # Calculate operation time for this hour
+        hour_operation_time = (hour_end - hour_start).total_seconds()
+        hour_break_time = calculate_break_time(hour_start, hour_end, working_mode)
+        hour_operation_time = max(hour_operation_time - hour_break_time, 0)
+
+        # Calculate theoretical quantity using weighted average target rate
+        hour_actual_qty = sum(model['total_qty'] for model in models_with_target)
+
+        if hour_actual_qty > 0:
+            weighted_target_rate = 0
+            for model in models_with_target:
+                weight = model['total_qty'] / hour_actual_qty
+                weighted_target_rate += model['target'] * weight
+
+            # Calculate theoretical quantity using weighted average rate
+            hour_theoretical_qty = (hour_operation_time / 3600) * weighted_target_rate
+
+            # Calculate performance
+            hour_performance = hour_actual_qty / hour_theoretical_qty if hour_theoretical_qty > 0 else 0
+
+    return {
+        'hour_start': hour_start.isoformat(),
+        'hour_end': hour_end.isoformat(),
+        'success_qty': hour_success,
+        'fail_qty': hour_fail,
+        'total_qty': hour_total,
+        'quality': hour_quality,
+        'performance': hour_performance,
+        'theoretical_qty': hour_theoretical_qty,
+        # Final numbers - clients may keep the hour
+        'closed': closed
+    }
+
 @app.get("/historical-hourly-data/{unit_name}")
-async def get_historical_hourly_data(unit_name: str, start_time: str, end_time: str, working_mode: str = 'mode1'):
+async def get_historical_hourly_data(unit_name: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                                     have_until: str = None):
+    """
+    Per-hour records and totals for the range. With have_until the client
+    already holds the closed hours before it: they are neither counted nor
+    sent, and the totals cover the hours sent.
+    """
     try:
         # Fix ISO format strings with 'Z' timezone
         start_time_str = start_time.replace('Z', '+00:00')
@@ -434,7 +754,6 @@ async def get_historical_hourly_data(unit_name: str, start_time: str, end_time:
         # Get current time in GMT+3
         current_time = datetime.now(TIMEZONE)
         
-        # Since get_production_data returns aggregated data, we need to query hour by hour
         hourly_data = []
         current_hour = start_time.replace(minute=0, second=0, microsecond=0)
         
@@ -443,82 +762,29 @@ async def get_historical_hourly_data(unit_name: str, start_time: str, end_time:
         total_fail = 0
         total_qty = 0
         
-        while current_hour < end_time:
-            hour_end = min(current_hour + timedelta(hours=1), end_time)
-            
-            # Get data for this specific hour with timeout protection
-            print(f"[HISTORICAL HOURLY] Starting database query for unit {unit_name}, hour {current_hour.strftime('%H:%M')}")
-            try:
-                hour_data = await asyncio.wait_for(
-                    asyncio.get_event_loop().run_in_executor(
-                        None, 
-                        lambda hour_start=current_hour, hour_end_copy=hour_end: get_production_data(unit_name, hour_start, hour_end_copy, current_time, working_mode)
-                    ), 
-                    timeout=30.0  # 30 second timeout per hour
-                )
-                print(f"[HISTORICAL HOURLY] Database query completed for unit {unit_name}, hour {current_hour.strftime('%H:%M')}")
-            except asyncio.TimeoutError:
+        # Count every hour concurrently (capped by the range planner); closed hours come from the chunk cache
+        planned = plan_chunks(current_hour, end_time, 'hour')
+        have_until = parse_have_until(have_until)
+        hours = skip_cached_hours(planned, have_until, current_time)
+        print(f"[HISTORICAL HOURLY] Starting {len(hours)} hourly queries for unit {unit_name}")
+        hour_counts = await gather_chunk_counts(unit_name, hours, current_time, return_exceptions=True)
+        
+        for (current_hour, hour_end, _), counts in zip(hours, hour_counts):
+            if isinstance(counts, asyncio.TimeoutError):
                 print(f"[HISTORICAL HOURLY ERROR] Database query timeout for unit {unit_name}, hour {current_hour.strftime('%H:%M')} - skipping hour")
-                # Skip this hour and continue with next hour
-                current_hour = hour_end
                 continue
-            except Exception as db_error:
-                print(f"[HISTORICAL HOURLY ERROR] Database error for unit {unit_name}, hour {current_hour.strftime('%H:%M')}: {str(db_error)} - skipping hour")
-                # Skip this hour and continue with next hour
-                current_hour = hour_end
+            if isinstance(counts, Exception):
+                print(f"[HISTORICAL HOURLY ERROR] Database error for unit {unit_name}, hour {current_hour.strftime('%H:%M')}: {str(counts)} - skipping hour")
                 continue
-            
-            # Calculate hourly totals
-            hour_success = sum(model['success_qty'] for model in hour_data)
-            hour_fail = sum(model['fail_qty'] for model in hour_data)
-            hour_total = sum(model['total_qty'] for model in hour_data)
+            hour_record = build_historical_hour_record(current_hour, hour_end, counts, working_mode,
+                                                       chunk_is_closed(hour_end, current_time))
             
             # Add to overall totals
-            total_success += hour_success
-            total_fail += hour_fail
-            total_qty += hour_total
-            
-            # Calculate hourly quality
-            hour_quality = hour_success / (hour_success + hour_fail) if (hour_success + hour_fail) > 0 else 0
-            
-            # Calculate hourly performance and theoretical quantity
-            models_with_target = [model for model in hour_data if model['target'] is not None and model['target'] > 0]
-            hour_performance = 0
-            hour_theoretical_qty = 0
-            
-            if models_with_target:
-                # Calculate operation time for this hour
-                hour_operation_time = (hour_end - current_hour).total_seconds()
-                hour_break_time = calculate_break_time(current_hour, hour_end, working_mode)
-                hour_operation_time = max(hour_operation_time - hour_break_time, 0)
-                
-                # Calculate theoretical quantity using weighted average target rate
-                hour_actual_qty = sum(model['total_qty'] for model in models_with_target)
-                
-                if hour_actual_qty > 0:
-                    weighted_target_rate = 0
-                    for model in models_with_target:
-                        weight = model['total_qty'] / hour_actual_qty
-                        weighted_target_rate += model['target'] * weight
-                    
-                    # Calculate theoretical quantity using weighted average rate
-                    hour_theoretical_qty = (hour_operation_time / 3600) * weighted_target_rate
-                    
-                    # Calculate performance
-                    hour_performance = hour_actual_qty / hour_theoretical_qty if hour_theoretical_qty > 0 else 0
+            total_success += hour_record['success_qty']
+            total_fail += hour_record['fail_qty']
+            total_qty += hour_record['total_qty']
             
-            hourly_data.append({
-                'hour_start': current_hour.isoformat(),
-                'hour_end': hour_end.isoformat(),
-                'success_qty': hour_success,
-                'fail_qty': hour_fail,
-                'total_qty': hour_total,
-                'quality': hour_quality,
-                'performance': hour_performance,
-                'theoretical_qty': hour_theoretical_qty
-            })
-            
-            current_hour = hour_end
+            hourly_data.append(hour_record)
         
         # Calculate overall metrics
         total_quality = total_success / (total_success + total_fail) if (total_success + total_fail) > 0 else 0
@@ -538,7 +804,9 @@ async def get_historical_hourly_data(unit_name: str, start_time: str, end_time:
             'total_quality': total_quality,
             'total_performance': total_performance,
             'total_theoretical_qty': total_theoretical_qty,
-            'hourly_data': hourly_data
+            'hourly_data': hourly_data,
+            'have_until': have_until.isoformat() if have_until else None,
+            'skipped_hours': len(planned) - len(hours)
         }
     except Exception as e:
         print(f"Error in historical hourly data endpoint: {str(e)}")
@@ -546,10 +814,378 @@ async def get_historical_hourly_data(unit_name: str, start_time: str, end_time:
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/historical-hourly-data/{unit_name}/stream")
+async def stream_historical_hourly_data(unit_name: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                                        have_until: str = None):
+    """
+    NDJSON variant of /historical-hourly-data: one line per hour as soon as it
+    is counted, newest hours first, each with the running totals.
+    Lines: {"type": "start"}, {"type": "hour"} / {"type": "hour_error"} per
+    hour, then {"type": "end"} with the same totals as the plain endpoint
+    (have_until works the same way too).
+    """
+    try:
+        start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+        have_until = parse_have_until(have_until)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Convert to application timezone (GMT+3)
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(TIMEZONE)
+        end_time = end_time.astimezone(TIMEZONE)
+    
+    current_time = datetime.now(TIMEZONE)
+    planned = plan_chunks(start_time.replace(minute=0, second=0, microsecond=0), end_time, 'hour')
+    hours = skip_cached_hours(planned, have_until, current_time)
+    
+    async def ndjson_lines():
+        totals = {'total_success': 0, 'total_fail': 0, 'total_qty': 0, 'total_theoretical_qty': 0, 'hours_done': 0, 'hours': len(hours)}
+        yield json.dumps({'type': 'start', 'unit_name': unit_name, 'hours': len(hours), 'skipped_hours': len(planned) - len(hours),
+                          'have_until': have_until.isoformat() if have_until else None}) + "\n"
+        
+        # Newest hours first - they are at the top of the table
+        async for (hour_start, hour_end, _), counts in iter_chunk_counts(unit_name, list(reversed(hours)), current_time):
+            totals['hours_done'] += 1
+            if isinstance(counts, Exception):
+                print(f"[HISTORICAL STREAM ERROR] {unit_name}, hour {hour_start.strftime('%H:%M')}: {str(counts) or type(counts).__name__} - skipping hour")
+                yield json.dumps({'type': 'hour_error', 'hour_start': hour_start.isoformat(), 'error': str(counts) or type(counts).__name__}) + "\n"
+                continue
+            
+            hour_record = build_historical_hour_record(hour_start, hour_end, counts, working_mode,
+                                                       chunk_is_closed(hour_end, current_time))
+            totals['total_success'] += hour_record['success_qty']
+            totals['total_fail'] += hour_record['fail_qty']
+            totals['total_qty'] += hour_record['total_qty']
+            totals['total_theoretical_qty'] += hour_record['theoretical_qty']
+            yield json.dumps({'type': 'hour', 'hour': hour_record, 'totals': totals}) + "\n"
+        
+        processed = totals['total_success'] + totals['total_fail']
+        yield json.dumps({
+            'type': 'end',
+            'unit_name': unit_name,
+            'total_success': totals['total_success'],
+            'total_fail': totals['total_fail'],
+            'total_qty': totals['total_qty'],
+            'total_quality': totals['total_success'] / processed if processed > 0 else 0,
+            'total_performance': totals['total_qty'] / totals['total_theoretical_qty'] if totals['total_theoretical_qty'] > 0 else 0,
+            'total_theoretical_qty': totals['total_theoretical_qty']
+        }) + "\n"
+        print(f"[HISTORICAL STREAM] Streamed {len(hours)} hours for unit {unit_name}")
+    
+    # X-Accel-Buffering: keep reverse proxies from holding lines back
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/shift-report/{unit_name}")
+async def get_shift_report(unit_name: str, at: str, period: str = 'shift', working_mode: str = 'mode1'):
+    """
+    Report for the shift, day or week containing `at`, summed from the
+    shift-close snapshots (snapshots.py) instead of raw rows.
+    """
+    if period not in PERIODS:
+        raise HTTPException(status_code=400, detail=f"Unknown period '{period}', expected one of {', '.join(PERIODS)}")
+    try:
+        at = datetime.fromisoformat(at.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    at = at.astimezone(TIMEZONE) if at.tzinfo is not None else TIMEZONE.localize(at)
+    
+    try:
+        return await get_snapshot_report(unit_name, at, period, datetime.now(TIMEZONE), working_mode)
+    except asyncio.TimeoutError:
+        print(f"[SHIFT REPORT ERROR] Database query timeout for unit {unit_name}")
+        raise HTTPException(status_code=504, detail="Database query timeout - try again later")
+    except Exception as db_error:
+        print(f"[SHIFT REPORT ERROR] Database error for unit {unit_name}: {str(db_error)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
+
+@app.get("/comparison/{unit_name}")
+async def get_shift_comparison(unit_name: str, working_mode: str = 'mode1'):
+    """
+    The current shift so far against the same shift last week and the
+    average of the last 7 days; baselines come from the precomputed cache
+    (baselines.py), the running totals from the shared live result.
+    """
+    current_time = datetime.now(TIMEZONE)
+    shift_start = bucket_floor(current_time, 'shift', working_mode)
+    try:
+        payload = await run_db_query(build_compared_standard_payload, unit_name, shift_start, current_time, current_time, working_mode,
+                                     label=f"comparison {unit_name}")
+    except asyncio.TimeoutError:
+        print(f"[COMPARISON ERROR] Database query timeout for unit {unit_name}")
+        raise HTTPException(status_code=504, detail="Database query timeout - try again later")
+    except Exception as db_error:
+        print(f"[COMPARISON ERROR] Database error for unit {unit_name}: {str(db_error)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
+    return {
+        'unit_name': unit_name,
+        'working_mode': working_mode,
+        'shift_start': shift_start.isoformat(),
+        'summary': payload['summary'],
+        'comparison': payload['comparison']
+    }
+
+@app.get("/trend/{unit_name}")
+async def get_trend_data(unit_name: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                         max_points: int = PYRAMID_DEFAULT_POINTS, level: str = None, by_model: bool = False):
+    """
+    Zoomable trend: the range as at most max_points 5-minute, hourly, shift or
+    daily buckets (the finest that fits, or `level`), from the pyramid (pyramid.py).
+    A `level` with more than max_points buckets over the range is rejected.
+    """
+    if level is not None and level not in LEVELS:
+        raise HTTPException(status_code=400, detail=f"Unknown level '{level}', expected one of {', '.join(LEVELS)}")
+    if not 1 <= max_points <= PYRAMID_MAX_POINTS:
+        raise HTTPException(status_code=400, detail=f"max_points must be between 1 and {PYRAMID_MAX_POINTS}")
+    try:
+        start_time = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+        end_time = datetime.fromisoformat(end_time.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    # Convert to application timezone (GMT+3)
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(TIMEZONE)
+        end_time = end_time.astimezone(TIMEZONE)
+    else:
+        start_time = TIMEZONE.localize(start_time)
+        end_time = TIMEZONE.localize(end_time)
+    
+    current_time = datetime.now(TIMEZONE)
+    if level is not None:
+        # Same budget as an automatic level - 5min over a month would be thousands of points and page queries
+        points = bucket_count(start_time, min(end_time, current_time), level, working_mode)
+        if points > max_points:
+            raise HTTPException(status_code=400, detail=f"Level '{level}' gives {points} points over this range, "
+                                                        f"more than max_points={max_points} - pick a coarser level or a shorter range")
+    try:
+        trend = await get_trend(unit_name, start_time, end_time, current_time, working_mode, max_points, level, by_model)
+    except asyncio.TimeoutError:
+        print(f"[TREND ERROR] Database query timeout for unit {unit_name}")
+        raise HTTPException(status_code=504, detail="Database query timeout - try a smaller time range")
+    except Exception as db_error:
+        print(f"[TREND ERROR] Database error for unit {unit_name}: {str(db_error)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
+    print(f"[TREND] {unit_name}: {len(trend['points'])} {trend['level']} points")
+    return trend
+
+def parse_live_start(start_time: str):
+    try:
+        start = datetime.fromisoformat(start_time.replace('Z', '+00:00'))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return start.astimezone(TIMEZONE) if start.tzinfo is not None else TIMEZONE.localize(start)
+
+# Server-Sent Events mirrors of the live WebSockets (see sse.py) - the server pushes every LIVE_TICK_SECONDS
+@app.get("/sse/{unit_name}")
+async def sse_standard(request: Request, unit_name: str, start_time: str, working_mode: str = 'mode1', format: str = None):
+    return sse_response(request, 'standard', build_compared_standard_payload, unit_name, parse_live_start(start_time),
+                        working_mode, resolve_wire_format(format), LIVE_TICK_SECONDS)
+
+@app.get("/sse/hourly/{unit_name}")
+async def sse_hourly(request: Request, unit_name: str, start_time: str, working_mode: str = 'mode1', format: str = None):
+    return sse_response(request, 'hourly', build_hourly_payload, unit_name, parse_live_start(start_time),
+                        working_mode, resolve_wire_format(format), LIVE_TICK_SECONDS)
+
+def parse_report_subscription(params):
+    """
+    {units, start_time, end_time, working_mode} -> (unit list, start, end, mode, live).
+    A live subscription (end within 5 minutes of now) follows the clock on every tick.
+    """
+    units = params.get('units')
+    if isinstance(units, str):
+        units = units.split(',')
+    # Deduplicated, request order kept
+    unit_list = list(dict.fromkeys(unit.strip() for unit in (units or []) if unit and unit.strip()))
+    if not unit_list:
+        raise ValueError("No units specified")
+    if len(unit_list) > REPORT_MAX_UNITS:
+        raise ValueError(f"Too many units ({len(unit_list)}), at most {REPORT_MAX_UNITS}")
+
+    start_time = datetime.fromisoformat(params['start_time'].replace('Z', '+00:00'))
+    end_time = datetime.fromisoformat(params.get('end_time', params['start_time']).replace('Z', '+00:00'))
+    if start_time.tzinfo is not None:
+        start_time = start_time.astimezone(TIMEZONE)
+        end_time = end_time.astimezone(TIMEZONE)
+    else:
+        start_time = TIMEZONE.localize(start_time)
+        end_time = TIMEZONE.localize(end_time)
+
+    live = 'end_time' not in params or is_live_range(end_time, datetime.now(TIMEZONE))
+    return unit_list, start_time, end_time, params.get('working_mode', 'mode1'), live
+
+# WebSocket endpoint for the live plant-wide report: one socket for all selected units
+@app.websocket("/ws/report")
+async def report_websocket_endpoint(websocket: WebSocket):
+    """
+    The client subscribes with {units, start_time, end_time, working_mode}
+    (again to change or refresh it) and the server pushes the finished report
+    - every unit's models and summary plus the plant rollup, from one
+    multi-unit query - every REPORT_TICK_SECONDS; with include_models: false
+    only the summaries are sent. {heartbeat: true} is answered like on the
+    other sockets.
+    """
+    await manager.connect(websocket, 'report')
+    subscription = None
+    include_models = True
+    next_push = None
+    next_message = None
+    try:
+        while True:
+            if next_message is None:
+                next_message = asyncio.ensure_future(websocket.receive_text())
+            # Ticks keep their own schedule; heartbeats and other messages don't postpone them
+            timeout = None if subscription is None else max(0.0, next_push - time.monotonic())
+            done, _ = await asyncio.wait({next_message}, timeout=timeout)
+
+            if next_message in done:
+                data = next_message.result()
+                next_message = None
+                try:
+                    params = json.loads(data)
+                    if params.get('heartbeat'):
+                        manager.send_json(websocket, {"heartbeat": True, "timestamp": time.time()}, FRAME_HEARTBEAT)
+                        continue
+                    subscription = parse_report_subscription(params)
+                    include_models = params.get('include_models', True)
+                    manager.watch(websocket, subscription[0])
+                except (ValueError, KeyError, TypeError, AttributeError) as e:
+                    print(f"[REPORT ERROR] Invalid subscription: {str(e)}")
+                    manager.send_json(websocket, {"error": str(e)}, FRAME_ERROR)
+                    continue
+                print(f"[REPORT] Subscribed to {len(subscription[0])} units: {', '.join(subscription[0])}")
+            elif subscription is None:
+                continue
+
+            unit_list, start_time, end_time, working_mode, live = subscription
+            units_label = ','.join(unit_list)
+            current_time = datetime.now(TIMEZONE)
+            tick_end = current_time if live else end_time
+            next_push = time.monotonic() + REPORT_TICK_SECONDS
+
+            with tick_trace('ws.report.tick', websocket, units_label, start_time, tick_end, working_mode):
+                try:
+                    # Falls back to the last good report (marked stale) while the database is slow or backing off
+                    response_data = await live_resilience.serve('report', build_report_payload, units_label, start_time, tick_end, current_time, working_mode)
+                except asyncio.TimeoutError:
+                    print(f"[REPORT ERROR] Database query timeout for {units_label} - query took longer than {QUERY_TIMEOUT_SECONDS:.0f} seconds")
+                    manager.send_json(websocket, {"error": "Database query timeout - try a smaller time range"}, FRAME_ERROR)
+                    continue
+                except CircuitOpen as e:
+                    print(f"[REPORT ERROR] {str(e)}")
+                    manager.send_json(websocket, {"error": str(e)}, FRAME_ERROR)
+                    continue
+                except Exception as db_error:
+                    print(f"[REPORT ERROR] Database error for {units_label}: {str(db_error)}")
+                    manager.send_json(websocket, {"error": f"Database error: {str(db_error)}"}, FRAME_ERROR)
+                    continue
+
+                # A stale report repeats old totals - nothing new for the alert rules
+                if live and not response_data.get('stale'):
+                    for unit_name, unit in response_data['units'].items():
+                        alert_engine.observe(unit_name, unit['summary'], start_time, current_time, working_mode)
+
+                if not include_models:
+                    # The report page only draws summaries; drill-downs use /drilldown
+                    response_data = dict(response_data, units={
+                        unit_name: {'summary': unit['summary']} for unit_name, unit in response_data['units'].items()
+                    })
+
+                with span('encode', format='json') as encode_span:
+                    frame = json.dumps(response_data)
+                    encode_span.set(bytes=len(frame))
+                with span('send.enqueue'):
+                    queued = manager.send(websocket, frame)
+                if not queued:
+                    print(f"[REPORT WARNING] Connection closed before sending report for {units_label}")
+                    break
+    except WebSocketDisconnect:
+        print("[REPORT INFO] WebSocket disconnected")
+    except Exception as e:
+        error_msg = str(e).lower()
+        if 'connection closed' in error_msg or '1005' in error_msg or 'no status received' in error_msg:
+            print(f"[REPORT INFO] WebSocket connection closed (normal): {e}")
+        else:
+            print(f"[REPORT ERROR] Unexpected error in report WebSocket handler: {str(e)}")
+            import traceback
+            traceback.print_exc()
+    finally:
+        if next_message is not None:
+            next_message.cancel()
+        manager.disconnect(websocket, 'report')
+
+async def ranking_summaries(units, start_time, end_time, working_mode, metric, order, limit):
+    """
+    Shared by the ranking and drill-down routes: validate, then
+    ({unit: (models, summary)}, range closed) from the hourly pre-aggregates (see rankings.py).
+    """
+    if metric not in UNIT_METRICS:
+        raise HTTPException(status_code=400, detail=f"Unknown metric '{metric}', expected one of {', '.join(UNIT_METRICS)}")
+    if order not in ('desc', 'asc'):
+        raise HTTPException(status_code=400, detail="order must be 'desc' or 'asc'")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    try:
+        unit_list, start_time, end_time, working_mode, _ = parse_report_subscription(
+            {'units': units, 'start_time': start_time, 'end_time': end_time, 'working_mode': working_mode}
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    current_time = datetime.now(TIMEZONE)
+    try:
+        results = await get_units_model_results(unit_list, start_time, end_time, current_time, working_mode)
+    except asyncio.TimeoutError:
+        print(f"[RANKINGS ERROR] Database query timeout for {', '.join(unit_list)}")
+        raise HTTPException(status_code=504, detail="Database query timeout - try a smaller time range")
+    except Exception as db_error:
+        print(f"[RANKINGS ERROR] Database error for {', '.join(unit_list)}: {str(db_error)}")
+        raise HTTPException(status_code=500, detail=f"Database error: {str(db_error)}")
+    # A closed range never changes again - the report page keeps those results (hour-cache.js)
+    return unit_summaries(results, start_time, end_time, current_time, working_mode), chunk_is_closed(end_time, current_time)
+
+@app.get("/rankings/units")
+async def get_unit_rankings(units: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                            metric: str = 'fail', order: str = 'desc', limit: int = 10):
+    """
+    Top `limit` units by metric (success, fail, production, quality, performance);
+    each item is the unit summary without its models.
+    """
+    summaries, closed = await ranking_summaries(units, start_time, end_time, working_mode, metric, order, limit)
+    items = rank_units(summaries, metric, limit, order)
+    return {'metric': metric, 'order': order, 'total': len(summaries), 'closed': closed, 'items': items}
+
+@app.get("/rankings/models")
+async def get_model_rankings(units: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                             metric: str = 'fail', order: str = 'desc', limit: int = 10):
+    """
+    Top `limit` models across the selected units; each item carries its unit_name.
+    """
+    summaries, closed = await ranking_summaries(units, start_time, end_time, working_mode, metric, order, limit)
+    items = rank_models(summaries, metric, limit, order)
+    return {'metric': metric, 'order': order, 'total': sum(len(models) for models, _ in summaries.values()), 'closed': closed, 'items': items}
+
+@app.get("/drilldown/{unit_name}")
+async def get_unit_drilldown(unit_name: str, start_time: str, end_time: str, working_mode: str = 'mode1',
+                             metric: str = 'quality', order: str = 'desc', limit: int = None):
+    """
+    One unit's summary and its models sorted by metric, for the report drill-down charts.
+    Models without a value for the metric (performance without a target) come last.
+    """
+    summaries, closed = await ranking_summaries(unit_name, start_time, end_time, working_mode, metric, order, limit)
+    unit_name, (models, summary) = next(iter(summaries.items()))
+    items = drilldown_models(unit_name, models, metric, limit, order)
+    return {'metric': metric, 'order': order, 'total': len(models), 'closed': closed, 'summary': summary, 'items': items}
+
 # WebSocket endpoint for standard dashboard
 @app.websocket("/ws/{unit_name}")
 async def websocket_endpoint(websocket: WebSocket, unit_name: str):
+    # Opt-in compact encoding: /ws/{unit}?format=columnar
+    wire_format = resolve_wire_format(websocket.query_params.get('format'))
     await manager.connect(websocket, 'standard')
+    manager.watch(websocket, [unit_name])
     try:
         while True:
             try:
@@ -559,9 +1195,8 @@ async def websocket_endpoint(websocket: WebSocket, unit_name: str):
                 # SLOW NETWORK FIX: Handle heartbeat requests
                 if params.get('heartbeat'):
                     # Send lightweight heartbeat response
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json({"heartbeat": True, "timestamp": time.time()})
-                        print(f"[HEARTBEAT] Sent heartbeat response to {unit_name}")
+                    if manager.send_json(websocket, {"heartbeat": True, "timestamp": time.time()}, FRAME_HEARTBEAT):
+                        print(f"[HEARTBEAT] Queued heartbeat response for {unit_name}")
                     continue
                 
                 # Fix ISO format strings with 'Z' timezone
@@ -580,123 +1215,49 @@ async def websocket_endpoint(websocket: WebSocket, unit_name: str):
                     start_time = start_time.astimezone(TIMEZONE)
                     end_time = end_time.astimezone(TIMEZONE)
                 
-                # Get current time in GMT+3
-                current_time = datetime.now(TIMEZONE)
+                # One trace per tick: query, encode and enqueue timings (see tracing.py)
+                with tick_trace('ws.standard.tick', websocket, unit_name, start_time, end_time, working_mode):
+                    # Get current time in GMT+3
+                    current_time = datetime.now(TIMEZONE)
                 
-                # Get production data with timeout protection
-                print(f"[STANDARD QUERY] Starting database query for {unit_name}: {start_time} to {end_time}")
-                try:
-                    # Add timeout protection for large queries
-                    production_data = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, 
-                            lambda: get_production_data(unit_name, start_time, end_time, current_time, working_mode)
-                        ), 
-                        timeout=30.0  # 30 second timeout
-                    )
-                    print(f"[STANDARD QUERY] Database query completed for {unit_name}")
-                except asyncio.TimeoutError:
-                    print(f"[STANDARD ERROR] Database query timeout for {unit_name} - query took longer than 30 seconds")
-                    error_response = {"error": "Database query timeout - try a smaller time range"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                    continue
-                except Exception as db_error:
-                    print(f"[STANDARD ERROR] Database error for {unit_name}: {str(db_error)}")
-                    error_response = {"error": f"Database error: {str(db_error)}"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                    continue
+                    # Get production data with timeout protection
+                    print(f"[STANDARD QUERY] Starting database query for {unit_name}: {start_time} to {end_time}")
+                    try:
+                        # Falls back to the last good payload (marked stale) while the database is slow or backing off
+                        response_data = await live_resilience.serve('standard', build_compared_standard_payload, unit_name, start_time, end_time, current_time, working_mode)
+                        print(f"[STANDARD QUERY] Database query completed for {unit_name}")
+                    except asyncio.TimeoutError:
+                        print(f"[STANDARD ERROR] Database query timeout for {unit_name} - query took longer than {QUERY_TIMEOUT_SECONDS:.0f} seconds")
+                        error_response = {"error": "Database query timeout - try a smaller time range"}
+                        manager.send_json(websocket, error_response, FRAME_ERROR)
+                        continue
+                    except CircuitOpen as e:
+                        print(f"[STANDARD ERROR] {str(e)}")
+                        manager.send_json(websocket, {"error": str(e)}, FRAME_ERROR)
+                        continue
+                    except Exception as db_error:
+                        print(f"[STANDARD ERROR] Database error for {unit_name}: {str(db_error)}")
+                        error_response = {"error": f"Database error: {str(db_error)}"}
+                        manager.send_json(websocket, error_response, FRAME_ERROR)
+                        continue
+
+                    if not response_data.get('stale'):
+                        alert_engine.observe(unit_name, response_data['summary'], start_time, current_time, working_mode)
                                
-                # For each model, if it has no target, set performance and OEE to None
-                for model in production_data:
-                    if not model['target']:
-                        model['performance'] = None
-                        model['oee'] = None
-                
-                # Calculate overall summary metrics (backend-calculated)
-                total_success = sum(model['success_qty'] for model in production_data)
-                total_fail = sum(model['fail_qty'] for model in production_data)
-                total_qty = sum(model['total_qty'] for model in production_data)
-                
-                # Calculate weighted quality
-                total_processed = total_success + total_fail
-                total_quality = total_success / total_processed if total_processed > 0 else 0
-                
-                # Calculate overall performance as total actual / total theoretical (same logic as hourly view)
-                models_with_target = [model for model in production_data if model['target'] is not None and model['target'] > 0]
-                total_performance = 0
-                if models_with_target:
-                    # Calculate total actual quantity
-                    total_actual_qty = sum(model['total_qty'] for model in models_with_target)
-                    
-                    # Calculate total theoretical quantity using weighted average target rate
-                    # Use weighted average since models compete for the same production capacity
-                    total_theoretical_qty = 0
-                    
-                    if total_actual_qty > 0:
-                        # Calculate weighted average target rate based on actual production mix
-                        weighted_target_rate = 0
-                        for model in models_with_target:
-                            weight = model['total_qty'] / total_actual_qty
-                            weighted_target_rate += weight * model['target']
-                        
-                        # Get operation time for theoretical calculation (same logic as database.py)
-                        # Need to determine actual end time for calculation
-                        actual_end_time_for_calculation = end_time
-                        if current_time:
-                            time_difference = current_time - end_time
-                            five_minutes = timedelta(minutes=5)
-                            
-                            # Only use current_time for live data (end_time is within 5 minutes of current_time)
-                            if time_difference <= five_minutes:
-                                actual_end_time_for_calculation = current_time
-                            else:
-                                actual_end_time_for_calculation = end_time
-                        
-                        operation_time_total = (actual_end_time_for_calculation - start_time).total_seconds() if actual_end_time_for_calculation > start_time else 0
-                        break_time = calculate_break_time(start_time, actual_end_time_for_calculation, working_mode)
-                        operation_time = max(operation_time_total - break_time, 0)
-                        
-                        # Calculate theoretical quantity using weighted average rate
-                        total_theoretical_qty = (operation_time / 3600) * weighted_target_rate
+                    # Queue the frame for this socket's writer; a slow client only ever gets the newest one
+                    with span('encode', format=wire_format) as encode_span:
+                        frame = serialize_payload(response_data, wire_format)
+                        encode_span.set(bytes=len(frame))
+                    with span('send.enqueue'):
+                        queued = manager.send(websocket, frame)
+                    if queued:
+                        print(f"[STANDARD SUCCESS] Queued response for {unit_name}")
                     else:
-                        total_theoretical_qty = 0
-                    
-                    # Calculate overall performance as actual/theoretical ratio
-                    total_performance = total_actual_qty / total_theoretical_qty if total_theoretical_qty > 0 else 0
-                
-                # Calculate unit performance as sum of all model performances
-                unit_performance_sum = 0
-                for model in production_data:
-                    if model.get('performance') is not None:
-                        unit_performance_sum += model['performance']
-                
-                # Create response with both individual model data and summary
-                response_data = {
-                    'unit_name': unit_name,
-                    'models': production_data,
-                    'summary': {
-                        'total_success': total_success,
-                        'total_fail': total_fail,
-                        'total_qty': total_qty,
-                        'total_quality': total_quality,
-                        'total_performance': total_performance,
-                        'unit_performance_sum': unit_performance_sum  # New: sum of model performances
-                    }
-                }
-                
-                
-                # Check if connection is still open before sending
-                if websocket.client_state.name == 'CONNECTED':
-                    await websocket.send_json(response_data)
-                    print(f"[STANDARD SUCCESS] Sent response to {unit_name}")
-                else:
-                    print(f"[STANDARD WARNING] Connection closed before sending response to {unit_name}")
-                    break
+                        print(f"[STANDARD WARNING] Connection closed before sending response to {unit_name}")
+                        break
                     
                 # ALIGNED: Match the hourly view sleep interval for consistency
-                await asyncio.sleep(12)  # 12 seconds - same as hourly view for consistent timing
+                await asyncio.sleep(LIVE_TICK_SECONDS)  # same as hourly view for consistent timing
             except WebSocketDisconnect:
                 print(f"[STANDARD INFO] WebSocket disconnected for {unit_name}")
                 break
@@ -704,8 +1265,7 @@ async def websocket_endpoint(websocket: WebSocket, unit_name: str):
                 try:
                     error_response = {"error": str(e)}
                     print(f"[STANDARD ERROR] Value error for {unit_name}: {str(e)}")
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
+                    manager.send_json(websocket, error_response, FRAME_ERROR)
                 except Exception:
                     break
             except Exception as e:
@@ -725,9 +1285,8 @@ async def websocket_endpoint(websocket: WebSocket, unit_name: str):
                 
                 try:
                     error_response = {"error": f"Server error occurred: {str(e)}"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                        print(f"[STANDARD ERROR] Sent error response to {unit_name}")
+                    if manager.send_json(websocket, error_response, FRAME_ERROR):
+                        print(f"[STANDARD ERROR] Queued error response for {unit_name}")
                 except Exception as send_err:
                     # Filter out normal connection closed errors for send failures too
                     send_error_msg = str(send_err).lower()
@@ -748,14 +1307,13 @@ async def websocket_endpoint(websocket: WebSocket, unit_name: str):
     finally:
         manager.disconnect(websocket, 'standard')
 
-# ROBUST OPTIMIZATION: Add simple caching to reduce database load for hourly data
-hourly_data_cache = {}
-cache_duration = 10  # Reduced to 10 seconds for better live data freshness
-
 # WebSocket endpoint for hourly data
 @app.websocket("/ws/hourly/{unit_name}")
 async def hourly_websocket_endpoint(websocket: WebSocket, unit_name: str):
+    # Opt-in compact encoding: /ws/hourly/{unit}?format=columnar
+    wire_format = resolve_wire_format(websocket.query_params.get('format'))
     await manager.connect(websocket, 'hourly')
+    manager.watch(websocket, [unit_name])
     try:
         while True:
             try:
@@ -778,261 +1336,56 @@ async def hourly_websocket_endpoint(websocket: WebSocket, unit_name: str):
                     start_time = start_time.astimezone(TIMEZONE)
                     end_time = end_time.astimezone(TIMEZONE)
                 
-                # Get current time in GMT+3
-                current_time = datetime.now(TIMEZONE)
+                # Closed hours the client already has in its hour cache are left out of the frame
+                have_until = parse_have_until(params.get('have_until'))
                 
-                # Basic request logging
-                print(f"[HOURLY] Processing request for {unit_name}")
+                # One trace per tick: query, encode and enqueue timings (see tracing.py)
+                with tick_trace('ws.hourly.tick', websocket, unit_name, start_time, end_time, working_mode):
+                    # Get current time in GMT+3
+                    current_time = datetime.now(TIMEZONE)
                 
-                # Get all raw data in one query for the entire time range with timeout protection
-                print(f"[HOURLY QUERY] Starting database query for {unit_name}: {start_time} to {end_time}")
-                try:
-                    # Add timeout protection for large queries
-                    raw_data = await asyncio.wait_for(
-                        asyncio.get_event_loop().run_in_executor(
-                            None, 
-                            lambda: get_production_data(unit_name, start_time, end_time, current_time, working_mode)
-                        ), 
-                        timeout=30.0  # 30 second timeout
-                    )
-                    print(f"[HOURLY QUERY] Database query completed for {unit_name}")
-                except asyncio.TimeoutError:
-                    print(f"[HOURLY ERROR] Database query timeout for {unit_name} - query took longer than 30 seconds")
-                    error_response = {"error": "Database query timeout - try a smaller time range"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                    continue
-                except Exception as db_error:
-                    print(f"[HOURLY ERROR] Database error for {unit_name}: {str(db_error)}")
-                    error_response = {"error": f"Database error: {str(db_error)}"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                    continue
-                
-                # Calculate totals from raw data first
-                total_success = sum(model['success_qty'] for model in raw_data)
-                total_fail = sum(model['fail_qty'] for model in raw_data)
-                total_qty = sum(model['total_qty'] for model in raw_data)
+                    # Basic request logging
+                    print(f"[HOURLY] Processing request for {unit_name}")
                 
-                # Direct calculation of quality as success/processed
-                total_processed = total_success + total_fail
-                total_quality = total_success / total_processed if total_processed > 0 else 0
+                    # Build the whole hourly payload (range query + per-hour queries) off the event loop with timeout protection
+                    print(f"[HOURLY QUERY] Starting database query for {unit_name}: {start_time} to {end_time}")
+                    try:
+                        # Falls back to the last good payload (marked stale) while the database is slow or backing off
+                        response_data = await live_resilience.serve('hourly', build_hourly_payload, unit_name, start_time, end_time, current_time, working_mode)
+                        print(f"[HOURLY QUERY] Database query completed for {unit_name}")
+                    except asyncio.TimeoutError:
+                        print(f"[HOURLY ERROR] Database query timeout for {unit_name} - query took longer than {QUERY_TIMEOUT_SECONDS:.0f} seconds")
+                        error_response = {"error": "Database query timeout - try a smaller time range"}
+                        manager.send_json(websocket, error_response, FRAME_ERROR)
+                        continue
+                    except CircuitOpen as e:
+                        print(f"[HOURLY ERROR] {str(e)}")
+                        manager.send_json(websocket, {"error": str(e)}, FRAME_ERROR)
+                        continue
+                    except Exception as db_error:
+                        print(f"[HOURLY ERROR] Database error for {unit_name}: {str(db_error)}")
+                        error_response = {"error": f"Database error: {str(db_error)}"}
+                        manager.send_json(websocket, error_response, FRAME_ERROR)
+                        continue
                 
-                # Calculate total performance and OEE using the raw model data
-                models_with_target = [model for model in raw_data if model['target'] is not None and model['target'] > 0]
-                total_performance = None
-                total_oee = None
-                total_theoretical_qty = 0
-                total_theoretical_time = 0
+                    if have_until is not None:
+                        response_data = dict(response_data, have_until=have_until.isoformat(),
+                                             hourly_data=drop_cached_hours(response_data['hourly_data'], have_until))
                 
-                if models_with_target:
-                    # Detect if this is historical data or live data
-                    actual_end_time_for_calculation = end_time
-                    if current_time:
-                        time_difference = current_time - end_time
-                        five_minutes = timedelta(minutes=5)
-                        
-                        # Only use current_time for live data (end_time is within 5 minutes of current_time)
-                        if time_difference <= five_minutes:
-                            # This is live data - use current_time
-                            actual_end_time_for_calculation = current_time
-                        else:
-                            # This is historical data - use the original end_time
-                            actual_end_time_for_calculation = end_time
-                    
-                    operation_time_total = (actual_end_time_for_calculation - start_time).total_seconds() if actual_end_time_for_calculation > start_time else 0
-                    
-                    # Calculate and subtract break time
-                    break_time = calculate_break_time(start_time, actual_end_time_for_calculation, working_mode)
-                    operation_time = operation_time_total - break_time
-                    
-                    # Ensure operation time is not negative
-                    operation_time = max(operation_time, 0)
-                    
-                    # Calculate theoretical quantity using weighted average target rate
-                    total_theoretical_qty = 0
-                    total_theoretical_time = 0
-                    total_actual_qty = sum(model['total_qty'] for model in models_with_target)
-                    
-                    if total_actual_qty > 0:
-                        weighted_target_rate = 0
-                        for model in models_with_target:
-                            weight = model['total_qty'] / total_actual_qty
-                            weighted_target_rate += weight * model['target']
-                            # Calculate theoretical time for performance calculation
-                            if model['target'] > 0:  # Safety check to prevent division by zero
-                                model_theoretical_time = model['total_qty'] * (3600 / model['target'])
-                                total_theoretical_time += model_theoretical_time
-                        
-                        # Calculate theoretical quantity using weighted average rate
-                        total_theoretical_qty = (operation_time / 3600) * weighted_target_rate
-                    else:
-                        total_theoretical_qty = 0
-                    
-                    # Calculate overall performance as actual/theoretical ratio
-                    total_performance = total_actual_qty / total_theoretical_qty if total_theoretical_qty > 0 else 0
-                    
-                    # Calculate overall OEE (set to None as per requirement #3)
-                    total_oee = None
-                else:
-                    pass  # No models with target found
-                
-                # Process hourly data hour by hour (same approach as historical hourly endpoint)
-                hourly_data = []
-                current_hour = start_time.replace(minute=0, second=0, microsecond=0)
-                
-                # Determine if this is live data to use current_time for the last hour
-                is_live_data = False
-                actual_end_time_for_hourly = end_time
-                if current_time:
-                    time_difference = current_time - end_time
-                    abs_time_difference = abs(time_difference.total_seconds())
-                    five_minutes = timedelta(minutes=5)
-                    # Consider it live data if end_time is within 5 minutes of current_time (past or future)
-                    is_live_data = abs_time_difference <= five_minutes.total_seconds()
-                    
-                    # FIXED: For live data, extend the processing to current_time to include current hour
-                    if is_live_data:
-                        actual_end_time_for_hourly = current_time
-                        print(f"[HOURLY] Live data detected for {unit_name}")
-                    else:
-                        print(f"[HOURLY] Historical data for {unit_name}")
-                
-                while current_hour < actual_end_time_for_hourly:
-                    hour_end = current_hour + timedelta(hours=1)
-                    
-                    # For the current hour in live data, use current_time as hour_end
-                    if is_live_data and current_time > current_hour and current_time < hour_end:
-                        # This is the current hour in live data - use current_time as hour_end
-                        hour_end = current_time
-                    else:
-                        # For historical data or completed hours, use the regular hour boundary or actual_end_time_for_hourly
-                        hour_end = min(hour_end, actual_end_time_for_hourly)
-                    
-                    # SMART CACHING: Don't cache current hour for live data to ensure freshness
-                    current_timestamp = time.time()
-                    is_current_hour = (is_live_data and current_time > current_hour and current_time < hour_end)
-                    
-                    if is_current_hour:
-                        # Never cache current hour in live data - always fetch fresh
-                        hour_data = get_production_data(unit_name, current_hour, hour_end, current_time, working_mode)
+                    # Queue the frame for this socket's writer; a slow client only ever gets the newest one
+                    with span('encode', format=wire_format) as encode_span:
+                        frame = serialize_payload(response_data, wire_format)
+                        encode_span.set(bytes=len(frame))
+                    with span('send.enqueue'):
+                        queued = manager.send(websocket, frame)
+                    if queued:
+                        print(f"[HOURLY SUCCESS] Queued response for {unit_name} with {len(response_data['hourly_data'])} hours")
                     else:
-                        # Cache historical hours to reduce database load
-                        cache_key = f"{unit_name}_{current_hour.isoformat()}_{hour_end.isoformat()}_{working_mode}"
-                        
-                        # Check if we have recent cached data for this exact query
-                        if (cache_key in hourly_data_cache and 
-                            current_timestamp - hourly_data_cache[cache_key]['timestamp'] < cache_duration):
-                            # Use cached data (significantly faster)
-                            hour_data = hourly_data_cache[cache_key]['data']
-                        else:
-                            # Get fresh data from database (maintains exact same business logic)
-                            hour_data = get_production_data(unit_name, current_hour, hour_end, current_time, working_mode)
-                            
-                            # Cache the result for future requests (only for historical hours)
-                            hourly_data_cache[cache_key] = {
-                                'data': hour_data,
-                                'timestamp': current_timestamp
-                            }
-                        
-                        # Clean up old cache entries to prevent memory growth
-                        keys_to_remove = []
-                        for key, cached_item in hourly_data_cache.items():
-                            if current_timestamp - cached_item['timestamp'] > cache_duration * 2:
-                                keys_to_remove.append(key)
-                        for key in keys_to_remove:
-                            del hourly_data_cache[key]
-                    
-                    # Calculate hourly totals
-                    hour_success = sum(model['success_qty'] for model in hour_data)
-                    hour_fail = sum(model['fail_qty'] for model in hour_data)
-                    hour_total = sum(model['total_qty'] for model in hour_data)
-                    
-                    # Calculate hourly quality
-                    hour_quality = hour_success / (hour_success + hour_fail) if (hour_success + hour_fail) > 0 else 0
-                    
-                    # Calculate hourly performance and theoretical quantity
-                    models_with_target = [model for model in hour_data if model['target'] is not None and model['target'] > 0]
-                    hour_performance = 0
-                    hour_theoretical_qty = 0
-                    
-                    if models_with_target:
-                        # Calculate operation time for this hour
-                        hour_operation_time = (hour_end - current_hour).total_seconds()
-                        hour_break_time = calculate_break_time(current_hour, hour_end, working_mode)
-                        hour_operation_time = max(hour_operation_time - hour_break_time, 0)
-                        
-                        # Calculate theoretical quantity using weighted average target rate
-                        hour_actual_qty = sum(model['total_qty'] for model in models_with_target)
-                        
-                        if hour_actual_qty > 0:
-                            weighted_target_rate = 0
-                            for model in models_with_target:
-                                weight = model['total_qty'] / hour_actual_qty
-                                weighted_target_rate += model['target'] * weight
-                            
-                            # Calculate theoretical quantity using weighted average rate
-                            hour_theoretical_qty = (hour_operation_time / 3600) * weighted_target_rate
-                            
-                            # Calculate performance
-                            hour_performance = hour_actual_qty / hour_theoretical_qty if hour_theoretical_qty > 0 else 0
-                    
-                    hour_record = {
-                        'hour_start': current_hour.isoformat(),
-                        'hour_end': hour_end.isoformat(),
-                        'success_qty': hour_success,
-                        'fail_qty': hour_fail,
-                        'total_qty': hour_total,
-                        'quality': hour_quality,
-                        'performance': hour_performance,
-                        'oee': 0,  # OEE set to 0 as per requirements
-                        'theoretical_qty': hour_theoretical_qty
-                    }
-                    
-                    hourly_data.append(hour_record)
-                    
-                    # Move to next hour - but for live data current hour, advance to the next hour boundary
-                    if is_live_data and hour_end == current_time:
-                        # For current hour in live data, move to next hour boundary to prevent infinite loop
-                        current_hour = current_hour + timedelta(hours=1)
-                    else:
-                        current_hour = hour_end
-                
-                # Calculate corrected total theoretical quantity (sum of hourly calculations)
-                total_theoretical_qty = sum(hour['theoretical_qty'] for hour in hourly_data)
-                
-                # Finalize the response data
-                response_data = {
-                    'unit_name': unit_name,
-                    'total_success': total_success,
-                    'total_fail': total_fail,
-                    'total_qty': total_qty,
-                    'total_quality': total_quality if total_quality is not None else 0,
-                    'total_performance': total_performance if total_performance is not None else 0,
-                    'total_oee': total_oee if total_oee is not None else 0,
-                    'total_theoretical_qty': total_theoretical_qty if total_theoretical_qty is not None else 0,
-                    'hourly_data': hourly_data
-                }
-                
-                # Ensure all values are valid for JSON serialization
-                for hour_data in response_data['hourly_data']:
-                    if hour_data['quality'] is None:
-                        hour_data['quality'] = 0
-                    if hour_data['performance'] is None:
-                        hour_data['performance'] = 0
-                    if hour_data['oee'] is None:
-                        hour_data['oee'] = 0
-                
-                # Check if connection is still open before sending
-                if websocket.client_state.name == 'CONNECTED':
-                    await websocket.send_json(response_data)
-                    print(f"[HOURLY SUCCESS] Sent response to {unit_name} with {len(hourly_data)} hours")
-                else:
-                    print(f"[HOURLY WARNING] Connection closed before sending response to {unit_name}")
-                    break
+                        print(f"[HOURLY WARNING] Connection closed before sending response to {unit_name}")
+                        break
                     
                 # PERFORMANCE FIX: Balanced sleep for hourly updates - not too fast to avoid overload
-                await asyncio.sleep(12)  # 12 seconds - balanced for performance and responsiveness
+                await asyncio.sleep(LIVE_TICK_SECONDS)  # balanced for performance and responsiveness
             except WebSocketDisconnect:
                 print(f"[HOURLY INFO] WebSocket disconnected for {unit_name}")
                 break
@@ -1040,16 +1393,14 @@ async def hourly_websocket_endpoint(websocket: WebSocket, unit_name: str):
                 try:
                     error_response = {"error": f"Invalid JSON format: {str(e)}"}
                     print(f"[HOURLY ERROR] JSON decode error for {unit_name}: {str(e)}")
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
+                    manager.send_json(websocket, error_response, FRAME_ERROR)
                 except Exception:
                     break
             except ValueError as e:
                 try:
                     error_response = {"error": str(e)}
                     print(f"[HOURLY ERROR] Value error for {unit_name}: {str(e)}")
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
+                    manager.send_json(websocket, error_response, FRAME_ERROR)
                 except Exception:
                     break
             except Exception as e:
@@ -1069,9 +1420,8 @@ async def hourly_websocket_endpoint(websocket: WebSocket, unit_name: str):
                 
                 try:
                     error_response = {"error": f"Server error occurred: {str(e)}"}
-                    if websocket.client_state.name == 'CONNECTED':
-                        await websocket.send_json(error_response)
-                        print(f"[HOURLY ERROR] Sent error response to {unit_name}")
+                    if manager.send_json(websocket, error_response, FRAME_ERROR):
+                        print(f"[HOURLY ERROR] Queued error response for {unit_name}")
                 except Exception as send_err:
                     # Filter out normal connection closed errors for send failures too
                     send_error_msg = str(send_err).lower()
@@ -1095,4 +1445,14 @@ async def hourly_websocket_endpoint(websocket: WebSocket, unit_name: str):
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000) 
\ No newline at end of file
+    # WEB_WORKERS > 1 runs several processes that share query results through the SQLite cache backend,
+    # so extra workers add socket capacity without multiplying database polling
+    workers = int(os.getenv("WEB_WORKERS", "1"))
+    if workers > 1:
+        os.environ.setdefault("CACHE_BACKEND", "sqlite")
+        if os.environ["CACHE_BACKEND"] == "memory":
+            print("[STARTUP WARNING] CACHE_BACKEND=memory with multiple workers - each worker will poll the database separately")
+        # permessage-deflate compresses every WebSocket frame for clients that negotiate it
+        uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=workers, ws="websockets", ws_per_message_deflate=True)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8000, ws="websockets", ws_per_message_deflate=True)
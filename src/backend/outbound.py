@@ -0,0 +1,109 @@
+"""
+Per-connection outbound queues for the dashboard WebSockets.
+
+Handlers and broadcasts never await a socket write directly. Each
+connection gets a small queue drained by its own writer task, so a TV on a
+slow link only delays itself:
+
+- latest-frame-wins: at most one pending frame per kind (data, heartbeat,
+  error). A newer frame replaces one the client has not received yet, so a
+  slow consumer skips stale updates instead of building a backlog. Alerts
+  are queued per alert ('alert:<id>'), so one never hides another.
+- send timeout: a write that does not complete within SEND_TIMEOUT_SECONDS
+  marks the consumer as stuck; the connection is closed (1013, try again
+  later) so the client's reconnect logic takes over.
+"""
+
+import asyncio
+import os
+import time
+from collections import OrderedDict
+
+# Frame kinds - each kind keeps only its newest pending frame
+FRAME_DATA = 'data'
+FRAME_HEARTBEAT = 'heartbeat'
+FRAME_ERROR = 'error'
+FRAME_ALERT = 'alert'
+
+# Seconds a single frame may take to reach the client before the consumer is considered stuck
+SEND_TIMEOUT_SECONDS = float(os.getenv('WS_SEND_TIMEOUT_SECONDS', '10'))
+
+# Seconds to wait for the close handshake of a stuck consumer
+CLOSE_TIMEOUT_SECONDS = 2.0
+
+# Close code sent to stuck consumers (1013 = try again later; clients reconnect on non-1000 codes)
+STUCK_CONSUMER_CLOSE_CODE = 1013
+
+
+class OutboundQueue:
+    def __init__(self, websocket, label, send_timeout=SEND_TIMEOUT_SECONDS):
+        self.websocket = websocket
+        self.label = label
+        self.send_timeout = send_timeout
+        self.closed = False
+        self.sent = 0
+        # Seconds the last send_text took (reported on the next tick's trace)
+        self.last_send_seconds = None
+        self.dropped = 0
+        self._pending = OrderedDict()
+        self._ready = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._writer())
+        return self
+
+    def put(self, message, kind=FRAME_DATA):
+        """
+        Queue a text frame without waiting. Returns False once the
+        connection is closed so handlers can stop producing.
+        """
+        if self.closed:
+            return False
+        if kind in self._pending:
+            # Superseded before the client received it
+            self.dropped += 1
+            del self._pending[kind]
+        self._pending[kind] = message
+        self._ready.set()
+        return True
+
+    async def _writer(self):
+        try:
+            while not self.closed:
+                await self._ready.wait()
+                self._ready.clear()
+                while self._pending and not self.closed:
+                    _, message = self._pending.popitem(last=False)
+                    try:
+                        started = time.perf_counter()
+                        await asyncio.wait_for(self.websocket.send_text(message), timeout=self.send_timeout)
+                        self.last_send_seconds = time.perf_counter() - started
+                        self.sent += 1
+                    except asyncio.TimeoutError:
+                        print(f"[OUTBOUND] {self.label}: send took longer than {self.send_timeout}s - closing stuck consumer")
+                        await self._force_close()
+                        return
+                    except Exception as e:
+                        # Client went away mid-send; the handler sees the disconnect on its next receive
+                        print(f"[OUTBOUND] {self.label}: send failed ({e}) - stopping writer")
+                        self.closed = True
+                        return
+        except asyncio.CancelledError:
+            pass
+
+    async def _force_close(self):
+        self.closed = True
+        self._pending.clear()
+        try:
+            await asyncio.wait_for(self.websocket.close(code=STUCK_CONSUMER_CLOSE_CODE), timeout=CLOSE_TIMEOUT_SECONDS)
+        except Exception:
+            pass
+
+    def close(self):
+        self.closed = True
+        self._pending.clear()
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        if self.dropped:
+            print(f"[OUTBOUND] {self.label}: closed after {self.sent} frames sent, {self.dropped} superseded frames dropped")
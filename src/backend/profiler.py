@@ -0,0 +1,226 @@
+"""
+On-demand sampling profiler and event-loop lag monitor.
+
+SamplingProfiler walks sys._current_frames() from a background thread every
+PROFILER_INTERVAL_MS for the requested number of seconds, so it can run
+against the live process: nothing is instrumented and the cost is one stack
+walk per thread per sample. It covers the event loop thread and the
+executor threads the DB queries run in; idle threads (waiting for work or
+in select()) are left out unless asked for. The result is in folded-stack
+format ("thread;outer;...;inner count" per line), which flamegraph.pl and
+speedscope read directly.
+
+LoopLagMonitor measures how late a short asyncio sleep wakes up. A watchdog
+thread watches the same heartbeat, and when the loop has been stuck for
+longer than LOOP_LAG_THRESHOLD_MS it captures the event loop thread's stack,
+so each recorded lag event says which callback was blocking the loop.
+"""
+
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter, deque
+from datetime import datetime
+
+from database import TIMEZONE
+
+PROFILER_INTERVAL_MS = float(os.getenv('PROFILER_INTERVAL_MS', '10'))
+PROFILER_MAX_SECONDS = float(os.getenv('PROFILER_MAX_SECONDS', '60'))
+
+LOOP_LAG_INTERVAL_MS = float(os.getenv('LOOP_LAG_INTERVAL_MS', '100'))
+LOOP_LAG_THRESHOLD_MS = float(os.getenv('LOOP_LAG_THRESHOLD_MS', '100'))
+LOOP_LAG_HISTORY = int(os.getenv('LOOP_LAG_HISTORY', '50'))
+
+# Leaf frames of threads that are waiting, not working
+IDLE_LEAVES = {
+    ('threading.py', 'wait'),
+    ('selectors.py', 'select'),
+    ('queue.py', 'get'),
+    ('thread.py', '_worker'),
+}
+
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack(frame):
+    """
+    Outermost-first list of frames.
+    """
+    frames = []
+    while frame is not None:
+        frames.append(frame)
+        frame = frame.f_back
+    frames.reverse()
+    return frames
+
+
+def _is_idle(frames):
+    leaf = frames[-1].f_code
+    return (os.path.basename(leaf.co_filename), leaf.co_name) in IDLE_LEAVES
+
+
+def _app_frame(frames):
+    """
+    Innermost frame from this package - the code that is actually responsible.
+    """
+    for frame in reversed(frames):
+        if os.path.dirname(os.path.abspath(frame.f_code.co_filename)) == BACKEND_DIR:
+            return f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})"
+    return None
+
+
+class SamplingProfiler:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.loop_thread_id = None
+
+    def _thread_label(self, ident, names):
+        if ident == self.loop_thread_id:
+            return 'event-loop'
+        # ThreadPoolExecutor-0_3 -> ThreadPoolExecutor-0, so the pool's workers fold together
+        return re.sub(r'_\d+$', '', names.get(ident, f"thread-{ident}"))
+
+    def sample(self, seconds, interval_ms=PROFILER_INTERVAL_MS, include_idle=False):
+        """
+        Blocking: sample every thread for `seconds` and return
+        {'folded': Counter(stack -> samples), ...}. One profile at a time.
+        """
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        try:
+            own = threading.get_ident()
+            interval = interval_ms / 1000
+            folded = Counter()
+            leaves = Counter()
+            samples = 0
+            idle = 0
+            started = time.perf_counter()
+            deadline = started + seconds
+            busy = 0.0
+            while time.perf_counter() < deadline:
+                tick = time.perf_counter()
+                names = {t.ident: t.name for t in threading.enumerate()}
+                for ident, frame in sys._current_frames().items():
+                    if ident == own or names.get(ident, '').startswith('profiler-'):
+                        continue
+                    frames = _stack(frame)
+                    if not include_idle and _is_idle(frames):
+                        idle += 1
+                        continue
+                    labels = [_frame_label(f.f_code) for f in frames]
+                    folded[';'.join([self._thread_label(ident, names)] + labels)] += 1
+                    leaves[labels[-1]] += 1
+                    samples += 1
+                busy += time.perf_counter() - tick
+                time.sleep(max(0.0, interval - (time.perf_counter() - tick)))
+            elapsed = time.perf_counter() - started
+        finally:
+            self._lock.release()
+
+        return {
+            'duration_seconds': round(elapsed, 3),
+            'interval_ms': interval_ms,
+            'samples': samples,
+            'idle_samples_skipped': idle,
+            # Share of the wall time the sampling thread itself was working
+            'overhead_ratio': round(busy / elapsed, 4) if elapsed else 0,
+            'top_self': leaves.most_common(20),
+            'folded': folded
+        }
+
+
+def folded_text(profile):
+    return ''.join(f"{stack} {count}\n" for stack, count in profile['folded'].most_common())
+
+
+class LoopLagMonitor:
+    def __init__(self, interval_ms=LOOP_LAG_INTERVAL_MS, threshold_ms=LOOP_LAG_THRESHOLD_MS, history=LOOP_LAG_HISTORY):
+        self.interval = interval_ms / 1000
+        self.threshold = threshold_ms / 1000
+        self.events = deque(maxlen=history)
+        self.loop_thread_id = None
+        self.last_beat = None
+        self.beats = 0
+        self.lagged = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._stall_stack = None
+        self._task = None
+
+    def start(self):
+        """
+        Start measuring on the running loop (call from the loop, e.g. at startup).
+        """
+        if self._task is not None:
+            return self
+        self.loop_thread_id = threading.get_ident()
+        self.last_beat = time.monotonic()
+        self._task = asyncio.create_task(self._beat())
+        threading.Thread(target=self._watchdog, name='profiler-loop-watchdog', daemon=True).start()
+        print(f"[LOOP LAG] Monitoring event loop (threshold {self.threshold * 1000:.0f}ms)")
+        return self
+
+    async def _beat(self):
+        while True:
+            scheduled = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - scheduled - self.interval
+            self.last_beat = time.monotonic()
+            self.beats += 1
+            self.total_lag += max(lag, 0.0)
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.lagged += 1
+                blocked_in, stack = self._stall_stack or (None, None)
+                self._stall_stack = None
+                event = {
+                    'at': datetime.now(TIMEZONE).isoformat(),
+                    'lag_ms': round(lag * 1000, 1),
+                    'blocked_in': blocked_in,
+                    'stack': stack
+                }
+                self.events.append(event)
+                print(f"[LOOP LAG] Event loop blocked for {event['lag_ms']}ms in {event['blocked_in'] or 'unknown'}")
+            else:
+                self._stall_stack = None
+
+    def _watchdog(self):
+        while True:
+            time.sleep(min(self.interval, self.threshold) / 2)
+            stalled = time.monotonic() - self.last_beat
+            if stalled >= self.interval + self.threshold and self._stall_stack is None:
+                frame = sys._current_frames().get(self.loop_thread_id)
+                if frame is not None:
+                    # Captured while the loop is still stuck: this is the blocking callback.
+                    # Formatted now - the frames move on as soon as the loop does.
+                    frames = _stack(frame)
+                    self._stall_stack = (_app_frame(frames), [_frame_label(f.f_code) + f" line {f.f_lineno}" for f in frames])
+                    del frames
+                del frame
+
+    def stats(self):
+        return {
+            'running': self._task is not None,
+            'interval_ms': self.interval * 1000,
+            'threshold_ms': self.threshold * 1000,
+            'beats': self.beats,
+            'lagged_beats': self.lagged,
+            'mean_lag_ms': round(self.total_lag / self.beats * 1000, 2) if self.beats else 0,
+            'max_lag_ms': round(self.max_lag * 1000, 1),
+            'events': list(self.events)
+        }
+
+
+sampling_profiler = SamplingProfiler()
+loop_lag_monitor = LoopLagMonitor()
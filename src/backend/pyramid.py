@@ -0,0 +1,207 @@
+"""
+Multi-resolution time-series pyramid for zoomable trend charts.
+
+Every unit's per-model counts are kept at four resolutions: 5-minute,
+hourly, per-shift and daily buckets. The two fine levels are stored in
+pages - the 5-minute buckets of one hour, the hourly buckets of one day -
+each counted with a single bucketed GROUP BY (database.get_bucket_counts).
+Shift and day buckets are rolled up from the hourly pages, so they never
+touch raw rows themselves.
+
+A closed page (ended more than RANGE_CLOSED_GRACE_MINUTES ago, same rule as
+the range planner's chunks) is kept in the shared cache for
+PYRAMID_PAGE_TTL; the open page is recounted on every request, which also
+picks up late rows.
+
+get_trend picks the finest level whose bucket count over the requested range
+fits the point budget, so a 15-minute and a 14-day chart both come back as a
+few hundred points from a handful of page lookups.
+"""
+
+import asyncio
+import math
+import os
+from datetime import datetime, timedelta
+
+from database import TIMEZONE, build_model_results, get_bucket_counts, run_db_query
+from live_payloads import shared_cache, summarize_unit
+from range_planner import WORKING_MODE_SHIFT_STARTS, chunk_is_closed, chunk_slots, merge_counts
+
+# Finest to coarsest
+LEVELS = ('5min', 'hour', 'shift', 'day')
+
+# Points returned when the client does not ask for a budget, and the most it may ask for
+PYRAMID_DEFAULT_POINTS = int(os.getenv('PYRAMID_DEFAULT_POINTS', '300'))
+PYRAMID_MAX_POINTS = int(os.getenv('PYRAMID_MAX_POINTS', '2000'))
+
+# How long closed pages are kept (the 5-minute pages are the bulky ones)
+PYRAMID_PAGE_TTL = {
+    '5min': float(os.getenv('PYRAMID_5MIN_PAGE_TTL', str(3 * 24 * 3600))),
+    'hour': float(os.getenv('PYRAMID_HOUR_PAGE_TTL', str(35 * 24 * 3600)))
+}
+
+# Level -> (stored level it is read from, page bucket of that stored level)
+SOURCES = {
+    '5min': ('5min', 'hour'),
+    'hour': ('hour', 'day'),
+    'shift': ('hour', 'day'),
+    'day': ('hour', 'day')
+}
+
+
+def _shift_starts(working_mode):
+    return WORKING_MODE_SHIFT_STARTS.get(working_mode, WORKING_MODE_SHIFT_STARTS['mode1'])
+
+
+def bucket_floor(timestamp, level, working_mode='mode1'):
+    """
+    Start of the level's bucket containing timestamp, in local wall-clock time.
+    """
+    local = timestamp.astimezone(TIMEZONE).replace(tzinfo=None) if timestamp.tzinfo else timestamp
+    if level == '5min':
+        floor = local.replace(minute=local.minute - local.minute % 5, second=0, microsecond=0)
+    elif level == 'hour':
+        floor = local.replace(minute=0, second=0, microsecond=0)
+    elif level == 'day':
+        floor = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    else:
+        day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+        starts = [hour for hour in _shift_starts(working_mode) if hour <= local.hour]
+        # Before the first shift of the day: still in the previous day's last shift
+        floor = day + timedelta(hours=starts[-1]) if starts else day - timedelta(days=1) + timedelta(hours=_shift_starts(working_mode)[-1])
+    return TIMEZONE.localize(floor)
+
+
+def bucket_next(bucket_start, level, working_mode='mode1'):
+    local = bucket_start.astimezone(TIMEZONE).replace(tzinfo=None)
+    if level == '5min':
+        return TIMEZONE.localize(local + timedelta(minutes=5))
+    if level == 'hour':
+        return TIMEZONE.localize(local + timedelta(hours=1))
+    if level == 'day':
+        return TIMEZONE.localize(local + timedelta(days=1))
+    day = local.replace(hour=0, minute=0, second=0, microsecond=0)
+    later = [hour for hour in _shift_starts(working_mode) if hour > local.hour]
+    return TIMEZONE.localize(day + timedelta(hours=later[0]) if later else day + timedelta(days=1, hours=_shift_starts(working_mode)[0]))
+
+
+def buckets(start_time, end_time, level, working_mode='mode1'):
+    """
+    [(bucket_start, bucket_end), ...] of every level bucket overlapping [start_time, end_time).
+    """
+    spans = []
+    bucket_start = bucket_floor(start_time, level, working_mode)
+    while bucket_start < end_time:
+        bucket_end = bucket_next(bucket_start, level, working_mode)
+        spans.append((bucket_start, bucket_end))
+        bucket_start = bucket_end
+    return spans
+
+
+def _bucket_seconds(level, working_mode):
+    return {'5min': 300, 'hour': 3600, 'day': 86400}.get(level) or 86400 / len(_shift_starts(working_mode))
+
+
+def bucket_count(start_time, end_time, level, working_mode='mode1'):
+    """
+    Buckets of the level over the range, as counted against the point budget.
+    """
+    return math.ceil((end_time - start_time).total_seconds() / _bucket_seconds(level, working_mode))
+
+
+def choose_level(start_time, end_time, max_points, working_mode='mode1'):
+    """
+    Finest level with at most max_points buckets over the range (daily if none fits).
+    """
+    for level in LEVELS:
+        if bucket_count(start_time, end_time, level, working_mode) <= max_points:
+            return level
+    return LEVELS[-1]
+
+
+def _page_key(unit_name, stored_level, page_start):
+    return f"pyramid:{unit_name}_{stored_level}_{page_start.isoformat()}"
+
+
+async def _page(unit_name, stored_level, page_start, page_end, current_time):
+    """
+    {bucket_start iso: [[model, success, fail, target], ...]} for one page.
+    """
+    closed = chunk_is_closed(page_end, current_time)
+    cache_key = _page_key(unit_name, stored_level, page_start)
+    if closed:
+        page = shared_cache.get(cache_key)
+        if page is not None:
+            return page
+
+    async with chunk_slots():
+        rows = await run_db_query(get_bucket_counts, unit_name, page_start, page_end, stored_level,
+                                  label=f"{unit_name} {stored_level} {page_start:%m-%d %H:%M}")
+    page = {}
+    for bucket_start, model, success, fail, target in rows:
+        page.setdefault(bucket_start.isoformat(), []).append([model, success, fail, target])
+
+    if closed:
+        shared_cache.set(cache_key, page, PYRAMID_PAGE_TTL[stored_level])
+    return page
+
+
+async def get_bucket_rows(unit_name, start_time, end_time, level, current_time, working_mode='mode1'):
+    """
+    [(bucket_start, bucket_end, counts), ...] for every level bucket overlapping
+    [start_time, end_time), counts merged per (model, target).
+    """
+    stored_level, page_level = SOURCES[level]
+    level_buckets = buckets(start_time, end_time, level, working_mode)
+    if not level_buckets:
+        return []
+
+    # Pages covering the first to the last bucket (a night shift reaches into the previous day)
+    pages = buckets(level_buckets[0][0], min(level_buckets[-1][1], current_time), page_level)
+    loaded = await asyncio.gather(
+        *(_page(unit_name, stored_level, page_start, page_end, current_time) for page_start, page_end in pages)
+    )
+    stored = {}
+    for page in loaded:
+        for bucket_start, rows in page.items():
+            stored[datetime.fromisoformat(bucket_start)] = rows
+
+    if stored_level == level:
+        return [(bucket_start, bucket_end, stored.get(bucket_start, [])) for bucket_start, bucket_end in level_buckets]
+
+    # Roll the hourly buckets up into shifts / days
+    rolled = {}
+    for bucket_start, rows in stored.items():
+        rolled.setdefault(bucket_floor(bucket_start, level, working_mode), []).append(rows)
+    return [(bucket_start, bucket_end, merge_counts(rolled.get(bucket_start, [])))
+            for bucket_start, bucket_end in level_buckets]
+
+
+async def get_trend(unit_name, start_time, end_time, current_time, working_mode='mode1',
+                    max_points=PYRAMID_DEFAULT_POINTS, level=None, by_model=False):
+    """
+    Trend points for one unit at the finest level that fits max_points (or
+    the level asked for). Buckets are aligned to their level, and buckets that
+    have not started yet are left out.
+    """
+    end_time = min(end_time, current_time)
+    level = level or choose_level(start_time, end_time, max_points, working_mode)
+    points = []
+    for bucket_start, bucket_end, counts in await get_bucket_rows(unit_name, start_time, end_time, level, current_time, working_mode):
+        # The open bucket is only measured up to now
+        measured_end = min(bucket_end, current_time)
+        models = build_model_results(counts, bucket_start, measured_end, working_mode)
+        summary = summarize_unit(models, bucket_start, measured_end, None, working_mode)
+        point = {
+            'start': bucket_start.isoformat(),
+            'end': bucket_end.isoformat(),
+            'success_qty': summary['total_success'],
+            'fail_qty': summary['total_fail'],
+            'total_qty': summary['total_qty'],
+            'quality': summary['total_quality'],
+            'performance': summary['total_performance']
+        }
+        if by_model:
+            point['models'] = models
+        points.append(point)
+    return {'unit_name': unit_name, 'level': level, 'points': points}
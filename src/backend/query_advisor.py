@@ -0,0 +1,322 @@
+"""
+Query plan advisor for the dashboard's SQL shapes.
+
+Runs each query the app issues against PRODUCTION_TABLE with
+SET STATISTICS XML/IO ON, reads back the actual execution plan and the IO
+messages, flags scans and key lookups, and proposes the covering index the
+aggregation needs. For deployments where ProductRecordLogView cannot be
+indexed it can create and fill an indexed staging table the app owns.
+
+Usage (from src/backend):
+    python query_advisor.py                      # analyse and print a report
+    python query_advisor.py --unit "Final 1A"    # analyse with a specific unit
+    python query_advisor.py --create-staging     # create + fill the staging table
+    python query_advisor.py --sync-staging       # incremental staging refresh
+
+Set PRODUCTION_TABLE=DashboardProductionStaging (and STAGING_SYNC_SECONDS)
+to make the app read from the staging table.
+"""
+
+import argparse
+import re
+import xml.etree.ElementTree as ET
+from datetime import datetime, timedelta
+
+from database import (
+    get_db_connection, PRODUCTION_TABLE, SOURCE_VIEW, STAGING_TABLE, TIMEZONE, sync_staging_table,
+    bucket_counts_sql, model_counts_sql, multi_unit_model_counts_sql, multi_unit_record_counts_sql, unit_catalog_sql
+)
+
+SHOWPLAN_NS = {'sp': 'http://schemas.microsoft.com/sqlserver/2004/07/showplan'}
+
+# Plan operators that read far more than the filtered range needs
+SCAN_OPERATORS = ('Table Scan', 'Clustered Index Scan', 'Index Scan')
+# Plan operators that mean the chosen index does not cover the query
+LOOKUP_OPERATORS = ('Key Lookup', 'RID Lookup')
+
+# Equality column first, then the range column; everything else the query reads goes in INCLUDE
+INDEX_KEY_COLUMNS = ('UnitName', 'KayitTarihi')
+INDEX_INCLUDE_COLUMNS = ('Model', 'ModelSuresiSN', 'TestSonucu')
+
+# Units used as parameters for the multi-unit (UnitName IN (...)) shapes
+ADVISOR_SAMPLE_UNITS = 8
+
+IO_PATTERN = re.compile(
+    r"Table '(?P<table>[^']+)'\. Scan count (?P<scans>\d+), logical reads (?P<logical>\d+), "
+    r"physical reads (?P<physical>\d+)"
+)
+
+
+def query_shapes(table_name, unit_name, unit_names=None):
+    """
+    The query shapes the app issues, built by the same *_sql functions as
+    database.py, with representative parameters: the live shift query, the
+    half-open chunk query of long ranges (range_planner), the multi-unit
+    report/ranking/snapshot queries over unit_names, the pyramid's bucketed
+    counts and the unit catalog.
+    """
+    now = datetime.now(TIMEZONE)
+    unit_names = list(unit_names or [unit_name])
+    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    hour_start = now.replace(minute=0, second=0, microsecond=0)
+    return [
+        ('live shift aggregation (8h)', model_counts_sql(table_name),
+         (unit_name, now - timedelta(hours=8), now)),
+        ('closed chunk aggregation (1d, half-open)', model_counts_sql(table_name, include_end=False),
+         (unit_name, day_start - timedelta(days=1), day_start)),
+        (f'multi-unit report aggregation ({len(unit_names)} units, 8h)', multi_unit_model_counts_sql(len(unit_names), table_name),
+         (*unit_names, now - timedelta(hours=8), now)),
+        (f'multi-unit hour aggregation ({len(unit_names)} units, half-open)',
+         multi_unit_model_counts_sql(len(unit_names), table_name, include_end=False),
+         (*unit_names, hour_start - timedelta(hours=1), hour_start)),
+        (f'snapshot record check ({len(unit_names)} units, 8h)', multi_unit_record_counts_sql(len(unit_names), table_name),
+         (*unit_names, now - timedelta(hours=8), now)),
+        ('trend 5min buckets (1h page)', bucket_counts_sql('5min', table_name, backend='mssql'),
+         (unit_name, hour_start - timedelta(hours=1), hour_start)),
+        ('trend hour buckets (1d page)', bucket_counts_sql('hour', table_name, backend='mssql'),
+         (unit_name, day_start - timedelta(days=1), day_start)),
+        ('unit catalog', unit_catalog_sql(table_name), ()),
+    ]
+
+
+def _drain_result_sets(cursor):
+    """
+    Consume every result set and return the showplan XML (the last result
+    set produced by SET STATISTICS XML ON).
+    """
+    plan_xml = None
+    while True:
+        try:
+            rows = cursor.fetchall()
+        except Exception:
+            rows = []
+        for row in rows:
+            value = row[0] if row else None
+            if isinstance(value, str) and value.lstrip().startswith('<ShowPlanXML'):
+                plan_xml = value
+        if not cursor.nextset():
+            break
+    return plan_xml
+
+
+def _io_stats(cursor):
+    # STATISTICS IO output arrives as informational messages on the cursor
+    stats = []
+    for _, message in getattr(cursor, 'messages', None) or []:
+        match = IO_PATTERN.search(str(message))
+        if match:
+            stats.append({
+                'table': match.group('table'),
+                'scan_count': int(match.group('scans')),
+                'logical_reads': int(match.group('logical')),
+                'physical_reads': int(match.group('physical')),
+            })
+    return stats
+
+
+def analyse_plan(plan_xml):
+    """
+    Extract flagged operators and SQL Server's own missing-index hints from
+    a showplan XML document.
+    """
+    findings = {'scans': [], 'lookups': [], 'missing_indexes': [], 'operators': []}
+    if not plan_xml:
+        return findings
+
+    root = ET.fromstring(plan_xml)
+    for relop in root.iter(f"{{{SHOWPLAN_NS['sp']}}}RelOp"):
+        physical_op = relop.get('PhysicalOp')
+        obj = relop.find('.//sp:Object', SHOWPLAN_NS)
+        target = ''
+        if obj is not None:
+            target = '.'.join(filter(None, [obj.get('Table'), obj.get('Index')])).replace('[', '').replace(']', '')
+        entry = {
+            'operator': physical_op,
+            'object': target,
+            'estimated_rows': float(relop.get('EstimateRows', 0) or 0),
+            'estimated_cost': float(relop.get('EstimatedTotalSubtreeCost', 0) or 0),
+        }
+        findings['operators'].append(entry)
+        if physical_op in SCAN_OPERATORS:
+            findings['scans'].append(entry)
+        elif physical_op in LOOKUP_OPERATORS:
+            findings['lookups'].append(entry)
+
+    for group in root.iter(f"{{{SHOWPLAN_NS['sp']}}}MissingIndexGroup"):
+        impact = group.get('Impact')
+        for index in group.findall('.//sp:MissingIndex', SHOWPLAN_NS):
+            columns = {'EQUALITY': [], 'INEQUALITY': [], 'INCLUDE': []}
+            for column_group in index.findall('sp:ColumnGroup', SHOWPLAN_NS):
+                usage = column_group.get('Usage')
+                columns.setdefault(usage, []).extend(
+                    c.get('Name').strip('[]') for c in column_group.findall('sp:Column', SHOWPLAN_NS)
+                )
+            findings['missing_indexes'].append({
+                'table': index.get('Table', '').strip('[]'),
+                'impact': float(impact) if impact else None,
+                'columns': columns,
+            })
+    return findings
+
+
+def capture_plan(conn, sql, params):
+    """
+    Execute one query with actual-plan and IO statistics enabled.
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SET STATISTICS XML ON; SET STATISTICS IO ON;")
+        started = datetime.now()
+        cursor.execute(sql, params)
+        plan_xml = _drain_result_sets(cursor)
+        elapsed_ms = (datetime.now() - started).total_seconds() * 1000
+        io_stats = _io_stats(cursor)
+        cursor.execute("SET STATISTICS XML OFF; SET STATISTICS IO OFF;")
+        return plan_xml, io_stats, elapsed_ms
+    finally:
+        cursor.close()
+
+
+def resolve_base_tables(conn, object_name):
+    """
+    If object_name is a view, return the tables it reads from (an index has
+    to go on those, or on an indexed view / staging table).
+    """
+    cursor = conn.cursor()
+    try:
+        cursor.execute("SELECT OBJECTPROPERTY(OBJECT_ID(?), 'IsView')", (object_name,))
+        row = cursor.fetchone()
+        if not row or row[0] != 1:
+            return False, [object_name]
+        cursor.execute(
+            """
+            SELECT DISTINCT referenced_schema_name, referenced_entity_name
+            FROM sys.sql_expression_dependencies
+            WHERE referencing_id = OBJECT_ID(?) AND referenced_entity_name IS NOT NULL
+            """,
+            (object_name,)
+        )
+        tables = ['.'.join(filter(None, r)) for r in cursor.fetchall()]
+        return True, tables
+    finally:
+        cursor.close()
+
+
+def covering_index_ddl(table_name):
+    index_name = f"IX_{table_name.split('.')[-1]}_{'_'.join(INDEX_KEY_COLUMNS)}"
+    return (
+        f"CREATE NONCLUSTERED INDEX {index_name} ON {table_name} "
+        f"({', '.join(INDEX_KEY_COLUMNS)}) INCLUDE ({', '.join(INDEX_INCLUDE_COLUMNS)});"
+    )
+
+
+def run_advisor(unit_name=None, table_name=PRODUCTION_TABLE):
+    """
+    Analyse every query shape and return a report dict (also used by the
+    QUERY_ADVISOR_ON_STARTUP hook in main.py).
+    """
+    conn = get_db_connection()
+    try:
+        # Sample units for the multi-unit shapes (a report screen's worth)
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT DISTINCT TOP {ADVISOR_SAMPLE_UNITS} UnitName FROM {table_name}")
+        unit_names = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        if unit_name is None:
+            unit_name = unit_names[0] if unit_names else ''
+
+        report = {'table': table_name, 'unit': unit_name, 'queries': [], 'recommendations': []}
+        needs_covering_index = False
+
+        for name, sql, params in query_shapes(table_name, unit_name, unit_names):
+            plan_xml, io_stats, elapsed_ms = capture_plan(conn, sql, params)
+            findings = analyse_plan(plan_xml)
+            report['queries'].append({
+                'name': name,
+                'elapsed_ms': round(elapsed_ms, 1),
+                'io': io_stats,
+                'scans': findings['scans'],
+                'lookups': findings['lookups'],
+                'missing_indexes': findings['missing_indexes'],
+            })
+            if findings['scans'] or findings['lookups'] or findings['missing_indexes']:
+                needs_covering_index = True
+
+        if needs_covering_index:
+            is_view, base_tables = resolve_base_tables(conn, table_name)
+            if is_view:
+                for base_table in base_tables:
+                    report['recommendations'].append(covering_index_ddl(base_table))
+                report['recommendations'].append(
+                    f"-- {table_name} is a view: if its base tables cannot be indexed, run "
+                    f"'python query_advisor.py --create-staging' and set PRODUCTION_TABLE={STAGING_TABLE}"
+                )
+            else:
+                report['recommendations'].append(covering_index_ddl(table_name))
+        return report
+    finally:
+        conn.close()
+
+
+def print_report(report):
+    print(f"[QUERY ADVISOR] Table: {report['table']} (sample unit: {report['unit']})")
+    for query in report['queries']:
+        total_logical = sum(io['logical_reads'] for io in query['io'])
+        print(f"[QUERY ADVISOR] {query['name']}: {query['elapsed_ms']} ms, {total_logical} logical reads")
+        for scan in query['scans']:
+            print(f"[QUERY ADVISOR]   SCAN {scan['operator']} on {scan['object']} (est. rows {scan['estimated_rows']:.0f})")
+        for lookup in query['lookups']:
+            print(f"[QUERY ADVISOR]   LOOKUP {lookup['operator']} on {lookup['object']} - index is not covering")
+        for missing in query['missing_indexes']:
+            print(f"[QUERY ADVISOR]   SQL Server missing-index hint on {missing['table']} (impact {missing['impact']}): {missing['columns']}")
+    if report['recommendations']:
+        print("[QUERY ADVISOR] Recommendations:")
+        for recommendation in report['recommendations']:
+            print(f"    {recommendation}")
+    else:
+        print("[QUERY ADVISOR] No scans or lookups found - the app's queries are index seeks")
+
+
+def create_staging_table():
+    """
+    Create the indexed staging table (same column types as the view) and
+    fill it with a full copy.
+    """
+    conn = get_db_connection()
+    cursor = conn.cursor()
+    try:
+        cursor.execute(f"""
+            IF OBJECT_ID(?) IS NULL
+            BEGIN
+                SELECT UnitName, KayitTarihi, Model, ModelSuresiSN, TestSonucu
+                INTO {STAGING_TABLE} FROM {SOURCE_VIEW} WHERE 1 = 0;
+                CREATE CLUSTERED INDEX CIX_{STAGING_TABLE}_{'_'.join(INDEX_KEY_COLUMNS)}
+                    ON {STAGING_TABLE} ({', '.join(INDEX_KEY_COLUMNS)});
+            END
+        """, (STAGING_TABLE,))
+        conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+    copied = sync_staging_table()
+    print(f"[QUERY ADVISOR] Staging table {STAGING_TABLE} ready ({copied} rows copied)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Execution plan advisor for the dashboard queries")
+    parser.add_argument('--unit', help="Unit name to use as the sample parameter")
+    parser.add_argument('--table', default=PRODUCTION_TABLE, help="Table or view to analyse")
+    parser.add_argument('--create-staging', action='store_true', help=f"Create and fill {STAGING_TABLE}")
+    parser.add_argument('--sync-staging', action='store_true', help=f"Incrementally refresh {STAGING_TABLE}")
+    args = parser.parse_args()
+
+    if args.create_staging:
+        create_staging_table()
+    elif args.sync_staging:
+        print(f"[QUERY ADVISOR] Synced {sync_staging_table()} rows into {STAGING_TABLE}")
+    else:
+        print_report(run_advisor(args.unit, args.table))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,188 @@
+"""
+Range planner for long historical windows.
+
+One GROUP BY over a 14-day range scans every row of the unit in that range
+in a single statement and regularly runs into the query timeout. Here a
+long window is split on day (or shift) boundaries, the chunks are counted
+concurrently - at most RANGE_MAX_CONCURRENCY statements at a time across
+all requests - and the raw per-model counts are merged before the usual
+quality/performance figures are computed for the whole range.
+
+Chunks that ended more than RANGE_CLOSED_GRACE_MINUTES ago are treated as
+closed and kept in the shared cache, so repeating a long report only
+queries the chunk that is still open.
+"""
+
+import asyncio
+import os
+from datetime import timedelta
+
+from database import (TIMEZONE, build_model_results, get_model_counts, get_production_data,
+                      resolve_query_window, run_db_query)
+from live_payloads import shared_cache
+
+# Ranges longer than this are split into chunks
+RANGE_SPLIT_THRESHOLD_HOURS = float(os.getenv('RANGE_SPLIT_THRESHOLD_HOURS', '24'))
+
+# 'day' (midnight boundaries) or 'shift' (the working mode's shift starts)
+RANGE_CHUNK = os.getenv('RANGE_CHUNK', 'day')
+
+# Chunk statements in flight at once, shared by every request on this worker
+RANGE_MAX_CONCURRENCY = int(os.getenv('RANGE_MAX_CONCURRENCY', '4'))
+
+# Rows can arrive late, so a chunk only counts as closed this long after its end
+RANGE_CLOSED_GRACE_MINUTES = float(os.getenv('RANGE_CLOSED_GRACE_MINUTES', '30'))
+
+# How long closed chunk counts are kept
+RANGE_CHUNK_CACHE_TTL = float(os.getenv('RANGE_CHUNK_CACHE_TTL', str(24 * 3600)))
+
+# Shift start hours per working mode (same shifts as the dashboard presets)
+WORKING_MODE_SHIFT_STARTS = {
+    'mode1': (0, 8, 16),
+    'mode2': (8, 20),
+    'mode3': (8, 20)
+}
+
+# Semaphore per event loop (a semaphore is bound to the loop that first waits on it);
+# rankings.py takes its hourly query slots from the same one
+_chunk_slots = {}
+
+
+def chunk_slots():
+    loop = asyncio.get_running_loop()
+    if loop not in _chunk_slots:
+        _chunk_slots.clear()
+        _chunk_slots[loop] = asyncio.Semaphore(RANGE_MAX_CONCURRENCY)
+    return _chunk_slots[loop]
+
+
+def _boundary_hours(chunk, working_mode):
+    if chunk == 'hour':
+        return tuple(range(24))
+    if chunk == 'shift':
+        return WORKING_MODE_SHIFT_STARTS.get(working_mode, WORKING_MODE_SHIFT_STARTS['mode1'])
+    return (0,)
+
+
+def plan_chunks(start_time, end_time, chunk=RANGE_CHUNK, working_mode='mode1'):
+    """
+    Split [start_time, end_time] at local day/shift/hour boundaries.
+    Returns [(chunk_start, chunk_end, include_end), ...]; every chunk but the
+    last is half-open so a row on a boundary is counted exactly once.
+    """
+    # Naive times are local, as in resolve_query_window
+    if start_time.tzinfo is None:
+        start_time = TIMEZONE.localize(start_time)
+    if end_time.tzinfo is None:
+        end_time = TIMEZONE.localize(end_time)
+    if end_time <= start_time:
+        return []
+    hours = _boundary_hours(chunk, working_mode)
+    chunks = []
+    chunk_start = start_time
+    while True:
+        # Next boundary strictly after chunk_start, in local wall-clock time
+        day = chunk_start.replace(tzinfo=None).replace(hour=0, minute=0, second=0, microsecond=0)
+        boundary = None
+        for day_offset in (0, 1):
+            for hour in hours:
+                candidate = TIMEZONE.localize(day + timedelta(days=day_offset, hours=hour))
+                if candidate > chunk_start:
+                    boundary = candidate
+                    break
+            if boundary is not None:
+                break
+
+        if boundary >= end_time:
+            chunks.append((chunk_start, end_time, True))
+            return chunks
+        chunks.append((chunk_start, boundary, False))
+        chunk_start = boundary
+
+
+def chunk_is_closed(chunk_end, current_time):
+    return chunk_end <= current_time - timedelta(minutes=RANGE_CLOSED_GRACE_MINUTES)
+
+
+def chunk_cache_key(unit_name, chunk_start, chunk_end, include_end):
+    # Shared with rankings.py, which fills the same per-unit hourly entries
+    return f"chunk:{unit_name}_{chunk_start.isoformat()}_{chunk_end.isoformat()}_{int(include_end)}"
+
+
+async def _chunk_counts(unit_name, chunk_start, chunk_end, include_end, current_time):
+    closed = chunk_is_closed(chunk_end, current_time)
+    cache_key = chunk_cache_key(unit_name, chunk_start, chunk_end, include_end)
+    if closed:
+        rows = shared_cache.get(cache_key)
+        if rows is not None:
+            return rows
+
+    async with chunk_slots():
+        rows = await run_db_query(get_model_counts, unit_name, chunk_start, chunk_end, include_end,
+                                  label=f"{unit_name} {chunk_start:%m-%d %H:%M}")
+
+    if closed:
+        shared_cache.set(cache_key, rows, RANGE_CHUNK_CACHE_TTL)
+    return rows
+
+
+def merge_counts(chunk_rows):
+    """
+    Sum per-model counts from several chunks, keyed like the GROUP BY (model, target).
+    """
+    merged = {}
+    for rows in chunk_rows:
+        for model, success, fail, target in rows:
+            key = (model, target)
+            if key in merged:
+                merged[key][1] += success
+                merged[key][2] += fail
+            else:
+                merged[key] = [model, success, fail, target]
+    return list(merged.values())
+
+
+async def gather_chunk_counts(unit_name, chunks, current_time, return_exceptions=False):
+    return await asyncio.gather(
+        *(_chunk_counts(unit_name, chunk_start, chunk_end, include_end, current_time)
+          for chunk_start, chunk_end, include_end in chunks),
+        return_exceptions=return_exceptions
+    )
+
+
+async def iter_chunk_counts(unit_name, chunks, current_time):
+    """
+    Yield (chunk, counts) as soon as each chunk is counted; counts is the
+    exception if that chunk failed. Chunks start in the order given (the
+    semaphore is FIFO). If the consumer stops early - e.g. the client of a
+    streaming response disconnects - the unfinished chunk queries are cancelled.
+    """
+    async def count(chunk):
+        try:
+            return chunk, await _chunk_counts(unit_name, *chunk, current_time)
+        except Exception as e:
+            return chunk, e
+
+    tasks = [asyncio.ensure_future(count(chunk)) for chunk in chunks]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def get_range_production_data(unit_name, start_time, end_time, current_time, working_mode='mode1'):
+    """
+    Drop-in async replacement for get_production_data on historical and
+    report ranges: short ranges run as one query, long ones are split,
+    counted concurrently and merged.
+    """
+    start_time, query_end_time, actual_end_time = resolve_query_window(start_time, end_time, current_time)
+    if (query_end_time - start_time) <= timedelta(hours=RANGE_SPLIT_THRESHOLD_HOURS):
+        return await run_db_query(get_production_data, unit_name, start_time, end_time, current_time, working_mode)
+
+    chunks = plan_chunks(start_time, query_end_time, RANGE_CHUNK, working_mode)
+    print(f"[RANGE] {unit_name}: split {query_end_time - start_time} into {len(chunks)} {RANGE_CHUNK} chunks")
+    chunk_rows = await gather_chunk_counts(unit_name, chunks, current_time)
+    return build_model_results(merge_counts(chunk_rows), start_time, actual_end_time, working_mode)
@@ -0,0 +1,132 @@
+"""
+Top-N rankings and per-unit drill-downs for the report pages.
+
+The report pages used to download every unit's full model list just to
+sort units and to draw a drill-down chart for one of them. Here both are
+answered on the server from hourly pre-aggregates: per-unit, per-model
+counts for each hour of the window, stored under the same shared-cache
+keys the range planner and the hourly history stream use. A closed hour
+is counted once and reused by every ranking, report and history request
+after that; hours not cached yet are counted with one multi-unit query
+per hour. Only the requested top N (heapq partial sort) or the one
+unit's models go back to the browser.
+"""
+
+import asyncio
+import heapq
+
+from database import build_model_results, get_multi_unit_model_counts, resolve_query_window, run_db_query
+from live_payloads import shared_cache, summarize_unit
+from range_planner import (RANGE_CHUNK_CACHE_TTL, chunk_cache_key, chunk_is_closed, chunk_slots,
+                           merge_counts, plan_chunks)
+
+# metric -> summary field, for units (see live_payloads.summarize_unit)
+UNIT_METRICS = {
+    'success': 'total_success',
+    'fail': 'total_fail',
+    'production': 'total_qty',
+    'quality': 'total_quality',
+    'performance': 'unit_performance_sum'
+}
+
+# metric -> model field (see database.build_model_results)
+MODEL_METRICS = {
+    'success': 'success_qty',
+    'fail': 'fail_qty',
+    'production': 'total_qty',
+    'quality': 'quality',
+    'performance': 'performance'
+}
+
+
+def top_n(items, key, limit=None, order='desc'):
+    """
+    The first `limit` items by key (all of them when limit is None) with a
+    partial sort. Items whose key is None (e.g. performance of a model
+    without a target) are left out.
+    """
+    ranked = [item for item in items if key(item) is not None]
+    if limit is None or limit >= len(ranked):
+        return sorted(ranked, key=key, reverse=(order == 'desc'))
+    if order == 'desc':
+        return heapq.nlargest(limit, ranked, key=key)
+    return heapq.nsmallest(limit, ranked, key=key)
+
+
+async def _hour_counts(unit_names, hour_start, hour_end, include_end, current_time):
+    """
+    {unit: counts} for one hour: cached units from the shared cache, the
+    rest with one multi-unit query (cached if the hour is closed).
+    """
+    closed = chunk_is_closed(hour_end, current_time)
+    counts = {}
+    missing = []
+    for unit_name in unit_names:
+        rows = shared_cache.get(chunk_cache_key(unit_name, hour_start, hour_end, include_end)) if closed else None
+        if rows is None:
+            missing.append(unit_name)
+        else:
+            counts[unit_name] = rows
+
+    if missing:
+        async with chunk_slots():
+            queried = await run_db_query(get_multi_unit_model_counts, missing, hour_start, hour_end, include_end,
+                                         label=f"{len(missing)} units {hour_start:%m-%d %H:%M}")
+        for unit_name, rows in queried.items():
+            counts[unit_name] = rows
+            if closed:
+                shared_cache.set(chunk_cache_key(unit_name, hour_start, hour_end, include_end), rows, RANGE_CHUNK_CACHE_TTL)
+    return counts
+
+
+async def get_units_model_results(unit_names, start_time, end_time, current_time, working_mode='mode1'):
+    """
+    {unit: per-model results over the window} from the hourly pre-aggregates,
+    same figures as get_production_data for each unit.
+    """
+    start_time, query_end_time, actual_end_time = resolve_query_window(start_time, end_time, current_time)
+    hours = plan_chunks(start_time, query_end_time, 'hour')
+    hour_counts = await asyncio.gather(
+        *(_hour_counts(unit_names, hour_start, hour_end, include_end, current_time)
+          for hour_start, hour_end, include_end in hours)
+    )
+    return {
+        unit_name: build_model_results(merge_counts(counts.get(unit_name, []) for counts in hour_counts),
+                                       start_time, actual_end_time, working_mode)
+        for unit_name in unit_names
+    }
+
+
+def unit_summaries(results, start_time, end_time, current_time, working_mode):
+    """
+    {unit: (models, summary)}; the model rows are copied before summarize_unit edits them.
+    """
+    summaries = {}
+    for unit_name, models in results.items():
+        models = [dict(model) for model in models]
+        summaries[unit_name] = (models, summarize_unit(models, start_time, end_time, current_time, working_mode))
+    return summaries
+
+
+def rank_units(summaries, metric, limit=None, order='desc'):
+    field = UNIT_METRICS[metric]
+    ranked = top_n(summaries.items(), lambda item: item[1][1][field], limit, order)
+    return [dict(unit_name=unit_name, value=summary[field], **summary) for unit_name, (_, summary) in ranked]
+
+
+def rank_models(summaries, metric, limit=None, order='desc'):
+    field = MODEL_METRICS[metric]
+    models = ((unit_name, model) for unit_name, (unit_models, _) in summaries.items() for model in unit_models)
+    ranked = top_n(models, lambda item: item[1][field], limit, order)
+    return [dict(model, unit_name=unit_name, value=model[field]) for unit_name, model in ranked]
+
+
+def drilldown_models(unit_name, models, metric, limit=None, order='desc'):
+    """
+    One unit's models sorted by metric; models without a value for it
+    (performance without a target) follow the ranked ones instead of being dropped.
+    """
+    field = MODEL_METRICS[metric]
+    ranked = rank_models({unit_name: (models, None)}, metric, limit, order)
+    unranked = [dict(model, unit_name=unit_name, value=None) for model in models if model[field] is None]
+    return (ranked + unranked)[:limit]
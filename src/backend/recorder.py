@@ -0,0 +1,208 @@
+"""
+Traffic recorder for deterministic replays (see replay.py).
+
+With RECORD_FILE set, this worker appends one JSON line per event to the
+file, each with `t`, its offset in seconds from the start of the recording:
+
+- start: wall-clock time of t=0 (`at`, ISO with offset)
+- http / http_end: a REST request (method, path, query) and, when its last
+  body chunk is sent, its status and duration - so a streamed export or an
+  SSE subscription ends when the client goes away
+- ws_open / ws_message / ws_close: a WebSocket connection and every text
+  message the client sends on it (subscriptions, heartbeats)
+- rows: ProductRecordLogView rows [UnitName, KayitTarihi, Model,
+  ModelSuresiSN, TestSonucu], polled every RECORD_ROWS_SECONDS. The first
+  poll reaches RECORD_HISTORY_HOURS back, so the replay's stand-in holds
+  the current shift the recorded screens asked for. The last
+  RECORD_ROWS_OVERLAP_MINUTES are read again on every poll so late rows
+  are not missed; only rows beyond the count already recorded for the
+  same values are written, as the view has no key.
+
+Events carry a per-connection `id`. Static assets and /admin requests are
+not recorded. Record on a single worker: each worker only sees its own
+connections.
+
+Lines are written from a background thread, so recording costs the event
+loop one queue put per event.
+"""
+
+import asyncio
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timedelta
+
+from database import SOURCE_VIEW, TIMEZONE, get_db_connection, open_cursor, run_db_query
+from static_assets import ASSET_URL_PREFIX
+from tracing import UNTRACED_SUFFIXES
+
+RECORD_FILE = os.getenv('RECORD_FILE')
+RECORD_ROWS_SECONDS = float(os.getenv('RECORD_ROWS_SECONDS', '10'))
+RECORD_HISTORY_HOURS = float(os.getenv('RECORD_HISTORY_HOURS', '12'))
+RECORD_ROWS_OVERLAP_MINUTES = float(os.getenv('RECORD_ROWS_OVERLAP_MINUTES', '5'))
+
+UNRECORDED_PREFIXES = ('/admin', '/static', ASSET_URL_PREFIX)
+
+ROW_COLUMNS = ['UnitName', 'KayitTarihi', 'Model', 'ModelSuresiSN', 'TestSonucu']
+
+
+def get_rows_since(since):
+    """
+    ProductRecordLogView rows with KayitTarihi >= since (naive local time), oldest first.
+    """
+    conn = get_db_connection()
+    cursor = open_cursor(conn)
+    try:
+        cursor.execute(f"""
+            SELECT UnitName, KayitTarihi, Model, ModelSuresiSN, TestSonucu FROM {SOURCE_VIEW}
+            WHERE KayitTarihi >= ?
+            ORDER BY KayitTarihi
+        """, (since,))
+        # pyodbc returns datetimes, the SQLite stand-in the stored text
+        return [[row[0], row[1].isoformat(sep=' ') if isinstance(row[1], datetime) else str(row[1]),
+                 row[2], row[3], row[4]] for row in cursor.fetchall()]
+    finally:
+        cursor.close()
+        conn.close()
+
+
+class TrafficRecorder:
+    def __init__(self, path):
+        self.path = path
+        self.started = time.monotonic()
+        self.events = 0
+        self.rows = 0
+        self._queue = queue.Queue()
+        self._seen = {}
+        self._watermark = None
+        self._thread = threading.Thread(target=self._run, name='traffic-recorder', daemon=True)
+        self._thread.start()
+        self.write({'type': 'start', 'at': datetime.now(TIMEZONE).isoformat(), 'pid': os.getpid(),
+                    'columns': ROW_COLUMNS})
+        print(f"[RECORDER] Recording traffic to {path}")
+
+    def write(self, event):
+        event['t'] = round(time.monotonic() - self.started, 4)
+        self.events += 1
+        self._queue.put(event)
+
+    def _run(self):
+        with open(self.path, 'a') as f:
+            while True:
+                event = self._queue.get()
+                f.write(json.dumps(event, default=str) + '\n')
+                # Write out whatever else is waiting before flushing
+                while not self._queue.empty():
+                    f.write(json.dumps(self._queue.get_nowait(), default=str) + '\n')
+                f.flush()
+
+    def poll_rows(self):
+        """
+        Read new rows from the view and record them. Blocking - run on an executor.
+        """
+        now = datetime.now(TIMEZONE).replace(tzinfo=None)
+        if self._watermark is None:
+            since = now - timedelta(hours=RECORD_HISTORY_HOURS)
+        else:
+            since = self._watermark - timedelta(minutes=RECORD_ROWS_OVERLAP_MINUTES)
+        since_text = since.isoformat(sep=' ')
+
+        # The view has no key: identical rows are separate records, so count them per row value
+        polled = Counter()
+        for row in get_rows_since(since):
+            polled[tuple(row)] += 1
+            self._watermark = max(self._watermark or since, datetime.fromisoformat(row[1]))
+        self._watermark = self._watermark or since
+
+        new_rows = []
+        for key, count in polled.items():
+            # Every copy of a row has the same KayitTarihi, so each poll returns all of them or none
+            new_rows.extend([list(key)] * (count - self._seen.get(key, 0)))
+            self._seen[key] = max(count, self._seen.get(key, 0))
+        # Rows before the overlap window can't be returned again
+        self._seen = {key: count for key, count in self._seen.items() if key[1] >= since_text}
+
+        if new_rows:
+            self.rows += len(new_rows)
+            self.write({'type': 'rows', 'rows': new_rows})
+        return len(new_rows)
+
+
+traffic_recorder = TrafficRecorder(RECORD_FILE) if RECORD_FILE else None
+
+
+def _recorded(scope):
+    path = scope['path']
+    return not (path.startswith(UNRECORDED_PREFIXES) or path.endswith(UNTRACED_SUFFIXES))
+
+
+class RecorderMiddleware:
+    """
+    ASGI middleware: records REST requests and WebSocket client messages.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if traffic_recorder is None or scope['type'] not in ('http', 'websocket') or not _recorded(scope):
+            await self.app(scope, receive, send)
+            return
+
+        connection_id = uuid.uuid4().hex[:12]
+        query = scope.get('query_string', b'').decode('latin-1')
+
+        if scope['type'] == 'websocket':
+            traffic_recorder.write({'type': 'ws_open', 'id': connection_id, 'path': scope['path'], 'query': query})
+
+            async def recorded_receive():
+                message = await receive()
+                if message['type'] == 'websocket.receive' and message.get('text') is not None:
+                    traffic_recorder.write({'type': 'ws_message', 'id': connection_id, 'text': message['text']})
+                return message
+
+            try:
+                await self.app(scope, recorded_receive, send)
+            finally:
+                traffic_recorder.write({'type': 'ws_close', 'id': connection_id})
+            return
+
+        traffic_recorder.write({'type': 'http', 'id': connection_id, 'method': scope['method'],
+                                'path': scope['path'], 'query': query})
+        started = time.perf_counter()
+        status = None
+        finished = False
+
+        async def recorded_send(message):
+            nonlocal status, finished
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            elif message['type'] == 'http.response.body' and not message.get('more_body', False):
+                finished = True
+                traffic_recorder.write({'type': 'http_end', 'id': connection_id, 'status': status,
+                                        'ms': round((time.perf_counter() - started) * 1000, 1)})
+            await send(message)
+
+        try:
+            await self.app(scope, receive, recorded_send)
+        finally:
+            if not finished:
+                # Streams end here when the client disconnects
+                traffic_recorder.write({'type': 'http_end', 'id': connection_id, 'status': status,
+                                        'ms': round((time.perf_counter() - started) * 1000, 1)})
+
+
+async def record_rows_loop():
+    """
+    Poll ProductRecordLogView for new rows while recording.
+    """
+    while True:
+        try:
+            await run_db_query(traffic_recorder.poll_rows, label='record rows')
+        except Exception as e:
+            print(f"[RECORDER ERROR] Row poll failed: {e}")
+        await asyncio.sleep(RECORD_ROWS_SECONDS)
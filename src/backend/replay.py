@@ -0,0 +1,544 @@
+"""
+Replay a traffic recording (recorder.py) against the SQLite stand-in.
+
+Starts the app in-process on a fresh stand-in of ProductRecordLogView
+(standin_db.py), fills it with the recorded rows and drives the recorded
+REST requests, SSE subscriptions and WebSocket conversations on their
+original schedule - at 1x or `--speed` times faster - then reports latency
+per endpoint, DB queries, lane queueing and memory. Save a report with
+--json and check a later run against it with --compare: any p50/p99 or
+query count more than --tolerance percent worse is listed and the exit
+code is 1, so a change to main.py or database.py can be checked against
+real traffic.
+
+Time: every timestamp in the recording (request parameters, subscription
+messages and row KayitTarihi) is moved by one offset: the shift that lands
+the end of the recording on the end of the replay, rounded down to whole
+--align-hours (default 24). Whole days keep every request on the same
+hours and shift boundaries whenever the replay runs, so chunk planning,
+closed hours, snapshots and comparison blocks - and with them --compare -
+are the same from run to run; the recording ends up to a day before the
+clock, so ranges that were live are served as historical. --align-hours 0
+shifts the recording exactly to now (live ranges stay live at 1x) at the
+cost of run-to-run determinism.
+
+Rows are inserted when the replay reaches their (shifted) KayitTarihi;
+older rows, including the recorded history, are inserted up front, and
+--history-hours of synthetic rows for the recorded units and models are
+added before that for long historical reports. Snapshots, the warm cache
+and the stand-in live in a fresh temp directory, so runs don't influence
+each other.
+
+Usage (from src/backend):
+    python replay.py recording.jsonl --speed 4 --json baseline.json
+    python replay.py recording.jsonl --speed 4 --compare baseline.json
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import shutil
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+from urllib.parse import parse_qsl, quote, unquote, urlencode
+
+import pytz
+import websockets
+
+from loadtest import memory_mb, percentile, start_server
+
+TIMEZONE = pytz.timezone('Europe/Istanbul')
+
+ISO_DATETIME = re.compile(r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}(:\d{2}(\.\d+)?)?(Z|[+-]\d{2}:\d{2})?$')
+
+# Report fields compared by --compare (lower is better)
+COMPARED_FIELDS = ('p50', 'p99')
+
+
+def load_recording(path):
+    """
+    (start time, events) of the last recording session in path; a file
+    appended to across restarts holds one session per 'start' line.
+    """
+    sessions = []
+    with open(path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            event = json.loads(line)
+            if event['type'] == 'start':
+                sessions.append((datetime.fromisoformat(event['at']), []))
+            elif sessions:
+                sessions[-1][1].append(event)
+    if not sessions:
+        raise ValueError(f"{path} has no recording start line")
+    if len(sessions) > 1:
+        print(f"[REPLAY] {path} holds {len(sessions)} recordings - replaying the last one")
+    started, events = sessions[-1]
+    events.sort(key=lambda event: event['t'])
+    return started, events
+
+
+class TimeMap:
+    """
+    Recording offsets -> replay schedule, and recorded timestamps -> replay timestamps.
+    """
+
+    def __init__(self, recorded_start, duration, speed, align_hours=24):
+        self.recorded_start = recorded_start
+        self.duration = duration
+        self.speed = speed
+        self.align_hours = align_hours
+        # The recording's end lands on the replay's end
+        offset = datetime.now(timezone.utc) + timedelta(seconds=duration / speed) - (recorded_start + timedelta(seconds=duration))
+        if align_hours > 0:
+            # Whole steps, rounded down so no timestamp moves past the clock
+            step = timedelta(hours=align_hours)
+            offset = offset // step * step
+        self.offset = offset
+        self.started = None
+
+    def begin(self):
+        self.started = time.monotonic()
+
+    def due(self, t):
+        # Monotonic time at which recording offset t is replayed
+        return self.started + max(t, 0.0) / self.speed
+
+    async def wait_until(self, t):
+        await asyncio.sleep(max(0.0, self.due(t) - time.monotonic()))
+
+    def row_offset(self, local_text):
+        return (TIMEZONE.localize(datetime.fromisoformat(local_text)) - self.recorded_start).total_seconds()
+
+    def shift_local(self, local_text):
+        # KayitTarihi is naive local time
+        return datetime.fromisoformat(local_text) + self.offset
+
+    def shift_text(self, value):
+        """
+        A recorded ISO timestamp string moved to the replay, in the same notation.
+        """
+        if not isinstance(value, str) or not ISO_DATETIME.match(value):
+            return value
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return value
+        shifted = parsed + self.offset
+        timespec = 'microseconds' if '.' in value else ('seconds' if value.count(':') >= 2 else 'minutes')
+        if value.endswith('Z'):
+            return shifted.astimezone(timezone.utc).replace(tzinfo=None).isoformat(timespec=timespec) + 'Z'
+        return shifted.isoformat(sep=value[10], timespec=timespec)
+
+    def shift_json(self, value):
+        if isinstance(value, dict):
+            return {key: self.shift_json(item) for key, item in value.items()}
+        if isinstance(value, list):
+            return [self.shift_json(item) for item in value]
+        return self.shift_text(value)
+
+    def shift_message(self, text):
+        try:
+            return json.dumps(self.shift_json(json.loads(text)))
+        except ValueError:
+            return text
+
+    def shift_query(self, query):
+        return urlencode([(key, self.shift_text(value)) for key, value in parse_qsl(query, keep_blank_values=True)])
+
+
+class RowFeeder:
+    """
+    Background thread inserting the recorded rows into the stand-in as the replay reaches them.
+    """
+
+    def __init__(self, path, rows, time_map, table_name, interval=0.25):
+        self.path = path
+        self.time_map = time_map
+        self.table_name = table_name
+        self.interval = interval
+        self.pending = deque(sorted(((time_map.row_offset(row[1]), row) for row in rows), key=lambda item: item[0]))
+        self.rows_written = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='replay-rows', daemon=True)
+
+    def insert_due(self, conn, until_offset):
+        batch = []
+        while self.pending and self.pending[0][0] <= until_offset:
+            _, (unit_name, recorded_at, model, target, result) = self.pending.popleft()
+            batch.append((unit_name, self.time_map.shift_local(recorded_at), model, target, result))
+        if batch:
+            conn.executemany(f"INSERT INTO {self.table_name} VALUES (?, ?, ?, ?, ?)", batch)
+            conn.commit()
+            self.rows_written += len(batch)
+        return len(batch)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        while not self._stop.wait(self.interval) and self.pending:
+            elapsed = (time.monotonic() - self.time_map.started) * self.time_map.speed
+            self.insert_due(conn, elapsed)
+        conn.close()
+
+
+def seed_standin(standin_db, path, rows, time_map, history_hours):
+    """
+    Empty stand-in + synthetic history before the first recorded row + the rows already due.
+    Returns the RowFeeder holding the remaining rows.
+    """
+    standin_db.create_standin(path, history_hours=0, reset=True)
+    conn = sqlite3.connect(path, timeout=10.0)
+
+    if rows and history_hours > 0:
+        first = min(time_map.shift_local(row[1]) for row in rows)
+        last = max(time_map.shift_local(row[1]) for row in rows)
+        models = {}
+        for unit_name, _, model, target, _ in rows:
+            models.setdefault(unit_name, {})[model] = target
+        # The recording's own rate per unit, so reports over older ranges look like production
+        minutes = max((last - first).total_seconds() / 60, 1.0)
+        rng = random.Random(42)
+        for unit_name, unit_models in sorted(models.items()):
+            unit_rows = sum(1 for row in rows if row[0] == unit_name)
+            batch = standin_db._row_batch(unit_name, sorted(unit_models.items()), first - timedelta(hours=history_hours),
+                                          first, unit_rows / minutes, rng)
+            conn.executemany(f"INSERT INTO {standin_db.TABLE_NAME} VALUES (?, ?, ?, ?, ?)", batch)
+        conn.commit()
+
+    feeder = RowFeeder(path, rows, time_map, standin_db.TABLE_NAME)
+    feeder.insert_due(conn, 0.0)
+    conn.close()
+    return feeder
+
+
+class Results:
+    def __init__(self):
+        self.latencies = {}
+        self.recorded = {}
+        self.errors = {}
+        self.pushes = {}
+        self.dropped = 0
+
+    def add(self, key, latency_ms=None, error=False, recorded_ms=None):
+        self.latencies.setdefault(key, [])
+        self.errors.setdefault(key, 0)
+        if error:
+            self.errors[key] += 1
+        elif latency_ms is not None:
+            self.latencies[key].append(latency_ms)
+        if recorded_ms is not None:
+            self.recorded.setdefault(key, []).append(recorded_ms)
+
+
+def endpoint_key(path, units):
+    # /historical-data/Unit%2001 -> /historical-data/{unit}
+    return '/'.join('{unit}' if unquote(part) in units else part for part in path.split('/'))
+
+
+def fetch(url, timeout, stream_until=None):
+    """
+    GET url; returns (status, ms to the full response - or to the first event of a stream).
+    Streams are read until the monotonic time stream_until.
+    """
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            if stream_until is None:
+                response.read()
+                return response.status, (time.perf_counter() - started) * 1000
+            first_event_ms = None
+            while time.monotonic() < stream_until:
+                line = response.readline()
+                if not line:
+                    break
+                if first_event_ms is None and line.startswith(b'data:'):
+                    first_event_ms = (time.perf_counter() - started) * 1000
+            return response.status, first_event_ms
+    except urllib.error.HTTPError as e:
+        return e.code, (time.perf_counter() - started) * 1000
+
+
+async def replay_http(request, end, base, time_map, results, units, args):
+    await time_map.wait_until(request['t'])
+    key = f"GET {endpoint_key(request['path'], units)}"
+    query = time_map.shift_query(request['query'])
+    url = f"{base}{quote(request['path'])}" + (f"?{query}" if query else '')
+    streaming = request['path'].startswith('/sse/')
+    stream_until = time_map.due(end['t'] if end else time_map.duration) if streaming else None
+    try:
+        status, latency = await asyncio.get_running_loop().run_in_executor(None, fetch, url, args.timeout, stream_until)
+        results.add(key, latency, error=status >= 400, recorded_ms=None if streaming or not end else end.get('ms'))
+    except Exception as e:
+        results.add(key, error=True)
+        print(f"[REPLAY] {key} failed: {e!r}", file=sys.__stdout__)
+
+
+async def replay_socket(opened, messages, closed, base, time_map, results, units):
+    """
+    One recorded WebSocket: same messages at the same (scaled) times. Latency is
+    from a subscription message to the data frame answering it; frames the server
+    pushes on its own schedule are counted as pushes.
+    """
+    await time_map.wait_until(opened['t'])
+    key = f"WS {endpoint_key(opened['path'], units)}"
+    results.add(key)
+    results.pushes.setdefault(key, 0)
+    url = f"{base}{quote(opened['path'])}" + (f"?{opened['query']}" if opened['query'] else '')
+    pending = deque()
+
+    async def read(socket):
+        async for message in socket:
+            frame = None
+            if isinstance(message, str):
+                try:
+                    frame = json.loads(message)
+                except ValueError:
+                    pass
+            if isinstance(frame, dict) and ('heartbeat' in frame or 'alert' in frame):
+                continue
+            error = isinstance(frame, dict) and 'error' in frame
+            if pending:
+                results.add(key, (time.perf_counter() - pending.popleft()) * 1000, error=error)
+            elif error:
+                results.add(key, error=True)
+            else:
+                results.pushes[key] += 1
+
+    try:
+        async with websockets.connect(url, max_size=None) as socket:
+            reader = asyncio.ensure_future(read(socket))
+            for message in messages:
+                await time_map.wait_until(message['t'])
+                try:
+                    heartbeat = bool(json.loads(message['text']).get('heartbeat'))
+                except (ValueError, AttributeError):
+                    heartbeat = False
+                if not heartbeat:
+                    pending.append(time.perf_counter())
+                await socket.send(time_map.shift_message(message['text']))
+            await time_map.wait_until(closed['t'] if closed else time_map.duration)
+            reader.cancel()
+    except (websockets.WebSocketException, OSError) as e:
+        results.dropped += 1
+        print(f"[REPLAY] {key} dropped: {e!r}", file=sys.__stdout__)
+
+
+async def run_replay(events, time_map, feeder, args, units):
+    from standin_db import query_counter
+
+    base_http = f"http://127.0.0.1:{args.port}"
+    base_ws = f"ws://127.0.0.1:{args.port}"
+    results = Results()
+    # Blocking HTTP clients - enough threads for every request the recording had open at once
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.http_threads))
+
+    ends = {event['id']: event for event in events if event['type'] in ('http_end', 'ws_close')}
+    messages = {}
+    for event in events:
+        if event['type'] == 'ws_message':
+            messages.setdefault(event['id'], []).append(event)
+
+    tasks = []
+    for event in events:
+        if event['type'] == 'http' and event['method'] == 'GET':
+            tasks.append(replay_http(event, ends.get(event['id']), base_http, time_map, results, units, args))
+        elif event['type'] == 'ws_open':
+            tasks.append(replay_socket(event, messages.get(event['id'], []), ends.get(event['id']),
+                                       base_ws, time_map, results, units))
+
+    query_counter.reset()
+    time_map.begin()
+    feeder.start()
+    peak_memory = memory_mb()
+
+    async def sample_memory():
+        nonlocal peak_memory
+        while time.monotonic() < time_map.due(time_map.duration):
+            peak_memory = max(peak_memory, memory_mb())
+            await asyncio.sleep(1)
+
+    await asyncio.gather(sample_memory(), *tasks)
+    elapsed = time.monotonic() - time_map.started
+    return results, query_counter.count, elapsed, peak_memory
+
+
+def build_report(args, time_map, results, queries, elapsed, memory_before, peak_memory, rows_replayed):
+    from lanes import lane_stats
+
+    endpoints = {}
+    for key in sorted(results.latencies):
+        latencies = results.latencies[key]
+        recorded = results.recorded.get(key, [])
+        endpoints[key] = {
+            'count': len(latencies),
+            'errors': results.errors[key],
+            'pushes': results.pushes.get(key, 0),
+            'p50': percentile(latencies, 50),
+            'p99': percentile(latencies, 99),
+            'mean': statistics.mean(latencies) if latencies else None,
+            'recorded_p50': percentile(recorded, 50)
+        }
+    return {
+        'recording': os.path.abspath(args.recording),
+        'recorded_at': time_map.recorded_start.isoformat(),
+        'speed': args.speed,
+        'align_hours': time_map.align_hours,
+        'recorded_seconds': time_map.duration,
+        'elapsed_seconds': elapsed,
+        'endpoints': endpoints,
+        'dropped_sockets': results.dropped,
+        'db_queries': queries,
+        'db_queries_per_recorded_minute': queries / max(time_map.duration / 60, 1e-9),
+        'rows_replayed': rows_replayed,
+        'memory_mb': {'before': memory_before, 'peak': peak_memory},
+        'lanes': {name: {'threads': stats['threads'], 'peak_pending': stats['peak_pending'],
+                         'completed': stats['completed']} for name, stats in lane_stats().items()}
+    }
+
+
+def _ms(value):
+    return f"{value:8.1f}" if value is not None else '       -'
+
+
+def print_report(report):
+    print("\n[REPLAY] ===== Results =====")
+    print(f"[REPLAY] {report['recording']} ({report['recorded_seconds']:.0f}s recorded at {report['recorded_at']}), "
+          f"speed {report['speed']}x, {report['elapsed_seconds']:.1f}s")
+    for key, endpoint in report['endpoints'].items():
+        print(f"[REPLAY] {key:42s} n={endpoint['count']:5d} err={endpoint['errors']:3d} "
+              f"p50={_ms(endpoint['p50'])} p99={_ms(endpoint['p99'])} ms  recorded p50={_ms(endpoint['recorded_p50'])} ms"
+              + (f"  pushes={endpoint['pushes']}" if endpoint['pushes'] else ''))
+    print(f"[REPLAY] DB queries: {report['db_queries']} ({report['db_queries_per_recorded_minute']:.1f} per recorded minute)")
+    print(f"[REPLAY] Lanes (peak pending/threads): " + ', '.join(
+        f"{name} {lane['peak_pending']}/{lane['threads']}" for name, lane in report['lanes'].items()))
+    print(f"[REPLAY] Rows replayed: {report['rows_replayed']}, dropped sockets: {report['dropped_sockets']}")
+    print(f"[REPLAY] Memory: {report['memory_mb']['before']:.1f} MiB before, {report['memory_mb']['peak']:.1f} MiB peak")
+
+
+def compare_reports(report, baseline, tolerance):
+    """
+    Regressions of report against baseline: values more than tolerance percent worse.
+    """
+    def worse(new, old):
+        return new is not None and old is not None and new > old * (1 + tolerance / 100.0)
+
+    if (baseline.get('speed') != report['speed'] or baseline.get('recorded_at') != report['recorded_at']
+            or baseline.get('align_hours') != report['align_hours']):
+        print("[REPLAY WARNING] Baseline was made from a different recording, speed or alignment - numbers may not be comparable")
+
+    regressions = []
+    for key, endpoint in report['endpoints'].items():
+        old = baseline.get('endpoints', {}).get(key)
+        if old is None:
+            continue
+        for field in COMPARED_FIELDS:
+            if worse(endpoint[field], old[field]):
+                regressions.append(f"{key} {field} {old[field]:.1f} -> {endpoint[field]:.1f} ms")
+        if endpoint['errors'] > old['errors']:
+            regressions.append(f"{key} errors {old['errors']} -> {endpoint['errors']}")
+    if worse(report['db_queries'], baseline.get('db_queries')):
+        regressions.append(f"DB queries {baseline['db_queries']} -> {report['db_queries']}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay recorded dashboard traffic against a SQLite stand-in")
+    parser.add_argument('recording', help="RECORD_FILE written by recorder.py")
+    parser.add_argument('--speed', type=float, default=1.0, help="Replay speed (1 = real time)")
+    parser.add_argument('--align-hours', type=float, default=24,
+                        help="Round the time shift down to whole hours (24 keeps shift boundaries; 0 shifts exactly to now)")
+    parser.add_argument('--history-hours', type=int, default=48, help="Hours of synthetic rows before the recorded ones")
+    parser.add_argument('--json', help="Write the report to this file")
+    parser.add_argument('--compare', help="Baseline report (--json of an earlier run) to check for regressions")
+    parser.add_argument('--tolerance', type=float, default=20, help="Percent worse than the baseline that counts as a regression")
+    parser.add_argument('--timeout', type=float, default=120, help="Seconds to wait for a REST response")
+    parser.add_argument('--http-threads', type=int, default=64, help="Concurrent REST requests")
+    parser.add_argument('--port', type=int, default=8766)
+    parser.add_argument('--keep', action='store_true', help="Keep the stand-in and snapshot files")
+    parser.add_argument('--verbose', action='store_true', help="Keep the server's per-tick logging")
+    args = parser.parse_args()
+    if args.speed <= 0:
+        parser.error("--speed must be positive")
+
+    recorded_start, events = load_recording(args.recording)
+    rows = [row for event in events if event['type'] == 'rows' for row in event['rows']]
+    duration = max((event['t'] for event in events), default=0.0)
+    units = {row[0] for row in rows}
+    time_map = TimeMap(recorded_start, duration, args.speed, args.align_hours)
+
+    # A fresh, isolated server: nothing from earlier runs or production settings
+    run_dir = tempfile.mkdtemp(prefix='dashboard-replay-')
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['STANDIN_DB_PATH'] = os.path.join(run_dir, 'standin.sqlite3')
+    os.environ['SNAPSHOT_PATH'] = os.path.join(run_dir, 'snapshots.sqlite3')
+    os.environ['WARM_CACHE_PATH'] = os.path.join(run_dir, 'warm-cache.json')
+    os.environ['CACHE_BACKEND'] = 'memory'
+    for name in ('RECORD_FILE', 'ALERT_WEBHOOK_URL', 'ALERT_LOG_FILE', 'TRACE_OTLP_ENDPOINT', 'DB_REPLICA_SERVER'):
+        os.environ.pop(name, None)
+    # Server-driven ticks (report socket, SSE and its keepalives) follow the replay speed
+    for name, default in (('LIVE_TICK_SECONDS', '12'), ('REPORT_TICK_SECONDS', '20'), ('SSE_KEEPALIVE_SECONDS', '15')):
+        os.environ[name] = str(float(os.getenv(name, default)) / args.speed)
+
+    import standin_db
+
+    feeder = seed_standin(standin_db, os.environ['STANDIN_DB_PATH'], rows, time_map, args.history_hours)
+    print(f"[REPLAY] {len(events)} events, {len(rows)} rows over {duration:.0f}s recorded; "
+          f"timestamps shifted by {time_map.offset}")
+
+    if not args.verbose:
+        sys.stdout = open(os.devnull, 'w')
+
+    memory_before = memory_mb()
+    server, thread = start_server(args.port)
+    try:
+        results, queries, elapsed, peak_memory = asyncio.run(run_replay(events, time_map, feeder, args, units))
+    finally:
+        server.should_exit = True
+        thread.join(timeout=10)
+        feeder.stop()
+        if sys.stdout is not sys.__stdout__:
+            sys.stdout.close()
+            sys.stdout = sys.__stdout__
+        if not args.keep:
+            shutil.rmtree(run_dir, ignore_errors=True)
+
+    report = build_report(args, time_map, results, queries, elapsed, memory_before, peak_memory,
+                          feeder.rows_written)
+    print_report(report)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"[REPLAY] Report written to {args.json}")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(report, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"[REPLAY REGRESSION] {regression}")
+        print(f"[REPLAY] {len(regressions)} regressions against {args.compare} (tolerance {args.tolerance:.0f}%)")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Stale-while-revalidate serving and per-unit circuit breakers for the live
+dashboard sockets.
+
+Every live key (payload type, unit, shift start, working mode) keeps its last
+good payload in the shared cache. A tick starts one background refresh per
+key and waits up to SWR_FRESH_WAIT_SECONDS for it; if the database is slower
+than that, the last good payload goes out at once marked
+{"stale": true, "generated_at": ..., "data_age_seconds": ...} and the refresh
+keeps running so a later tick picks up its result.
+
+Each unit has a circuit breaker: after BREAKER_FAILURE_THRESHOLD failed
+refreshes in a row it opens and no queries are sent for that unit during a
+cooldown that doubles on each re-open (up to BREAKER_MAX_COOLDOWN_SECONDS).
+After the cooldown a single probe query is allowed through; success closes
+the breaker. While open, sockets get the last good payload (or an error if
+there is none yet).
+"""
+
+import asyncio
+import os
+import time
+from datetime import datetime
+
+from database import run_db_query, TIMEZONE
+from live_payloads import is_live_range, shared_cache
+from tracing import annotate
+
+# How long a tick waits for a fresh payload before serving the last good one
+FRESH_WAIT_SECONDS = float(os.getenv('SWR_FRESH_WAIT_SECONDS', '3'))
+
+# Last good payloads outlive a full shift so a DB outage late in the shift still has something to show
+LAST_GOOD_TTL = float(os.getenv('SWR_LAST_GOOD_TTL', str(12 * 3600)))
+
+BREAKER_FAILURE_THRESHOLD = int(os.getenv('BREAKER_FAILURE_THRESHOLD', '3'))
+BREAKER_COOLDOWN_SECONDS = float(os.getenv('BREAKER_COOLDOWN_SECONDS', '15'))
+BREAKER_MAX_COOLDOWN_SECONDS = float(os.getenv('BREAKER_MAX_COOLDOWN_SECONDS', '300'))
+
+
+class CircuitOpen(Exception):
+    pass
+
+
+class CircuitBreaker:
+    """
+    closed -> open after `threshold` consecutive failures; open -> half-open
+    once the cooldown has passed (one probe allowed); half-open -> closed on
+    success or back to open, with a doubled cooldown, on failure; a cancelled
+    probe returns it to open with the cooldown already over.
+    Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, name, threshold=BREAKER_FAILURE_THRESHOLD,
+                 cooldown=BREAKER_COOLDOWN_SECONDS, max_cooldown=BREAKER_MAX_COOLDOWN_SECONDS):
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+        self.open_until = 0.0
+
+    def allow(self):
+        if self.state == 'closed':
+            return True
+        if self.state == 'open' and time.monotonic() >= self.open_until:
+            self.state = 'half-open'
+            print(f"[BREAKER] {self.name}: cooldown over - sending one probe query")
+            return True
+        # Open, or half-open with the probe still in flight
+        return False
+
+    def retry_in(self):
+        return max(0.0, self.open_until - time.monotonic())
+
+    def record_success(self):
+        if self.state != 'closed':
+            print(f"[BREAKER] {self.name}: probe succeeded - closing breaker")
+        self.state = 'closed'
+        self.failures = 0
+        self.opened = 0
+
+    def record_failure(self, error):
+        self.failures += 1
+        if self.state == 'half-open' or self.failures >= self.threshold:
+            cooldown = min(self.cooldown * (2 ** self.opened), self.max_cooldown)
+            self.opened += 1
+            self.state = 'open'
+            self.open_until = time.monotonic() + cooldown
+            print(f"[BREAKER] {self.name}: opened for {cooldown:.0f}s after {self.failures} failures ({error!r})")
+
+    def record_abandoned(self):
+        # The probe was cancelled before it finished: no verdict on the database,
+        # but it must not stay half-open - the next tick sends a new probe
+        if self.state == 'half-open':
+            self.state = 'open'
+            print(f"[BREAKER] {self.name}: probe cancelled - will probe again")
+
+
+class LiveResilience:
+    def __init__(self):
+        self.breakers = {}
+        # Live key -> in-flight refresh task (one per key, shared by every socket on it)
+        self.refreshing = {}
+
+    def breaker(self, unit_name):
+        if unit_name not in self.breakers:
+            self.breakers[unit_name] = CircuitBreaker(unit_name)
+        return self.breakers[unit_name]
+
+    async def serve(self, kind, builder, unit_name, start_time, end_time, current_time, working_mode):
+        """
+        Build a payload with builder(unit_name, start_time, end_time,
+        current_time, working_mode) in the executor. Live ranges fall back to
+        the last good payload when the database is slow or the unit's breaker
+        is open; historical ranges only go through the breaker.
+        Raises CircuitOpen, asyncio.TimeoutError or the builder's error when
+        there is nothing to serve.
+        """
+        breaker = self.breaker(unit_name)
+        args = (unit_name, start_time, end_time, current_time, working_mode)
+
+        if not is_live_range(end_time, current_time):
+            if not breaker.allow():
+                raise CircuitOpen(f"Database backing off for {unit_name} - retry in {breaker.retry_in():.0f}s")
+            return await self._refresh(None, breaker, builder, args)
+
+        key = f"lastgood:{kind}:{unit_name}_{start_time.isoformat()}_{working_mode}"
+        last_good = shared_cache.get(key)
+
+        task = self.refreshing.get(key)
+        if task is None and breaker.allow():
+            task = asyncio.create_task(self._refresh(key, breaker, builder, args))
+            self.refreshing[key] = task
+            task.add_done_callback(lambda t: self._refresh_done(key, t))
+
+        if task is None:
+            if last_good is None:
+                raise CircuitOpen(f"Database backing off for {unit_name} - retry in {breaker.retry_in():.0f}s")
+            return self._mark_stale(last_good)
+
+        if last_good is None:
+            # Nothing to fall back on yet - wait for the query (shielded so other sockets can share it)
+            return await asyncio.shield(task)
+
+        done, _ = await asyncio.wait({task}, timeout=FRESH_WAIT_SECONDS)
+        if task in done and not task.cancelled() and task.exception() is None:
+            return task.result()
+        return self._mark_stale(last_good)
+
+    async def _refresh(self, key, breaker, builder, args):
+        try:
+            payload = await run_db_query(builder, *args)
+        except Exception as e:
+            breaker.record_failure(e)
+            raise
+        except BaseException:
+            # Cancelled (socket closed, request aborted) - historical probes run inline in the caller
+            breaker.record_abandoned()
+            raise
+        breaker.record_success()
+        if key is not None:
+            shared_cache.set(key, {'payload': payload, 'generated_at': datetime.now(TIMEZONE).isoformat()}, LAST_GOOD_TTL)
+        return payload
+
+    def _refresh_done(self, key, task):
+        if self.refreshing.get(key) is task:
+            del self.refreshing[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieve the error so background refreshes nobody awaited don't log "never retrieved"
+            print(f"[SWR] Background refresh failed for {key}: {task.exception()!r}")
+
+    def _mark_stale(self, entry):
+        generated_at = datetime.fromisoformat(entry['generated_at'])
+        age = (datetime.now(TIMEZONE) - generated_at).total_seconds()
+        print(f"[SWR] Serving last good payload ({age:.0f}s old) for {entry['payload'].get('unit_name')}")
+        annotate(stale=True, data_age_seconds=round(age, 1))
+        return dict(entry['payload'], stale=True, generated_at=entry['generated_at'], data_age_seconds=round(age, 1))
+
+
+live_resilience = LiveResilience()
@@ -0,0 +1,232 @@
+"""
+Pluggable cache backends for query results shared between sockets and workers.
+
+- 'memory': process-local dict (default, single worker)
+- 'sqlite': a WAL-mode SQLite file on local disk, shared by every worker on
+  the host. Leases give cross-process single-flight, so when 40 screens on
+  4 workers ask for the same unit/shift only one of them queries SQL Server.
+
+Values must be JSON-serialisable (the query results already are, since they
+go out over the WebSocket as JSON).
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(tempfile.gettempdir(), 'dashboard-cache.sqlite3'))
+
+# How long a worker may hold the right to compute a key before others take over
+LEASE_SECONDS = float(os.getenv('CACHE_LEASE_SECONDS', '35'))
+# Poll interval while waiting for another worker to fill a key
+LEASE_POLL_SECONDS = 0.1
+
+
+class MemoryCacheBackend:
+    def __init__(self):
+        self._entries = {}
+        self._leases = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def items(self, prefix=''):
+        now = time.time()
+        with self._lock:
+            return [(key, value, expires_at) for key, (value, expires_at) in self._entries.items()
+                    if key.startswith(prefix) and expires_at >= now]
+
+    def acquire_lease(self, key, owner, ttl=LEASE_SECONDS):
+        now = time.time()
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[1] >= now and lease[0] != owner:
+                return False
+            self._leases[key] = (owner, now + ttl)
+            return True
+
+    def release_lease(self, key, owner):
+        with self._lock:
+            lease = self._leases.get(key)
+            if lease is not None and lease[0] == owner:
+                del self._leases[key]
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (_, expires_at) in self._entries.items() if expires_at < now]:
+                del self._entries[key]
+            for key in [k for k, (_, expires_at) in self._leases.items() if expires_at < now]:
+                del self._leases[key]
+
+
+class SqliteCacheBackend:
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.execute("CREATE TABLE IF NOT EXISTS leases (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+        conn.commit()
+
+    def _connection(self):
+        # sqlite3 connections are not shareable across threads - one per executor thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key):
+        row = self._connection().execute(
+            "SELECT value FROM cache WHERE key = ? AND expires_at >= ?", (key, time.time())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, key, value, ttl):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO cache (key, value, expires_at) VALUES (?, ?, ?)",
+            (key, json.dumps(value), time.time() + ttl)
+        )
+
+    def delete(self, key):
+        self._connection().execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def items(self, prefix=''):
+        rows = self._connection().execute(
+            "SELECT key, value, expires_at FROM cache WHERE key >= ? AND key < ? AND expires_at >= ?",
+            (prefix, prefix + '\uffff', time.time())
+        ).fetchall()
+        return [(key, json.loads(value), expires_at) for key, value, expires_at in rows]
+
+    def acquire_lease(self, key, owner, ttl=LEASE_SECONDS):
+        now = time.time()
+        conn = self._connection()
+        # Take the lease if nobody holds it, it expired, or we already own it
+        cursor = conn.execute(
+            """
+            INSERT INTO leases (key, owner, expires_at) VALUES (?, ?, ?)
+            ON CONFLICT(key) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at
+            WHERE leases.expires_at < ? OR leases.owner = excluded.owner
+            """,
+            (key, owner, now + ttl, now)
+        )
+        return cursor.rowcount == 1
+
+    def release_lease(self, key, owner):
+        self._connection().execute("DELETE FROM leases WHERE key = ? AND owner = ?", (key, owner))
+
+    def purge_expired(self):
+        now = time.time()
+        conn = self._connection()
+        conn.execute("DELETE FROM cache WHERE expires_at < ?", (now,))
+        conn.execute("DELETE FROM leases WHERE expires_at < ?", (now,))
+
+
+def create_cache_backend(backend=None, path=None):
+    backend = backend or CACHE_BACKEND
+    if backend == 'sqlite':
+        print(f"[CACHE] Using shared SQLite cache at {path or CACHE_PATH}")
+        return SqliteCacheBackend(path or CACHE_PATH)
+    if backend != 'memory':
+        print(f"[CACHE] Unknown CACHE_BACKEND '{backend}' - falling back to memory")
+    return MemoryCacheBackend()
+
+
+class SharedCache:
+    """
+    Cache front-end with single-flight computation. Safe to call from
+    executor threads; waiting for another worker blocks only that thread.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._last_purge = 0.0
+
+    def get(self, key):
+        return self.backend.get(key)
+
+    def set(self, key, value, ttl):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def items(self, prefix=''):
+        return self.backend.items(prefix)
+
+    def get_or_compute(self, key, ttl, compute, wait_timeout=LEASE_SECONDS):
+        """
+        Return the cached value for key, or compute it once across all
+        workers: the lease holder runs compute(), everyone else waits for
+        the value to appear (or the lease to lapse) and reuses it.
+        """
+        value = self.backend.get(key)
+        if value is not None:
+            return value
+
+        owner = f"{self.owner}-{threading.get_ident()}"
+        deadline = time.time() + wait_timeout
+        while not self.backend.acquire_lease(key, owner):
+            time.sleep(LEASE_POLL_SECONDS)
+            value = self.backend.get(key)
+            if value is not None:
+                return value
+            if time.time() > deadline:
+                # Holder is stuck - compute ourselves rather than fail the tick
+                break
+
+        try:
+            # The previous holder may have filled the key just before we got the lease
+            value = self.backend.get(key)
+            if value is not None:
+                return value
+            value = compute()
+            self.backend.set(key, value, ttl)
+            return value
+        finally:
+            self.backend.release_lease(key, owner)
+            self._maybe_purge()
+
+    def _maybe_purge(self):
+        now = time.time()
+        if now - self._last_purge > 60:
+            self._last_purge = now
+            self.backend.purge_expired()
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = SharedCache(create_cache_backend())
+        return _shared_cache
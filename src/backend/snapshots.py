@@ -0,0 +1,279 @@
+"""
+Shift-close snapshot store.
+
+Looking back at "yesterday's night shift" used to recount the shift from raw
+rows and redo the break deductions every time. Here a job freezes every
+closed shift into a snapshot per unit and working mode: per-model counts and
+targets, operation time after the mode's breaks, theoretical quantity,
+quality and performance. Shift, day and week reports are then sums of
+snapshots - performance as total actual over total theoretical quantity,
+the same rollup /historical-hourly-data uses for its hours.
+
+A shift is frozen once it is closed (RANGE_CLOSED_GRACE_MINUTES after its
+end, like the range planner's chunks), with one multi-unit query per shift;
+working modes with the same shift starts share that query. Rows can still
+arrive later, so every SNAPSHOT_VERIFY_SECONDS the record counts of the
+shifts in the last SNAPSHOT_LOOKBACK_HOURS are compared with the snapshots
+and only the units and shifts that changed are recounted.
+
+Snapshots are kept in a SQLite file (SNAPSHOT_PATH) so they survive
+restarts and are shared by every worker on the host.
+"""
+
+import json
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from database import (TIMEZONE, build_model_results, calculate_break_time, get_multi_unit_model_counts,
+                      get_multi_unit_record_counts, get_production_units, run_db_query)
+from pyramid import bucket_floor, bucket_next, buckets
+from range_planner import WORKING_MODE_SHIFT_STARTS, chunk_is_closed, merge_counts
+
+SNAPSHOT_PATH = os.getenv('SNAPSHOT_PATH', os.path.join(tempfile.gettempdir(), 'dashboard-snapshots.sqlite3'))
+
+# Closed shifts this recent are frozen if missing and checked for late rows
+SNAPSHOT_LOOKBACK_HOURS = float(os.getenv('SNAPSHOT_LOOKBACK_HOURS', '48'))
+
+# How often the late-row check runs (the job itself runs every SNAPSHOT_JOB_SECONDS, see main.py)
+SNAPSHOT_VERIFY_SECONDS = float(os.getenv('SNAPSHOT_VERIFY_SECONDS', '600'))
+
+PERIODS = ('shift', 'day', 'week')
+
+
+class SnapshotStore:
+    def __init__(self, path=SNAPSHOT_PATH):
+        self.path = path
+        self._local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS shift_snapshots (
+                unit_name TEXT NOT NULL,
+                working_mode TEXT NOT NULL,
+                shift_start TEXT NOT NULL,
+                record_count INTEGER NOT NULL,
+                snapshot TEXT NOT NULL,
+                frozen_at REAL NOT NULL,
+                PRIMARY KEY (unit_name, working_mode, shift_start)
+            )
+        """)
+
+    def _connection(self):
+        # sqlite3 connections are not shareable across threads - one per thread
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put(self, snapshot):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO shift_snapshots (unit_name, working_mode, shift_start, record_count, snapshot, frozen_at) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (snapshot['unit_name'], snapshot['working_mode'], snapshot['shift_start'], snapshot['record_count'],
+             json.dumps(snapshot), snapshot['frozen_at'])
+        )
+
+    def get(self, unit_name, working_mode, shift_start):
+        row = self._connection().execute(
+            "SELECT snapshot FROM shift_snapshots WHERE unit_name = ? AND working_mode = ? AND shift_start = ?",
+            (unit_name, working_mode, shift_start.isoformat())
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_range(self, unit_name, working_mode, start_time, end_time):
+        """
+        {shift_start iso: snapshot} for the shifts starting in [start_time, end_time).
+        """
+        # Local times with the same fixed offset, so the ISO strings sort chronologically
+        rows = self._connection().execute(
+            "SELECT shift_start, snapshot FROM shift_snapshots "
+            "WHERE unit_name = ? AND working_mode = ? AND shift_start >= ? AND shift_start < ?",
+            (unit_name, working_mode, start_time.isoformat(), end_time.isoformat())
+        ).fetchall()
+        return {shift_start: json.loads(snapshot) for shift_start, snapshot in rows}
+
+    def unit_names(self):
+        return [row[0] for row in self._connection().execute("SELECT DISTINCT unit_name FROM shift_snapshots ORDER BY unit_name")]
+
+    def record_counts(self, working_mode, shift_start):
+        """
+        {unit_name: record_count} of the units frozen for this shift.
+        """
+        rows = self._connection().execute(
+            "SELECT unit_name, record_count FROM shift_snapshots WHERE working_mode = ? AND shift_start = ?",
+            (working_mode, shift_start.isoformat())
+        ).fetchall()
+        return dict(rows)
+
+
+def schedules():
+    """
+    Working modes grouped by shift starts: modes in one group share their shifts' counts.
+    """
+    groups = {}
+    for working_mode, starts in WORKING_MODE_SHIFT_STARTS.items():
+        groups.setdefault(tuple(starts), []).append(working_mode)
+    return list(groups.values())
+
+
+def _schedule_of(working_mode):
+    return next((modes for modes in schedules() if working_mode in modes), [working_mode])
+
+
+def build_snapshot(unit_name, working_mode, shift_start, shift_end, counts):
+    models = build_model_results(counts, shift_start, shift_end, working_mode)
+    success_qty = sum(model['success_qty'] for model in models)
+    fail_qty = sum(model['fail_qty'] for model in models)
+
+    operation_seconds = max((shift_end - shift_start).total_seconds() - calculate_break_time(shift_start, shift_end, working_mode), 0)
+
+    # Theoretical quantity from the production-weighted target rate (as in summarize_unit)
+    models_with_target = [model for model in models if model['target'] is not None and model['target'] > 0]
+    target_qty = sum(model['total_qty'] for model in models_with_target)
+    weighted_target_rate = sum(model['total_qty'] * model['target'] for model in models_with_target) / target_qty if target_qty > 0 else 0
+    theoretical_qty = (operation_seconds / 3600) * weighted_target_rate
+
+    return {
+        'unit_name': unit_name,
+        'working_mode': working_mode,
+        'shift_start': shift_start.isoformat(),
+        'shift_end': shift_end.isoformat(),
+        'counts': counts,
+        'models': models,
+        'success_qty': success_qty,
+        'fail_qty': fail_qty,
+        'total_qty': sum(model['total_qty'] for model in models),
+        'target_qty': target_qty,
+        'operation_seconds': operation_seconds,
+        'theoretical_qty': theoretical_qty,
+        'quality': success_qty / (success_qty + fail_qty) if (success_qty + fail_qty) > 0 else 0,
+        'performance': target_qty / theoretical_qty if theoretical_qty > 0 else 0,
+        'record_count': success_qty + fail_qty,
+        'frozen_at': time.time()
+    }
+
+
+def sum_snapshots(snapshots):
+    """
+    Totals over several snapshots; per-model counts are merged by (model, target).
+    """
+    success_qty = sum(snapshot['success_qty'] for snapshot in snapshots)
+    fail_qty = sum(snapshot['fail_qty'] for snapshot in snapshots)
+    target_qty = sum(snapshot['target_qty'] for snapshot in snapshots)
+    theoretical_qty = sum(snapshot['theoretical_qty'] for snapshot in snapshots)
+    return {
+        'success_qty': success_qty,
+        'fail_qty': fail_qty,
+        'total_qty': sum(snapshot['total_qty'] for snapshot in snapshots),
+        'operation_seconds': sum(snapshot['operation_seconds'] for snapshot in snapshots),
+        'theoretical_qty': theoretical_qty,
+        'quality': success_qty / (success_qty + fail_qty) if (success_qty + fail_qty) > 0 else 0,
+        'performance': target_qty / theoretical_qty if theoretical_qty > 0 else 0,
+        'models': [
+            {'model': model, 'success_qty': success, 'fail_qty': fail, 'total_qty': success + fail, 'target': target}
+            for model, success, fail, target in merge_counts(snapshot['counts'] for snapshot in snapshots)
+        ]
+    }
+
+
+def store_shift(unit_names, working_modes, shift_start, shift_end):
+    """
+    Count one shift for several units in one query and store a snapshot per unit and mode.
+    Blocking - from the event loop use freeze_shift.
+    """
+    counts = get_multi_unit_model_counts(unit_names, shift_start, shift_end, False)
+    for unit_name, rows in counts.items():
+        for working_mode in working_modes:
+            snapshot_store.put(build_snapshot(unit_name, working_mode, shift_start, shift_end, rows))
+    return counts
+
+
+async def freeze_shift(unit_names, working_modes, shift_start, shift_end):
+    return await run_db_query(store_shift, unit_names, working_modes, shift_start, shift_end,
+                              label=f"snapshot {len(unit_names)} units {shift_start:%m-%d %H:%M}")
+
+
+async def run_snapshot_job(current_time, verify=False):
+    """
+    Freeze every closed shift of the lookback window that has no snapshot yet;
+    with verify, also recount the units whose record count changed since.
+    Returns (snapshots frozen, snapshots recomputed), counted per unit and shift.
+    """
+    unit_names = await run_db_query(get_production_units, label='snapshot units')
+    frozen = recomputed = 0
+    for working_modes in schedules():
+        shifts = buckets(current_time - timedelta(hours=SNAPSHOT_LOOKBACK_HOURS), current_time, 'shift', working_modes[0])
+        for shift_start, shift_end in shifts:
+            if not chunk_is_closed(shift_end, current_time):
+                continue
+            stored = snapshot_store.record_counts(working_modes[0], shift_start)
+            missing = [unit_name for unit_name in unit_names if unit_name not in stored]
+            if missing:
+                await freeze_shift(missing, working_modes, shift_start, shift_end)
+                frozen += len(missing)
+
+            if verify and stored:
+                records = await run_db_query(get_multi_unit_record_counts, list(stored), shift_start, shift_end,
+                                             label=f"snapshot check {shift_start:%m-%d %H:%M}")
+                changed = [unit_name for unit_name, count in records.items() if count != stored[unit_name]]
+                if changed:
+                    print(f"[SNAPSHOT] Late rows in shift {shift_start:%m-%d %H:%M} ({'/'.join(working_modes)}) for {', '.join(changed)} - recomputing")
+                    await freeze_shift(changed, working_modes, shift_start, shift_end)
+                    recomputed += len(changed)
+    return frozen, recomputed
+
+
+def period_bounds(at, period, working_mode='mode1'):
+    """
+    (start, end) of the shift, production day or week (from Monday) containing `at`.
+    """
+    if period == 'shift':
+        start = bucket_floor(at, 'shift', working_mode)
+        return start, bucket_next(start, 'shift', working_mode)
+    start = bucket_floor(at, 'day')
+    days = 1
+    if period == 'week':
+        start = TIMEZONE.localize(start.replace(tzinfo=None) - timedelta(days=start.weekday()))
+        days = 7
+    return start, TIMEZONE.localize(start.replace(tzinfo=None) + timedelta(days=days))
+
+
+async def get_snapshot_report(unit_name, at, period, current_time, working_mode='mode1'):
+    """
+    Shift / day / week report for one unit summed from snapshots. A day holds
+    the shifts that start on it; closed shifts without a snapshot (from before
+    the job ran) are frozen on the way; started shifts not closed yet are listed as pending.
+    """
+    period_start, period_end = period_bounds(at, period, working_mode)
+    shifts = [(shift_start, shift_end) for shift_start, shift_end in buckets(period_start, period_end, 'shift', working_mode)
+              if shift_start >= period_start]
+
+    snapshots = snapshot_store.get_range(unit_name, working_mode, period_start, period_end)
+    missing = [(shift_start, shift_end) for shift_start, shift_end in shifts
+               if shift_start.isoformat() not in snapshots and chunk_is_closed(shift_end, current_time)]
+    for shift_start, shift_end in missing:
+        await freeze_shift([unit_name], _schedule_of(working_mode), shift_start, shift_end)
+    if missing:
+        snapshots = snapshot_store.get_range(unit_name, working_mode, period_start, period_end)
+
+    included = [snapshots[shift_start.isoformat()] for shift_start, _ in shifts if shift_start.isoformat() in snapshots]
+    return {
+        'unit_name': unit_name,
+        'working_mode': working_mode,
+        'period': period,
+        'start': period_start.isoformat(),
+        'end': period_end.isoformat(),
+        'shifts': [{key: value for key, value in snapshot.items() if key not in ('counts', 'models')} for snapshot in included],
+        'pending_shifts': [shift_start.isoformat() for shift_start, _ in shifts
+                           if shift_start.isoformat() not in snapshots and shift_start <= current_time],
+        'summary': sum_snapshots(included)
+    }
+
+
+snapshot_store = SnapshotStore()
@@ -0,0 +1,187 @@
+"""
+Server-Sent Events transport for the read-only live displays.
+
+/sse/{unit} and /sse/hourly/{unit} push the same payloads as /ws/{unit} and
+/ws/hourly/{unit}, but the server drives the ticks: a display opens one
+long-lived GET with its shift start and working mode and never sends
+anything again. That removes the per-socket request/heartbeat traffic and
+lets proxies and TV browsers treat the subscription as a plain HTTP
+response.
+
+- fan-out: every subscription to the same (payload type, unit, shift start,
+  working mode, wire format) shares one topic, which builds and serialises
+  the payload once per LIVE_TICK_SECONDS for all of its subscribers. A slow
+  subscriber only ever gets the newest frame.
+- keepalive: a comment line every SSE_KEEPALIVE_SECONDS keeps idle
+  connections open through proxies; `retry:` sets the browser's reconnect delay.
+- resume: events carry `id: <topic epoch>-<seq>`. A reconnect with a
+  Last-Event-ID equal to the topic's latest frame waits for the next one
+  instead of receiving a duplicate; anything else gets the latest frame at once.
+- compression: with Accept-Encoding: gzip the stream is gzip-encoded and
+  flushed (Z_SYNC_FLUSH) after every event so nothing is held back.
+"""
+
+import asyncio
+import os
+import uuid
+import zlib
+from datetime import datetime
+
+from fastapi.responses import StreamingResponse
+
+from alerts import alert_engine
+from database import TIMEZONE
+from resilience import live_resilience
+from tracing import span, trace
+from wire_format import serialize_payload
+
+# Seconds between keepalive comments on an idle stream
+SSE_KEEPALIVE_SECONDS = float(os.getenv('SSE_KEEPALIVE_SECONDS', '15'))
+
+# Browser reconnect delay sent in the `retry:` field
+SSE_RETRY_MS = int(os.getenv('SSE_RETRY_MS', '5000'))
+
+
+class Subscriber:
+    def __init__(self):
+        self.event = None
+        self.ready = asyncio.Event()
+
+    def deliver(self, event):
+        # Latest frame wins - an undelivered older frame is simply replaced
+        self.event = event
+        self.ready.set()
+
+    async def next_event(self):
+        await self.ready.wait()
+        self.ready.clear()
+        return self.event
+
+
+class Topic:
+    def __init__(self, hub, key, kind, builder, unit_name, start_time, working_mode, wire_format, tick_seconds):
+        self.hub = hub
+        self.key = key
+        self.kind = kind
+        self.builder = builder
+        self.unit_name = unit_name
+        self.start_time = start_time
+        self.working_mode = working_mode
+        self.wire_format = wire_format
+        self.tick_seconds = tick_seconds
+        # Changes on every new topic, so ids from another worker or an earlier topic never match
+        self.epoch = uuid.uuid4().hex[:8]
+        self.sequence = 0
+        self.latest = None
+        self.subscribers = set()
+        self.task = None
+
+    def subscribe(self, last_event_id=None):
+        subscriber = Subscriber()
+        self.subscribers.add(subscriber)
+        if self.latest is not None and self.latest[0] != last_event_id:
+            subscriber.deliver(self.latest)
+        if self.task is None:
+            self.task = asyncio.create_task(self._produce())
+        return subscriber
+
+    def unsubscribe(self, subscriber):
+        self.subscribers.discard(subscriber)
+        if not self.subscribers:
+            if self.task is not None:
+                self.task.cancel()
+            self.hub.topics.pop(self.key, None)
+            print(f"[SSE] Topic closed: {self.kind} {self.unit_name} ({self.sequence} events)")
+
+    def publish(self, data):
+        self.sequence += 1
+        self.latest = (f"{self.epoch}-{self.sequence}", data)
+        for subscriber in self.subscribers:
+            subscriber.deliver(self.latest)
+
+    async def _produce(self):
+        while self.subscribers:
+            # One trace per topic tick, shared by all of its subscribers
+            with trace(f"sse.{self.kind}.tick", unit=self.unit_name, start_time=self.start_time.isoformat(),
+                       working_mode=self.working_mode, subscribers=len(self.subscribers)):
+                current_time = datetime.now(TIMEZONE)
+                try:
+                    # Live view: the range always ends now, like the WebSocket clients' requests
+                    payload = await live_resilience.serve(self.kind, self.builder, self.unit_name, self.start_time,
+                                                          current_time, current_time, self.working_mode)
+                    if self.kind == 'standard' and not payload.get('stale'):
+                        alert_engine.observe(self.unit_name, payload['summary'], self.start_time, current_time, self.working_mode)
+                    with span('encode', format=self.wire_format):
+                        frame = serialize_payload(payload, self.wire_format)
+                    self.publish(frame)
+                except asyncio.CancelledError:
+                    raise
+                except asyncio.TimeoutError:
+                    print(f"[SSE ERROR] Database query timeout for {self.unit_name}")
+                    self.publish(serialize_payload({"error": "Database query timeout - try a smaller time range"}, self.wire_format))
+                except Exception as e:
+                    print(f"[SSE ERROR] {self.kind} payload failed for {self.unit_name}: {str(e)}")
+                    self.publish(serialize_payload({"error": str(e)}, self.wire_format))
+            await asyncio.sleep(self.tick_seconds)
+
+
+class SSEHub:
+    def __init__(self):
+        self.topics = {}
+
+    def topic(self, kind, builder, unit_name, start_time, working_mode, wire_format, tick_seconds):
+        key = (kind, unit_name, start_time.isoformat(), working_mode, wire_format)
+        if key not in self.topics:
+            self.topics[key] = Topic(self, key, kind, builder, unit_name, start_time, working_mode, wire_format, tick_seconds)
+            print(f"[SSE] Topic opened: {kind} {unit_name} from {start_time} ({len(self.topics)} topics)")
+        return self.topics[key]
+
+    def subscriber_count(self):
+        return sum(len(topic.subscribers) for topic in self.topics.values())
+
+
+sse_hub = SSEHub()
+
+
+def sse_response(request, kind, builder, unit_name, start_time, working_mode, wire_format, tick_seconds):
+    """
+    Stream the matching topic to one client as text/event-stream,
+    gzip-encoded when accepted.
+    """
+    last_event_id = request.headers.get('last-event-id')
+    use_gzip = 'gzip' in request.headers.get('accept-encoding', '').lower()
+    # wbits=31: gzip container
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if use_gzip else None
+
+    def encode(text):
+        data = text.encode('utf-8')
+        if compressor is None:
+            return data
+        return compressor.compress(data) + compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    async def event_stream():
+        # Joined only once the response is streaming, so a client that never gets this far leaves no topic behind
+        topic = sse_hub.topic(kind, builder, unit_name, start_time, working_mode, wire_format, tick_seconds)
+        subscriber = topic.subscribe(last_event_id)
+        print(f"[SSE] {topic.kind} {topic.unit_name}: subscriber joined ({sse_hub.subscriber_count()} total)")
+        try:
+            yield encode(f"retry: {SSE_RETRY_MS}\n\n")
+            while True:
+                try:
+                    event_id, data = await asyncio.wait_for(subscriber.next_event(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield encode(": keepalive\n\n")
+                    continue
+                yield encode(f"id: {event_id}\ndata: {data}\n\n")
+        finally:
+            topic.unsubscribe(subscriber)
+
+    headers = {
+        'Cache-Control': 'no-cache',
+        # Keep reverse proxies from buffering the stream
+        'X-Accel-Buffering': 'no',
+        'Vary': 'Accept-Encoding'
+    }
+    if use_gzip:
+        headers['Content-Encoding'] = 'gzip'
+    return StreamingResponse(event_stream(), media_type='text/event-stream', headers=headers)
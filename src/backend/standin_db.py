@@ -0,0 +1,188 @@
+"""
+Local SQLite stand-in for ProductRecordLogView.
+
+Used by the load-test harness (loadtest.py) and for running the app without
+SQL Server: set DB_BACKEND=sqlite and database.get_db_connection() returns a
+connection to this file instead of opening an ODBC connection.
+
+The table has the same name and columns as the view, so the app's queries
+run unchanged. A background generator appends synthetic rows at a
+configurable rate per unit to mimic live production, and every SELECT is
+counted so the harness can report DB queries/sec.
+"""
+
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytz
+
+TIMEZONE = pytz.timezone('Europe/Istanbul')
+
+STANDIN_DB_PATH = os.getenv('STANDIN_DB_PATH', os.path.join(tempfile.gettempdir(), 'dashboard-standin.sqlite3'))
+STANDIN_UNITS = int(os.getenv('STANDIN_UNITS', '8'))
+STANDIN_MODELS_PER_UNIT = int(os.getenv('STANDIN_MODELS_PER_UNIT', '4'))
+# Synthetic production rate per unit, in rows per minute
+STANDIN_ROWS_PER_MINUTE = float(os.getenv('STANDIN_ROWS_PER_MINUTE', '6'))
+# How much history to seed when the file is created
+STANDIN_HISTORY_HOURS = int(os.getenv('STANDIN_HISTORY_HOURS', '48'))
+# Share of rows that pass the test (TestSonucu = 1)
+STANDIN_SUCCESS_RATE = 0.97
+
+TABLE_NAME = 'ProductRecordLogView'
+
+
+def _adapt_datetime(value):
+    # Stored as naive local (GMT+3) time, like the SQL Server datetime column
+    if value.tzinfo is not None:
+        value = value.astimezone(TIMEZONE).replace(tzinfo=None)
+    return value.isoformat(sep=' ', timespec='microseconds')
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+
+
+class QueryCounter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def record(self, statement):
+        if statement.lstrip().upper().startswith('SELECT'):
+            with self._lock:
+                self.count += 1
+
+    def reset(self):
+        with self._lock:
+            self.count = 0
+
+
+query_counter = QueryCounter()
+
+
+def unit_names(units=None):
+    return [f"Standin {i + 1:02d}" for i in range(units or STANDIN_UNITS)]
+
+
+def _unit_models(unit_name, models_per_unit):
+    # Deterministic per unit so repeated runs see the same catalog and targets
+    rng = random.Random(unit_name)
+    return [(f"{unit_name.split()[-1]}-M{m + 1}", rng.choice([60, 90, 120, 150, 180])) for m in range(models_per_unit)]
+
+
+def connect_standin(path=None):
+    """
+    Connection factory used by database.get_db_connection() when DB_BACKEND=sqlite.
+    """
+    conn = sqlite3.connect(path or STANDIN_DB_PATH, timeout=10.0, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.set_trace_callback(query_counter.record)
+    return conn
+
+
+def _row_batch(unit_name, models, start, end, rows_per_minute, rng):
+    rows = []
+    if rows_per_minute <= 0 or end <= start:
+        return rows
+    interval = 60.0 / rows_per_minute
+    timestamp = start + timedelta(seconds=rng.uniform(0, interval))
+    while timestamp < end:
+        model, target = rng.choice(models)
+        rows.append((unit_name, timestamp, model, target, 1 if rng.random() < STANDIN_SUCCESS_RATE else 0))
+        timestamp += timedelta(seconds=rng.expovariate(1.0 / interval))
+    return rows
+
+
+def create_standin(path=None, units=None, models_per_unit=STANDIN_MODELS_PER_UNIT,
+                   rows_per_minute=STANDIN_ROWS_PER_MINUTE, history_hours=STANDIN_HISTORY_HOURS, reset=False):
+    """
+    Create the stand-in table and seed it with `history_hours` of rows up to now.
+    """
+    path = path or STANDIN_DB_PATH
+    if reset and os.path.exists(path):
+        for suffix in ('', '-wal', '-shm'):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(f"""
+        CREATE TABLE IF NOT EXISTS {TABLE_NAME} (
+            UnitName TEXT NOT NULL,
+            KayitTarihi TEXT NOT NULL,
+            Model TEXT NOT NULL,
+            ModelSuresiSN REAL,
+            TestSonucu INTEGER NOT NULL
+        )
+    """)
+    conn.execute(f"CREATE INDEX IF NOT EXISTS IX_standin_unit_time ON {TABLE_NAME} (UnitName, KayitTarihi)")
+    existing = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+    if existing == 0:
+        now = datetime.now(TIMEZONE)
+        rng = random.Random(42)
+        for unit_name in unit_names(units):
+            rows = _row_batch(unit_name, _unit_models(unit_name, models_per_unit),
+                              now - timedelta(hours=history_hours), now, rows_per_minute, rng)
+            conn.executemany(f"INSERT INTO {TABLE_NAME} VALUES (?, ?, ?, ?, ?)", rows)
+        conn.commit()
+        existing = conn.execute(f"SELECT COUNT(*) FROM {TABLE_NAME}").fetchone()[0]
+        print(f"[STANDIN] Seeded {existing} rows for {len(unit_names(units))} units into {path}")
+    conn.close()
+    return existing
+
+
+class RowGenerator:
+    """
+    Background thread appending live rows for every unit at the configured rate.
+    """
+
+    def __init__(self, path=None, units=None, models_per_unit=STANDIN_MODELS_PER_UNIT,
+                 rows_per_minute=STANDIN_ROWS_PER_MINUTE, interval=1.0):
+        self.path = path or STANDIN_DB_PATH
+        self.units = unit_names(units)
+        self.models = {unit: _unit_models(unit, models_per_unit) for unit in self.units}
+        self.rows_per_minute = rows_per_minute
+        self.interval = interval
+        self.rows_written = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='standin-generator', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join(timeout=5)
+
+    def _run(self):
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        rng = random.Random()
+        last = datetime.now(TIMEZONE)
+        while not self._stop.wait(self.interval):
+            now = datetime.now(TIMEZONE)
+            rows = []
+            for unit in self.units:
+                rows.extend(_row_batch(unit, self.models[unit], last, now, self.rows_per_minute, rng))
+            if rows:
+                conn.executemany(f"INSERT INTO {TABLE_NAME} VALUES (?, ?, ?, ?, ?)", rows)
+                conn.commit()
+                self.rows_written += len(rows)
+            last = now
+        conn.close()
+
+
+if __name__ == '__main__':
+    # Seed the stand-in so the app can be started with DB_BACKEND=sqlite
+    create_standin(reset=True)
+    print(f"[STANDIN] Writing live rows every second ({STANDIN_ROWS_PER_MINUTE}/min per unit), Ctrl+C to stop")
+    generator = RowGenerator().start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        generator.stop()
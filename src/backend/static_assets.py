@@ -0,0 +1,195 @@
+"""
+In-memory static asset pipeline for the frontend files.
+
+Every page and script is read once, fingerprinted with a content hash and
+pre-compressed (gzip always, brotli when the optional `brotli` package is
+installed). Fingerprinted URLs (/assets/hourly.3f2a1b9c.js) are served with
+immutable cache headers; HTML pages are served with `no-cache` + ETag so a
+TV reload costs a 304, and their script tags are rewritten to the
+fingerprinted URLs so scripts are only refetched when they change.
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # brotli is optional - gzip is always available
+    brotli = None
+
+# File types picked up from the frontend directory
+ASSET_EXTENSIONS = ('.html', '.js', '.css')
+
+# URL prefix for fingerprinted assets
+ASSET_URL_PREFIX = '/assets'
+
+# Length of the content hash embedded in fingerprinted names
+FINGERPRINT_LENGTH = 10
+
+# Bodies smaller than this are not worth compressing
+MIN_COMPRESS_SIZE = 512
+
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+REVALIDATE_CACHE_CONTROL = 'no-cache'
+
+# Re-stat files on every request (development only - production serves from memory)
+STATIC_ASSET_RELOAD = os.getenv('STATIC_ASSET_RELOAD', '0') == '1'
+
+# Matches src="..." / href="..." references to local scripts and stylesheets in HTML
+ASSET_REFERENCE_PATTERN = re.compile(r'(src|href)="/?([\w\-.]+\.(?:js|css))"')
+
+
+class StaticAsset:
+    def __init__(self, name, path, body, media_type, mtime):
+        self.name = name
+        self.path = path
+        self.media_type = media_type
+        self.mtime = mtime
+        self.set_body(body)
+
+    def set_body(self, body):
+        self.body = body
+        self.digest = hashlib.sha256(body).hexdigest()[:FINGERPRINT_LENGTH]
+        self.etag = f'"{self.digest}"'
+
+        # Pre-build compressed variants once instead of per request
+        self.variants = {}
+        if len(body) >= MIN_COMPRESS_SIZE:
+            self.variants['gzip'] = gzip.compress(body, compresslevel=9, mtime=0)
+            if brotli is not None:
+                self.variants['br'] = brotli.compress(body)
+
+    @property
+    def fingerprinted_name(self):
+        base, ext = os.path.splitext(self.name)
+        return f"{base}.{self.digest}{ext}"
+
+    @property
+    def url(self):
+        return f"{ASSET_URL_PREFIX}/{self.fingerprinted_name}"
+
+
+def _accepted_encodings(request):
+    header = request.headers.get('accept-encoding', '')
+    accepted = set()
+    for part in header.split(','):
+        token, _, params = part.strip().partition(';')
+        if not token:
+            continue
+        if params.strip().replace(' ', '') in ('q=0', 'q=0.0'):
+            continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+class StaticAssetCache:
+    def __init__(self, root_dir, reload=STATIC_ASSET_RELOAD):
+        self.root_dir = root_dir
+        self.reload = reload
+        self.assets = {}
+
+    def load(self):
+        """
+        Read all frontend assets into memory. Scripts are loaded before HTML
+        so page references can be rewritten to fingerprinted URLs.
+        """
+        self.assets = {}
+        names = [
+            name for name in os.listdir(self.root_dir)
+            if name.endswith(ASSET_EXTENSIONS) and os.path.isfile(os.path.join(self.root_dir, name))
+        ]
+        for name in sorted(names, key=lambda n: (n.endswith('.html'), n)):
+            self._load_file(name)
+        print(f"[STATIC] Loaded {len(self.assets)} assets from {self.root_dir} (brotli: {'yes' if brotli else 'no'})")
+
+    def _read_body(self, name, path):
+        with open(path, 'rb') as f:
+            body = f.read()
+        if name.endswith('.html'):
+            body = self._rewrite_references(body.decode('utf-8')).encode('utf-8')
+        return body
+
+    def _load_file(self, name):
+        path = os.path.join(self.root_dir, name)
+        media_type = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+        if name.endswith('.js'):
+            media_type = 'application/javascript'
+        asset = StaticAsset(name, path, self._read_body(name, path), media_type, os.path.getmtime(path))
+        self.assets[name] = asset
+        return asset
+
+    def _rewrite_references(self, html):
+        def replace(match):
+            asset = self.assets.get(match.group(2))
+            if asset is None:
+                return match.group(0)
+            return f'{match.group(1)}="{asset.url}"'
+        return ASSET_REFERENCE_PATTERN.sub(replace, html)
+
+    def _refresh_if_changed(self, asset):
+        try:
+            mtime = os.path.getmtime(asset.path)
+        except OSError:
+            return asset
+        if mtime != asset.mtime:
+            asset = self._load_file(asset.name)
+            # Pages embed script fingerprints, so re-render them after any change
+            for other in list(self.assets.values()):
+                if other.name.endswith('.html') and other is not asset:
+                    other.set_body(self._read_body(other.name, other.path))
+        return asset
+
+    def get(self, name):
+        asset = self.assets.get(name)
+        if asset is not None and self.reload:
+            asset = self._refresh_if_changed(asset)
+        return asset
+
+    def resolve_fingerprinted(self, asset_path):
+        """
+        Map 'hourly.3f2a1b9c.js' to (asset, is_current_fingerprint).
+        """
+        base, ext = os.path.splitext(asset_path)
+        name_part, _, digest = base.rpartition('.')
+        if not name_part:
+            return None, False
+        asset = self.get(f"{name_part}{ext}")
+        if asset is None:
+            return None, False
+        return asset, digest == asset.digest
+
+    def response(self, request: Request, asset, immutable=False):
+        """
+        Build the response for an asset, negotiating the pre-built encoding
+        and answering conditional requests with 304.
+        """
+        headers = {
+            'Cache-Control': IMMUTABLE_CACHE_CONTROL if immutable else REVALIDATE_CACHE_CONTROL,
+            'Vary': 'Accept-Encoding',
+        }
+
+        body = asset.body
+        encoding = None
+        accepted = _accepted_encodings(request)
+        for candidate in ('br', 'gzip'):
+            if candidate in asset.variants and candidate in accepted:
+                encoding = candidate
+                body = asset.variants[candidate]
+                headers['Content-Encoding'] = candidate
+                break
+
+        # Each encoded representation gets its own entity tag
+        headers['ETag'] = f'"{asset.digest}-{encoding}"' if encoding else asset.etag
+
+        if_none_match = request.headers.get('if-none-match', '')
+        for tag in if_none_match.split(','):
+            if tag.strip().removeprefix('W/').strip('"').split('-')[0] == asset.digest:
+                return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type=asset.media_type, headers=headers)
@@ -0,0 +1,398 @@
+"""
+Span-based tracing for live ticks and REST requests.
+
+Every WebSocket/SSE tick and every HTTP request is one trace; the work inside
+it is recorded as nested spans (db.call, db.connect, db.query, hourly.hours,
+encode, send.enqueue) with attributes such as unit, range length and row
+counts. Very frequent small calls (calculate_break_time)
+are summed into per-trace phase totals instead of getting a span each.
+
+The current span lives in a contextvar, so spans opened in executor threads
+nest correctly as long as the call was started with a copied context
+(database.run_db_query does this).
+
+Finished traces go to:
+- TRACE_FILE: one JSON line per trace
+- TRACE_OTLP_ENDPOINT: OTLP/HTTP JSON (POST {endpoint}/v1/traces), sent from
+  a background thread; `python tracing.py --collector` runs a minimal
+  stand-in collector that appends what it receives to a file
+- the slow-request log: traces longer than TRACE_SLOW_MS are printed with
+  their parameters and phase breakdown, and appended to TRACE_SLOW_FILE if set
+  (an SSE subscription counts as slow only when its first chunk is)
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import queue
+import threading
+import time
+import uuid
+import urllib.request
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+TRACE_FILE = os.getenv('TRACE_FILE')
+TRACE_OTLP_ENDPOINT = os.getenv('TRACE_OTLP_ENDPOINT')
+TRACE_SLOW_MS = float(os.getenv('TRACE_SLOW_MS', '1000'))
+TRACE_SLOW_FILE = os.getenv('TRACE_SLOW_FILE')
+TRACE_SERVICE_NAME = os.getenv('TRACE_SERVICE_NAME', 'production-dashboard')
+
+# Static files are not worth a trace each
+UNTRACED_SUFFIXES = ('.js', '.css', '.html', '.ico', '.png', '.svg', '.map')
+
+# Open-ended responses (SSE subscriptions): their duration is how long the client stayed, so
+# the slow-request log times them to the first body chunk instead. Finite streams (NDJSON
+# exports) write a line before any query runs and are timed to completion like any response.
+STREAMING_CONTENT_TYPES = ('text/event-stream',)
+
+_current_span = contextvars.ContextVar('current_span', default=None)
+_file_lock = threading.Lock()
+
+
+class Span:
+    def __init__(self, trace, name, parent, attrs):
+        self.trace = trace
+        self.name = name
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attrs = dict(attrs)
+        self.start_ns = time.time_ns()
+        self.start = time.perf_counter()
+        self.duration = None
+        self.error = None
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+
+class Trace:
+    def __init__(self, name, attrs):
+        self.trace_id = uuid.uuid4().hex
+        self.spans = []
+        # phase name -> [seconds, calls]
+        self.phases = {}
+        self.closed = False
+        self.root = Span(self, name, None, attrs)
+
+    def add_phase(self, name, seconds):
+        totals = self.phases.setdefault(name, [0.0, 0])
+        totals[0] += seconds
+        totals[1] += 1
+
+
+class _NullSpan:
+    def set(self, **attrs):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class trace:
+    """
+    Start a new trace (context manager). Used once per tick or request;
+    everything opened with span() inside it is recorded under it.
+    """
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.trace = Trace(self.name, self.attrs)
+        self.token = _current_span.set(self.trace.root)
+        return self.trace.root
+
+    def __exit__(self, exc_type, exc, tb):
+        root = self.trace.root
+        root.duration = time.perf_counter() - root.start
+        if exc is not None:
+            root.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.trace.closed = True
+        export(self.trace)
+        return False
+
+
+class span:
+    """
+    Record a child span of the current span (context manager). A no-op
+    outside a trace, or once the trace has been exported.
+    """
+
+    def __init__(self, name, **attrs):
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None or parent.trace.closed:
+            self.span = None
+            return _NULL_SPAN
+        self.span = Span(parent.trace, self.name, parent, self.attrs)
+        self.token = _current_span.set(self.span)
+        return self.span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.span is None:
+            return False
+        self.span.duration = time.perf_counter() - self.span.start
+        if exc is not None:
+            self.span.error = f"{exc_type.__name__}: {exc}"
+        _current_span.reset(self.token)
+        self.span.trace.spans.append(self.span)
+        return False
+
+
+def annotate(**attrs):
+    """
+    Add attributes (unit, range_hours, ...) to the current trace's root span.
+    """
+    current = _current_span.get()
+    if current is not None and not current.trace.closed:
+        current.trace.root.attrs.update(attrs)
+
+
+def phase(name):
+    """
+    Decorator: add the call's duration to the current trace's phase totals.
+    """
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            current = _current_span.get()
+            if current is None:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                current.trace.add_phase(name, time.perf_counter() - started)
+        return wrapper
+    return decorator
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def trace_record(finished):
+    root = finished.root
+    return {
+        'trace_id': finished.trace_id,
+        'name': root.name,
+        'start': datetime.fromtimestamp(root.start_ns / 1e9, timezone.utc).isoformat(),
+        'duration_ms': _ms(root.duration),
+        'attrs': root.attrs,
+        'error': root.error,
+        'rows': sum(s.attrs.get('rows', 0) for s in finished.spans),
+        'phases': {name: {'ms': _ms(total), 'calls': calls} for name, (total, calls) in finished.phases.items()},
+        'spans': [{
+            'name': s.name,
+            'span_id': s.span_id,
+            'parent_id': s.parent_id,
+            'offset_ms': _ms(s.start - root.start),
+            'duration_ms': _ms(s.duration),
+            'attrs': s.attrs,
+            'error': s.error
+        } for s in finished.spans]
+    }
+
+
+def _append_line(path, record):
+    with _file_lock:
+        with open(path, 'a') as f:
+            f.write(json.dumps(record, default=str) + '\n')
+
+
+def _slow_ms(finished):
+    # A stream is slow when its first chunk is; one without any body never was
+    root = finished.root
+    if root.attrs.get('streaming'):
+        return root.attrs.get('first_chunk_ms') or 0.0
+    return root.duration * 1000
+
+
+def export(finished):
+    slow = _slow_ms(finished) >= TRACE_SLOW_MS
+    if not (TRACE_FILE or TRACE_OTLP_ENDPOINT or slow):
+        return
+    record = trace_record(finished)
+
+    if TRACE_FILE:
+        _append_line(TRACE_FILE, record)
+    if TRACE_OTLP_ENDPOINT:
+        _otlp_exporter.submit(finished)
+
+    if slow:
+        breakdown = ', '.join(f"{s['name']}={s['duration_ms']}ms" for s in record['spans'] if s['parent_id'] == finished.root.span_id)
+        phases = ', '.join(f"{name}={p['ms']}ms/{p['calls']}" for name, p in record['phases'].items())
+        print(f"[SLOW] {record['name']} took {record['duration_ms']}ms {record['attrs']} rows={record['rows']} | {breakdown} | {phases}")
+        if TRACE_SLOW_FILE:
+            _append_line(TRACE_SLOW_FILE, record)
+
+
+def _otlp_value(value):
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+def _otlp_span(finished, s):
+    attrs = dict(s.attrs)
+    if s is finished.root:
+        attrs.update({f"phase.{name}.ms": _ms(total) for name, (total, _) in finished.phases.items()})
+    result = {
+        'traceId': finished.trace_id,
+        'spanId': s.span_id,
+        'name': s.name,
+        'kind': 2 if s is finished.root else 1,  # SERVER / INTERNAL
+        'startTimeUnixNano': str(s.start_ns),
+        'endTimeUnixNano': str(s.start_ns + int((s.duration or 0) * 1e9)),
+        'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in attrs.items() if value is not None],
+        'status': {'code': 2, 'message': s.error} if s.error else {'code': 1}
+    }
+    if s.parent_id:
+        result['parentSpanId'] = s.parent_id
+    return result
+
+
+class OtlpExporter:
+    """
+    Batches finished traces and POSTs them as OTLP/HTTP JSON from a daemon
+    thread, so a slow or missing collector never holds up a tick.
+    """
+
+    def __init__(self, endpoint, max_queue=1000, batch_size=50):
+        self.url = endpoint.rstrip('/') + '/v1/traces'
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.thread = None
+
+    def submit(self, finished):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name='otlp-exporter', daemon=True)
+            self.thread.start()
+        try:
+            self.queue.put_nowait(finished)
+        except queue.Full:
+            self.dropped += 1
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            body = {
+                'resourceSpans': [{
+                    'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': TRACE_SERVICE_NAME}}]},
+                    'scopeSpans': [{
+                        'scope': {'name': 'dashboard.tracing'},
+                        'spans': [_otlp_span(t, s) for t in batch for s in [t.root] + t.spans]
+                    }]
+                }]
+            }
+            request = urllib.request.Request(self.url, data=json.dumps(body).encode('utf-8'),
+                                             headers={'Content-Type': 'application/json'}, method='POST')
+            try:
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                print(f"[TRACE] OTLP export of {len(batch)} traces to {self.url} failed: {str(e)}")
+
+
+_otlp_exporter = OtlpExporter(TRACE_OTLP_ENDPOINT) if TRACE_OTLP_ENDPOINT else None
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware: one trace per HTTP request (method, path, query, status).
+    The trace ends with the last body chunk, so streamed responses are timed
+    to completion; SSE streams are marked `streaming` and judged slow by
+    their first chunk (first_chunk_ms). Traces are named after the
+    matched route template (/historical-data/{unit_name}), not the path.
+    WebSocket ticks are traced in their handlers instead.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = {}
+
+    def route_template(self, scope):
+        # The router puts the matched endpoint into the (shared) scope; map it back to its path template
+        endpoint = scope.get('endpoint')
+        if endpoint is None:
+            return '(unmatched)'
+        if endpoint not in self._templates:
+            self._templates[endpoint] = next((route.path for route in getattr(scope.get('app'), 'routes', ())
+                                              if getattr(route, 'endpoint', None) is endpoint), scope['path'])
+        return self._templates[endpoint]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http' or scope['path'].endswith(UNTRACED_SUFFIXES):
+            await self.app(scope, receive, send)
+            return
+
+        query = scope.get('query_string', b'').decode('latin-1')
+        with trace(f"http {scope['method']}", path=scope['path'], query=query) as root:
+            async def traced_send(message):
+                if message['type'] == 'http.response.start':
+                    root.set(status=message['status'])
+                    content_type = dict(message.get('headers', [])).get(b'content-type', b'').decode('latin-1')
+                    if content_type.startswith(STREAMING_CONTENT_TYPES):
+                        root.set(streaming=True)
+                elif message['type'] == 'http.response.body' and 'first_chunk_ms' not in root.attrs:
+                    root.set(first_chunk_ms=_ms(time.perf_counter() - root.start))
+                await send(message)
+
+            try:
+                await self.app(scope, receive, traced_send)
+            finally:
+                root.name = f"http {scope['method']} {self.route_template(scope)}"
+
+
+def run_collector(port, path):
+    """
+    Minimal OTLP/HTTP JSON collector stand-in: accepts POST /v1/traces and
+    appends one line per received span to `path`.
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+            count = 0
+            try:
+                for resource in json.loads(body).get('resourceSpans', []):
+                    for scope_spans in resource.get('scopeSpans', []):
+                        for s in scope_spans.get('spans', []):
+                            _append_line(path, s)
+                            count += 1
+                self.send_response(200)
+            except ValueError:
+                self.send_response(400)
+            self.end_headers()
+            print(f"[COLLECTOR] {self.path}: {count} spans")
+
+        def log_message(self, format, *args):
+            pass
+
+    print(f"[COLLECTOR] Listening on http://127.0.0.1:{port}/v1/traces, writing to {path}")
+    HTTPServer(('127.0.0.1', port), Handler).serve_forever()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Tracing utilities")
+    parser.add_argument('--collector', action='store_true', help="Run the OTLP collector stand-in")
+    parser.add_argument('--port', type=int, default=4318)
+    parser.add_argument('--output', default='otlp-spans.jsonl')
+    args = parser.parse_args()
+    if args.collector:
+        run_collector(args.port, args.output)
+    else:
+        parser.print_help()
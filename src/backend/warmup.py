@@ -0,0 +1,208 @@
+"""
+Warm start after a restart or deploy.
+
+A fresh worker has an empty cache, and every screen reconnecting at once
+would ask for its unit's full shift at the same moment. Two things avoid
+that burst:
+
+- Cache snapshots: the long-lived cache entries (closed hours and chunks,
+  pyramid pages, the unit catalog, last good live payloads, baselines) are
+  written to WARM_CACHE_PATH every WARM_SNAPSHOT_SECONDS and on shutdown, and
+  loaded back - with their remaining TTL - at startup. Entries that expired
+  while the server was down are skipped.
+- Prefetch: at startup the unit catalog is loaded and the current shift's
+  standard and hourly payloads are built for every unit (WARMUP_CONCURRENCY
+  at a time). They go through the same cache keys and single-flight leases
+  the sockets use, so a screen that connects mid warm-up waits for the
+  prefetch instead of querying again.
+
+One worker per host prefetches, under the 'warmup' lease. The others are
+'waiting' until the holder writes WARMUP_DONE_KEY to the shared cache and
+then take its status; if the lease comes free without it (the holder went
+away), the next waiter prefetches itself. The holder releases the lease when
+it is done.
+
+warmup_state backs the /ready endpoint: 'ready' once the prefetch finished
+(or failed, or ran out of WARMUP_TIMEOUT_SECONDS - the server then warms up
+on demand like before). With WARMUP_BLOCKING=1 startup waits for the
+warm-up, so the worker only accepts connections once it is warm.
+"""
+
+import asyncio
+import json
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from database import TIMEZONE, run_db_query
+from live_payloads import build_hourly_payload, get_unit_catalog, shared_cache
+from baselines import build_compared_standard_payload
+from pyramid import bucket_floor
+from resilience import live_resilience
+
+WARMUP_ENABLED = os.getenv('WARMUP_ENABLED', '1') == '1'
+WARMUP_BLOCKING = os.getenv('WARMUP_BLOCKING', '0') == '1'
+WARMUP_TIMEOUT_SECONDS = float(os.getenv('WARMUP_TIMEOUT_SECONDS', '120'))
+WARMUP_CONCURRENCY = int(os.getenv('WARMUP_CONCURRENCY', '4'))
+# Working modes whose current shift is prefetched (the screens' preset)
+WARMUP_WORKING_MODES = [mode for mode in os.getenv('WARMUP_WORKING_MODES', 'mode1').split(',') if mode]
+
+# Workers that did not get the warm-up lease poll for the holder's "done" entry this often
+WARMUP_POLL_SECONDS = float(os.getenv('WARMUP_POLL_SECONDS', '1'))
+WARMUP_DONE_KEY = 'warmup:done'
+
+WARM_CACHE_PATH = os.getenv('WARM_CACHE_PATH', os.path.join(tempfile.gettempdir(), 'dashboard-warm-cache.json'))
+WARM_SNAPSHOT_SECONDS = float(os.getenv('WARM_SNAPSHOT_SECONDS', '300'))
+
+# Cache entries worth keeping across a restart; the seconds-long live results are not
+WARM_CACHE_PREFIXES = ('hour:', 'chunk:', 'pyramid:', 'units:', 'lastgood:', 'baseline:')
+
+
+def save_cache_snapshot(path=WARM_CACHE_PATH):
+    """
+    Write the long-lived cache entries to path (atomically). Returns the number of entries.
+    """
+    entries = [[key, value, expires_at] for prefix in WARM_CACHE_PREFIXES
+               for key, value, expires_at in shared_cache.items(prefix)]
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, 'w') as snapshot:
+        json.dump({'saved_at': time.time(), 'entries': entries}, snapshot)
+    os.replace(temp_path, path)
+    return len(entries)
+
+
+def load_cache_snapshot(path=WARM_CACHE_PATH):
+    """
+    Put the snapshot's unexpired entries back into the cache. Returns the number restored.
+    """
+    if not os.path.exists(path):
+        return 0
+    with open(path) as snapshot:
+        entries = json.load(snapshot)['entries']
+    now = time.time()
+    restored = 0
+    for key, value, expires_at in entries:
+        if expires_at > now and key.startswith(WARM_CACHE_PREFIXES):
+            shared_cache.set(key, value, expires_at - now)
+            restored += 1
+    return restored
+
+
+class WarmupState:
+    def __init__(self):
+        self.status = 'cold'
+        self.started_at = None
+        self.finished_at = None
+        self.restored_entries = 0
+        self.units_total = 0
+        self.units_done = 0
+        self.errors = []
+
+    @property
+    def ready(self):
+        return self.status in ('ready', 'skipped', 'failed', 'timed_out')
+
+    def as_dict(self):
+        return {
+            'status': self.status,
+            'ready': self.ready,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'restored_entries': self.restored_entries,
+            'units_total': self.units_total,
+            'units_done': self.units_done,
+            'errors': self.errors[-10:]
+        }
+
+
+warmup_state = WarmupState()
+
+
+async def _prefetch_unit(unit_name, slots):
+    async with slots:
+        for working_mode in WARMUP_WORKING_MODES:
+            current_time = datetime.now(TIMEZONE)
+            shift_start = bucket_floor(current_time, 'shift', working_mode)
+            try:
+                # The same calls a screen's first tick makes: fills the live, hourly and last good entries
+                await live_resilience.serve('standard', build_compared_standard_payload, unit_name, shift_start,
+                                            current_time, current_time, working_mode)
+                await live_resilience.serve('hourly', build_hourly_payload, unit_name, shift_start,
+                                            current_time, current_time, working_mode)
+            except Exception as e:
+                warmup_state.errors.append(f"{unit_name} {working_mode}: {str(e) or type(e).__name__}")
+                print(f"[WARMUP ERROR] Prefetch failed for {unit_name} ({working_mode}): {str(e)}")
+        warmup_state.units_done += 1
+
+
+async def _prefetch():
+    units = await run_db_query(get_unit_catalog, label='warmup units')
+    warmup_state.units_total = len(units)
+    slots = asyncio.Semaphore(WARMUP_CONCURRENCY)
+    await asyncio.gather(*(_prefetch_unit(unit_name, slots) for unit_name in units))
+
+
+async def _prefetch_as_holder(timeout):
+    """
+    Prefetch while holding the warm-up lease, then tell the waiting workers
+    (WARMUP_DONE_KEY) and release the lease. Returns the warm-up status.
+    """
+    try:
+        try:
+            await asyncio.wait_for(_prefetch(), timeout=timeout)
+            status = 'ready'
+        except asyncio.TimeoutError:
+            print(f"[WARMUP WARNING] Prefetch still running after {WARMUP_TIMEOUT_SECONDS:.0f}s - serving anyway")
+            status = 'timed_out'
+        except Exception as e:
+            warmup_state.errors.append(str(e))
+            print(f"[WARMUP ERROR] Prefetch failed: {str(e)}")
+            status = 'failed'
+        shared_cache.set(WARMUP_DONE_KEY, {'status': status, 'finished_at': time.time()}, WARMUP_TIMEOUT_SECONDS)
+        return status
+    finally:
+        shared_cache.backend.release_lease("warmup", shared_cache.owner)
+
+
+async def warm_up():
+    """
+    Restore the cache snapshot, then prefetch the current shift for every unit.
+    """
+    warmup_state.started_at = datetime.now(TIMEZONE).isoformat()
+    warmup_state.status = 'warming'
+    started = time.monotonic()
+
+    try:
+        warmup_state.restored_entries = await asyncio.get_running_loop().run_in_executor(None, load_cache_snapshot)
+        print(f"[WARMUP] Restored {warmup_state.restored_entries} cache entries from {WARM_CACHE_PATH}")
+    except Exception as e:
+        warmup_state.errors.append(f"snapshot: {str(e)}")
+        print(f"[WARMUP ERROR] Could not restore cache snapshot: {str(e)}")
+
+    if not WARMUP_ENABLED:
+        warmup_state.status = 'skipped'
+    else:
+        deadline = time.monotonic() + WARMUP_TIMEOUT_SECONDS
+        waiting_since = time.time()
+        # One worker per host prefetches; the others wait for it and then reuse its cache entries
+        while warmup_state.status in ('warming', 'waiting'):
+            remaining = deadline - time.monotonic()
+            done = shared_cache.get(WARMUP_DONE_KEY)
+            if done is not None and done['finished_at'] >= waiting_since:
+                warmup_state.status = done['status']
+            elif remaining <= 0:
+                print(f"[WARMUP WARNING] Another worker is still prefetching after {WARMUP_TIMEOUT_SECONDS:.0f}s - serving anyway")
+                warmup_state.status = 'timed_out'
+            elif shared_cache.backend.acquire_lease("warmup", shared_cache.owner, ttl=remaining):
+                # Free at start, or the holder went away without finishing
+                warmup_state.status = await _prefetch_as_holder(remaining)
+            else:
+                if warmup_state.status != 'waiting':
+                    print("[WARMUP] Another worker is prefetching - waiting for it")
+                    warmup_state.status = 'waiting'
+                await asyncio.sleep(min(WARMUP_POLL_SECONDS, remaining))
+
+    warmup_state.finished_at = datetime.now(TIMEZONE).isoformat()
+    print(f"[WARMUP] {warmup_state.status} after {time.monotonic() - started:.1f}s "
+          f"({warmup_state.units_done}/{warmup_state.units_total} units)")
@@ -0,0 +1,84 @@
+"""
+Compact wire encoding for the live dashboard WebSockets.
+
+The default JSON frames repeat every key name ('success_qty', 'fail_qty',
+'theoretical_qty', ...) for each model and hour on every tick. The columnar
+layout sends the key names once as a schema header and each record as a
+plain value list, and trims float noise that the dashboards never display.
+"""
+
+import json
+
+# Wire format identifiers accepted in the `format` query parameter
+WIRE_FORMAT_JSON = 'json'
+WIRE_FORMAT_COLUMNAR = 'columnar'
+SUPPORTED_WIRE_FORMATS = (WIRE_FORMAT_JSON, WIRE_FORMAT_COLUMNAR)
+
+# Bump when the columnar layout changes so old clients can detect it
+COLUMNAR_VERSION = 1
+
+# Dashboards show at most one decimal of a percentage, so 4 decimals of a ratio is lossless on screen
+FLOAT_PRECISION = 4
+
+# Record lists that get the schema/rows treatment, per payload type
+TABLE_KEYS = ('models', 'hourly_data')
+
+
+def resolve_wire_format(requested):
+    """
+    Normalise the `format` query parameter; unknown values fall back to plain JSON.
+    """
+    if requested and requested.lower() in SUPPORTED_WIRE_FORMATS:
+        return requested.lower()
+    return WIRE_FORMAT_JSON
+
+
+def _compact_value(value):
+    if isinstance(value, float):
+        return round(value, FLOAT_PRECISION)
+    return value
+
+
+def _encode_table(records):
+    # Union of record keys in first-seen order, so sparse records still line up
+    schema = []
+    for record in records:
+        for key in record:
+            if key not in schema:
+                schema.append(key)
+
+    rows = [[_compact_value(record.get(key)) for key in schema] for record in records]
+    return {'schema': schema, 'rows': rows}
+
+
+def encode_columnar(payload):
+    """
+    Convert a standard or hourly payload into the columnar layout.
+
+    Scalar fields and nested dicts (e.g. 'summary') are kept as-is apart from
+    float rounding; every list of records under TABLE_KEYS becomes
+    {'schema': [...], 'rows': [[...], ...]}.
+    Error and heartbeat frames pass through untouched.
+    """
+    if not isinstance(payload, dict) or 'error' in payload or payload.get('heartbeat'):
+        return payload
+
+    frame = {'format': WIRE_FORMAT_COLUMNAR, 'v': COLUMNAR_VERSION}
+    for key, value in payload.items():
+        if key in TABLE_KEYS and isinstance(value, list):
+            frame[key] = _encode_table(value)
+        elif isinstance(value, dict):
+            frame[key] = {k: _compact_value(v) for k, v in value.items()}
+        else:
+            frame[key] = _compact_value(value)
+    return frame
+
+
+def serialize_payload(payload, wire_format):
+    """
+    Encode and serialise a payload to the text frame sent over the socket.
+    Columnar frames also drop the whitespace json.dumps adds by default.
+    """
+    if wire_format == WIRE_FORMAT_COLUMNAR:
+        return json.dumps(encode_columnar(payload), separators=(',', ':'))
+    return json.dumps(payload)
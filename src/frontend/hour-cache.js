@@ -0,0 +1,198 @@
+// Browser-side cache of numbers that can no longer change (IndexedDB).
+//
+// - hours: closed hourly records, keyed by (unit, working mode, hour start). The server marks a
+//   record `closed` once the hour is past the late-row grace period; only full closed hours are
+//   kept. Pages send `have_until` (see coveredUntil) so the server leaves those hours out and
+//   only the open hour and the missing ones go over the wire.
+// - results: whole responses for closed ranges (report rankings and drill-downs), keyed by URL.
+//
+// Everything degrades to "nothing cached" when IndexedDB is unavailable (private mode, old
+// browsers): reads resolve empty, writes are dropped.
+const HourCache = (() => {
+    const DB_NAME = 'dashboard-cache';
+    const DB_VERSION = 1;
+    const HOUR_MS = 3600 * 1000;
+    // Entries older than this are dropped when the cache is opened
+    const MAX_AGE_MS = 45 * 24 * HOUR_MS;
+
+    let dbPromise = null;
+
+    function open() {
+        if (dbPromise) {
+            return dbPromise;
+        }
+        dbPromise = new Promise(resolve => {
+            if (!window.indexedDB) {
+                resolve(null);
+                return;
+            }
+            let request;
+            try {
+                request = indexedDB.open(DB_NAME, DB_VERSION);
+            } catch (error) {
+                console.warn('[HOUR CACHE] IndexedDB unavailable:', error);
+                resolve(null);
+                return;
+            }
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                if (!db.objectStoreNames.contains('hours')) {
+                    db.createObjectStore('hours', { keyPath: ['unit', 'mode', 'start'] }).createIndex('saved_at', 'saved_at');
+                }
+                if (!db.objectStoreNames.contains('results')) {
+                    db.createObjectStore('results', { keyPath: 'key' }).createIndex('saved_at', 'saved_at');
+                }
+            };
+            request.onsuccess = () => {
+                const db = request.result;
+                prune(db);
+                resolve(db);
+            };
+            request.onerror = () => {
+                console.warn('[HOUR CACHE] Could not open IndexedDB:', request.error);
+                resolve(null);
+            };
+        });
+        return dbPromise;
+    }
+
+    function prune(db) {
+        const cutoff = IDBKeyRange.upperBound(Date.now() - MAX_AGE_MS);
+        ['hours', 'results'].forEach(storeName => {
+            const cursorRequest = db.transaction(storeName, 'readwrite').objectStore(storeName).index('saved_at').openCursor(cutoff);
+            cursorRequest.onsuccess = () => {
+                const cursor = cursorRequest.result;
+                if (cursor) {
+                    cursor.delete();
+                    cursor.continue();
+                }
+            };
+        });
+    }
+
+    // Start of the hour containing time; the server's timezone (+03:00) has whole-hour offsets, so
+    // UTC hour boundaries are its hour boundaries too, whatever the browser's timezone
+    function hourFloor(time) {
+        return Math.floor(time.getTime() / HOUR_MS) * HOUR_MS;
+    }
+
+    function isCacheableHour(hour) {
+        return hour.closed === true && Date.parse(hour.hour_end) - Date.parse(hour.hour_start) === HOUR_MS;
+    }
+
+    // Closed hours of unit/mode starting in [fromTime, toTime), oldest first
+    function getHours(unitName, workingMode, fromTime, toTime) {
+        return open().then(db => new Promise(resolve => {
+            if (!db) {
+                resolve([]);
+                return;
+            }
+            const range = IDBKeyRange.bound([unitName, workingMode, hourFloor(fromTime)], [unitName, workingMode, toTime.getTime()], false, true);
+            const request = db.transaction('hours').objectStore('hours').getAll(range);
+            request.onsuccess = () => resolve(request.result.map(entry => entry.hour));
+            request.onerror = () => resolve([]);
+        }));
+    }
+
+    // Keep the closed full hours of a response; others are ignored
+    function putHours(unitName, workingMode, hours) {
+        const cacheable = (hours || []).filter(isCacheableHour);
+        if (cacheable.length === 0) {
+            return Promise.resolve(0);
+        }
+        return open().then(db => {
+            if (!db) {
+                return 0;
+            }
+            const store = db.transaction('hours', 'readwrite').objectStore('hours');
+            const now = Date.now();
+            cacheable.forEach(hour => {
+                store.put({ unit: unitName, mode: workingMode, start: Date.parse(hour.hour_start), hour: hour, saved_at: now });
+            });
+            return cacheable.length;
+        }).catch(error => {
+            console.warn('[HOUR CACHE] Could not store hours:', error);
+            return 0;
+        });
+    }
+
+    // End of the run of cached hours that starts at the (hour-aligned) range start, or null when
+    // the first hour is missing - the value to send as have_until
+    function coveredUntil(cachedHours, rangeStart) {
+        const starts = new Set(cachedHours.filter(isCacheableHour).map(hour => Date.parse(hour.hour_start)));
+        let hourStart = hourFloor(rangeStart);
+        while (starts.has(hourStart)) {
+            hourStart += HOUR_MS;
+        }
+        return hourStart > hourFloor(rangeStart) ? new Date(hourStart) : null;
+    }
+
+    // The response's hours completed with the cached hours the server left out (before have_until)
+    function mergeHours(cachedHours, hours, haveUntil) {
+        if (!haveUntil) {
+            return hours;
+        }
+        const limit = Date.parse(haveUntil);
+        const sent = new Set(hours.map(hour => Date.parse(hour.hour_start)));
+        const merged = cachedHours.filter(hour => Date.parse(hour.hour_end) <= limit && !sent.has(Date.parse(hour.hour_start)));
+        return merged.concat(hours).sort((a, b) => Date.parse(a.hour_start) - Date.parse(b.hour_start));
+    }
+
+    function getResult(key) {
+        return open().then(db => new Promise(resolve => {
+            if (!db) {
+                resolve(null);
+                return;
+            }
+            const request = db.transaction('results').objectStore('results').get(key);
+            request.onsuccess = () => resolve(request.result ? request.result.data : null);
+            request.onerror = () => resolve(null);
+        }));
+    }
+
+    // Keep a response only if the server says its range is closed
+    function putResult(key, data) {
+        if (!data || data.closed !== true) {
+            return Promise.resolve(false);
+        }
+        return open().then(db => {
+            if (!db) {
+                return false;
+            }
+            db.transaction('results', 'readwrite').objectStore('results').put({ key: key, data: data, saved_at: Date.now() });
+            return true;
+        }).catch(error => {
+            console.warn('[HOUR CACHE] Could not store result:', error);
+            return false;
+        });
+    }
+
+    // fetch(url).json() that answers closed ranges from the cache and stores new closed results
+    function fetchJson(url) {
+        const key = url.toString();
+        return getResult(key).then(cached => {
+            if (cached) {
+                console.log(`[HOUR CACHE] Cached result for ${url.pathname}`);
+                return cached;
+            }
+            return fetch(url).then(response => {
+                if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+                return response.json();
+            }).then(data => {
+                putResult(key, data);
+                return data;
+            });
+        });
+    }
+
+    return {
+        isCacheableHour: isCacheableHour,
+        getHours: getHours,
+        putHours: putHours,
+        coveredUntil: coveredUntil,
+        mergeHours: mergeHours,
+        getResult: getResult,
+        putResult: putResult,
+        fetchJson: fetchJson
+    };
+})();
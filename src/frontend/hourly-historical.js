@@ -149,59 +149,216 @@ function loadHistoricalHourlyData() {
     } else {
         hourlyDataContainer.className = 'grid grid-cols-1 md:grid-cols-2 gap-4 w-full';
     }
-    let completedRequests = 0;
+    // Sections are created up front (in selection order) and filled as hours stream in
     selectedUnits.forEach(unit => {
-        fetchHistoricalHourlyData(unit, startTime, endTime, (data) => {
-            createHourlyDataDisplay(unit, data);
-            completedRequests++;
-            if (completedRequests === selectedUnits.length) {
-                loadingIndicator.classList.add('hidden');
-            }
+        streamHistoricalHourlyData(unit, startTime, endTime, () => {
+            // The first rendered hour already hid the spinner; this covers units with no data or errors
+            loadingIndicator.classList.add('hidden');
         });
     });
 }
 
-// Fetch historical hourly data using HTTP endpoint
-function fetchHistoricalHourlyData(unitName, startTime, endTime, callback) {
-    const url = new URL(`/historical-hourly-data/${encodeURIComponent(unitName)}`, window.location.origin);
+function historicalHourlyUrl(unitName, startTime, endTime, suffix, haveUntil) {
+    const url = new URL(`/historical-hourly-data/${encodeURIComponent(unitName)}${suffix}`, window.location.origin);
     url.searchParams.append('start_time', startTime.toISOString());
     url.searchParams.append('end_time', endTime.toISOString());
     url.searchParams.append('working_mode', workingModeValue || 'mode1');
-    fetch(url)
+    if (haveUntil) {
+        // Closed hours before this come from the browser's hour cache (hour-cache.js)
+        url.searchParams.append('have_until', haveUntil.toISOString());
+    }
+    return url;
+}
+
+// Stream totals plus those of the cached hours the server left out
+function withCachedTotals(totals, cachedTotals) {
+    if (!cachedTotals) {
+        return totals;
+    }
+    return Object.assign({}, totals, {
+        total_success: (totals.total_success || 0) + cachedTotals.total_success,
+        total_fail: (totals.total_fail || 0) + cachedTotals.total_fail,
+        total_qty: (totals.total_qty || 0) + cachedTotals.total_qty,
+        total_theoretical_qty: (totals.total_theoretical_qty || 0) + cachedTotals.total_theoretical_qty
+    });
+}
+
+// Stream hourly records (NDJSON) and render each hour as it arrives; falls back to the
+// plain endpoint when the browser cannot read the response body as a stream
+function streamHistoricalHourlyData(unitName, startTime, endTime, callback) {
+    const unit = createUnitSection(unitName);
+    const workingMode = workingModeValue || 'mode1';
+    showTableMessage(unit.tableBody, 'Yükleniyor...');
+
+    HourCache.getHours(unitName, workingMode, startTime, endTime)
+        .then(cachedHours => {
+            // Show the cached run of closed hours at once; the server only sends what comes after it
+            const haveUntil = HourCache.coveredUntil(cachedHours, startTime);
+            if (haveUntil) {
+                const covered = cachedHours.filter(hour => Date.parse(hour.hour_end) <= haveUntil.getTime());
+                unit.cachedTotals = covered.reduce((totals, hour) => ({
+                    total_success: totals.total_success + hour.success_qty,
+                    total_fail: totals.total_fail + hour.fail_qty,
+                    total_qty: totals.total_qty + hour.total_qty,
+                    total_theoretical_qty: totals.total_theoretical_qty + (hour.theoretical_qty || 0)
+                }), { total_success: 0, total_fail: 0, total_qty: 0, total_theoretical_qty: 0 });
+                unit.pendingHours.push(...covered);
+                unit.cachedRows = covered.length;
+                unit.totals = unit.cachedTotals;
+                flushUnitRows(unit);
+                console.log(`[HOUR CACHE] ${covered.length} cached hours for "${unitName}" up to ${haveUntil.toISOString()}`);
+            }
+            return fetch(historicalHourlyUrl(unitName, startTime, endTime, '/stream', haveUntil));
+        })
         .then(response => {
             if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            return response.json();
+            if (!response.body || !window.TextDecoder) throw new Error('Streaming not supported');
+
+            const reader = response.body.getReader();
+            const decoder = new TextDecoder();
+            let buffer = '';
+
+            function pump() {
+                return reader.read().then(({ done, value }) => {
+                    if (done) {
+                        buffer += decoder.decode();
+                        if (buffer.trim()) {
+                            handleStreamLine(unit, buffer);
+                        }
+                        return;
+                    }
+                    buffer += decoder.decode(value, { stream: true });
+                    const lines = buffer.split('\n');
+                    buffer = lines.pop();
+                    lines.forEach(line => {
+                        if (line.trim()) {
+                            handleStreamLine(unit, line);
+                        }
+                    });
+                    return pump();
+                });
+            }
+            return pump();
         })
-        .then(data => {
-            console.log(`[HISTORICAL] Received hourly data for "${unitName}":`, data);
-            callback(data);
+        .then(() => {
+            flushUnitRows(unit);
+            if (unit.rows.size === 0) {
+                showTableMessage(unit.tableBody, 'Bu birim için veri bulunamadı');
+            }
+            console.log(`[HISTORICAL] Streamed ${unit.rows.size} hours for "${unitName}"`);
+            callback();
         })
         .catch(error => {
-            console.error(`[HISTORICAL] Error fetching hourly data for "${unitName}":`, error);
-            callback(null);
+            console.error(`[HISTORICAL] Streaming failed for "${unitName}":`, error);
+            if (unit.rows.size > unit.cachedRows) {
+                // Keep what already arrived
+                flushUnitRows(unit);
+                callback();
+                return;
+            }
+            fetchHistoricalHourlyData(unitName, startTime, endTime, (data) => {
+                if (data) {
+                    updateUnitSummary(unit, data);
+                    updateTableBody(unit.tableBody, data.hourly_data);
+                } else {
+                    showTableMessage(unit.tableBody, 'Veri alınamadı');
+                }
+                callback();
+            });
         });
 }
 
-// Create hourly data display for a unit (historical - no updates)
-function createHourlyDataDisplay(unitName, data) {
-    if (!data) {
-        console.error(`[HISTORICAL] Invalid data received for "${unitName}"`);
+function handleStreamLine(unit, line) {
+    let message;
+    try {
+        message = JSON.parse(line);
+    } catch (error) {
+        console.error(`[HISTORICAL] Bad stream line for "${unit.name}":`, line);
         return;
     }
 
-    if (!data.hourly_data) {
-        console.error(`[HISTORICAL] No hourly data received for "${unitName}"`);
-        return;
+    if (message.type === 'hour') {
+        unit.pendingHours.push(message.hour);
+        unit.totals = withCachedTotals(message.totals, unit.cachedTotals);
+        scheduleUnitFlush(unit);
+    } else if (message.type === 'end') {
+        unit.totals = withCachedTotals(message, unit.cachedTotals);
+        scheduleUnitFlush(unit);
+    } else if (message.type === 'hour_error') {
+        console.warn(`[HISTORICAL] Hour ${message.hour_start} failed for "${unit.name}": ${message.error}`);
+    } else if (message.type === 'start') {
+        console.log(`[HISTORICAL] Streaming ${message.hours} hours for "${unit.name}"`);
+    }
+}
+
+// Batch rows that arrive within one frame into a single DOM update
+function scheduleUnitFlush(unit) {
+    if (unit.flushFrame === null) {
+        unit.flushFrame = requestAnimationFrame(() => flushUnitRows(unit));
     }
+}
 
-    if (!Array.isArray(data.hourly_data)) {
-        console.error(`[HISTORICAL] hourly_data is not an array for "${unitName}"`);
+function flushUnitRows(unit) {
+    if (unit.flushFrame !== null) {
+        cancelAnimationFrame(unit.flushFrame);
+        unit.flushFrame = null;
+    }
+    if (unit.totals) {
+        updateUnitSummary(unit, unit.totals);
+    }
+    if (unit.pendingHours.length === 0) {
         return;
     }
+    HourCache.putHours(unit.name, workingModeValue || 'mode1', unit.pendingHours);
 
-    console.log(`[HISTORICAL] Processing hourly display for "${unitName}" with ${data.hourly_data.length} records`);
-    console.log(`[HISTORICAL] Summary totals: success=${data.total_success}, fail=${data.total_fail}, total=${data.total_qty}`);
+    if (unit.rows.size === 0) {
+        unit.tableBody.innerHTML = '';
+        loadingIndicator.classList.add('hidden');
+    }
 
+    unit.pendingHours.forEach(hour => {
+        const startDate = new Date(hour.hour_start);
+        if (isNaN(startDate)) {
+            return;
+        }
+        const row = createHourRow(hour, startDate, new Date(hour.hour_end));
+        row._startTime = startDate.getTime();
+        unit.rows.set(hour.hour_start, row);
+
+        // Keep newest hour first: insert before the first row that starts earlier
+        let before = unit.tableBody.firstChild;
+        while (before && before._startTime > row._startTime) {
+            before = before.nextSibling;
+        }
+        unit.tableBody.insertBefore(row, before);
+    });
+    unit.pendingHours = [];
+
+    // Re-apply alternating row colours after the inserts
+    Array.from(unit.tableBody.children).forEach((row, index) => {
+        row.className = index % 2 === 0 ? 'bg-white' : 'bg-gray-200';
+    });
+}
+
+// Fetch historical hourly data using HTTP endpoint
+function fetchHistoricalHourlyData(unitName, startTime, endTime, callback) {
+    fetch(historicalHourlyUrl(unitName, startTime, endTime, ''))
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return response.json();
+        })
+        .then(data => {
+            console.log(`[HISTORICAL] Received hourly data for "${unitName}":`, data);
+            callback(data);
+        })
+        .catch(error => {
+            console.error(`[HISTORICAL] Error fetching hourly data for "${unitName}":`, error);
+            callback(null);
+        });
+}
+
+// Create the display section for a unit (historical - no updates); values are filled in by updateUnitSummary/rows
+function createUnitSection(unitName) {
     // Create unit section
     const unitSection = document.createElement('div');
     unitSection.id = `unit-section-${unitName.replace(/\s+/g, '-')}`;
@@ -215,9 +372,6 @@ function createHourlyDataDisplay(unitName, data) {
     // Extract unit short name (e.g., "1A" from "Final 1A")
     const unitShortName = unitName.includes(' ') ? unitName.split(' ').pop() : unitName;
 
-    // Get the summary data
-    const totalSuccessQty = data.total_success || 0;
-
     // Create a table for the summary
     const summaryTable = document.createElement('table');
     summaryTable.className = 'w-full';
@@ -241,7 +395,7 @@ function createHourlyDataDisplay(unitName, data) {
     const col1Value = document.createElement('div');
     col1Value.className = 'text-9xl font-bold text-center p-2';
     col1Value.style.backgroundColor = '#FEF08A'; // bg-yellow-200
-    col1Value.textContent = totalSuccessQty.toLocaleString();
+    col1Value.textContent = '-';
 
     col1.appendChild(col1Header);
     col1.appendChild(col1Value);
@@ -259,13 +413,7 @@ function createHourlyDataDisplay(unitName, data) {
     const col2Value = document.createElement('div');
     col2Value.className = 'text-9xl font-bold text-center p-2';
     col2Value.style.backgroundColor = '#BBF7D0'; // bg-green-200
-
-    // Calculate Theoretical Production Quantity from data summary
-    let theoreticalValue = '-';
-    if (data.total_theoretical_qty !== null && data.total_theoretical_qty !== undefined && data.total_theoretical_qty > 0) {
-        theoreticalValue = Math.round(data.total_theoretical_qty).toLocaleString();
-    }
-    col2Value.textContent = theoreticalValue;
+    col2Value.textContent = '-';
 
     col2.appendChild(col2Header);
     col2.appendChild(col2Value);
@@ -319,9 +467,6 @@ function createHourlyDataDisplay(unitName, data) {
     const tableBody = document.createElement('tbody');
     tableBody.className = 'bg-white divide-y divide-gray-200';
 
-    // Update table body with hourly data
-    updateTableBody(tableBody, data.hourly_data);
-
     table.appendChild(tableBody);
     tableContainer.appendChild(table);
     unitSection.appendChild(tableContainer);
@@ -330,6 +475,43 @@ function createHourlyDataDisplay(unitName, data) {
     hourlyDataContainer.appendChild(unitSection);
 
     console.log(`[HISTORICAL] Created display for "${unitName}"`);
+
+    return {
+        name: unitName,
+        productionValue: col1Value,
+        theoreticalValue: col2Value,
+        tableBody: tableBody,
+        // hour_start -> row, for streamed rows
+        rows: new Map(),
+        pendingHours: [],
+        totals: null,
+        // Sums and row count of the hours shown from the browser's hour cache
+        cachedTotals: null,
+        cachedRows: 0,
+        flushFrame: null
+    };
+}
+
+// Update the unit summary from a full response or the running totals of a stream
+function updateUnitSummary(unit, totals) {
+    unit.productionValue.textContent = (totals.total_success || 0).toLocaleString();
+
+    let theoreticalValue = '-';
+    if (totals.total_theoretical_qty !== null && totals.total_theoretical_qty !== undefined && totals.total_theoretical_qty > 0) {
+        theoreticalValue = Math.round(totals.total_theoretical_qty).toLocaleString();
+    }
+    unit.theoreticalValue.textContent = theoreticalValue;
+}
+
+function showTableMessage(tableBody, message) {
+    tableBody.innerHTML = '';
+    const messageRow = document.createElement('tr');
+    const messageCell = document.createElement('td');
+    messageCell.colSpan = 4;
+    messageCell.className = 'px-2 py-2 text-center text-gray-500';
+    messageCell.textContent = message;
+    messageRow.appendChild(messageCell);
+    tableBody.appendChild(messageRow);
 }
 
 // Helper function to update table body with hourly data
@@ -341,13 +523,7 @@ function updateTableBody(tableBody, hourlyData) {
 
     if (!hourlyData || hourlyData.length === 0) {
         // No data case
-        const noDataRow = document.createElement('tr');
-        const noDataCell = document.createElement('td');
-        noDataCell.colSpan = 4;
-        noDataCell.className = 'px-2 py-2 text-center text-gray-500';
-        noDataCell.textContent = 'Bu birim için veri bulunamadı';
-        noDataRow.appendChild(noDataCell);
-        tableBody.appendChild(noDataRow);
+        showTableMessage(tableBody, 'Bu birim için veri bulunamadı');
         return;
     }
 
@@ -385,13 +561,7 @@ function updateTableBody(tableBody, hourlyData) {
 
     if (validHours.length === 0) {
         console.warn('[HISTORICAL] No valid hour records found after validation');
-        const noDataRow = document.createElement('tr');
-        const noDataCell = document.createElement('td');
-        noDataCell.colSpan = 4;
-        noDataCell.className = 'px-2 py-2 text-center text-gray-500';
-        noDataCell.textContent = 'Geçerli veri bulunamadı';
-        noDataRow.appendChild(noDataCell);
-        tableBody.appendChild(noDataRow);
+        showTableMessage(tableBody, 'Geçerli veri bulunamadı');
         return;
     }
 
@@ -400,41 +570,48 @@ function updateTableBody(tableBody, hourlyData) {
 
     // Add rows for each hour
     validHours.forEach((hour, index) => {
-        const row = document.createElement('tr');
+        const row = createHourRow(hour, hour._startDate, hour._endDate);
 
         // Add alternating background colors
         row.className = index % 2 === 0 ? 'bg-white' : 'bg-gray-200';
 
-        // Hour range
-        const hourCell = document.createElement('td');
-        hourCell.className = 'px-2 py-2 text-center font-bold text-black text-2xl';
-        hourCell.textContent = `${formatTimeOnly(hour._startDate)} - ${formatTimeOnly(hour._endDate)}`;
-        row.appendChild(hourCell);
-
-        // Success quantity (Production)
-        const successQty = hour.success_qty || 0;
-        const successCell = document.createElement('td');
-        successCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
-        successCell.textContent = successQty.toLocaleString();
-        row.appendChild(successCell);
-
-        // Fail quantity (Repair)
-        const failQty = hour.fail_qty || 0;
-        const failCell = document.createElement('td');
-        failCell.className = 'px-2 py-2 text-center text-red-900 font-bold text-7xl ';
-        failCell.textContent = failQty.toLocaleString();
-        row.appendChild(failCell);
-
-        // Theoretical Production
-        const theoreticalCell = document.createElement('td');
-        theoreticalCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
-        if (hour.theoretical_qty === null || hour.theoretical_qty === undefined || hour.theoretical_qty === 0) {
-            theoreticalCell.textContent = '-';
-        } else {
-            theoreticalCell.textContent = Math.round(hour.theoretical_qty).toLocaleString();
-        }
-        row.appendChild(theoreticalCell);
-
         tableBody.appendChild(row);
     });
 }
+
+// Build one hour row (Saat, Üretim, Tamir, Hedef)
+function createHourRow(hour, startDate, endDate) {
+    const row = document.createElement('tr');
+
+    // Hour range
+    const hourCell = document.createElement('td');
+    hourCell.className = 'px-2 py-2 text-center font-bold text-black text-2xl';
+    hourCell.textContent = `${formatTimeOnly(startDate)} - ${formatTimeOnly(endDate)}`;
+    row.appendChild(hourCell);
+
+    // Success quantity (Production)
+    const successQty = Number(hour.success_qty) || 0;
+    const successCell = document.createElement('td');
+    successCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
+    successCell.textContent = successQty.toLocaleString();
+    row.appendChild(successCell);
+
+    // Fail quantity (Repair)
+    const failQty = Number(hour.fail_qty) || 0;
+    const failCell = document.createElement('td');
+    failCell.className = 'px-2 py-2 text-center text-red-900 font-bold text-7xl ';
+    failCell.textContent = failQty.toLocaleString();
+    row.appendChild(failCell);
+
+    // Theoretical Production
+    const theoreticalCell = document.createElement('td');
+    theoreticalCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
+    if (hour.theoretical_qty === null || hour.theoretical_qty === undefined || hour.theoretical_qty === 0) {
+        theoreticalCell.textContent = '-';
+    } else {
+        theoreticalCell.textContent = Math.round(hour.theoretical_qty).toLocaleString();
+    }
+    row.appendChild(theoreticalCell);
+
+    return row;
+}
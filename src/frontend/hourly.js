@@ -23,12 +23,8 @@ let isShiftChangeInProgress = false;
 // Background tab handling variables
 let isTabVisible = true;
 let lastVisibilityChange = Date.now();
-let visibilityCheckInterval = null;
-let clockUpdateInterval = null;
-let shiftCheckInterval = null;
 
 // CRITICAL FIX: Global status monitoring system to prevent permanent freezing
-let statusMonitorInterval = null;
 let lastSuccessfulUpdate = Date.now();
 
 // Working mode configurations (same as in app.js)
@@ -69,6 +65,9 @@ function handleVisibilityChange() {
         // Tab became visible - force immediate refresh
         console.log('[VISIBILITY] Tab became visible - forcing immediate data refresh');
 
+        // Time spent hidden (runtime paused) is not a stall - don't let the status monitor reload the page
+        lastSuccessfulUpdate = Date.now();
+
         // For live data views, update endTime to current time to maintain live status
     const now = new Date();
         const originalTimeDifference = now.getTime() - endTime.getTime();
@@ -172,61 +171,33 @@ function forceDataRefreshAllUnits() {
     }
 }
 
-// Optimized interval management for background tabs
+// Periodic page jobs run on the shared LiveRuntime tick (see live-runtime.js), which
+// also pauses them while the tab is hidden
 function startOptimizedIntervals() {
-    // Clear any existing intervals
+    // Clear any existing jobs
     stopOptimizedIntervals();
 
     // OPTIMIZED: Use fastest intervals for live hourly data (most critical)
     // Hourly view needs the most responsive updates for real-time production monitoring
     const CLOCK_UPDATE_INTERVAL = 1000; // 1 second - fastest for live time display
     const SHIFT_CHECK_INTERVAL = 10000; // 10 seconds - fastest shift detection for hourly view
-    const VISIBILITY_CHECK_INTERVAL = 5000; // 5 seconds - fastest visibility checks for responsiveness
 
-    // Clock update interval (optimized frequency)
-    clockUpdateInterval = setInterval(updateCurrentTime, CLOCK_UPDATE_INTERVAL);
+    // Clock and shift rollover catch up immediately when the tab becomes visible again
+    LiveRuntime.every('hourly-clock', CLOCK_UPDATE_INTERVAL, updateCurrentTime, { catchUp: true });
 
-    // Shift change check with consistent frequency
-    shiftCheckInterval = setInterval(() => {
+    LiveRuntime.every('hourly-shift-check', SHIFT_CHECK_INTERVAL, () => {
         if (checkForNewTimePeriod()) {
             console.log('Hourly view: Shift change detected, updating time period...');
             updateTimePeriod();
         }
-    }, SHIFT_CHECK_INTERVAL);
-
-    // IMPROVED: Optimized visibility check that doesn't restart intervals
-    visibilityCheckInterval = setInterval(() => {
-        const currentVisible = !document.hidden;
-        if (currentVisible !== isTabVisible) {
-            // Visibility state changed, handle it directly
-            console.log('[VISIBILITY] Detected visibility change via monitoring');
-            isTabVisible = currentVisible;
-            lastVisibilityChange = Date.now();
-            
-            // Force refresh when tab becomes visible instead of restarting intervals
-            if (isTabVisible) {
-                console.log('[VISIBILITY] Tab became visible - forcing immediate refresh');
-                forceDataRefreshAllUnits();
-            }
-        }
-    }, VISIBILITY_CHECK_INTERVAL);
+    }, { catchUp: true });
 
-    console.log(`[INTERVALS] Started optimized intervals - clock: ${CLOCK_UPDATE_INTERVAL}ms, shift: ${SHIFT_CHECK_INTERVAL}ms, visibility: ${VISIBILITY_CHECK_INTERVAL}ms - tab visible: ${isTabVisible}`);
+    console.log(`[INTERVALS] Started runtime jobs - clock: ${CLOCK_UPDATE_INTERVAL}ms, shift: ${SHIFT_CHECK_INTERVAL}ms - tab visible: ${isTabVisible}`);
 }
 
 function stopOptimizedIntervals() {
-    if (clockUpdateInterval) {
-        clearInterval(clockUpdateInterval);
-        clockUpdateInterval = null;
-    }
-    if (shiftCheckInterval) {
-        clearInterval(shiftCheckInterval);
-        shiftCheckInterval = null;
-    }
-    if (visibilityCheckInterval) {
-        clearInterval(visibilityCheckInterval);
-        visibilityCheckInterval = null;
-    }
+    LiveRuntime.cancel('hourly-clock');
+    LiveRuntime.cancel('hourly-shift-check');
 }
 
 // Function to check if we need to update to a new time period
@@ -484,7 +455,11 @@ function updateLastUpdateTime() {
         const minutes = String(now.getMinutes()).padStart(2, '0');
         const seconds = String(now.getSeconds()).padStart(2, '0');
 
-        const displayText = `🟢 Canlı Veri: ${hours}:${minutes}:${seconds}`;
+        let displayText = `🟢 Canlı Veri: ${hours}:${minutes}:${seconds}`;
+        const staleBanner = LiveStaleness.bannerText();
+        if (staleBanner) {
+            displayText = `🟠 ${staleBanner}`;
+        }
 
         // Flash effect to indicate update for live data
             lastUpdateDisplay.classList.add('bg-green-600');
@@ -588,7 +563,7 @@ function loadHourlyData() {
         // Stagger connections by 2 seconds each to prevent server overload
         const connectionDelay = index * 2000;
         
-        setTimeout(() => {
+        LiveRuntime.after(`hourly-stagger:${unit}`, connectionDelay, () => {
             console.log(`[CONNECTION STAGGER] Starting connection for ${unit} (delay: ${connectionDelay}ms)`);
             
             // Connect to WebSocket for hourly data
@@ -612,7 +587,7 @@ function loadHourlyData() {
                     console.log('🚀 PRODUCTION: Auto-recovery system activated');
                 }
             });
-        }, connectionDelay);
+        });
     });
 }
 
@@ -791,7 +766,7 @@ function createOrUpdateHourlyDataDisplay(unitName, data) {
         productionValue: col1Value,
         theoreticalValue: col2Value,
         tableBody: tableBody,
-        lastData: JSON.parse(JSON.stringify(data)) // Store initial data for comparison
+        lastData: data // Frames are parsed fresh per message and never mutated, so no copy is needed
     };
 
     console.log(`Created display for "${unitName}"`);
@@ -843,217 +818,264 @@ function updateHourlyDataDisplay(unitName, data) {
     console.log(`Updated display for "${unitName}" complete`);
 }
 
-// Helper function to update table body with hourly data
+// Keyed row state per table body: hour_start -> { row, cells, values }
+const hourRowState = new WeakMap();
+
+// Table updates waiting for the next animation frame (latest data per table wins)
+const pendingTableUpdates = new Map();
+let tableUpdateFrame = null;
+
+// Helper function to update table body with hourly data.
+// Rendering is batched into one requestAnimationFrame for all units and only
+// the rows/cells whose values changed are touched.
 function updateTableBody(tableBody, hourlyData) {
-    console.log(`Updating table body with ${hourlyData?.length || 0} hourly records`);
+    pendingTableUpdates.set(tableBody, hourlyData);
+    if (tableUpdateFrame === null) {
+        tableUpdateFrame = requestAnimationFrame(flushTableUpdates);
+    }
+}
 
-    // Clear the table body
-    tableBody.innerHTML = '';
+function flushTableUpdates() {
+    tableUpdateFrame = null;
+    const updates = Array.from(pendingTableUpdates);
+    pendingTableUpdates.clear();
+    updates.forEach(([tableBody, hourlyData]) => renderHourlyRows(tableBody, hourlyData));
+}
 
-    if (!hourlyData || hourlyData.length === 0) {
-        // No data case
-        const noDataRow = document.createElement('tr');
-        const noDataCell = document.createElement('td');
-        noDataCell.colSpan = 4; // Update colspan to match header count (was 6, now 4)
-        noDataCell.className = 'px-2 py-2 text-center text-gray-500';
-        noDataCell.textContent = 'Bu birim için veri bulunamadı';
-        noDataRow.appendChild(noDataCell);
-        tableBody.appendChild(noDataRow);
+// Replace the table content with a single message row (no data / invalid data)
+function showTableMessage(tableBody, message) {
+    const state = hourRowState.get(tableBody);
+    if (state && state.message === message) {
         return;
     }
+    tableBody.textContent = '';
+    const noDataRow = document.createElement('tr');
+    const noDataCell = document.createElement('td');
+    noDataCell.colSpan = 4; // Update colspan to match header count (was 6, now 4)
+    noDataCell.className = 'px-2 py-2 text-center text-gray-500';
+    noDataCell.textContent = message;
+    noDataRow.appendChild(noDataCell);
+    tableBody.appendChild(noDataRow);
+    hourRowState.set(tableBody, { rows: new Map(), message: message });
+}
 
-    // Make a deep copy of hourly data to avoid modifying the original
-    const hourDataCopy = JSON.parse(JSON.stringify(hourlyData));
+// Build the display values for one hour without copying or mutating the received record
+function hourRowValues(hour, now, index) {
+    const startDate = new Date(hour.hour_start);
+    const endDate = new Date(hour.hour_end);
+    const isCurrent = startDate <= now && now < endDate;
+    const theoreticalQty = hour.theoretical_qty;
 
-    // Validate and sanitize each hour data object
-    hourDataCopy.forEach(hour => {
-        // Ensure required fields exist
-        if (hour.hour_start === undefined) {
-            console.warn('Hour missing hour_start - skipping', hour);
-            return;
-        }
-        if (hour.hour_end === undefined) {
-            console.warn('Hour missing hour_end - skipping', hour);
-            return;
-        }
+    return {
+        startDate: startDate,
+        isCurrent: isCurrent,
+        // Alternating background colors, with special highlight for current hour
+        className: isCurrent ? 'bg-blue-50' : (index % 2 === 0 ? 'bg-white' : 'bg-gray-200'),
+        label: `${formatTimeOnly(startDate)} - ${formatTimeOnly(endDate)}`,
+        success: Number(hour.success_qty || 0).toLocaleString(),
+        fail: Number(hour.fail_qty || 0).toLocaleString(),
+        theoretical: (theoreticalQty === null || theoreticalQty === undefined || theoreticalQty === 0)
+            ? '-'
+            : Math.round(theoreticalQty).toLocaleString()
+    };
+}
 
-        // Ensure quantity fields are valid numbers
-        hour.success_qty = hour.success_qty !== undefined ? Number(hour.success_qty) : 0;
-        hour.fail_qty = hour.fail_qty !== undefined ? Number(hour.fail_qty) : 0;
-        hour.total_qty = hour.total_qty !== undefined ? Number(hour.total_qty) : 0;
+function createHourRow(values) {
+    const hourOfDay = values.startDate.getHours();
+    const row = document.createElement('tr');
+    row.id = `hour-row-${hourOfDay}`;
 
-        // Ensure metric fields are valid numbers or null
-        hour.quality = hour.quality !== undefined && hour.quality !== null ? Number(hour.quality) : 0;
+    // Hour range
+    const hourCell = document.createElement('td');
+    hourCell.className = 'px-2 py-2 text-center font-bold text-black text-2xl';
 
-        // For performance and OEE, if they're null/None from Python, keep them as null in JS
-        if (hour.performance === null) {
-            hour.performance = null;
-        } else if (hour.performance !== undefined) {
-            hour.performance = Number(hour.performance);
-        } else {
-            hour.performance = null;
-        }
+    // Success quantity (Production)
+    const successCell = document.createElement('td');
+    successCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
+    successCell.id = `success-${hourOfDay}`;
 
-        if (hour.oee === null) {
-            hour.oee = null;
-        } else if (hour.oee !== undefined) {
-            hour.oee = Number(hour.oee);
-        } else {
-            hour.oee = null;
+    // Fail quantity (Repair)
+    const failCell = document.createElement('td');
+    failCell.className = 'px-2 py-2 text-center text-red-900 font-bold text-7xl ';
+    failCell.id = `fail-${hourOfDay}`;
+
+    // Theoretical Production
+    const theoreticalCell = document.createElement('td');
+    theoreticalCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
+    theoreticalCell.id = `theoretical-${hourOfDay}`;
+
+    row.appendChild(hourCell);
+    row.appendChild(successCell);
+    row.appendChild(failCell);
+    row.appendChild(theoreticalCell);
+
+    return {
+        row: row,
+        cells: { hour: hourCell, success: successCell, fail: failCell, theoretical: theoreticalCell },
+        values: {}
+    };
+}
+
+// Write only the parts of a row whose display values changed
+function patchHourRow(entry, values) {
+    const previous = entry.values;
+
+    if (previous.className !== values.className) {
+        entry.row.className = values.className;
+    }
+
+    if (previous.label !== values.label || previous.isCurrent !== values.isCurrent) {
+        entry.cells.hour.textContent = values.label;
+        // Add a badge for current hour
+        if (values.isCurrent) {
+            const currentBadge = document.createElement('span');
+            currentBadge.className = 'ml-1 px-1 bg-green-100 text-green-800 text-xs rounded-full';
+            currentBadge.textContent = 'Aktif';
+            entry.cells.hour.appendChild(currentBadge);
         }
+    }
 
-        // Convert ISO strings to Date objects for proper comparison
-        try {
-            hour._startDate = new Date(hour.hour_start);
-            hour._endDate = new Date(hour.hour_end);
-        } catch (e) {
-            console.error('Error converting dates for hour:', hour, e);
-            hour._startDate = new Date();
-            hour._endDate = new Date();
+    ['success', 'fail', 'theoretical'].forEach(field => {
+        if (previous[field] !== values[field]) {
+            entry.cells[field].textContent = values[field];
         }
     });
 
-    // DEBUG: Log each hour before filtering
-    console.log(`[FRONTEND DEBUG] Before filtering - ${hourDataCopy.length} hours:`);
-    hourDataCopy.forEach((hour, i) => {
-        console.log(`[FRONTEND DEBUG] Hour ${i}: start=${hour.hour_start} (${hour._startDate}) | end=${hour.hour_end} (${hour._endDate})`);
-    });
+    entry.values = values;
+}
 
-    // Filter out invalid hours
-    const validHours = hourDataCopy.filter(hour => {
-        const isValid = hour._startDate instanceof Date && !isNaN(hour._startDate) &&
-                       hour._endDate instanceof Date && !isNaN(hour._endDate);
-        if (!isValid) {
-            console.warn(`[FRONTEND DEBUG] Invalid hour filtered out:`, hour);
+function renderHourlyRows(tableBody, hourlyData) {
+    if (!hourlyData || hourlyData.length === 0) {
+        showTableMessage(tableBody, 'Bu birim için veri bulunamadı');
+        return;
+    }
+
+    // Keep only records with a usable time range, newest hour first
+    const validHours = hourlyData.filter(hour => {
+        if (hour.hour_start === undefined || hour.hour_end === undefined) {
+            console.warn('Hour missing hour_start/hour_end - skipping', hour);
+            return false;
         }
-        return isValid;
+        return !isNaN(new Date(hour.hour_start)) && !isNaN(new Date(hour.hour_end));
     });
 
-    console.log(`[FRONTEND DEBUG] After filtering - ${validHours.length} valid hours`);
-
     if (validHours.length === 0) {
         console.warn('No valid hour records found after validation');
-        const noDataRow = document.createElement('tr');
-        const noDataCell = document.createElement('td');
-        noDataCell.colSpan = 4; // Update colspan to match header count (was 6, now 4)
-        noDataCell.className = 'px-2 py-2 text-center text-gray-500';
-        noDataCell.textContent = 'Geçerli veri bulunamadı';
-        noDataRow.appendChild(noDataCell);
-        tableBody.appendChild(noDataRow);
+        showTableMessage(tableBody, 'Geçerli veri bulunamadı');
         return;
     }
 
-    // Sort hours in descending order (newest hour first)
-    validHours.sort((a, b) => b._startDate - a._startDate);
-    
-    // DEBUG: Log final sorted hours
-    console.log(`[FRONTEND DEBUG] Final sorted hours:`);
-    validHours.forEach((hour, i) => {
-        console.log(`[FRONTEND DEBUG] Sorted ${i}: ${hour.hour_start} → ${hour.hour_end} | Success: ${hour.success_qty}`);
-    });
+    validHours.sort((a, b) => new Date(b.hour_start) - new Date(a.hour_start));
+
+    let state = hourRowState.get(tableBody);
+    if (!state || state.message !== null) {
+        // First render, or replacing a message row
+        tableBody.textContent = '';
+        state = { rows: new Map(), message: null };
+        hourRowState.set(tableBody, state);
+    }
 
     // Get current time to highlight current hour
     const now = new Date();
+    const seen = new Set();
+    let changedRows = 0;
 
-    // Add rows for each hour
     validHours.forEach((hour, index) => {
-        // Skip any hour with missing data
-        if (hour.hour_start === undefined || hour.hour_end === undefined) {
-            return;
+        const key = hour.hour_start;
+        seen.add(key);
+
+        const values = hourRowValues(hour, now, index);
+        let entry = state.rows.get(key);
+        if (!entry) {
+            entry = createHourRow(values);
+            state.rows.set(key, entry);
         }
 
-        const row = document.createElement('tr');
-        row.id = `hour-row-${hour._startDate.getHours()}`;
-
-        // Check if this is the current hour
-        const isCurrent = hour._startDate <= now && now < hour._endDate;
-
-        // Add alternating background colors, with special highlight for current hour
-        if (isCurrent) {
-            row.className = 'bg-blue-50'; // Highlight current hour
-        } else {
-            row.className = index % 2 === 0 ? 'bg-white' : 'bg-gray-200';
+        const before = entry.values;
+        patchHourRow(entry, values);
+        if (before.success !== values.success || before.fail !== values.fail ||
+            before.theoretical !== values.theoretical || before.className !== values.className) {
+            changedRows++;
         }
 
-        // Hour range
-        const hourCell = document.createElement('td');
-        hourCell.className = 'px-2 py-2 text-center font-bold text-black text-2xl';
-        hourCell.textContent = `${formatTimeOnly(hour._startDate)} - ${formatTimeOnly(hour._endDate)}`;
-
-        // Add a badge for current hour
-        if (isCurrent) {
-            const currentBadge = document.createElement('span');
-            currentBadge.className = 'ml-1 px-1 bg-green-100 text-green-800 text-xs rounded-full';
-            currentBadge.textContent = 'Aktif';
-            hourCell.appendChild(currentBadge);
+        // Keep DOM order in step with the sorted data (moves only when a new hour appears)
+        const rowAtIndex = tableBody.children[index];
+        if (rowAtIndex !== entry.row) {
+            tableBody.insertBefore(entry.row, rowAtIndex || null);
         }
+    });
 
-        row.appendChild(hourCell);
-
-        // Success quantity (Production)
-        const successQty = hour.success_qty || 0;
-        const successCell = document.createElement('td');
-        successCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
-        successCell.id = `success-${hour._startDate.getHours()}`;
-        successCell.textContent = successQty.toLocaleString();
-        row.appendChild(successCell);
-
-        // Fail quantity (Repair)
-        const failQty = hour.fail_qty || 0;
-        const failCell = document.createElement('td');
-        failCell.className = 'px-2 py-2 text-center text-red-900 font-bold text-7xl ';
-        failCell.id = `fail-${hour._startDate.getHours()}`;
-        failCell.textContent = failQty.toLocaleString();
-        row.appendChild(failCell);
-
-        // Theoretical Production
-        const theoreticalCell = document.createElement('td');
-        theoreticalCell.className = 'px-2 py-2 text-center text-black font-bold text-7xl';
-        theoreticalCell.id = `theoretical-${hour._startDate.getHours()}`;
-        // Use theoretical_qty field instead of performance
-        if (hour.theoretical_qty === null || hour.theoretical_qty === undefined || hour.theoretical_qty === 0) {
-            theoreticalCell.textContent = '-';
-        } else {
-            theoreticalCell.textContent = Math.round(hour.theoretical_qty).toLocaleString();
+    // Drop rows for hours no longer in the data (e.g. after a shift change)
+    state.rows.forEach((entry, key) => {
+        if (!seen.has(key)) {
+            entry.row.remove();
+            state.rows.delete(key);
         }
-        row.appendChild(theoreticalCell);
-
-        tableBody.appendChild(row);
     });
+
+    console.log(`Updated table body: ${changedRows} of ${validHours.length} hourly rows changed`);
 }
 
 // Connect to WebSocket for hourly data and handle response
 function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
-    // Determine WebSocket URL
+    // Determine WebSocket URL - request the compact columnar encoding to cut per-frame size
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/hourly/${encodeURIComponent(unitName)}`;
+    const wsUrl = `${wsProtocol}//${window.location.host}/ws/hourly/${encodeURIComponent(unitName)}?format=columnar`;
 
     console.log(`Connecting to hourly WebSocket for "${unitName}" at ${wsUrl}`);
 
-    // Create a new WebSocket for this unit
-    const unitSocket = new WebSocket(wsUrl);
+    // Create a new WebSocket for this unit (or an SSE stream with ?transport=sse, see sse-socket.js)
+    const unitSocket = LiveTransport.open(wsUrl);
 
     // Store the socket for cleanup
     unitSockets[unitName] = unitSocket;
 
     let reconnectAttempts = 0;
     const maxReconnectAttempts = 8; // Reasonable limit for robust reconnection
-    let updateInterval = null;
+    let updateInterval = null; // LiveRuntime job name while the socket is polling
     let hasReceivedInitialData = false;
     let lastRequestTime = 0;
+    // Per-socket runtime job names (unique so a reconnect never cancels its successor's jobs)
+    const responseTimeoutJob = LiveRuntime.uniqueName(`hourly-response:${unitName}`);
+    const heartbeatJob = LiveRuntime.uniqueName(`hourly-heartbeat:${unitName}`);
+    // Time of the last message on this socket (shared by the heartbeat job and onmessage)
+    let lastHeartbeat = Date.now();
     
     // Pre-calculate reusable values to reduce overhead
     const workingMode = workingModeValue || 'mode1';
     const startTimeISO = startTime.toISOString();
 
+    // Closed hours already in the browser's hour cache (hour-cache.js) - sent as have_until so the
+    // server leaves them out of every frame; newly closed hours are added as they arrive
+    let cachedHours = [];
+    let haveUntil = null;
+    HourCache.getHours(unitName, workingMode, startTime, new Date()).then(hours => {
+        cachedHours = hours;
+        haveUntil = HourCache.coveredUntil(cachedHours, startTime);
+        if (haveUntil) {
+            console.log(`[HOUR CACHE] ${hours.length} cached hours for "${unitName}" up to ${haveUntil.toISOString()}`);
+        }
+    });
+
+    function rememberClosedHours(hours) {
+        const known = new Set(cachedHours.map(hour => hour.hour_start));
+        const fresh = hours.filter(hour => HourCache.isCacheableHour(hour) && !known.has(hour.hour_start));
+        if (fresh.length === 0) {
+            return;
+        }
+        HourCache.putHours(unitName, workingMode, fresh);
+        cachedHours = cachedHours.concat(fresh);
+        haveUntil = HourCache.coveredUntil(cachedHours, startTime);
+    }
+
     // Set a timeout to ensure we get a callback even if WebSocket fails to connect
-    const connectionTimeout = setTimeout(() => {
+    const connectionTimeout = LiveRuntime.after(LiveRuntime.uniqueName(`hourly-connect:${unitName}`), 15000, () => {
         if (!hasReceivedInitialData) {
             console.warn(`Connection timeout for hourly data "${unitName}". Completing with empty data.`);
             hasReceivedInitialData = true;
             callback(null);
         }
-    }, 15000); // 15 second timeout for hourly data (increased for heavy data processing)
+    }); // 15 second timeout for hourly data (increased for heavy data processing)
 
     function sendDataRequest() {
         // PRODUCTION FIX: Log shift changes but NEVER block data requests - data freshness is critical
@@ -1096,6 +1118,9 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                 end_time: requestEndTime.toISOString(),
                 working_mode: workingMode // Reuse pre-calculated value
             };
+            if (haveUntil) {
+                params.have_until = haveUntil.toISOString();
+            }
 
             console.log(`[HOURLY REQUEST] ${unitName}: ${isShiftBasedView ? 'Shift-based live' : 'Live'} data request`);
             console.log(`[HOURLY REQUEST] Time range: ${params.start_time} → ${params.end_time}`);
@@ -1107,12 +1132,8 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
             try {
             unitSocket.send(JSON.stringify(params));
                 
-                // CRITICAL FIX: Set a response timeout to detect silent failures
-                if (unitSocket.responseTimeout) {
-                    clearTimeout(unitSocket.responseTimeout);
-                }
-                
-                unitSocket.responseTimeout = setTimeout(() => {
+                // CRITICAL FIX: Set a response timeout to detect silent failures (replaces any pending one)
+                LiveRuntime.after(responseTimeoutJob, 30000, () => {
                     console.warn(`[STATUS FIX] No response received for ${unitName} within 30 seconds - checking connection`);
                     
                     // Check if socket is still open but not responding
@@ -1120,7 +1141,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                         console.warn(`[STATUS FIX] Socket appears open but unresponsive for ${unitName} - forcing reconnection`);
                         unitSocket.close(1000, 'Response timeout');
                     }
-                }, 30000); // 30 second response timeout (increased for heavy hourly data processing)
+                }); // 30 second response timeout (increased for heavy hourly data processing)
             } catch (error) {
                 console.error(`[STATUS FIX] Failed to send WebSocket message for ${unitName}:`, error);
                 // Force connection reset on send error
@@ -1132,7 +1153,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
             console.warn(`Cannot send hourly update request - socket not open for "${unitName}", readyState: ${unitSocket.readyState}`);
             // Clear interval if socket is not open
             if (updateInterval) {
-                clearInterval(updateInterval);
+                LiveRuntime.cancel(updateInterval);
                 updateInterval = null;
             }
 
@@ -1140,7 +1161,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
             if (!hasReceivedInitialData) {
                 console.warn(`Socket closed before receiving initial hourly data for "${unitName}". Completing with empty data.`);
                 hasReceivedInitialData = true;
-                clearTimeout(connectionTimeout);
+                LiveRuntime.cancel(connectionTimeout);
                 callback(null);
             }
         }
@@ -1156,56 +1177,51 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
         // OPTIMIZED INTERVAL SYSTEM - FASTEST for live hourly data (most critical)
         const UPDATE_INTERVAL = 12000; // 12 seconds - fastest for hourly view (most critical real-time data)
         
-        updateInterval = setInterval(() => {
+        // Runs on the shared runtime tick, which is paused entirely while the tab is hidden
+        updateInterval = LiveRuntime.every(LiveRuntime.uniqueName(`hourly-update:${unitName}`), UPDATE_INTERVAL, () => {
             // SIMPLIFIED: Only send requests if connection is open and healthy
             if (unitSocket.readyState === WebSocket.OPEN) {
-                // For background tabs, skip fewer requests (hourly data is most critical)
-                const shouldSkipRequest = !isTabVisible && Math.random() < 0.15; // Skip only 15% of requests when hidden (less than other views)
-                
-                if (!shouldSkipRequest) {
-                    sendDataRequest();
-                } else {
-                    console.log(`[HOURLY OPTIMIZATION] Skipping background request for ${unitName}`);
-                }
+                sendDataRequest();
             } else {
                 console.warn(`[HOURLY ERROR] Connection lost for ${unitName} (state: ${unitSocket.readyState}), clearing interval`);
-                clearInterval(updateInterval);
+                LiveRuntime.cancel(updateInterval);
                 updateInterval = null;
                 // Note: Global recovery system will handle reconnection
             }
-        }, UPDATE_INTERVAL);
+        });
 
         // CRITICAL FIX: Add heartbeat mechanism to detect dead connections
         const HEARTBEAT_INTERVAL = 60000; // 60 seconds
-        let lastHeartbeat = Date.now();
+        lastHeartbeat = Date.now();
         
-        const heartbeatInterval = setInterval(() => {
-            const now = Date.now();
+        LiveRuntime.every(heartbeatJob, HEARTBEAT_INTERVAL, (now) => {
             const timeSinceLastMessage = now - lastHeartbeat;
             
             // If no message received for 2 minutes, force reconnection
             if (timeSinceLastMessage > 120000) {
                 console.warn(`[STATUS FIX] No heartbeat from ${unitName} for ${Math.round(timeSinceLastMessage/1000)}s - forcing reconnection`);
-                clearInterval(heartbeatInterval);
+                LiveRuntime.cancel(heartbeatJob);
                 if (unitSocket.readyState === WebSocket.OPEN) {
                     unitSocket.close(1000, 'Heartbeat timeout');
                 }
             }
-        }, HEARTBEAT_INTERVAL);
+        });
         
-        // Store heartbeat interval for cleanup
-        unitSocket.heartbeatInterval = heartbeatInterval;
+        // Store heartbeat job for cleanup
+        unitSocket.heartbeatInterval = heartbeatJob;
 
         console.log(`[HOURLY WEBSOCKET] Connected to ${unitName} with optimized ${UPDATE_INTERVAL}ms interval`);
     };
 
     unitSocket.onmessage = (event) => {
         try {
-            // CRITICAL FIX: Clear response timeout when message is received
-            if (unitSocket.responseTimeout) {
-                clearTimeout(unitSocket.responseTimeout);
-                unitSocket.responseTimeout = null;
+            // Threshold alerts share the socket; they don't answer the pending request
+            if (LiveAlerts.handleFrame(event.data)) {
+                return;
             }
+
+            // CRITICAL FIX: Clear response timeout when message is received
+            LiveRuntime.cancel(responseTimeoutJob);
             
             // Update last heartbeat time for connection health monitoring
             if (unitSocket.heartbeatInterval) {
@@ -1224,14 +1240,14 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                 console.error(`Empty data received for "${unitName}"`);
                 if (!hasReceivedInitialData) {
                     hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
+                    LiveRuntime.cancel(connectionTimeout);
                     callback(null);
                 }
                 return;
             }
 
-            // Try to parse the data
-            const data = JSON.parse(event.data);
+            // Try to parse the data (and expand compact columnar frames)
+            const data = decodeColumnarFrame(JSON.parse(event.data));
 
             // Check if response contains an error
             if (data.error) {
@@ -1240,10 +1256,16 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                 // Still count as completed for multi-unit processing
                 if (!hasReceivedInitialData) {
                     hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
+                    LiveRuntime.cancel(connectionTimeout);
                     callback(null);
                 }
             } else {
+                // Put back the cached hours the server left out, and keep the ones that just closed
+                if (Array.isArray(data.hourly_data)) {
+                    data.hourly_data = HourCache.mergeHours(cachedHours, data.hourly_data, data.have_until);
+                    rememberClosedHours(data.hourly_data);
+                }
+                LiveStaleness.track(unitName, data);
                 console.log(`Processed hourly data for "${unitName}": ${data.hourly_data ? data.hourly_data.length : 0} hour records`);
 
                 // Detailed data validation and logging
@@ -1344,15 +1366,15 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                     }
                 }
 
-                // Store the data for future comparison (create a deep copy)
+                // Store the data for future comparison (each frame is a fresh object, so no copy is needed)
                 if (unitContainers[unitName]) {
-                    unitContainers[unitName].lastData = JSON.parse(JSON.stringify(data));
+                    unitContainers[unitName].lastData = data;
                 }
 
                 // Always update the display for both initial and subsequent data
                 if (!hasReceivedInitialData) {
                     hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
+                    LiveRuntime.cancel(connectionTimeout);
                     callback(data);
                 }
                 
@@ -1387,7 +1409,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
 
             if (!hasReceivedInitialData) {
                 hasReceivedInitialData = true;
-                clearTimeout(connectionTimeout);
+                LiveRuntime.cancel(connectionTimeout);
                 callback(null);
             }
         }
@@ -1396,16 +1418,17 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
     unitSocket.onerror = (error) => {
         console.error(`Hourly WebSocket error for ${unitName}:`, error);
 
-        // Clean up intervals
+        // Clean up runtime jobs
         if (updateInterval) {
-            clearInterval(updateInterval);
+            LiveRuntime.cancel(updateInterval);
             updateInterval = null;
         }
+        LiveRuntime.cancel(responseTimeoutJob);
 
         // Count as completed but with no data
         if (!hasReceivedInitialData) {
             hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
+            LiveRuntime.cancel(connectionTimeout);
             callback(null);
         }
     };
@@ -1413,16 +1436,18 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
     unitSocket.onclose = (event) => {
         console.log(`Hourly WebSocket closed for ${unitName}:`, event);
 
-        // Clean up intervals
+        // Clean up runtime jobs
         if (updateInterval) {
-            clearInterval(updateInterval);
+            LiveRuntime.cancel(updateInterval);
             updateInterval = null;
         }
+        LiveRuntime.cancel(responseTimeoutJob);
+        LiveRuntime.cancel(heartbeatJob);
 
         // Make sure we call callback if we haven't received initial data yet
         if (!hasReceivedInitialData) {
             hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
+            LiveRuntime.cancel(connectionTimeout);
             callback(null);
             return;
         }
@@ -1443,7 +1468,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
 
             console.log(`[HOURLY RECONNECT] Will attempt to reconnect ${unitName} in ${reconnectDelay}ms (attempt ${reconnectAttempts + 1}/${maxReconnectAttempts})`);
 
-            setTimeout(() => {
+            LiveRuntime.after(LiveRuntime.uniqueName(`hourly-reconnect:${unitName}`), reconnectDelay, () => {
                 if (!unitSockets[unitName] || unitSockets[unitName].readyState === WebSocket.CLOSED) {
                     console.log(`[HOURLY RECONNECT] Attempting to reconnect ${unitName}`);
                     connectHourlyWebSocket(unitName, startTime, endTime, (data) => {
@@ -1456,7 +1481,7 @@ function connectHourlyWebSocket(unitName, startTime, endTime, callback) {
                         }
                     });
                 }
-            }, reconnectDelay);
+            });
         } else if (shouldReconnect === false && reconnectAttempts >= maxReconnectAttempts) {
             console.error(`Failed to connect to WebSocket for ${unitName} after ${maxReconnectAttempts} attempts`);
             
@@ -1522,13 +1547,8 @@ window.forceLiveMode = function() {
 let shiftChangeStartTime = null;
 
 function startStatusMonitoring() {
-    // Clear any existing monitor
-    if (statusMonitorInterval) {
-        clearInterval(statusMonitorInterval);
-    }
-    
-    // SIMPLIFIED: Less aggressive connection health monitoring
-    const connectionHealthInterval = setInterval(() => {
+    // SIMPLIFIED: Less aggressive connection health monitoring (re-registering replaces existing jobs)
+    LiveRuntime.every('hourly-connection-health', 30000, () => {
         for (const unitName in unitSockets) {
             const socket = unitSockets[unitName];
             
@@ -1547,13 +1567,9 @@ function startStatusMonitoring() {
                 delete unitSockets[unitName];
             }
         }
-    }, 30000); // Check every 30 seconds (much less aggressive)
+    }); // Check every 30 seconds (much less aggressive)
     
-    // Store the interval for cleanup
-    window.connectionHealthInterval = connectionHealthInterval;
-    
-    statusMonitorInterval = setInterval(() => {
-        const now = Date.now();
+    LiveRuntime.every('hourly-status-monitor', 10000, (now) => {
         const timeSinceLastUpdate = now - lastSuccessfulUpdate;
         
         // CRITICAL: Monitor shift change flag to prevent permanent blocking
@@ -1597,7 +1613,7 @@ function startStatusMonitoring() {
                         delete unitSockets[unitName];
                         
                         // Reconnect this unit
-                        setTimeout(() => {
+                        LiveRuntime.after(`hourly-reconnect-unit:${unitName}`, 1000 * deadConnections, () => {
                             console.log(`[STATUS MONITOR] Reconnecting ${unitName}...`);
                             connectHourlyWebSocket(unitName, startTime, endTime, (data) => {
                                 if (data) {
@@ -1606,7 +1622,7 @@ function startStatusMonitoring() {
                                     console.log(`[STATUS MONITOR] Successfully reconnected ${unitName}`);
                                 }
                             });
-                        }, 1000 * deadConnections); // Stagger reconnections
+                        }); // Staggered by 1s per dead connection
                     }
                 }
                 
@@ -1626,20 +1642,12 @@ function startStatusMonitoring() {
             console.warn(`[STATUS MONITOR] No activity for ${Math.round(timeSinceLastUpdate/1000)}s - forcing complete refresh`);
             window.location.reload(); // Force page reload as last resort
         }
-    }, 10000); // Check every 10 seconds
+    }); // Check every 10 seconds
 }
 
 function stopStatusMonitoring() {
-    if (statusMonitorInterval) {
-        clearInterval(statusMonitorInterval);
-        statusMonitorInterval = null;
-    }
-    
-    // Clean up connection health monitoring
-    if (window.connectionHealthInterval) {
-        clearInterval(window.connectionHealthInterval);
-        window.connectionHealthInterval = null;
-    }
+    LiveRuntime.cancel('hourly-status-monitor');
+    LiveRuntime.cancel('hourly-connection-health');
 }
 
 // Update the successful update timestamp when data is processed
@@ -1731,7 +1739,8 @@ window.forceReconnectAll = function() {
     // Reconnect all units
     console.log('Reconnecting all units...');
     selectedUnits.forEach((unitName, index) => {
-        setTimeout(() => {
+        // Staggered by 1s per unit; replaces a status-monitor reconnect still pending for the unit
+        LiveRuntime.after(`hourly-reconnect-unit:${unitName}`, 1000 * index, () => {
             console.log(`Reconnecting ${unitName}...`);
             connectHourlyWebSocket(unitName, startTime, endTime, (data) => {
                 if (data) {
@@ -1740,7 +1749,7 @@ window.forceReconnectAll = function() {
                     console.log(`Successfully reconnected ${unitName}`);
                 }
             });
-        }, 1000 * index); // Stagger connections
+        });
     });
     
     console.log('=== RECONNECTION INITIATED ===');
@@ -1795,18 +1804,11 @@ window.quickFixTables = function() {
     };
 };
 
-// PRODUCTION FIX: Auto-recovery system that runs every 30 seconds
-let productionAutoRecovery = null;
-
+// PRODUCTION FIX: Auto-recovery system that runs every 60 seconds on the shared runtime tick
 window.startProductionAutoRecovery = function() {
-    if (productionAutoRecovery) {
-        clearInterval(productionAutoRecovery);
-    }
-    
     console.log('🚀 PRODUCTION AUTO-RECOVERY: Starting aggressive monitoring');
     
-    productionAutoRecovery = setInterval(() => {
-        const now = Date.now();
+    LiveRuntime.every('hourly-auto-recovery', 60000, (now) => {
         const timeSinceLastUpdate = now - lastSuccessfulUpdate;
         
         // Only auto-fix if no updates for 2 minutes (more conservative)
@@ -1845,15 +1847,14 @@ window.startProductionAutoRecovery = function() {
             console.warn('🚨 PRODUCTION AUTO-RECOVERY: Shift change flag stuck - clearing');
             isShiftChangeInProgress = false;
         }
-    }, 60000); // Check every 60 seconds (less aggressive)
+    }); // Check every 60 seconds (less aggressive)
     
     console.log('✅ PRODUCTION AUTO-RECOVERY: Monitoring active');
 };
 
 window.stopProductionAutoRecovery = function() {
-    if (productionAutoRecovery) {
-        clearInterval(productionAutoRecovery);
-        productionAutoRecovery = null;
+    if (LiveRuntime.has('hourly-auto-recovery')) {
+        LiveRuntime.cancel('hourly-auto-recovery');
         console.log('🛑 PRODUCTION AUTO-RECOVERY: Monitoring stopped');
     }
 };
@@ -0,0 +1,258 @@
+// Shared client runtime for the live dashboard pages (hourly, standart, report).
+//
+// One timer drives every periodic job on the page - clock, shift rollover checks,
+// per-socket data requests and heartbeats, connection health and response deadlines -
+// instead of a separate setInterval per job and per socket. Jobs run on whole-second
+// boundaries, so a page wakes the CPU at most once per second however many units it shows.
+//
+// While the tab is hidden the loop stops completely. On return, jobs registered with
+// { catchUp: true } (clock, shift rollover) run immediately; every other job and deadline
+// is pushed back by the time spent hidden, so timeouts do not all fire at once. Pages do
+// their own "refresh now" work in a LiveRuntime.onResume() handler.
+const LiveRuntime = (() => {
+    const TICK_MS = 1000;
+
+    // name -> { intervalMs, fn, nextRun, once, catchUp }
+    const jobs = new Map();
+    const resumeHandlers = [];
+    let timer = null;
+    let hiddenSince = document.hidden ? Date.now() : null;
+    let sequence = 0;
+
+    function schedule(name, intervalMs, fn, options = {}) {
+        jobs.set(name, {
+            intervalMs: intervalMs,
+            fn: fn,
+            nextRun: Date.now() + (options.immediate ? 0 : intervalMs),
+            once: !!options.once,
+            catchUp: !!options.catchUp
+        });
+        ensureRunning();
+        return name;
+    }
+
+    // Run fn every intervalMs (rounded up to the tick). Re-registering a name replaces the job.
+    function every(name, intervalMs, fn, options = {}) {
+        return schedule(name, intervalMs, fn, options);
+    }
+
+    // Run fn once after delayMs - used for response and connection deadlines
+    function after(name, delayMs, fn) {
+        return schedule(name, delayMs, fn, { once: true });
+    }
+
+    function cancel(name) {
+        if (name) {
+            jobs.delete(name);
+        }
+    }
+
+    function has(name) {
+        return jobs.has(name);
+    }
+
+    // Unique job name for per-socket jobs, so a reconnect never cancels its successor's jobs
+    function uniqueName(prefix) {
+        sequence++;
+        return `${prefix}#${sequence}`;
+    }
+
+    function onResume(handler) {
+        resumeHandlers.push(handler);
+    }
+
+    function runDueJobs() {
+        const now = Date.now();
+        // Snapshot so jobs can add or cancel jobs while running
+        Array.from(jobs.entries()).forEach(([name, job]) => {
+            if (jobs.get(name) !== job || now < job.nextRun) {
+                return;
+            }
+            if (job.once) {
+                jobs.delete(name);
+            } else {
+                job.nextRun = now + job.intervalMs;
+            }
+            try {
+                job.fn(now);
+            } catch (error) {
+                console.error(`[RUNTIME] Job "${name}" failed:`, error);
+            }
+        });
+    }
+
+    function loop() {
+        timer = null;
+        runDueJobs();
+        ensureRunning();
+    }
+
+    function ensureRunning() {
+        if (timer !== null || document.hidden || jobs.size === 0) {
+            return;
+        }
+        // Align to the next whole second so clock displays change on the second
+        timer = setTimeout(loop, TICK_MS - (Date.now() % TICK_MS));
+    }
+
+    function pause() {
+        if (timer !== null) {
+            clearTimeout(timer);
+            timer = null;
+        }
+        hiddenSince = Date.now();
+        console.log(`[RUNTIME] Tab hidden - paused ${jobs.size} jobs`);
+    }
+
+    function resume() {
+        const now = Date.now();
+        const hiddenFor = hiddenSince !== null ? now - hiddenSince : 0;
+        hiddenSince = null;
+
+        jobs.forEach(job => {
+            job.nextRun = job.catchUp ? now : job.nextRun + hiddenFor;
+        });
+        console.log(`[RUNTIME] Tab visible after ${Math.round(hiddenFor / 1000)}s - resuming ${jobs.size} jobs`);
+
+        resumeHandlers.forEach(handler => {
+            try {
+                handler(hiddenFor);
+            } catch (error) {
+                console.error('[RUNTIME] Resume handler failed:', error);
+            }
+        });
+
+        runDueJobs();
+        ensureRunning();
+    }
+
+    document.addEventListener('visibilitychange', () => {
+        if (document.hidden) {
+            pause();
+        } else if (hiddenSince !== null) {
+            resume();
+        }
+    });
+
+    return {
+        every: every,
+        after: after,
+        cancel: cancel,
+        has: has,
+        uniqueName: uniqueName,
+        onResume: onResume,
+        isPaused: () => document.hidden
+    };
+})();
+
+// Threshold alerts pushed by the server on the live sockets as {"alert": {...}} frames
+// (see alerts.py). Shown as toasts in the top right corner: a firing alert stays until it is
+// resolved or clicked away, a resolution replaces it and disappears on its own.
+const LiveAlerts = (() => {
+    const RESOLVED_VISIBLE_MS = 10000;
+    // alert id -> toast element
+    const toasts = new Map();
+    let container = null;
+
+    function ensureContainer() {
+        if (!container) {
+            container = document.createElement('div');
+            container.id = 'live-alerts';
+            container.className = 'fixed top-4 right-4 z-50 flex flex-col gap-2 max-w-sm';
+            document.body.appendChild(container);
+        }
+        return container;
+    }
+
+    function dismiss(id) {
+        const toast = toasts.get(id);
+        if (toast) {
+            toast.remove();
+            toasts.delete(id);
+        }
+        LiveRuntime.cancel(`alert-dismiss:${id}`);
+    }
+
+    function show(alert) {
+        const firing = alert.status === 'firing';
+        console.log(`[ALERT] ${alert.status} ${alert.rule}: ${alert.message}`);
+
+        let toast = toasts.get(alert.id);
+        if (!toast) {
+            toast = document.createElement('div');
+            toast.addEventListener('click', () => dismiss(alert.id));
+            ensureContainer().appendChild(toast);
+            toasts.set(alert.id, toast);
+        }
+        toast.className = `cursor-pointer rounded-lg shadow-lg px-4 py-3 text-sm text-white ${firing ? 'bg-red-600' : 'bg-green-600'}`;
+        toast.textContent = firing ? `⚠ ${alert.message}` : `✓ Düzeldi: ${alert.message}`;
+
+        if (!firing) {
+            LiveRuntime.after(`alert-dismiss:${alert.id}`, RESOLVED_VISIBLE_MS, () => dismiss(alert.id));
+        }
+    }
+
+    // Call first thing in a socket's onmessage; true if the frame was an alert (and is handled)
+    function handleFrame(raw) {
+        if (typeof raw !== 'string' || !raw.startsWith('{"alert"')) {
+            return false;
+        }
+        try {
+            show(JSON.parse(raw).alert);
+        } catch (error) {
+            console.error('[ALERT] Could not show alert:', error);
+        }
+        return true;
+    }
+
+    return {
+        show: show,
+        handleFrame: handleFrame
+    };
+})();
+
+// Last good payloads the server falls back to while the database is slow (see resilience.py) arrive
+// marked {"stale": true, "generated_at": ..., "data_age_seconds": ...}. Pages pass every data frame
+// to track() under a source name (a unit, or the whole report) and show bannerText() instead of
+// their "last update" time while any source is stale.
+const LiveStaleness = (() => {
+    // source -> time its stale payload was generated
+    const staleSources = new Map();
+
+    function track(source, data) {
+        if (data.stale) {
+            staleSources.set(source, new Date(data.generated_at));
+            console.warn(`[STALE] "${source}" showing data from ${Math.round(data.data_age_seconds)}s ago - database is slow`);
+        } else {
+            staleSources.delete(source);
+        }
+    }
+
+    // Oldest stale payload time on the page, or null when every source is live
+    function oldestTime() {
+        let oldest = null;
+        staleSources.forEach(time => {
+            if (!oldest || time < oldest) {
+                oldest = time;
+            }
+        });
+        return oldest;
+    }
+
+    // "Gecikmeli veri: HH:MM:SS (veritabanı yavaş)" for the oldest stale payload, or null
+    function bannerText() {
+        const staleSince = oldestTime();
+        if (!staleSince) {
+            return null;
+        }
+        const staleClock = [staleSince.getHours(), staleSince.getMinutes(), staleSince.getSeconds()]
+            .map(part => String(part).padStart(2, '0')).join(':');
+        return `Gecikmeli veri: ${staleClock} (veritabanı yavaş)`;
+    }
+
+    return {
+        track: track,
+        oldestTime: oldestTime,
+        bannerText: bannerText
+    };
+})();
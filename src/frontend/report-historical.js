@@ -306,54 +306,47 @@ function updateLastUpdateTime() {
 function loadHistoricalData() {
     loadingIndicator.classList.remove('hidden');
     
-    let completedRequests = 0;
-    const totalRequests = selectedUnits.length;
-    
-    function checkAllRequestsCompleted() {
-        completedRequests++;
-        if (completedRequests === totalRequests) {
-            console.log('[HISTORICAL REPORT] All data loaded, creating charts');
-            loadingIndicator.classList.add('hidden');
-            summaryContainer.classList.remove('hidden');
-            chartsContainer.classList.remove('hidden');
-            createCharts();
-        }
-    }
-    
-    selectedUnits.forEach(unitName => {
-        fetchHistoricalReportData(unitName, startTime, endTime, (data) => {
-            if (data) {
-                unitData[unitName] = data;
-                console.log(`[HISTORICAL REPORT] Data loaded for ${unitName}:`, data);
-            } else {
-                console.error(`[HISTORICAL REPORT] Failed to load data for ${unitName}`);
-                unitData[unitName] = null;
-            }
-            checkAllRequestsCompleted();
+    // One request for every unit's summary; models are only fetched on drill-down
+    fetchHistoricalUnitSummaries(startTime, endTime, (items) => {
+        selectedUnits.forEach(unitName => {
+            unitData[unitName] = null;
         });
+        if (items) {
+            items.forEach(item => {
+                unitData[item.unit_name] = item;
+            });
+        } else {
+            console.error('[HISTORICAL REPORT] Failed to load unit summaries');
+        }
+        
+        console.log('[HISTORICAL REPORT] All data loaded, creating charts');
+        loadingIndicator.classList.add('hidden');
+        summaryContainer.classList.remove('hidden');
+        chartsContainer.classList.remove('hidden');
+        createCharts();
     });
 }
 
-// Fetch historical report data using HTTP endpoint
-function fetchHistoricalReportData(unitName, startTime, endTime, callback) {
-    const url = new URL(`/historical-data/${encodeURIComponent(unitName)}`, window.location.origin);
+// Fetch the summaries of all selected units (/rankings/units, every unit)
+function fetchHistoricalUnitSummaries(startTime, endTime, callback) {
+    const url = new URL('/rankings/units', window.location.origin);
+    url.searchParams.append('units', selectedUnits.join(','));
     url.searchParams.append('start_time', startTime.toISOString());
     url.searchParams.append('end_time', endTime.toISOString());
     url.searchParams.append('working_mode', workingModeValue || 'mode1');
+    url.searchParams.append('metric', 'production');
+    url.searchParams.append('limit', selectedUnits.length);
     
-    console.log(`[HISTORICAL REPORT] Fetching data for ${unitName} from:`, url.toString());
+    console.log(`[HISTORICAL REPORT] Fetching summaries for ${selectedUnits.length} units from:`, url.toString());
     
-    fetch(url)
-        .then(response => {
-            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
-            return response.json();
-        })
+    // Closed ranges are answered from the browser cache on later visits (hour-cache.js)
+    HourCache.fetchJson(url)
         .then(data => {
-            console.log(`[HISTORICAL REPORT] Received data for "${unitName}":`, data);
-            callback(data);
+            console.log('[HISTORICAL REPORT] Received unit summaries:', data);
+            callback(data.items);
         })
         .catch(error => {
-            console.error(`[HISTORICAL REPORT] Error fetching data for "${unitName}":`, error);
+            console.error('[HISTORICAL REPORT] Error fetching unit summaries:', error);
             callback(null);
         });
 }
@@ -691,67 +684,74 @@ function updateSummaryStatistics(unitMetrics) {
     document.getElementById('avg-performance').textContent = avgPerformance.toFixed(0);
 }
 
+// Fetch one unit's models, sorted by metric on the server, for a drill-down chart
+function fetchUnitModels(unitName, metric) {
+    const url = new URL(`/drilldown/${encodeURIComponent(unitName)}`, window.location.origin);
+    url.searchParams.append('start_time', startTime.toISOString());
+    url.searchParams.append('end_time', endTime.toISOString());
+    url.searchParams.append('working_mode', workingModeValue || 'mode1');
+    url.searchParams.append('metric', metric);
+
+    return HourCache.fetchJson(url)
+        .then(data => data.items)
+        .catch(error => {
+            console.error(`[HISTORICAL REPORT] Error fetching ${metric} drill-down for "${unitName}":`, error);
+            return [];
+        });
+}
+
 // Drill down to show model-level quality data for a specific unit
 function drillDownToUnitModels(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    qualityChartDrilldownState.originalData = {
-        labels: qualityChart.data.labels.slice(),
-        data: qualityChart.data.datasets[0].data.slice(),
-        backgroundColor: qualityChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: qualityChart.data.datasets[0].borderColor.slice(),
-        title: 'Kalite (%)'
-    };
-    
-    qualityChartDrilldownState.isInDrilldown = true;
-    qualityChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data - handle both new structure (with models array) and old structure
-    let models = [];
-    if (unitDataObj.models && Array.isArray(unitDataObj.models)) {
-        models = unitDataObj.models;
-    } else if (Array.isArray(unitDataObj)) {
-        models = unitDataObj;
-    }
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by quality (/drilldown)
+    fetchUnitModels(unitName, 'quality').then(models => {
+        // Store original data for returning back
+        qualityChartDrilldownState.originalData = {
+            labels: qualityChart.data.labels.slice(),
+            data: qualityChart.data.datasets[0].data.slice(),
+            backgroundColor: qualityChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: qualityChart.data.datasets[0].borderColor.slice(),
+            title: 'Kalite (%)'
+        };
     
-    if (models.length === 0) {
-        console.log('[HISTORICAL REPORT] No model data available for unit:', unitName);
-        return;
-    }
+        qualityChartDrilldownState.isInDrilldown = true;
+        qualityChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate quality for each model
-    const modelData = models.map(model => {
-        const totalProduced = (model.success_qty || 0) + (model.fail_qty || 0);
-        const quality = totalProduced > 0 ? ((model.success_qty || 0) / totalProduced) * 100 : 0;
-        return {
-            name: model.model || 'Unknown Model',
-            quality: quality
-        };
-    });
+        if (models.length === 0) {
+            console.log('[HISTORICAL REPORT] No model data available for unit:', unitName);
+            return;
+        }
 
-    // Sort models by quality descending
-    modelData.sort((a, b) => b.quality - a.quality);
+        // Calculate quality for each model
+        const modelData = models.map(model => {
+            const totalProduced = (model.success_qty || 0) + (model.fail_qty || 0);
+            const quality = totalProduced > 0 ? ((model.success_qty || 0) / totalProduced) * 100 : 0;
+            return {
+                name: model.model || 'Unknown Model',
+                quality: quality
+            };
+        });
 
-    // Colors for models
-    const modelColors = [
-        '#3B82F6', '#EF4444', '#10B981', '#F59E0B', 
-        '#8B5CF6', '#06B6D4', '#F97316', '#84CC16',
-        '#6366F1', '#EC4899', '#14B8A6', '#F59E0B'
-    ];
+        // Colors for models
+        const modelColors = [
+            '#3B82F6', '#EF4444', '#10B981', '#F59E0B', 
+            '#8B5CF6', '#06B6D4', '#F97316', '#84CC16',
+            '#6366F1', '#EC4899', '#14B8A6', '#F59E0B'
+        ];
 
-    // Update quality chart with model data
-    qualityChart.data.labels = modelData.map(m => m.name);
-    qualityChart.data.datasets[0].data = modelData.map(m => m.quality);
-    qualityChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    qualityChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    qualityChart.data.datasets[0].label = `${unitName} - Model Kalite (%)`;
+        // Update quality chart with model data
+        qualityChart.data.labels = modelData.map(m => m.name);
+        qualityChart.data.datasets[0].data = modelData.map(m => m.quality);
+        qualityChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        qualityChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        qualityChart.data.datasets[0].label = `${unitName} - Model Kalite (%)`;
     
-    qualityChart.update('active');
+        qualityChart.update('active');
 
-    // Update chart title and add back button
-    updateQualityChartTitle(`${unitName} - Model Kalite Detayı`, true);
+        // Update chart title and add back button
+        updateQualityChartTitle(`${unitName} - Model Kalite Detayı`, true);
+    });
 }
 
 // Return to unit-level view
@@ -820,63 +820,54 @@ function updateQualityChartTitle(title, showBackButton) {
 
 // Drill down to show model-level fail data for a specific unit
 function drillDownToUnitModelsFail(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    failChartDrilldownState.originalData = {
-        labels: totalFailChart.data.labels.slice(),
-        data: totalFailChart.data.datasets[0].data.slice(),
-        backgroundColor: totalFailChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: totalFailChart.data.datasets[0].borderColor.slice(),
-        title: 'Toplam Tamir'
-    };
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by fail (/drilldown)
+    fetchUnitModels(unitName, 'fail').then(models => {
+        // Store original data for returning back
+        failChartDrilldownState.originalData = {
+            labels: totalFailChart.data.labels.slice(),
+            data: totalFailChart.data.datasets[0].data.slice(),
+            backgroundColor: totalFailChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: totalFailChart.data.datasets[0].borderColor.slice(),
+            title: 'Toplam Tamir'
+        };
     
-    failChartDrilldownState.isInDrilldown = true;
-    failChartDrilldownState.selectedUnit = unitName;
+        failChartDrilldownState.isInDrilldown = true;
+        failChartDrilldownState.selectedUnit = unitName;
 
-    // Get model data - handle both new structure (with models array) and old structure
-    let models = [];
-    if (unitDataObj.models && Array.isArray(unitDataObj.models)) {
-        models = unitDataObj.models;
-    } else if (Array.isArray(unitDataObj)) {
-        models = unitDataObj;
-    }
-    
-    if (models.length === 0) {
-        console.log('[HISTORICAL REPORT] No model data available for unit:', unitName);
-        return;
-    }
-
-    // Calculate fail quantities for each model
-    const modelData = models.map(model => {
-        return {
-            name: model.model || 'Unknown Model',
-            failQty: model.fail_qty || 0
-        };
-    });
+        if (models.length === 0) {
+            console.log('[HISTORICAL REPORT] No model data available for unit:', unitName);
+            return;
+        }
 
-    // Sort models by fail quantity descending
-    modelData.sort((a, b) => b.failQty - a.failQty);
+        // Calculate fail quantities for each model
+        const modelData = models.map(model => {
+            return {
+                name: model.model || 'Unknown Model',
+                failQty: model.fail_qty || 0
+            };
+        });
 
-    // Colors for models (red theme for fails)
-    const modelColors = [
-        '#EF4444', '#DC2626', '#B91C1C', '#991B1B', 
-        '#7F1D1D', '#F87171', '#FCA5A5', '#FECACA',
-        '#FEE2E2', '#FEF2F2', '#F59E0B', '#F97316'
-    ];
+        // Colors for models (red theme for fails)
+        const modelColors = [
+            '#EF4444', '#DC2626', '#B91C1C', '#991B1B', 
+            '#7F1D1D', '#F87171', '#FCA5A5', '#FECACA',
+            '#FEE2E2', '#FEF2F2', '#F59E0B', '#F97316'
+        ];
 
-    // Update fail chart with model data
-    totalFailChart.data.labels = modelData.map(m => m.name);
-    totalFailChart.data.datasets[0].data = modelData.map(m => m.failQty);
-    totalFailChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    totalFailChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    totalFailChart.data.datasets[0].label = `${unitName} - Model Tamir`;
+        // Update fail chart with model data
+        totalFailChart.data.labels = modelData.map(m => m.name);
+        totalFailChart.data.datasets[0].data = modelData.map(m => m.failQty);
+        totalFailChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        totalFailChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        totalFailChart.data.datasets[0].label = `${unitName} - Model Tamir`;
     
-    totalFailChart.update('active');
+        totalFailChart.update('active');
 
-    // Update chart title and add back button
-    updateFailChartTitle(`${unitName} - Model Tamir Detayı`, true);
+        // Update chart title and add back button
+        updateFailChartTitle(`${unitName} - Model Tamir Detayı`, true);
+    });
 }
 
 // Return to unit-level view for fail chart
@@ -945,60 +936,56 @@ function updateFailChartTitle(title, showBackButton) {
 
 // Drill down to show model-level production data for a specific unit
 function drillDownToUnitModelsProduction(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    productionChartDrilldownState.originalData = {
-        labels: totalSuccessChart.data.labels.slice(),
-        data: totalSuccessChart.data.datasets[0].data.slice(),
-        backgroundColor: totalSuccessChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: totalSuccessChart.data.datasets[0].borderColor.slice(),
-        title: 'Toplam Üretim'
-    };
-    
-    productionChartDrilldownState.isInDrilldown = true;
-    productionChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data
-    const models = unitDataObj.models || [];
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by success (/drilldown)
+    fetchUnitModels(unitName, 'success').then(models => {
+        // Store original data for returning back
+        productionChartDrilldownState.originalData = {
+            labels: totalSuccessChart.data.labels.slice(),
+            data: totalSuccessChart.data.datasets[0].data.slice(),
+            backgroundColor: totalSuccessChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: totalSuccessChart.data.datasets[0].borderColor.slice(),
+            title: 'Toplam Üretim'
+        };
     
-    if (models.length === 0) {
-        console.log('[HISTORICAL PRODUCTION DRILL] No model data available for unit:', unitName);
-        return;
-    }
+        productionChartDrilldownState.isInDrilldown = true;
+        productionChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate production quantities for each model
-    const modelData = models.map(model => {
-        return {
-            name: model.model || 'Unknown Model',
-            successQty: model.success_qty || 0
-        };
-    });
+        if (models.length === 0) {
+            console.log('[HISTORICAL PRODUCTION DRILL] No model data available for unit:', unitName);
+            return;
+        }
 
-    // Sort models by production quantity descending
-    modelData.sort((a, b) => b.successQty - a.successQty);
+        // Calculate production quantities for each model
+        const modelData = models.map(model => {
+            return {
+                name: model.model || 'Unknown Model',
+                successQty: model.success_qty || 0
+            };
+        });
 
-    // Colors for models
-    const modelColors = [
-        '#3B82F6', '#1D4ED8', '#1E40AF', '#1E3A8A', 
-        '#1F2937', '#60A5FA', '#93C5FD', '#DBEAFE',
-        '#EFF6FF', '#F0F9FF', '#10B981', '#059669'
-    ];
+        // Colors for models
+        const modelColors = [
+            '#3B82F6', '#1D4ED8', '#1E40AF', '#1E3A8A', 
+            '#1F2937', '#60A5FA', '#93C5FD', '#DBEAFE',
+            '#EFF6FF', '#F0F9FF', '#10B981', '#059669'
+        ];
 
-    // Update production chart with model data
-    totalSuccessChart.data.labels = modelData.map(m => m.name);
-    totalSuccessChart.data.datasets[0].data = modelData.map(m => m.successQty);
-    totalSuccessChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    totalSuccessChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    totalSuccessChart.data.datasets[0].label = `${unitName} - Model Üretim`;
+        // Update production chart with model data
+        totalSuccessChart.data.labels = modelData.map(m => m.name);
+        totalSuccessChart.data.datasets[0].data = modelData.map(m => m.successQty);
+        totalSuccessChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        totalSuccessChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        totalSuccessChart.data.datasets[0].label = `${unitName} - Model Üretim`;
     
-    totalSuccessChart.update('active');
+        totalSuccessChart.update('active');
 
-    // Update chart title and add back button
-    updateProductionChartTitle(`${unitName} - Model Üretim Detayı`, true);
+        // Update chart title and add back button
+        updateProductionChartTitle(`${unitName} - Model Üretim Detayı`, true);
     
-    console.log(`[HISTORICAL PRODUCTION DRILL] Drilled down to ${unitName} models:`, modelData);
+        console.log(`[HISTORICAL PRODUCTION DRILL] Drilled down to ${unitName} models:`, modelData);
+    });
 }
 
 // Return to unit-level view for production chart
@@ -1069,64 +1056,60 @@ function updateProductionChartTitle(title, showBackButton) {
 
 // Drill down to show model-level performance data for a specific unit
 function drillDownToUnitModelsPerformance(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    performanceChartDrilldownState.originalData = {
-        labels: performanceChart.data.labels.slice(),
-        data: performanceChart.data.datasets[0].data.slice(),
-        backgroundColor: performanceChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: performanceChart.data.datasets[0].borderColor.slice(),
-        title: 'OEE (%)'
-    };
-    
-    performanceChartDrilldownState.isInDrilldown = true;
-    performanceChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data
-    const models = unitDataObj.models || [];
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by performance (/drilldown)
+    fetchUnitModels(unitName, 'performance').then(models => {
+        // Store original data for returning back
+        performanceChartDrilldownState.originalData = {
+            labels: performanceChart.data.labels.slice(),
+            data: performanceChart.data.datasets[0].data.slice(),
+            backgroundColor: performanceChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: performanceChart.data.datasets[0].borderColor.slice(),
+            title: 'OEE (%)'
+        };
     
-    if (models.length === 0) {
-        console.log('[HISTORICAL PERFORMANCE DRILL] No model data available for unit:', unitName);
-        return;
-    }
+        performanceChartDrilldownState.isInDrilldown = true;
+        performanceChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate performance for each model
-    const modelData = models.map(model => {
-        let performance = 0;
-        if (model.performance !== null && model.performance !== undefined) {
-            performance = model.performance * 100; // Convert to percentage
+        if (models.length === 0) {
+            console.log('[HISTORICAL PERFORMANCE DRILL] No model data available for unit:', unitName);
+            return;
         }
-        return {
-            name: model.model || 'Unknown Model',
-            performance: performance
-        };
-    });
 
-    // Sort models by performance descending
-    modelData.sort((a, b) => b.performance - a.performance);
+        // Calculate performance for each model
+        const modelData = models.map(model => {
+            let performance = 0;
+            if (model.performance !== null && model.performance !== undefined) {
+                performance = model.performance * 100; // Convert to percentage
+            }
+            return {
+                name: model.model || 'Unknown Model',
+                performance: performance
+            };
+        });
 
-    // Colors for models (green tones for performance)
-    const modelColors = [
-        '#10B981', '#059669', '#047857', '#065F46', 
-        '#064E3B', '#34D399', '#6EE7B7', '#A7F3D0',
-        '#D1FAE5', '#ECFDF5', '#3B82F6', '#1D4ED8'
-    ];
+        // Colors for models (green tones for performance)
+        const modelColors = [
+            '#10B981', '#059669', '#047857', '#065F46', 
+            '#064E3B', '#34D399', '#6EE7B7', '#A7F3D0',
+            '#D1FAE5', '#ECFDF5', '#3B82F6', '#1D4ED8'
+        ];
 
-    // Update performance chart with model data
-    performanceChart.data.labels = modelData.map(m => m.name);
-    performanceChart.data.datasets[0].data = modelData.map(m => m.performance);
-    performanceChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    performanceChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    performanceChart.data.datasets[0].label = `${unitName} - Model Performance (%)`;
+        // Update performance chart with model data
+        performanceChart.data.labels = modelData.map(m => m.name);
+        performanceChart.data.datasets[0].data = modelData.map(m => m.performance);
+        performanceChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        performanceChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        performanceChart.data.datasets[0].label = `${unitName} - Model Performance (%)`;
     
-    performanceChart.update('active');
+        performanceChart.update('active');
 
-    // Update chart title and add back button
-    updatePerformanceChartTitle(`${unitName} - Model Performance Detayı`, true);
+        // Update chart title and add back button
+        updatePerformanceChartTitle(`${unitName} - Model Performance Detayı`, true);
     
-    console.log(`[HISTORICAL PERFORMANCE DRILL] Drilled down to ${unitName} models:`, modelData);
+        console.log(`[HISTORICAL PERFORMANCE DRILL] Drilled down to ${unitName} models:`, modelData);
+    });
 }
 
 // Return to unit-level view for performance chart
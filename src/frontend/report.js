@@ -14,7 +14,11 @@ let oeeChart = null;
 
 // Unit data storage
 let unitData = {};
-let unitSockets = {};
+let plantSummary = null;
+
+// Single report socket for all selected units
+let reportSocket = null;
+let reconnectAttempts = 0;
 
 // Track elements that need flash animation on update
 let elementsToFlashOnUpdate = [];
@@ -26,8 +30,6 @@ let currentSortOrder = 'desc'; // desc or asc
 // Background tab handling variables
 let isTabVisible = true;
 let lastVisibilityChange = Date.now();
-let visibilityCheckInterval = null;
-let clockUpdateInterval = null; // Add clock update interval for live time display
 
 // Quality chart drill-down state
 let qualityChartDrilldownState = {
@@ -105,7 +107,6 @@ document.addEventListener('DOMContentLoaded', () => {
     // Set up background tab optimization
     isTabVisible = !document.hidden;
     document.addEventListener('visibilitychange', handleVisibilityChange);
-    startVisibilityCheck();
     
     // Start clock updates for live data
     startTimeUpdates();
@@ -143,12 +144,9 @@ document.addEventListener('DOMContentLoaded', () => {
     
     // Clean up on page unload
     window.addEventListener('beforeunload', () => {
-        stopVisibilityCheck();
         stopTimeUpdates();
-        for (const unitName in unitSockets) {
-            if (unitSockets[unitName]) {
-                unitSockets[unitName].close();
-            }
+        if (reportSocket) {
+            reportSocket.close();
         }
     });
 });
@@ -350,7 +348,8 @@ function updateLastUpdateTime() {
     const hours = String(now.getHours()).padStart(2, '0');
     const minutes = String(now.getMinutes()).padStart(2, '0');
     const seconds = String(now.getSeconds()).padStart(2, '0');
-    lastUpdateTimeElement.textContent = `Son güncelleme: ${hours}:${minutes}:${seconds}`;
+    // While the server falls back to the last good report, show how old it is instead
+    lastUpdateTimeElement.textContent = LiveStaleness.bannerText() || `Son güncelleme: ${hours}:${minutes}:${seconds}`;
     }
     
     // Apply flash effect to elements that changed
@@ -418,92 +417,37 @@ function handleVisibilityChange() {
     }
 }
 
-function startVisibilityCheck() {
-    // Stop any existing check
-    stopVisibilityCheck();
-    
-    // OPTIMIZED: Reduce monitoring frequency to reduce CPU overhead
-    // Most visibility changes are detected by the built-in event listener
-    // This is just a backup check for edge cases
-    visibilityCheckInterval = setInterval(() => {
-        const currentVisible = !document.hidden;
-        if (currentVisible !== isTabVisible) {
-            // Visibility state changed, handle it
-            console.log('[REPORT VISIBILITY] Detected visibility change via monitoring');
-            handleVisibilityChange();
-        }
-    }, 10000); // Reduced to every 10 seconds for lower overhead
-
-    console.log('[REPORT VISIBILITY] Started optimized background tab monitoring');
-}
-
-function stopVisibilityCheck() {
-    if (visibilityCheckInterval) {
-        clearInterval(visibilityCheckInterval);
-        visibilityCheckInterval = null;
-    }
-}
-
-// Start time updates for live data
+// Start time updates for live data (on the shared LiveRuntime tick, paused while hidden)
 function startTimeUpdates() {
     // Stop any existing timer
     stopTimeUpdates();
     
     // OPTIMIZED: Update time display every 5 seconds instead of every second
     // This reduces CPU overhead while still keeping the display reasonably current
-    clockUpdateInterval = setInterval(() => {
-        updateTimeDisplay();
-    }, 5000);
+    LiveRuntime.every('report-clock', 5000, updateTimeDisplay, { catchUp: true });
     
     console.log('[REPORT TIME] Started optimized time updates (5s interval)');
 }
 
 function stopTimeUpdates() {
-    if (clockUpdateInterval) {
-        clearInterval(clockUpdateInterval);
-        clockUpdateInterval = null;
-    }
+    LiveRuntime.cancel('report-clock');
 }
 
 function forceDataRefreshAllUnits() {
     console.log('[REPORT VISIBILITY] forceDataRefreshAllUnits called');
     console.log('[REPORT VISIBILITY] Current endTime:', endTime.toISOString());
-    console.log('[REPORT VISIBILITY] Current time:', new Date().toISOString());
-
-    let refreshCount = 0;
-    for (const unitName in unitSockets) {
-        const socket = unitSockets[unitName];
-        if (socket && socket.readyState === WebSocket.OPEN) {
-            console.log(`[REPORT VISIBILITY] Forcing data refresh for unit: ${unitName}`);
-
-            // For live data, always use current time as end time
-            const requestEndTime = new Date();
-            const params = {
-                start_time: startTime.toISOString(),
-                end_time: requestEndTime.toISOString(),
-                working_mode: workingModeValue || 'mode1'
-            };
 
-            console.log(`[REPORT VISIBILITY] Sending refresh request for ${unitName}:`, {
-                start: params.start_time,
-                end: params.end_time,
-                working_mode: params.working_mode
-            });
-
-            socket.send(JSON.stringify(params));
-            refreshCount++;
-        } else {
-            console.log(`[REPORT VISIBILITY] Skipping ${unitName} - socket not ready (state: ${socket ? socket.readyState : 'null'})`);
+    // Re-subscribing makes the server push a fresh report at once
+    if (sendReportSubscription()) {
+        // Show update indicator only if we actually sent a refresh request
+        if (updateIndicator) {
+            updateIndicator.classList.remove('hidden');
+            setTimeout(() => {
+                updateIndicator.classList.add('hidden');
+            }, 1500);
         }
-    }
-    
-    // Show update indicator only if we actually sent refresh requests
-    if (refreshCount > 0 && updateIndicator) {
-        updateIndicator.classList.remove('hidden');
-        // Auto-hide after longer delay for batch operations
-        setTimeout(() => {
-            updateIndicator.classList.add('hidden');
-        }, 1500);
+    } else {
+        console.log(`[REPORT VISIBILITY] Skipping refresh - socket not ready (state: ${reportSocket ? reportSocket.readyState : 'null'})`);
     }
 }
 
@@ -518,257 +462,152 @@ function loadData() {
         unitData[unit] = { models: [], summary: null };
     });
     
-    let completedRequests = 0;
+    let chartsCreated = false;
     
-    function checkAllRequestsCompleted() {
-        completedRequests++;
-        if (completedRequests === selectedUnits.length) {
+    // One socket for all units: the server pushes every unit's data plus the plant totals
+    connectReportSocket(() => {
+        if (!chartsCreated) {
+            chartsCreated = true;
             createCharts();
             loadingIndicator.classList.add('hidden');
             chartsContainer.classList.remove('hidden');
             summaryContainer.classList.remove('hidden');
             updateLastUpdateTime();
+        } else {
+            // Batch UI updates to prevent excessive redraws
+            requestAnimationFrame(() => {
+                // Show update indicator
+                updateIndicator.classList.remove('hidden');
+                
+                // Update charts with new data
+                updateCharts();
+                updateLastUpdateTime();
+                
+                // Hide update indicator after a brief moment
+                setTimeout(() => {
+                    updateIndicator.classList.add('hidden');
+                }, 800);
+            });
         }
+    });
+}
+
+// Subscribe (or re-subscribe) the report socket to the selected units and time range
+function sendReportSubscription() {
+    if (!reportSocket || reportSocket.readyState !== WebSocket.OPEN) {
+        return false;
     }
-    
-    // Connect to WebSocket for each unit
-    selectedUnits.forEach(unit => {
-        connectWebSocket(unit, startTime, endTime, () => {
-            checkAllRequestsCompleted();
-        });
+    // For live data, use current time as end time
+    const params = {
+        units: selectedUnits,
+        start_time: startTime.toISOString(),
+        end_time: new Date().toISOString(),
+        working_mode: workingModeValue || 'mode1',
+        // Summaries only; a drill-down fetches its unit's models (/drilldown)
+        include_models: false
+    };
+    console.log(`[REPORT REQUEST] Subscribing to ${selectedUnits.length} units`);
+    reportSocket.send(JSON.stringify(params));
+    return true;
+}
+
+// Store one pushed report: per-unit summaries plus the plant-wide summary
+function applyReportFrame(data) {
+    selectedUnits.forEach(unitName => {
+        const unit = data.units ? data.units[unitName] : null;
+        unitData[unitName] = { summary: unit ? unit.summary : null };
     });
+    plantSummary = data.summary || null;
 }
 
-// Connect to WebSocket and handle data
-function connectWebSocket(unitName, startTime, endTime, callback) {
+// Connect to the report WebSocket; onReport runs after every pushed report (and once on failure to load)
+function connectReportSocket(onReport) {
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/${unitName}`;
+    const wsUrl = `${wsProtocol}//${window.location.host}/ws/report`;
     
-    const unitSocket = new WebSocket(wsUrl);
-    unitSockets[unitName] = unitSocket;
+    const socket = new WebSocket(wsUrl);
+    reportSocket = socket;
     
     let hasReceivedInitialData = false;
-    let updateInterval = null;
-    let reconnectAttempts = 0;
-    let lastRequestTime = 0;
     
-    // Pre-calculate reusable values to reduce overhead
-    const workingMode = workingModeValue || 'mode1';
-    
-    function sendDataRequest() {
-        if (unitSocket.readyState === WebSocket.OPEN) {
-            const now = Date.now();
-            
-            // Throttle requests to prevent excessive calls (minimum 10 seconds between requests)
-            if (now - lastRequestTime < 10000) {
-                console.log(`[REPORT THROTTLE] Skipping request for ${unitName} - too soon (${now - lastRequestTime}ms ago)`);
-                return;
-            }
-            
-            lastRequestTime = now;
-            
-            // For live data, use current time as end time (optimized)
-            const currentEndTime = new Date(now);
-            const params = {
-                start_time: startTime.toISOString(), // Always use fresh start time (not cached)
-                end_time: currentEndTime.toISOString(),
-                working_mode: workingMode // Reuse pre-calculated value
-            };
-            
-            console.log(`[REPORT REQUEST] Sending data request for ${unitName}`);
-            unitSocket.send(JSON.stringify(params));
+    function finishInitialLoad() {
+        if (!hasReceivedInitialData) {
+            hasReceivedInitialData = true;
+            LiveRuntime.cancel(connectionTimeout);
+            onReport();
         }
     }
     
     // Connection timeout
-    const connectionTimeout = setTimeout(() => {
-        if (!hasReceivedInitialData) {
-            hasReceivedInitialData = true;
-            unitData[unitName] = { models: [], summary: null };
-            callback([]);
-        }
-    }, 10000);
+    const connectionTimeout = LiveRuntime.after(LiveRuntime.uniqueName('report-connect'), 10000, () => {
+        finishInitialLoad();
+    });
     
-    unitSocket.onopen = () => {
+    socket.onopen = () => {
         reconnectAttempts = 0;
-        sendDataRequest();
-        
-        // OPTIMIZED INTERVAL SYSTEM
-        const UPDATE_INTERVAL = 20000; // 20 seconds - balanced approach
-        
-        updateInterval = setInterval(() => {
-            // Only send request if connection is still open and tab is active
-            if (unitSocket.readyState === WebSocket.OPEN) {
-                // For background tabs, skip some requests to reduce server load
-                // but still maintain reasonable update frequency
-                const shouldSkipRequest = !isTabVisible && Math.random() < 0.3; // Skip 30% of requests when hidden
-                
-                if (!shouldSkipRequest) {
-                    sendDataRequest();
-                } else {
-                    console.log(`[REPORT OPTIMIZATION] Skipping background request for ${unitName}`);
-                }
-            } else {
-                console.log(`[REPORT ERROR] Connection lost for ${unitName}, clearing interval`);
-                clearInterval(updateInterval);
-                updateInterval = null;
-            }
-        }, UPDATE_INTERVAL);
-        
-        console.log(`[REPORT WEBSOCKET] Connected to ${unitName} with optimized ${UPDATE_INTERVAL}ms interval`);
+        sendReportSubscription();
+        console.log(`[REPORT WEBSOCKET] Connected - the server pushes updates for ${selectedUnits.length} units`);
     };
     
-    unitSocket.onmessage = (event) => {
+    socket.onmessage = (event) => {
         try {
+            if (LiveAlerts.handleFrame(event.data)) {
+                return;
+            }
             const data = JSON.parse(event.data);
             
+            if (data.heartbeat) {
+                return;
+            }
             if (data.error) {
-                console.error(`Error for "${unitName}":`, data.error);
-                if (!hasReceivedInitialData) {
-                    hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
-                    unitData[unitName] = { models: [], summary: null };
-                    callback([]);
-                }
-            } else {
-                // Check if data has the new structure with models and summary
-                if (data.models && data.summary) {
-                    // New structure: store both models and summary
-                    unitData[unitName] = {
-                        models: data.models.map(item => ({
-                            ...item,
-                            unit: unitName
-                        })),
-                        summary: data.summary
-                    };
-                } else {
-                    // Old structure: assume data is array of models (fallback)
-                    unitData[unitName] = {
-                        models: data.map(item => ({
-                            ...item,
-                            unit: unitName
-                        })),
-                        summary: null
-                    };
-                }
-                
-                if (!hasReceivedInitialData) {
-                    hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
-                    callback(data.models || data);
-                } else {
-                    // Batch UI updates to prevent excessive redraws
-                    requestAnimationFrame(() => {
-                    // Show update indicator
-                    updateIndicator.classList.remove('hidden');
-                    
-                    // Update charts with new data
-                    updateCharts();
-                    updateLastUpdateTime();
-                    
-                    // Hide update indicator after a brief moment
-                    setTimeout(() => {
-                        updateIndicator.classList.add('hidden');
-                        }, 800);
-                    });
-                }
+                console.error('Report error:', data.error);
+                finishInitialLoad();
+                return;
             }
-        } catch (error) {
-            console.error(`Error parsing data for "${unitName}":`, error);
+            
+            LiveStaleness.track('report', data);
+            applyReportFrame(data);
             if (!hasReceivedInitialData) {
-                hasReceivedInitialData = true;
-                clearTimeout(connectionTimeout);
-                unitData[unitName] = { models: [], summary: null };
-                callback([]);
+                finishInitialLoad();
+            } else {
+                onReport();
             }
+        } catch (error) {
+            console.error('Error parsing report data:', error);
+            finishInitialLoad();
         }
     };
     
-    unitSocket.onerror = (error) => {
-        console.error(`WebSocket error for "${unitName}":`, error);
+    socket.onerror = (error) => {
+        console.error('Report WebSocket error:', error);
         reconnectAttempts++;
-        
-        // Clean up intervals
-        if (updateInterval) {
-            clearInterval(updateInterval);
-            updateInterval = null;
-        }
-        
-        if (!hasReceivedInitialData) {
-            hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
-            unitData[unitName] = { models: [], summary: null };
-            callback([]);
-        }
+        finishInitialLoad();
     };
     
-    unitSocket.onclose = (event) => {
-        // Clean up intervals
-        if (updateInterval) {
-            clearInterval(updateInterval);
-            updateInterval = null;
-        }
-        
-        console.log(`[REPORT WEBSOCKET] Connection closed for "${unitName}" (code: ${event.code})`);
-        
-        if (!hasReceivedInitialData) {
-            hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
-            unitData[unitName] = { models: [], summary: null };
-            callback([]);
-        }
+    socket.onclose = (event) => {
+        console.log(`[REPORT WEBSOCKET] Connection closed (code: ${event.code})`);
+        finishInitialLoad();
         
         // Auto-reconnect for unexpected closures
         if (event.code !== 1000 && reconnectAttempts < 5) { // 1000 = normal closure
             const reconnectDelay = Math.min(5000 * Math.pow(2, reconnectAttempts), 30000); // Exponential backoff, max 30s
-            console.log(`[REPORT RECONNECT] Will attempt to reconnect ${unitName} in ${reconnectDelay}ms (attempt ${reconnectAttempts + 1}/5)`);
+            console.log(`[REPORT RECONNECT] Will attempt to reconnect in ${reconnectDelay}ms (attempt ${reconnectAttempts + 1}/5)`);
             
-            setTimeout(() => {
-                if (!unitSockets[unitName] || unitSockets[unitName].readyState === WebSocket.CLOSED) {
-                    console.log(`[REPORT RECONNECT] Attempting to reconnect ${unitName}`);
-                    connectWebSocket(unitName, startTime, endTime, () => {
-                        // Force immediate chart update after reconnection
-                        updateCharts();
-                        updateLastUpdateTime();
-                    });
+            LiveRuntime.after(LiveRuntime.uniqueName('report-reconnect'), reconnectDelay, () => {
+                if (reportSocket === socket) {
+                    console.log('[REPORT RECONNECT] Attempting to reconnect');
+                    connectReportSocket(onReport);
                 }
-            }, reconnectDelay);
+            });
         }
     };
 }
 
-// Calculate unit metrics
+// Unit metrics from the server-side unit summary
 function calculateUnitMetrics(unitName) {
-    const unitDataObj = unitData[unitName];
-    
-    if (!unitDataObj) {
-        return {
-            totalSuccess: 0,
-            totalFail: 0,
-            quality: 0,
-            performance: 0
-        };
-    }
-    
-    // Check if we have backend-calculated summary (preferred)
-    if (unitDataObj.summary) {
-        // Use backend summary values - check for new unit_performance_sum field
-        const performance = unitDataObj.summary.unit_performance_sum !== undefined ? 
-            unitDataObj.summary.unit_performance_sum : 
-            unitDataObj.summary.total_performance;
-            
-        return {
-            totalSuccess: unitDataObj.summary.total_success || 0,
-            totalFail: unitDataObj.summary.total_fail || 0,
-            quality: (unitDataObj.summary.total_quality || 0) * 100,
-            performance: (performance || 0) * 100
-        };
-    }
-    
-    // Fallback: calculate from model data if no summary (shouldn't happen with new backend)
-    const data = unitDataObj.models || unitDataObj || [];
+    const summary = unitData[unitName] ? unitData[unitName].summary : null;
     
-    if (data.length === 0) {
+    if (!summary) {
         return {
             totalSuccess: 0,
             totalFail: 0,
@@ -777,39 +616,11 @@ function calculateUnitMetrics(unitName) {
         };
     }
     
-    // Calculate totals for this unit
-    let totalSuccess = 0;
-    let totalFail = 0;
-    let totalQty = 0;
-    let weightedQualitySum = 0;
-    
-    data.forEach(model => {
-        totalSuccess += model.success_qty;
-        totalFail += model.fail_qty;
-        totalQty += model.total_qty;
-        
-        const modelQuality = (model.success_qty + model.fail_qty) > 0 ? model.success_qty / (model.success_qty + model.fail_qty) : 0;
-        weightedQualitySum += modelQuality * (model.success_qty + model.fail_qty);
-    });
-    
-    const quality = (totalSuccess + totalFail) > 0 ? weightedQualitySum / (totalSuccess + totalFail) : 0;
-    
-    // Fallback: Calculate sum of all model performances for this unit
-    let totalPerformance = 0;
-    
-    data.forEach(model => {
-        if (model.performance !== null && model.performance !== undefined) {
-            totalPerformance += model.performance;
-        }
-    });
-    
-    const performance = totalPerformance;
-    
     return {
-        totalSuccess: totalSuccess,
-        totalFail: totalFail,
-        quality: quality * 100,
-        performance: performance * 100
+        totalSuccess: summary.total_success || 0,
+        totalFail: summary.total_fail || 0,
+        quality: (summary.total_quality || 0) * 100,
+        performance: (summary.unit_performance_sum || 0) * 100
     };
 }
 
@@ -1064,35 +875,12 @@ function updateCharts() {
 
 // Update summary statistics
 function updateSummaryStatistics(unitMetrics) {
-    const totalSuccess = unitMetrics.reduce((sum, m) => sum + m.totalSuccess, 0);
-    const totalFail = unitMetrics.reduce((sum, m) => sum + m.totalFail, 0);
-    
-    // Calculate weighted average quality (already weighted by production in individual unit calculations)
-    let weightedQualitySum = 0;
-    let totalProduction = 0;
-    
-    unitMetrics.forEach(m => {
-        const unitProduction = m.totalSuccess + m.totalFail;
-        if (unitProduction > 0) {
-            weightedQualitySum += (m.quality / 100) * unitProduction;
-            totalProduction += unitProduction;
-        }
-    });
-    
-    const avgQuality = totalProduction > 0 ? (weightedQualitySum / totalProduction) * 100 : 0;
-    
-    // Calculate weighted average performance based on unit success values
-    let weightedPerformanceSum = 0;
-    let totalSuccessWeight = 0;
-    
-    unitMetrics.forEach(m => {
-        if (m.totalSuccess > 0) {
-            weightedPerformanceSum += (m.performance / 100) * m.totalSuccess;
-            totalSuccessWeight += m.totalSuccess;
-        }
-    });
-    
-    const avgPerformance = totalSuccessWeight > 0 ? (weightedPerformanceSum / totalSuccessWeight) * 100 : 0;
+    // Plant totals and weighted averages come finished from the server
+    const summary = plantSummary || {};
+    const totalSuccess = summary.total_success || 0;
+    const totalFail = summary.total_fail || 0;
+    const avgQuality = (summary.weighted_quality || 0) * 100;
+    const avgPerformance = (summary.weighted_performance || 0) * 100;
     
     // Check if values have changed and update individual elements
     const totalSuccessElement = document.getElementById('total-success');
@@ -1128,62 +916,78 @@ function updateSummaryStatistics(unitMetrics) {
     }
 }
 
+// Fetch one unit's models, sorted by metric on the server, for a drill-down chart
+function fetchUnitModels(unitName, metric) {
+    const url = new URL(`/drilldown/${encodeURIComponent(unitName)}`, window.location.origin);
+    url.searchParams.append('start_time', startTime.toISOString());
+    url.searchParams.append('end_time', new Date().toISOString());
+    url.searchParams.append('working_mode', workingModeValue || 'mode1');
+    url.searchParams.append('metric', metric);
+
+    return fetch(url)
+        .then(response => {
+            if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+            return response.json();
+        })
+        .then(data => data.items)
+        .catch(error => {
+            console.error(`[REPORT] Error fetching ${metric} drill-down for "${unitName}":`, error);
+            return [];
+        });
+}
+
 // Drill down to show model-level quality data for a specific unit
 function drillDownToUnitModels(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    qualityChartDrilldownState.originalData = {
-        labels: qualityChart.data.labels.slice(),
-        data: qualityChart.data.datasets[0].data.slice(),
-        backgroundColor: qualityChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: qualityChart.data.datasets[0].borderColor.slice(),
-        title: 'Kalite (%)'
-    };
-    
-    qualityChartDrilldownState.isInDrilldown = true;
-    qualityChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data
-    const models = unitDataObj.models || [];
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by quality (/drilldown)
+    fetchUnitModels(unitName, 'quality').then(models => {
+        // Store original data for returning back
+        qualityChartDrilldownState.originalData = {
+            labels: qualityChart.data.labels.slice(),
+            data: qualityChart.data.datasets[0].data.slice(),
+            backgroundColor: qualityChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: qualityChart.data.datasets[0].borderColor.slice(),
+            title: 'Kalite (%)'
+        };
     
-    if (models.length === 0) {
-        console.log('No model data available for unit:', unitName);
-        return;
-    }
+        qualityChartDrilldownState.isInDrilldown = true;
+        qualityChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate quality for each model
-    const modelData = models.map(model => {
-        const totalProduced = (model.success_qty || 0) + (model.fail_qty || 0);
-        const quality = totalProduced > 0 ? ((model.success_qty || 0) / totalProduced) * 100 : 0;
-        return {
-            name: model.model || 'Unknown Model',
-            quality: quality
-        };
-    });
+        if (models.length === 0) {
+            console.log('No model data available for unit:', unitName);
+            return;
+        }
 
-    // Sort models by quality descending
-    modelData.sort((a, b) => b.quality - a.quality);
+        // Calculate quality for each model
+        const modelData = models.map(model => {
+            const totalProduced = (model.success_qty || 0) + (model.fail_qty || 0);
+            const quality = totalProduced > 0 ? ((model.success_qty || 0) / totalProduced) * 100 : 0;
+            return {
+                name: model.model || 'Unknown Model',
+                quality: quality
+            };
+        });
 
-    // Colors for models
-    const modelColors = [
-        '#3B82F6', '#EF4444', '#10B981', '#F59E0B', 
-        '#8B5CF6', '#06B6D4', '#F97316', '#84CC16',
-        '#6366F1', '#EC4899', '#14B8A6', '#F59E0B'
-    ];
+        // Colors for models
+        const modelColors = [
+            '#3B82F6', '#EF4444', '#10B981', '#F59E0B', 
+            '#8B5CF6', '#06B6D4', '#F97316', '#84CC16',
+            '#6366F1', '#EC4899', '#14B8A6', '#F59E0B'
+        ];
 
-    // Update quality chart with model data
-    qualityChart.data.labels = modelData.map(m => m.name);
-    qualityChart.data.datasets[0].data = modelData.map(m => m.quality);
-    qualityChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    qualityChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    qualityChart.data.datasets[0].label = `${unitName} - Model Kalite (%)`;
+        // Update quality chart with model data
+        qualityChart.data.labels = modelData.map(m => m.name);
+        qualityChart.data.datasets[0].data = modelData.map(m => m.quality);
+        qualityChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        qualityChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        qualityChart.data.datasets[0].label = `${unitName} - Model Kalite (%)`;
     
-    qualityChart.update('active');
+        qualityChart.update('active');
 
-    // Update chart title and add back button
-    updateQualityChartTitle(`${unitName} - Model Kalite Detayı`, true);
+        // Update chart title and add back button
+        updateQualityChartTitle(`${unitName} - Model Kalite Detayı`, true);
+    });
 }
 
 // Return to unit-level view
@@ -1252,58 +1056,54 @@ function updateQualityChartTitle(title, showBackButton) {
 
 // Drill down to show model-level fail data for a specific unit
 function drillDownToUnitModelsFail(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    failChartDrilldownState.originalData = {
-        labels: totalFailChart.data.labels.slice(),
-        data: totalFailChart.data.datasets[0].data.slice(),
-        backgroundColor: totalFailChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: totalFailChart.data.datasets[0].borderColor.slice(),
-        title: 'Toplam Tamir'
-    };
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by fail (/drilldown)
+    fetchUnitModels(unitName, 'fail').then(models => {
+        // Store original data for returning back
+        failChartDrilldownState.originalData = {
+            labels: totalFailChart.data.labels.slice(),
+            data: totalFailChart.data.datasets[0].data.slice(),
+            backgroundColor: totalFailChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: totalFailChart.data.datasets[0].borderColor.slice(),
+            title: 'Toplam Tamir'
+        };
     
-    failChartDrilldownState.isInDrilldown = true;
-    failChartDrilldownState.selectedUnit = unitName;
+        failChartDrilldownState.isInDrilldown = true;
+        failChartDrilldownState.selectedUnit = unitName;
 
-    // Get model data
-    const models = unitDataObj.models || [];
-    
-    if (models.length === 0) {
-        console.log('No model data available for unit:', unitName);
-        return;
-    }
+        if (models.length === 0) {
+            console.log('No model data available for unit:', unitName);
+            return;
+        }
 
-    // Calculate fail quantities for each model
-    const modelData = models.map(model => {
-        return {
-            name: model.model || 'Unknown Model',
-            failQty: model.fail_qty || 0
-        };
-    });
+        // Calculate fail quantities for each model
+        const modelData = models.map(model => {
+            return {
+                name: model.model || 'Unknown Model',
+                failQty: model.fail_qty || 0
+            };
+        });
 
-    // Sort models by fail quantity descending
-    modelData.sort((a, b) => b.failQty - a.failQty);
+        // Colors for models
+        const modelColors = [
+            '#EF4444', '#DC2626', '#B91C1C', '#991B1B', 
+            '#7F1D1D', '#F87171', '#FCA5A5', '#FECACA',
+            '#FEE2E2', '#FEF2F2', '#F59E0B', '#F97316'
+        ];
 
-    // Colors for models
-    const modelColors = [
-        '#EF4444', '#DC2626', '#B91C1C', '#991B1B', 
-        '#7F1D1D', '#F87171', '#FCA5A5', '#FECACA',
-        '#FEE2E2', '#FEF2F2', '#F59E0B', '#F97316'
-    ];
-
-    // Update fail chart with model data
-    totalFailChart.data.labels = modelData.map(m => m.name);
-    totalFailChart.data.datasets[0].data = modelData.map(m => m.failQty);
-    totalFailChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    totalFailChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    totalFailChart.data.datasets[0].label = `${unitName} - Model Tamir`;
+        // Update fail chart with model data
+        totalFailChart.data.labels = modelData.map(m => m.name);
+        totalFailChart.data.datasets[0].data = modelData.map(m => m.failQty);
+        totalFailChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        totalFailChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        totalFailChart.data.datasets[0].label = `${unitName} - Model Tamir`;
     
-    totalFailChart.update('active');
+        totalFailChart.update('active');
 
-    // Update chart title and add back button
-    updateFailChartTitle(`${unitName} - Model Tamir Detayı`, true);
+        // Update chart title and add back button
+        updateFailChartTitle(`${unitName} - Model Tamir Detayı`, true);
+    });
 }
 
 // Return to unit-level view for fail chart
@@ -1372,58 +1172,54 @@ function updateFailChartTitle(title, showBackButton) {
 
 // Drill down to show model-level production data for a specific unit
 function drillDownToUnitModelsProduction(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    productionChartDrilldownState.originalData = {
-        labels: totalSuccessChart.data.labels.slice(),
-        data: totalSuccessChart.data.datasets[0].data.slice(),
-        backgroundColor: totalSuccessChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: totalSuccessChart.data.datasets[0].borderColor.slice(),
-        title: 'Toplam Üretim'
-    };
-    
-    productionChartDrilldownState.isInDrilldown = true;
-    productionChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data
-    const models = unitDataObj.models || [];
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by success (/drilldown)
+    fetchUnitModels(unitName, 'success').then(models => {
+        // Store original data for returning back
+        productionChartDrilldownState.originalData = {
+            labels: totalSuccessChart.data.labels.slice(),
+            data: totalSuccessChart.data.datasets[0].data.slice(),
+            backgroundColor: totalSuccessChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: totalSuccessChart.data.datasets[0].borderColor.slice(),
+            title: 'Toplam Üretim'
+        };
     
-    if (models.length === 0) {
-        console.log('No model data available for unit:', unitName);
-        return;
-    }
+        productionChartDrilldownState.isInDrilldown = true;
+        productionChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate production quantities for each model
-    const modelData = models.map(model => {
-        return {
-            name: model.model || 'Unknown Model',
-            successQty: model.success_qty || 0
-        };
-    });
+        if (models.length === 0) {
+            console.log('No model data available for unit:', unitName);
+            return;
+        }
 
-    // Sort models by production quantity descending
-    modelData.sort((a, b) => b.successQty - a.successQty);
+        // Calculate production quantities for each model
+        const modelData = models.map(model => {
+            return {
+                name: model.model || 'Unknown Model',
+                successQty: model.success_qty || 0
+            };
+        });
 
-    // Colors for models
-    const modelColors = [
-        '#3B82F6', '#1D4ED8', '#1E40AF', '#1E3A8A', 
-        '#1F2937', '#60A5FA', '#93C5FD', '#DBEAFE',
-        '#EFF6FF', '#F0F9FF', '#10B981', '#059669'
-    ];
+        // Colors for models
+        const modelColors = [
+            '#3B82F6', '#1D4ED8', '#1E40AF', '#1E3A8A', 
+            '#1F2937', '#60A5FA', '#93C5FD', '#DBEAFE',
+            '#EFF6FF', '#F0F9FF', '#10B981', '#059669'
+        ];
 
-    // Update production chart with model data
-    totalSuccessChart.data.labels = modelData.map(m => m.name);
-    totalSuccessChart.data.datasets[0].data = modelData.map(m => m.successQty);
-    totalSuccessChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    totalSuccessChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    totalSuccessChart.data.datasets[0].label = `${unitName} - Model Üretim`;
+        // Update production chart with model data
+        totalSuccessChart.data.labels = modelData.map(m => m.name);
+        totalSuccessChart.data.datasets[0].data = modelData.map(m => m.successQty);
+        totalSuccessChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        totalSuccessChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        totalSuccessChart.data.datasets[0].label = `${unitName} - Model Üretim`;
     
-    totalSuccessChart.update('active');
+        totalSuccessChart.update('active');
 
-    // Update chart title and add back button
-    updateProductionChartTitle(`${unitName} - Model Üretim Detayı`, true);
+        // Update chart title and add back button
+        updateProductionChartTitle(`${unitName} - Model Üretim Detayı`, true);
+    });
 }
 
 // Return to unit-level view for production chart
@@ -1492,62 +1288,58 @@ function updateProductionChartTitle(title, showBackButton) {
 
 // Drill down to show model-level performance data for a specific unit
 function drillDownToUnitModelsPerformance(unitName) {
-    const unitDataObj = unitData[unitName];
-    if (!unitDataObj) return;
-
-    // Store original data for returning back
-    performanceChartDrilldownState.originalData = {
-        labels: performanceChart.data.labels.slice(),
-        data: performanceChart.data.datasets[0].data.slice(),
-        backgroundColor: performanceChart.data.datasets[0].backgroundColor.slice(),
-        borderColor: performanceChart.data.datasets[0].borderColor.slice(),
-        title: 'OEE (%)'
-    };
-    
-    performanceChartDrilldownState.isInDrilldown = true;
-    performanceChartDrilldownState.selectedUnit = unitName;
-
-    // Get model data
-    const models = unitDataObj.models || [];
+    if (!unitData[unitName]) return;
+
+    // Models come from the server already sorted by performance (/drilldown)
+    fetchUnitModels(unitName, 'performance').then(models => {
+        // Store original data for returning back
+        performanceChartDrilldownState.originalData = {
+            labels: performanceChart.data.labels.slice(),
+            data: performanceChart.data.datasets[0].data.slice(),
+            backgroundColor: performanceChart.data.datasets[0].backgroundColor.slice(),
+            borderColor: performanceChart.data.datasets[0].borderColor.slice(),
+            title: 'OEE (%)'
+        };
     
-    if (models.length === 0) {
-        console.log('No model data available for unit:', unitName);
-        return;
-    }
+        performanceChartDrilldownState.isInDrilldown = true;
+        performanceChartDrilldownState.selectedUnit = unitName;
 
-    // Calculate performance for each model
-    const modelData = models.map(model => {
-        let performance = 0;
-        if (model.performance !== null && model.performance !== undefined) {
-            performance = model.performance * 100; // Convert to percentage
+        if (models.length === 0) {
+            console.log('No model data available for unit:', unitName);
+            return;
         }
-        return {
-            name: model.model || 'Unknown Model',
-            performance: performance
-        };
-    });
 
-    // Sort models by performance descending
-    modelData.sort((a, b) => b.performance - a.performance);
+        // Calculate performance for each model
+        const modelData = models.map(model => {
+            let performance = 0;
+            if (model.performance !== null && model.performance !== undefined) {
+                performance = model.performance * 100; // Convert to percentage
+            }
+            return {
+                name: model.model || 'Unknown Model',
+                performance: performance
+            };
+        });
 
-    // Colors for models (green tones for performance)
-    const modelColors = [
-        '#10B981', '#059669', '#047857', '#065F46', 
-        '#064E3B', '#34D399', '#6EE7B7', '#A7F3D0',
-        '#D1FAE5', '#ECFDF5', '#3B82F6', '#1D4ED8'
-    ];
+        // Colors for models (green tones for performance)
+        const modelColors = [
+            '#10B981', '#059669', '#047857', '#065F46', 
+            '#064E3B', '#34D399', '#6EE7B7', '#A7F3D0',
+            '#D1FAE5', '#ECFDF5', '#3B82F6', '#1D4ED8'
+        ];
 
-    // Update performance chart with model data
-    performanceChart.data.labels = modelData.map(m => m.name);
-    performanceChart.data.datasets[0].data = modelData.map(m => m.performance);
-    performanceChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
-    performanceChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
-    performanceChart.data.datasets[0].label = `${unitName} - Model Performance (%)`;
+        // Update performance chart with model data
+        performanceChart.data.labels = modelData.map(m => m.name);
+        performanceChart.data.datasets[0].data = modelData.map(m => m.performance);
+        performanceChart.data.datasets[0].backgroundColor = modelColors.slice(0, modelData.length);
+        performanceChart.data.datasets[0].borderColor = modelColors.slice(0, modelData.length);
+        performanceChart.data.datasets[0].label = `${unitName} - Model Performance (%)`;
     
-    performanceChart.update('active');
+        performanceChart.update('active');
 
-    // Update chart title and add back button
-    updatePerformanceChartTitle(`${unitName} - Model Performance Detayı`, true);
+        // Update chart title and add back button
+        updatePerformanceChartTitle(`${unitName} - Model Performance Detayı`, true);
+    });
 }
 
 // Return to unit-level view for performance chart
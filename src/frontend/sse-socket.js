@@ -0,0 +1,110 @@
+// Server-Sent Events transport for the live displays (standart, hourly).
+//
+// With ?transport=sse in the page URL, LiveTransport.open() returns an SseSocket instead of a
+// WebSocket. It has the WebSocket surface the pages use (readyState, send, close, onopen,
+// onmessage, onerror, onclose), so the page code is unchanged:
+// - the first data request ({start_time, working_mode}) opens /sse/... and from then on the
+//   server pushes every tick; later requests for the same shift are dropped, a new shift start
+//   re-opens the stream
+// - heartbeats are dropped - the server's keepalive comments and pushes do that job
+// - network drops are retried by EventSource itself (with Last-Event-ID); only a fatal stream
+//   error is reported as onclose (code 1006), which hands over to the page's reconnect logic
+const LiveTransport = (() => {
+    const useSse = new URLSearchParams(window.location.search).get('transport') === 'sse'
+        && typeof EventSource !== 'undefined';
+
+    class SseSocket {
+        constructor(wsUrl) {
+            // ws://host/ws/hourly/Unit?format=columnar -> http://host/sse/hourly/Unit?format=columnar
+            this.url = new URL(wsUrl.replace(/^ws/, 'http'));
+            this.url.pathname = this.url.pathname.replace(/^\/ws\//, '/sse/');
+            this.readyState = WebSocket.CONNECTING;
+            this.onopen = null;
+            this.onmessage = null;
+            this.onerror = null;
+            this.onclose = null;
+            this.source = null;
+            this.streamKey = null;
+
+            // "Open" asynchronously like a WebSocket, so handlers assigned after construction still fire
+            setTimeout(() => {
+                if (this.readyState === WebSocket.CONNECTING) {
+                    this.readyState = WebSocket.OPEN;
+                    if (this.onopen) this.onopen({});
+                }
+            }, 0);
+        }
+
+        send(text) {
+            if (this.readyState !== WebSocket.OPEN) {
+                throw new Error('SSE socket is not open');
+            }
+            const params = JSON.parse(text);
+            if (params.heartbeat) {
+                return;
+            }
+            const streamKey = `${params.start_time}|${params.working_mode || 'mode1'}`;
+            if (streamKey !== this.streamKey) {
+                this.streamKey = streamKey;
+                this.openStream(params);
+            }
+        }
+
+        openStream(params) {
+            if (this.source) {
+                this.source.close();
+            }
+            const url = new URL(this.url);
+            url.searchParams.set('start_time', params.start_time);
+            url.searchParams.set('working_mode', params.working_mode || 'mode1');
+            console.log(`[SSE] Subscribing to ${url.pathname} from ${params.start_time}`);
+
+            const source = new EventSource(url);
+            this.source = source;
+            source.onmessage = (event) => {
+                if (this.source === source && this.onmessage) {
+                    this.onmessage({ data: event.data });
+                }
+            };
+            source.onerror = (event) => {
+                if (this.source !== source) {
+                    return;
+                }
+                if (source.readyState === EventSource.CLOSED) {
+                    if (this.onerror) this.onerror(event);
+                    this.finish(1006, 'SSE stream failed');
+                } else {
+                    console.warn(`[SSE] Stream interrupted for ${url.pathname} - browser is reconnecting`);
+                }
+            };
+        }
+
+        close(code = 1000, reason = '') {
+            if (this.readyState !== WebSocket.CLOSED) {
+                this.finish(code, reason);
+            }
+        }
+
+        finish(code, reason) {
+            if (this.source) {
+                this.source.close();
+                this.source = null;
+            }
+            this.readyState = WebSocket.CLOSED;
+            if (this.onclose) this.onclose({ code: code, reason: reason, wasClean: code === 1000 });
+        }
+    }
+
+    function open(wsUrl) {
+        return useSse ? new SseSocket(wsUrl) : new WebSocket(wsUrl);
+    }
+
+    if (useSse) {
+        console.log('[SSE] Using Server-Sent Events transport for live data');
+    }
+
+    return {
+        open: open,
+        usingSse: () => useSse
+    };
+})();
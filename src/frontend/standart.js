@@ -33,9 +33,6 @@ let isShiftChangeInProgress = false;
 // Background tab handling variables
 let isTabVisible = true;
 let lastVisibilityChange = Date.now();
-let visibilityCheckInterval = null;
-let shiftCheckInterval = null;
-let clockUpdateInterval = null; // Add clock update interval for live time display
 
 // Working mode configurations (same as in app.js and hourly.js)
 const workingModes = {
@@ -544,6 +541,9 @@ function processUnitData(unit, data) {
         
         // Store backend-calculated summary
         unitData[unit].summary = data.summary;
+        
+        // Deltas against last week's shift and the 7-day average (only while showing the current shift)
+        unitData[unit].comparison = data.comparison || null;
     } else {
         // Old structure: assume data is array of models (fallback)
         unitData[unit].models = [];
@@ -588,57 +588,15 @@ function updateUI() {
             const successCountElement = document.getElementById(`success-count-${unit.replace(/\s+/g, '-')}`);
             if (successCountElement) {
                 const totalSuccess = models.reduce((sum, model) => sum + model.success_qty, 0);
-                successCountElement.textContent = `OK: ${totalSuccess}`;
-                elementsToFlashOnUpdate.push(successCountElement);
+                const successCountText = `OK: ${totalSuccess}`;
+                if (successCountElement.textContent !== successCountText) {
+                    successCountElement.textContent = successCountText;
+                    elementsToFlashOnUpdate.push(successCountElement);
+                }
             }
             
-            // Update each model row
-            models.forEach(model => {
-                // Update target qty
-                const targetQtyElement = document.getElementById(`target-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`);
-                if (targetQtyElement) {
-                    const targetQty = model.target || '-';
-                    if (targetQtyElement.textContent != targetQty) {
-                        targetQtyElement.textContent = targetQty;
-                    }
-                }
-                
-                // Update success qty
-                const successQtyElement = document.getElementById(`success-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`);
-                if (successQtyElement && successQtyElement.textContent != model.success_qty) {
-                    successQtyElement.textContent = model.success_qty;
-                    elementsToFlashOnUpdate.push(successQtyElement);
-                }
-                
-                // Update fail qty
-                const failQtyElement = document.getElementById(`fail-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`);
-                if (failQtyElement && failQtyElement.textContent != model.fail_qty) {
-                    failQtyElement.textContent = model.fail_qty;
-                    elementsToFlashOnUpdate.push(failQtyElement);
-                }
-                
-                // Update quality
-                const qualityElement = document.getElementById(`quality-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`);
-                if (qualityElement) {
-                    const totalProcessed = model.success_qty + model.fail_qty;
-                    const modelQuality = totalProcessed > 0 ? model.success_qty / totalProcessed : 0;
-                    const quality = (modelQuality * 100).toFixed(0);
-                    if (qualityElement.textContent != quality) {
-                        qualityElement.textContent = quality;
-                    }
-                }
-                
-                // Update Performance (use backend-calculated value)
-                const performanceElement = document.getElementById(`performance-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`);
-                if (performanceElement) {
-                    const performance = (model.performance !== undefined && model.performance !== null) 
-                        ? (model.performance * 100).toFixed(0) 
-                        : '-';
-                    if (performanceElement.textContent != performance) {
-                        performanceElement.textContent = performance;
-                    }
-                }
-            });
+            // Patch model rows in place, keyed by model name; new models get a row appended
+            patchModelRows(unit, models);
         }
     }
 
@@ -696,6 +654,116 @@ function createErrorContainer() {
     return container;
 }
 
+// Keyed model rows per unit: unit -> { tbody, rows: Map(model name -> { row, cells, values }) }
+let modelRowIndex = {};
+
+// Display values for one model row
+function modelRowValues(model) {
+    const totalProcessed = model.success_qty + model.fail_qty;
+    const modelQuality = totalProcessed > 0 ? model.success_qty / totalProcessed : 0;
+    return {
+        target: String(model.target || '-'),
+        success: String(model.success_qty),
+        fail: String(model.fail_qty),
+        quality: (modelQuality * 100).toFixed(0),
+        performance: (model.performance !== undefined && model.performance !== null)
+            ? (model.performance * 100).toFixed(0)
+            : '-'
+    };
+}
+
+function createModelRow(unit, modelName) {
+    const idSuffix = `${unit.replace(/\s+/g, '-')}-${modelName.replace(/\s+/g, '-')}`;
+    const row = document.createElement('tr');
+    
+    // Cell 1: Model Name
+    const modelCell = document.createElement('td');
+    modelCell.className = 'px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900';
+    modelCell.textContent = modelName;
+    row.appendChild(modelCell);
+    
+    // Cells 2-6: Target, Success, Fail, Quality, Performance
+    const cells = {};
+    [
+        ['target', 'text-blue-600'],
+        ['success', 'text-green-600'],
+        ['fail', 'text-red-600'],
+        ['quality', 'text-gray-500'],
+        ['performance', 'text-gray-500']
+    ].forEach(([field, colorClass]) => {
+        const cell = document.createElement('td');
+        cell.className = `px-6 py-4 whitespace-nowrap text-sm ${colorClass}`;
+        cell.id = `${field}-${idSuffix}`;
+        row.appendChild(cell);
+        cells[field] = cell;
+    });
+    
+    return { row: row, cells: cells, values: {} };
+}
+
+// Update a unit's model rows so only changed cells are written
+function patchModelRows(unit, models) {
+    const index = modelRowIndex[unit];
+    if (!index) {
+        return; // Unit had no table when the tables were built
+    }
+    
+    const seen = new Set();
+    models.forEach((model, position) => {
+        seen.add(model.model);
+        let entry = index.rows.get(model.model);
+        if (!entry) {
+            entry = createModelRow(unit, model.model);
+            index.rows.set(model.model, entry);
+            index.tbody.appendChild(entry.row);
+        }
+        
+        const rowClass = position % 2 === 0 ? 'bg-white' : 'bg-gray-50';
+        if (entry.row.className !== rowClass) {
+            entry.row.className = rowClass;
+        }
+        
+        const values = modelRowValues(model);
+        for (const field in values) {
+            if (entry.values[field] !== values[field]) {
+                entry.cells[field].textContent = values[field];
+                if (field === 'success' || field === 'fail') {
+                    elementsToFlashOnUpdate.push(entry.cells[field]);
+                }
+            }
+        }
+        entry.values = values;
+        
+        // Keep row order in step with the data
+        const rowAtPosition = index.tbody.children[position];
+        if (rowAtPosition !== entry.row) {
+            index.tbody.insertBefore(entry.row, rowAtPosition || null);
+        }
+    });
+    
+    // Remove rows for models that are no longer reported (e.g. after a shift change)
+    index.rows.forEach((entry, modelName) => {
+        if (!seen.has(modelName)) {
+            entry.row.remove();
+            index.rows.delete(modelName);
+        }
+    });
+}
+
+// Coalesce UI updates from all unit sockets into a single animation frame
+let uiUpdateFrame = null;
+
+function scheduleUIUpdate() {
+    if (uiUpdateFrame !== null) {
+        return;
+    }
+    uiUpdateFrame = requestAnimationFrame(() => {
+        uiUpdateFrame = null;
+        updateUI();
+        updateLastUpdateTime();
+    });
+}
+
 // Create tables for each unit
 function createUnitTables(unitDataMap) {
     // PRODUCTION FIX: Log shift changes but NEVER block table creation - data freshness is critical
@@ -704,6 +772,7 @@ function createUnitTables(unitDataMap) {
     }
     
     unitsContainer.innerHTML = '';
+    modelRowIndex = {};
     
     let unitCount = 0;
     
@@ -796,63 +865,8 @@ function createUnitTables(unitDataMap) {
 
         
         // Add a row for each model
-        models.forEach((model, index) => {
-                const row = document.createElement('tr');
-            row.className = index % 2 === 0 ? 'bg-white' : 'bg-gray-50';
-            
-            // Cell 1: Model Name
-            const modelCell = document.createElement('td');
-            modelCell.className = 'px-6 py-4 whitespace-nowrap text-sm font-medium text-gray-900';
-            modelCell.textContent = model.model;
-            row.appendChild(modelCell);
-            
-            // Cell 2: Target Quantity
-            const targetCell = document.createElement('td');
-            targetCell.className = 'px-6 py-4 whitespace-nowrap text-sm text-blue-600';
-            targetCell.id = `target-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`;
-            targetCell.textContent = model.target || '-';
-            row.appendChild(targetCell);
-            
-            // Cell 3: Success Quantity
-            const successCell = document.createElement('td');
-            successCell.className = 'px-6 py-4 whitespace-nowrap text-sm text-green-600';
-            successCell.id = `success-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`;
-            successCell.textContent = model.success_qty;
-            // Add to elements that should flash when updated
-            elementsToFlashOnUpdate.push(successCell);
-            row.appendChild(successCell);
-            
-            // Cell 4: Fail Quantity
-            const failCell = document.createElement('td');
-            failCell.className = 'px-6 py-4 whitespace-nowrap text-sm text-red-600';
-            failCell.id = `fail-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`;
-            failCell.textContent = model.fail_qty;
-            // Add to elements that should flash when updated
-            elementsToFlashOnUpdate.push(failCell);
-            row.appendChild(failCell);
-            
-            // Cell 5: Quality
-                const qualityCell = document.createElement('td');
-            qualityCell.className = 'px-6 py-4 whitespace-nowrap text-sm text-gray-500';
-            qualityCell.id = `quality-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`;
-            const totalProcessed = model.success_qty + model.fail_qty;
-            const modelQuality = totalProcessed > 0 ? model.success_qty / totalProcessed : 0;
-            const quality = (modelQuality * 100).toFixed(0);
-            qualityCell.textContent = quality;
-                row.appendChild(qualityCell);
-                
-            // Cell 6: Performance
-                const performanceCell = document.createElement('td');
-            performanceCell.className = 'px-6 py-4 whitespace-nowrap text-sm text-gray-500';
-            performanceCell.id = `performance-${unit.replace(/\s+/g, '-')}-${model.model.replace(/\s+/g, '-')}`;
-            const performance = (model.performance !== undefined && model.performance !== null) 
-                ? (model.performance * 100).toFixed(1) 
-                : '-';
-            performanceCell.textContent = performance;
-                row.appendChild(performanceCell);
-                
-            tbody.appendChild(row);
-        });
+        modelRowIndex[unit] = { tbody: tbody, rows: new Map() };
+        patchModelRows(unit, models);
         
         table.appendChild(tbody);
         unitContainer.appendChild(table);
@@ -873,12 +887,12 @@ function createUnitTables(unitDataMap) {
 
 // Connect to WebSocket and handle data
 function connectWebSocket(unitName, startTime, endTime, callback) {
-    // Determine WebSocket URL
+    // Determine WebSocket URL - request the compact columnar encoding to cut per-frame size
     const wsProtocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/${encodeURIComponent(unitName)}`;
+    const wsUrl = `${wsProtocol}//${window.location.host}/ws/${encodeURIComponent(unitName)}?format=columnar`;
     
-    // Create a new WebSocket for this unit
-    const unitSocket = new WebSocket(wsUrl);
+    // Create a new WebSocket for this unit (or an SSE stream with ?transport=sse, see sse-socket.js)
+    const unitSocket = LiveTransport.open(wsUrl);
     
     // Store the socket for cleanup
     unitSockets[unitName] = unitSocket;
@@ -888,17 +902,17 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
     let updateInterval = null;
     let hasReceivedInitialData = false;
     let lastRequestTime = 0;
-    let heartbeatInterval = null; // SLOW NETWORK FIX: Add heartbeat mechanism
     let lastHeartbeat = Date.now();
+    // Per-socket runtime job names (unique so a reconnect never cancels its successor's jobs)
+    const heartbeatJob = LiveRuntime.uniqueName(`standard-heartbeat:${unitName}`); // SLOW NETWORK FIX: Add heartbeat mechanism
     
     // Pre-calculate reusable values to reduce overhead
     const workingMode = workingModeValue || 'mode1';
     
     // SLOW NETWORK FIX: Add heartbeat mechanism to detect connection issues
     function startHeartbeat() {
-        heartbeatInterval = setInterval(() => {
+        LiveRuntime.every(heartbeatJob, 30000, (now) => {
             if (unitSocket.readyState === WebSocket.OPEN) {
-                const now = Date.now();
                 // Check if we haven't received data in the last 60 seconds
                 if (now - lastHeartbeat > 60000) {
                     console.warn(`[HEARTBEAT] No data received for ${unitName} in 60s - forcing reconnection`);
@@ -919,14 +933,11 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
                     console.warn(`[HEARTBEAT] Failed to send heartbeat for ${unitName}:`, error);
                 }
             }
-        }, 30000); // Send heartbeat every 30 seconds
+        }); // Send heartbeat every 30 seconds
     }
     
     function stopHeartbeat() {
-        if (heartbeatInterval) {
-            clearInterval(heartbeatInterval);
-            heartbeatInterval = null;
-        }
+        LiveRuntime.cancel(heartbeatJob);
     }
     
     function sendDataRequest() {
@@ -934,7 +945,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         if (unitSocket._isInvalid) {
             console.warn(`[SHIFT CHANGE] Stopping data requests from invalid connection for "${unitName}" - connection marked invalid`);
             if (updateInterval) {
-                clearInterval(updateInterval);
+                LiveRuntime.cancel(updateInterval);
                 updateInterval = null;
                 console.warn(`[SHIFT CHANGE] Cleared update interval for invalid connection "${unitName}"`);
             }
@@ -993,7 +1004,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
             console.warn(`Cannot send update request - socket not open for "${unitName}", readyState: ${unitSocket.readyState}`);
             // Clear interval if socket is not open
             if (updateInterval) {
-                clearInterval(updateInterval);
+                LiveRuntime.cancel(updateInterval);
                 updateInterval = null;
             }
             
@@ -1007,7 +1018,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
     }
     
     // SLOW NETWORK FIX: Increased timeout from 10s to 20s for slow networks
-    const connectionTimeout = setTimeout(() => {
+    const connectionTimeout = LiveRuntime.after(LiveRuntime.uniqueName(`standard-connect:${unitName}`), 20000, () => {
         if (!hasReceivedInitialData) {
             console.warn(`Connection timeout for "${unitName}" after 20 seconds. Completing with empty data.`);
             hasReceivedInitialData = true;
@@ -1019,7 +1030,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
             
             callback([]);
         }
-    }, 20000); // SLOW NETWORK FIX: Increased from 10s to 20s
+    }); // SLOW NETWORK FIX: Increased from 10s to 20s
     
     unitSocket.onopen = () => {
         reconnectAttempts = 0; // Reset reconnect attempts on successful connection
@@ -1034,26 +1045,17 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         // OPTIMIZED INTERVAL SYSTEM - Aligned with hourly view for consistency
         const UPDATE_INTERVAL = 12000; // 12 seconds - same as hourly view for live data consistency
         
-        updateInterval = setInterval(() => {
+        // Runs on the shared runtime tick, which is paused entirely while the tab is hidden
+        updateInterval = LiveRuntime.every(LiveRuntime.uniqueName(`standard-update:${unitName}`), UPDATE_INTERVAL, () => {
             // Only send request if connection is still open
             if (unitSocket.readyState === WebSocket.OPEN) {
-                // For background tabs, skip some requests to reduce server load
-                // but still maintain reasonable update frequency
-                const shouldSkipRequest = !isTabVisible && Math.random() < 0.25; // Skip 25% of requests when hidden
-                
-                console.log(`[STANDARD INTERVAL] ${unitName}: tabVisible=${isTabVisible}, shouldSkip=${shouldSkipRequest}`);
-                
-                if (!shouldSkipRequest) {
-                    sendDataRequest();
-                } else {
-                    console.log(`[STANDARD OPTIMIZATION] Skipping background request for ${unitName}`);
-                }
+                sendDataRequest();
             } else {
                 console.log(`[STANDARD ERROR] Connection lost for ${unitName}, clearing interval`);
-                clearInterval(updateInterval);
+                LiveRuntime.cancel(updateInterval);
                 updateInterval = null;
             }
-        }, UPDATE_INTERVAL);
+        });
         
         console.log(`[STANDARD WEBSOCKET] Connected to ${unitName} with optimized ${UPDATE_INTERVAL}ms interval`);
     };
@@ -1064,6 +1066,11 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         lastHeartbeat = Date.now();
         
         try {
+            // Threshold alerts share the socket with the data frames
+            if (LiveAlerts.handleFrame(event.data)) {
+                return;
+            }
+
             // Check if this connection is marked as invalid (from previous shift)
             if (unitSocket._isInvalid) {
                 console.log(`[SHIFT CHANGE] Ignoring data from invalid connection for "${unitName}"`);
@@ -1075,7 +1082,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
                 console.log(`[SHIFT CHANGE] Data processing proceeding during shift change for "${unitName}" (NEVER BLOCK)`);
             }
             
-            const data = JSON.parse(event.data);
+            const data = decodeColumnarFrame(JSON.parse(event.data));
             
             // SLOW NETWORK FIX: Skip heartbeat responses
             if (data.heartbeat) {
@@ -1090,7 +1097,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
                 // Still count as completed for multi-unit processing
                 if (!hasReceivedInitialData) {
                     hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
+                    LiveRuntime.cancel(connectionTimeout);
                     
                     // Ensure we have an entry in unitData even if there's an error
                     if (!unitData[unitName]) {
@@ -1100,20 +1107,19 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
                     callback([]);
                 }
             } else {
+                LiveStaleness.track(unitName, data);
+
                 // Process the data - CRITICAL: Must process before calling callback
                 processUnitData(unitName, data);
                 
                 // Only call the callback once for initial data
                 if (!hasReceivedInitialData) {
                     hasReceivedInitialData = true;
-                    clearTimeout(connectionTimeout);
+                    LiveRuntime.cancel(connectionTimeout);
                     callback(data.models || data);
                 } else {
-                    // If it's a subsequent update, update UI directly with batched rendering
-                    requestAnimationFrame(() => {
-                        updateUI();
-                        updateLastUpdateTime();
-                    });
+                    // If it's a subsequent update, update UI with rendering batched across units
+                    scheduleUIUpdate();
                 }
             }
         } catch (error) {
@@ -1121,7 +1127,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
             
             if (!hasReceivedInitialData) {
                 hasReceivedInitialData = true;
-                clearTimeout(connectionTimeout);
+                LiveRuntime.cancel(connectionTimeout);
                 
                 // Ensure we have an entry in unitData even if there's a parsing error
                 if (!unitData[unitName]) {
@@ -1142,14 +1148,14 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         
         // Clean up intervals
         if (updateInterval) {
-            clearInterval(updateInterval);
+            LiveRuntime.cancel(updateInterval);
             updateInterval = null;
         }
         
         // Count as completed but with no data
         if (!hasReceivedInitialData) {
             hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
+            LiveRuntime.cancel(connectionTimeout);
             callback([]);
         }
     };
@@ -1160,7 +1166,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         
         // Clean up intervals
         if (updateInterval) {
-            clearInterval(updateInterval);
+            LiveRuntime.cancel(updateInterval);
             updateInterval = null;
         }
         
@@ -1169,7 +1175,7 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
         // Make sure we call callback if we haven't received initial data yet
         if (!hasReceivedInitialData) {
             hasReceivedInitialData = true;
-            clearTimeout(connectionTimeout);
+            LiveRuntime.cancel(connectionTimeout);
             callback([]);
             return;
         }
@@ -1181,21 +1187,18 @@ function connectWebSocket(unitName, startTime, endTime, callback) {
             const reconnectDelay = Math.min(baseDelay * Math.pow(1.3, reconnectAttempts), 30000); // Max 30s instead of 20s
             console.log(`[STANDARD RECONNECT] Will attempt to reconnect ${unitName} in ${reconnectDelay}ms (attempt ${reconnectAttempts + 1}/${maxReconnectAttempts})`);
             
-            setTimeout(() => {
+            LiveRuntime.after(LiveRuntime.uniqueName(`standard-reconnect:${unitName}`), reconnectDelay, () => {
                 if (!unitSockets[unitName] || unitSockets[unitName].readyState === WebSocket.CLOSED) {
                     console.log(`[STANDARD RECONNECT] Attempting to reconnect ${unitName}`);
                     connectWebSocket(unitName, startTime, endTime, (data) => {
                         // Only process data on reconnect, don't call original callback
                         if (data && data.length > 0) {
                             processUnitData(unitName, data);
-                            requestAnimationFrame(() => {
-                                updateUI();
-                                updateLastUpdateTime();
-                            });
+                            scheduleUIUpdate();
                         }
                     });
                 }
-            }, reconnectDelay);
+            });
         } else if (event.code !== 1000 && reconnectAttempts >= maxReconnectAttempts) {
             console.error(`Failed to connect to WebSocket for "${unitName}" after ${maxReconnectAttempts} attempts`);
             
@@ -1279,6 +1282,56 @@ function updateSummary() {
         totalPerformance.textContent = newTotalPerformance;
         elementsToFlashOnUpdate.push(totalPerformance);
     }
+    
+    updateShiftComparison();
+}
+
+// Sum the per-unit baseline deltas (same weights as the summary) and show them under the summary
+function updateShiftComparison() {
+    const comparisonElement = document.getElementById('shift-comparison');
+    if (!comparisonElement) return;
+    
+    const baselineLabels = {
+        last_week: 'Geçen hafta aynı vardiya',
+        avg_7d: 'Son 7 gün ortalaması'
+    };
+    const formatDelta = (value, digits) => `${value >= 0 ? '+' : ''}${value.toFixed(digits)}`;
+    
+    const lines = [];
+    Object.keys(baselineLabels).forEach(name => {
+        let deltaSuccess = 0;
+        let deltaFail = 0;
+        let qualityWeighted = 0;
+        let qualityWeight = 0;
+        let performanceWeighted = 0;
+        let performanceWeight = 0;
+        let units = 0;
+        
+        for (const unit in unitData) {
+            const comparison = unitData[unit] && unitData[unit].comparison;
+            const baseline = comparison ? comparison[name] : null;
+            if (!baseline) continue;
+            const summary = unitData[unit].summary || {};
+            const processed = (summary.total_success || 0) + (summary.total_fail || 0);
+            
+            units++;
+            deltaSuccess += baseline.delta_success_qty;
+            deltaFail += baseline.delta_fail_qty;
+            qualityWeighted += baseline.delta_quality * processed;
+            qualityWeight += processed;
+            performanceWeighted += baseline.delta_performance * (summary.total_success || 0);
+            performanceWeight += summary.total_success || 0;
+        }
+        
+        if (units === 0) return;
+        const qualityDelta = qualityWeight > 0 ? (qualityWeighted / qualityWeight) * 100 : 0;
+        const performanceDelta = performanceWeight > 0 ? (performanceWeighted / performanceWeight) * 100 : 0;
+        lines.push(`${baselineLabels[name]}: Üretim ${formatDelta(deltaSuccess, 0)}, Tamir ${formatDelta(deltaFail, 0)}, ` +
+            `Kalite ${formatDelta(qualityDelta, 1)} puan, OEE ${formatDelta(performanceDelta, 1)} puan`);
+    });
+    
+    comparisonElement.textContent = lines.join(' | ');
+    comparisonElement.classList.toggle('hidden', lines.length === 0);
 }
 
 // Update the last update time display
@@ -1290,8 +1343,13 @@ function updateLastUpdateTime() {
     const minutes = String(now.getMinutes()).padStart(2, '0');
     const seconds = String(now.getSeconds()).padStart(2, '0');
     
-    // LIVE data view - always show live update time
-    lastUpdateTimeElement.textContent = `Son güncelleme: ${hours}:${minutes}:${seconds}`;
+    // LIVE data view - show live update time, or the age of the oldest cached payload while the database is slow
+    const staleBanner = LiveStaleness.bannerText();
+    if (staleBanner) {
+        lastUpdateTimeElement.textContent = staleBanner;
+    } else {
+        lastUpdateTimeElement.textContent = `Son güncelleme: ${hours}:${minutes}:${seconds}`;
+    }
     
     // Hide updating indicator
     updateIndicator.classList.add('hidden');
@@ -1445,51 +1503,26 @@ function forceDataRefreshAllUnits() {
     });
 }
 
-// Optimized interval management for background tabs
+// Periodic page jobs run on the shared LiveRuntime tick (see live-runtime.js), which
+// also pauses them while the tab is hidden
 function startOptimizedIntervals() {
-    // Clear any existing intervals
+    // Clear any existing jobs
     stopOptimizedIntervals();
     
     // IMPROVED: Use consistent shift check frequency to prevent timing drift
-    // Reduce frequency but avoid variable intervals that cause synchronization issues
     const SHIFT_CHECK_INTERVAL = 15000; // 15 seconds - consistent for all visibility states
-    shiftCheckInterval = setInterval(() => {
+    LiveRuntime.every('standard-shift-check', SHIFT_CHECK_INTERVAL, () => {
         if (checkForNewTimePeriod()) {
             console.log('Standard view: Shift change detected, updating time period...');
             updateTimePeriod();
         }
-    }, SHIFT_CHECK_INTERVAL);
-    
-    // OPTIMIZED: Reduce visibility check frequency to reduce CPU overhead
-    // Most visibility changes are detected by the built-in event listener
-    visibilityCheckInterval = setInterval(() => {
-        const currentVisible = !document.hidden;
-        if (currentVisible !== isTabVisible) {
-            // Visibility state changed, handle it
-            console.log('[VISIBILITY] Detected visibility change via monitoring');
-            isTabVisible = currentVisible;
-            lastVisibilityChange = Date.now();
-            
-            // Force refresh when tab becomes visible instead of restarting intervals
-            if (isTabVisible) {
-                console.log('[VISIBILITY] Tab became visible - forcing immediate refresh');
-                forceDataRefreshAllUnits();
-            }
-        }
-    }, 10000); // Reduced to every 10 seconds for lower overhead
+    }, { catchUp: true });
     
-    console.log(`[INTERVALS] Started optimized intervals with ${SHIFT_CHECK_INTERVAL}ms shift checks - tab visible: ${isTabVisible}`);
+    console.log(`[INTERVALS] Started runtime jobs with ${SHIFT_CHECK_INTERVAL}ms shift checks - tab visible: ${isTabVisible}`);
 }
 
 function stopOptimizedIntervals() {
-    if (shiftCheckInterval) {
-        clearInterval(shiftCheckInterval);
-        shiftCheckInterval = null;
-    }
-    if (visibilityCheckInterval) {
-        clearInterval(visibilityCheckInterval);
-        visibilityCheckInterval = null;
-    }
+    LiveRuntime.cancel('standard-shift-check');
 }
 
 // Start time updates for live data
@@ -1499,16 +1532,12 @@ function startTimeUpdates() {
     
     // OPTIMIZED: Update time display every 3 seconds instead of every second
     // This reduces CPU overhead while still keeping the display reasonably current
-    clockUpdateInterval = setInterval(() => {
-    updateTimeDisplay();
-    }, 3000);
+    LiveRuntime.every('standard-clock', 3000, updateTimeDisplay, { catchUp: true });
     
     console.log('[STANDARD TIME] Started optimized time updates (3s interval)');
 }
 
 function stopTimeUpdates() {
-    if (clockUpdateInterval) {
-        clearInterval(clockUpdateInterval);
-        clockUpdateInterval = null;
-    }
-} 
\ No newline at end of file
+    LiveRuntime.cancel('standard-clock');
+}
+ 
\ No newline at end of file
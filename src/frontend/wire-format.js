@@ -0,0 +1,31 @@
+// Client side of the compact WebSocket encoding (src/backend/wire_format.py), shared by the live
+// displays (standart, hourly). Pages request ?format=columnar and pass every parsed frame through
+// decodeColumnarFrame.
+
+// Decode a compact columnar frame ({format: 'columnar', schema/rows tables}) back into plain objects.
+// Frames in the default JSON format (and heartbeat/error frames) are returned unchanged.
+function decodeColumnarFrame(frame) {
+    if (!frame || frame.format !== 'columnar') {
+        return frame;
+    }
+
+    const decoded = {};
+    for (const key in frame) {
+        if (key === 'format' || key === 'v') continue;
+
+        const value = frame[key];
+        if (value && Array.isArray(value.schema) && Array.isArray(value.rows)) {
+            // Rebuild each record from the schema header
+            decoded[key] = value.rows.map(row => {
+                const record = {};
+                value.schema.forEach((field, index) => {
+                    record[field] = row[index];
+                });
+                return record;
+            });
+        } else {
+            decoded[key] = value;
+        }
+    }
+    return decoded;
+}